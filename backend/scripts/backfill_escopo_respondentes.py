@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Carimba idOrganizacao, idSetor e numeroUnidade do usuário em respostas e diagnósticos.
+
+Os relatórios por organização/setor filtram pelo escopo gravado nos próprios
+diagnósticos; documentos anteriores a essa mudança precisam ser preenchidos
+uma vez. O script é idempotente: só reescreve documentos cujo escopo difere
+do usuário, então pode rodar a cada migração.
+
+Uso:
+  python backend/scripts/backfill_escopo_respondentes.py
+"""
+
+import os
+from typing import Any, Dict, List
+
+from pymongo import MongoClient, UpdateMany
+from pymongo.errors import PyMongoError
+
+
+CAMPOS_ESCOPO = ("idOrganizacao", "idSetor", "numeroUnidade")
+COLECOES = ("respostas", "diagnosticos")
+
+
+def _uri() -> str:
+    return os.getenv("MONGO_URI", "mongodb://localhost:27017/LuzIA")
+
+
+def _db_name() -> str:
+    return os.getenv("MONGO_DB_NAME", "LuzIA")
+
+
+def _operacao(usuario: Dict[str, Any]) -> UpdateMany:
+    escopo = {campo: usuario.get(campo) for campo in CAMPOS_ESCOPO}
+    divergente = [{campo: {"$ne": valor}} for campo, valor in escopo.items()]
+    return UpdateMany({"anonId": usuario["anonId"], "$or": divergente}, {"$set": escopo})
+
+
+def backfill_escopo(client: MongoClient, batch_size: int = 1000) -> Dict[str, int]:
+    """
+    Percorre os usuários com anonId e aplica o escopo em lotes de ``bulk_write``.
+
+    Returns:
+        Documentos modificados por coleção.
+    """
+    db = client[_db_name()]
+    modificados = {colecao: 0 for colecao in COLECOES}
+    lote: List[UpdateMany] = []
+
+    def _flush() -> None:
+        for colecao in COLECOES:
+            resultado = db[colecao].bulk_write(lote, ordered=False)
+            modificados[colecao] += resultado.modified_count
+        lote.clear()
+
+    cursor = db["usuarios"].find(
+        {"anonId": {"$exists": True, "$ne": None}},
+        {"anonId": 1, **{campo: 1 for campo in CAMPOS_ESCOPO}},
+    ).batch_size(batch_size)
+    for usuario in cursor:
+        lote.append(_operacao(usuario))
+        if len(lote) >= batch_size:
+            _flush()
+    if lote:
+        _flush()
+    return modificados
+
+
+def main() -> int:
+    client = MongoClient(_uri(), serverSelectionTimeoutMS=5000)
+    try:
+        client.admin.command("ping")
+        modificados = backfill_escopo(client)
+        for colecao, total in modificados.items():
+            print(f"[escopo] {colecao}: {total} documentos atualizados")
+        return 0
+    except PyMongoError as exc:
+        print(f"[erro] backfill de escopo falhou: {exc}")
+        return 1
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -72,6 +72,11 @@ def create_all_indexes(client: MongoClient) -> Dict[str, List[str]]:
                 [("anonId", ASCENDING), ("idQuestionario", ASCENDING)],
                 {"name": "ux_respostas_anon_questionario", "unique": True},
             ),
+            ([("idQuestionario", ASCENDING)], {"name": "ix_respostas_questionario"}),
+            (
+                [("idQuestionario", ASCENDING), ("idOrganizacao", ASCENDING), ("idSetor", ASCENDING)],
+                {"name": "ix_respostas_questionario_org_setor"},
+            ),
         ],
     )
 
@@ -80,6 +85,39 @@ def create_all_indexes(client: MongoClient) -> Dict[str, List[str]]:
         [
             ([("anonId", ASCENDING), ("idQuestionario", ASCENDING)], {"name": "ix_diagnosticos_anon_questionario"}),
             ([("dataAnalise", DESCENDING)], {"name": "ix_diagnosticos_dataAnalise_desc"}),
+            ([("idQuestionario", ASCENDING)], {"name": "ix_diagnosticos_questionario"}),
+            (
+                [("idQuestionario", ASCENDING), ("anonId", ASCENDING), ("dataAnalise", DESCENDING)],
+                {"name": "ix_diagnosticos_questionario_anon_data"},
+            ),
+            # Relatórios por escopo (organização ou setor carimbados no diagnóstico)
+            (
+                [
+                    ("idQuestionario", ASCENDING),
+                    ("idOrganizacao", ASCENDING),
+                    ("anonId", ASCENDING),
+                    ("dataCriacao", DESCENDING),
+                ],
+                {"name": "ix_diagnosticos_questionario_org_anon_criacao"},
+            ),
+            (
+                [
+                    ("idQuestionario", ASCENDING),
+                    ("idSetor", ASCENDING),
+                    ("anonId", ASCENDING),
+                    ("dataCriacao", DESCENDING),
+                ],
+                {"name": "ix_diagnosticos_questionario_setor_anon_criacao"},
+            ),
+            # Deltas do refresh incremental de relatórios (janela de dataCriacao)
+            (
+                [("idQuestionario", ASCENDING), ("idOrganizacao", ASCENDING), ("dataCriacao", ASCENDING)],
+                {"name": "ix_diagnosticos_questionario_org_criacao"},
+            ),
+            (
+                [("idQuestionario", ASCENDING), ("idSetor", ASCENDING), ("dataCriacao", ASCENDING)],
+                {"name": "ix_diagnosticos_questionario_setor_criacao"},
+            ),
         ],
     )
 
@@ -112,6 +150,40 @@ def create_all_indexes(client: MongoClient) -> Dict[str, List[str]]:
             ([("idQuestionario", ASCENDING)], {"name": "ix_relatorios_questionario"}),
             ([("tipoRelatorio", ASCENDING)], {"name": "ix_relatorios_tipo"}),
             ([("idOrganizacao", ASCENDING), ("idSetor", ASCENDING)], {"name": "ix_relatorios_org_setor_sparse", "sparse": True}),
+            (
+                [
+                    ("idQuestionario", ASCENDING),
+                    ("idOrganizacao", ASCENDING),
+                    ("idSetor", ASCENDING),
+                    ("tipoRelatorio", ASCENDING),
+                    ("dataGeracao", DESCENDING),
+                ],
+                {"name": "ix_relatorios_escopo_dataGeracao"},
+            ),
+        ],
+    )
+
+    created["dashboard_rollups"] = _ensure_indexes(
+        db["dashboard_rollups"],
+        [
+            (
+                [("idOrganizacao", ASCENDING), ("idSetor", ASCENDING), ("idQuestionario", ASCENDING)],
+                {"name": "ux_dashboard_rollups_org_setor_questionario", "unique": True},
+            ),
+        ],
+    )
+
+    created["exportacoes"] = _ensure_indexes(
+        db["exportacoes"],
+        [
+            ([("criadoEm", ASCENDING)], {"name": "ix_exportacoes_criadoEm"}),
+        ],
+    )
+
+    created["envios_twilio"] = _ensure_indexes(
+        db["envios_twilio"],
+        [
+            ([("telefone", ASCENDING), ("criadoEm", DESCENDING)], {"name": "ix_envios_twilio_telefone_data"}),
         ],
     )
 
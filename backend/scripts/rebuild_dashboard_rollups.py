@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Reconstrói a coleção dashboard_rollups a partir de usuarios, respostas e diagnosticos.
+
+Use para o backfill inicial (antes de ativar DASHBOARD_USE_ROLLUPS) ou para
+corrigir desvios dos contadores incrementais.
+
+Uso:
+  PYTHONPATH=backend/src python backend/scripts/rebuild_dashboard_rollups.py
+"""
+
+import asyncio
+
+from app.core.config import settings
+from app.core.database import close_mongo_connection, connect_to_mongo
+from app.repositories.dashboard_rollups import DashboardRollupsRepo
+
+
+async def main() -> None:
+    await connect_to_mongo()
+    try:
+        print(f"[rollups] Database: {settings.MONGO_DB_NAME}")
+        total = await DashboardRollupsRepo().rebuild()
+        print(f"[rollups] Documentos gravados: {total}")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
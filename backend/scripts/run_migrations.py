@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 Runner simples de migrações para backend/scripts.
-Atualmente executa criação de índices com rollback dos índices criados nesta execução.
+Executa a criação de índices (com rollback dos índices criados nesta execução)
+e o backfill idempotente do escopo carimbado em respostas/diagnósticos.
 """
 
 import os
@@ -10,6 +11,7 @@ from typing import Dict, List
 from pymongo import MongoClient
 from pymongo.errors import PyMongoError
 
+from backfill_escopo_respondentes import backfill_escopo
 from create_indexes import create_all_indexes
 
 
@@ -42,6 +44,8 @@ def main() -> int:
         client.admin.command("ping")
         print("[ok] conexao com MongoDB validada")
         created = create_all_indexes(client)
+        for collection_name, total in backfill_escopo(client).items():
+            print(f"[ok] escopo carimbado em {collection_name}: {total} documentos")
         print("[ok] migracoes concluidas")
         return 0
     except PyMongoError as exc:
@@ -1,13 +1,51 @@
-from typing import Annotated
+from typing import Annotated, Any, Dict, Optional
 import logging
 from fastapi import Depends, HTTPException, status
 from pydantic import ValidationError
+from app.core.cache import cache
+from app.core.config import settings
 from app.core.security import get_current_user as get_token_user, TokenData
 from app.models.base import Usuario, is_active_user_status, normalize_user_status
-from app.repositories.usuarios import UsuariosRepo
+from app.repositories.usuarios import PRINCIPAL_PROJECTION, UsuariosRepo, principal_cache_tag
 
 logger = logging.getLogger(__name__)
 
+PRINCIPAL_CACHE_PREFIX = "auth:principal:"
+
+
+async def _load_principal(token_data: TokenData) -> Optional[Dict[str, Any]]:
+    """Lê do MongoDB apenas os campos do usuário autenticado (PRINCIPAL_PROJECTION)."""
+    user_repo = UsuariosRepo()
+    if token_data.email:
+        return await user_repo.find_by_email(token_data.email, PRINCIPAL_PROJECTION)
+    if token_data.sub:
+        # Compatibilidade com tokens antigos cujo sub ainda era telefone.
+        if "@" in token_data.sub:
+            return await user_repo.find_by_email(token_data.sub.lower(), PRINCIPAL_PROJECTION)
+        return await user_repo.find_by_phone(token_data.sub, PRINCIPAL_PROJECTION)
+    return None
+
+
+async def _resolve_principal(token_data: TokenData) -> Optional[Dict[str, Any]]:
+    """
+    Usuário do token, em cache por ``jti`` durante ``AUTH_PRINCIPAL_CACHE_TTL``.
+
+    A entrada leva a tag ``usuario:{_id}``; atualizações e remoções do usuário
+    no ``UsuariosRepo`` a invalidam.
+    """
+    ttl = settings.AUTH_PRINCIPAL_CACHE_TTL
+    if not token_data.jti or ttl <= 0:
+        return await _load_principal(token_data)
+
+    key = f"{PRINCIPAL_CACHE_PREFIX}{token_data.jti}"
+    cached = await cache.get(key)
+    if cached is not None:
+        return cached
+    user_dict = await _load_principal(token_data)
+    if user_dict is not None:
+        await cache.set(key, user_dict, ttl=ttl, tags=(principal_cache_tag(user_dict["_id"]),))
+    return user_dict
+
 
 async def get_current_user(
     token_data: Annotated[TokenData, Depends(get_token_user)],
@@ -15,17 +53,7 @@ async def get_current_user(
     """
     Dependency to get the current authenticated user from the database.
     """
-    user_repo = UsuariosRepo()
-
-    user_dict = None
-    if token_data.email:
-        user_dict = await user_repo.find_by_email(token_data.email)
-    elif token_data.sub:
-        # Compatibilidade com tokens antigos cujo sub ainda era telefone.
-        if "@" in token_data.sub:
-            user_dict = await user_repo.find_by_email(token_data.sub.lower())
-        else:
-            user_dict = await user_repo.find_by_phone(token_data.sub)
+    user_dict = await _resolve_principal(token_data)
 
     if user_dict is None:
         raise HTTPException(
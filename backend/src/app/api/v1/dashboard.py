@@ -1,8 +1,9 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 
 from app.api.deps import get_current_admin_user
+from app.core.pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT, NEXT_CURSOR_HEADER, Page
 from app.models.base import Usuario
 from app.models.dashboard import (
     DashboardOverview,
@@ -23,6 +24,15 @@ router = APIRouter(prefix="/dashboard")
 # Legacy routes kept for backward compatibility with older frontend bundles.
 legacy_router = APIRouter()
 
+CURSOR_QUERY = Query(None, description="Cursor retornado no header X-Next-Cursor")
+LIMIT_QUERY = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT)
+
+
+def _page_items(response: Response, page: Page):
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page.items
+
 
 @router.get(
     "/organizacoes",
@@ -53,11 +63,14 @@ legacy_router = APIRouter()
     },
 )
 async def listar_organizacoes(
+    response: Response,
+    limit: int = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
     current_user: Usuario = Depends(get_current_admin_user),
 ) -> List[OrganizacaoDashboard]:
     _ = current_user
     service = DashboardService()
-    return await service.list_organizacoes()
+    return _page_items(response, await service.list_organizacoes(limit=limit, cursor=cursor))
 
 
 @router.get("/organizacoes/{org_id}", response_model=OrganizacaoDetalhada)
@@ -79,12 +92,15 @@ async def detalhes_organizacao(
 @router.get("/setores", response_model=List[SetorDashboard])
 @legacy_router.get("/setores", response_model=List[SetorDashboard])
 async def listar_setores(
+    response: Response,
     org_id: Optional[str] = None,
+    limit: int = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
     current_user: Usuario = Depends(get_current_admin_user),
 ) -> List[SetorDashboard]:
     _ = current_user
     service = DashboardService()
-    return await service.list_setores(org_id=org_id)
+    return _page_items(response, await service.list_setores(org_id=org_id, limit=limit, cursor=cursor))
 
 
 @router.get("/setores/{setor_id}", response_model=SetorDetalhado)
@@ -107,13 +123,22 @@ async def detalhes_setor(
 @router.get("/usuarios/ativos", response_model=List[UsuarioAtivo])
 @legacy_router.get("/usuarios/ativos", response_model=List[UsuarioAtivo])
 async def listar_usuarios_ativos(
+    response: Response,
     org_id: Optional[str] = None,
     setor_id: Optional[str] = None,
+    limit: int = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
     current_user: Usuario = Depends(get_current_admin_user),
 ) -> List[UsuarioAtivo]:
     _ = current_user
     service = DashboardService()
-    return await service.list_usuarios_ativos(org_id=org_id, setor_id=setor_id)
+    page = await service.list_usuarios_ativos(
+        org_id=org_id,
+        setor_id=setor_id,
+        limit=limit,
+        cursor=cursor,
+    )
+    return _page_items(response, page)
 
 
 @router.get("/usuarios/{user_id}/progresso", response_model=ProgressoUsuario)
@@ -136,11 +161,14 @@ async def progresso_usuario(
 @router.get("/questionarios/status", response_model=List[QuestionarioStatus])
 @legacy_router.get("/questionarios/status", response_model=List[QuestionarioStatus])
 async def status_questionarios(
+    response: Response,
+    limit: int = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
     current_user: Usuario = Depends(get_current_admin_user),
 ) -> List[QuestionarioStatus]:
     _ = current_user
     service = DashboardService()
-    return await service.list_questionarios_status()
+    return _page_items(response, await service.list_questionarios_status(limit=limit, cursor=cursor))
 
 
 @router.get("/questionarios/{questionario_id}/metricas", response_model=QuestionarioMetricas)
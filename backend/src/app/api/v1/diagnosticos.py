@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from typing import List, Dict, Any, Optional
+from app.core.pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT, apply_next_cursor
 from app.models.base import Usuario
 from app.repositories.diagnosticos import DiagnosticosRepo
 from app.api.deps import get_current_active_user
@@ -8,10 +9,13 @@ router = APIRouter(prefix="/diagnosticos", tags=["diagnosticos"])
 
 @router.get("/me", response_model=List[Dict[str, Any]])
 async def get_my_diagnosticos(
+    response: Response,
+    limit: int = Query(default=DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = Query(default=None),
     current_user: Usuario = Depends(get_current_active_user)
 ) -> List[Dict[str, Any]]:
     """
-    Retorna o histórico de diagnósticos do usuário autenticado.
+    Retorna o histórico de diagnósticos do usuário autenticado (paginado por cursor).
     """
     repo = DiagnosticosRepo()
     
@@ -21,7 +25,8 @@ async def get_my_diagnosticos(
     if not anon_id:
         return []
 
-    diags = await repo.get_by_anon_id(anon_id)
+    docs = await repo.get_by_anon_id(anon_id, limit=limit + 1, cursor=cursor)
+    diags = apply_next_cursor(response, docs, limit, DiagnosticosRepo.LIST_SORT)
     
     # Serialize ObjectIds
     results = []
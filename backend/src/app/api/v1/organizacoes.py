@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from typing import List, Dict, Any, Optional
 from bson import ObjectId
 from bson.errors import InvalidId
 from app.models.base import Organizacao, Usuario
 from app.repositories.organizacoes import OrganizacoesRepo
 from app.api.deps import get_current_admin_user
 from app.core.database import get_db
+from app.core.pagination import MAX_PAGE_LIMIT, apply_next_cursor
 
 router = APIRouter(prefix="/organizacoes", tags=["organizacoes"])
 
@@ -32,14 +33,17 @@ async def create_organization(
 
 @router.get("/", response_model=List[Dict[str, Any]])
 async def list_organizations(
-    limit: int = 100,
+    response: Response,
+    limit: int = Query(default=100, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = Query(default=None),
     current_user: Usuario = Depends(get_current_admin_user)
 ) -> List[Dict[str, Any]]:
     """
-    Lista todas as organizações. Apenas administradores.
+    Lista organizações paginando por cursor (header X-Next-Cursor). Apenas administradores.
     """
     repo = OrganizacoesRepo()
-    orgs = await repo.list_organizations(limit=limit)
+    docs = await repo.list_organizations(limit=limit + 1, cursor=cursor)
+    orgs = apply_next_cursor(response, docs, limit, OrganizacoesRepo.LIST_SORT)
     
     # Convert ObjectId to string for JSON serialization
     for org in orgs:
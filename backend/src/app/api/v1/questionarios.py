@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from typing import List, Dict, Any, Optional
+from app.core.pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT, apply_next_cursor
 from app.models.base import Usuario
 from app.repositories.questionarios import QuestionariosRepo, PerguntasRepo
 from app.api.deps import get_current_active_user, get_current_admin_user
@@ -8,13 +9,17 @@ router = APIRouter(prefix="/questionarios", tags=["questionarios"])
 
 @router.get("/", response_model=List[Dict[str, Any]])
 async def list_questionarios(
+    response: Response,
+    limit: int = Query(default=DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = Query(default=None),
     current_user: Usuario = Depends(get_current_active_user)
 ) -> List[Dict[str, Any]]:
     """
-    Lista todos os questionários ativos.
+    Lista os questionários ativos, paginando por cursor (header X-Next-Cursor).
     """
     repo = QuestionariosRepo()
-    qs = await repo.list_questionnaires()
+    docs = await repo.list_questionnaires(limit=limit + 1, cursor=cursor)
+    qs = apply_next_cursor(response, docs, limit, QuestionariosRepo.LIST_SORT)
     
     # Serialize ObjectId
     results = []
@@ -1,28 +1,41 @@
-import io
+from datetime import timedelta
 from enum import Enum
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.encoders import jsonable_encoder
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
-from bson import ObjectId
+from app.core.config import settings
+from app.core.pagination import apply_next_cursor
 from app.models.base import Usuario
+from app.repositories.exportacoes import STATUS_CONCLUIDO, STATUS_PENDENTE, ExportacoesRepo
 from app.repositories.relatorios import RelatoriosRepo
-from app.repositories.usuarios import UsuariosRepo
 from app.repositories.diagnosticos import DiagnosticosRepo
-from app.services.relatorio_export_service import RelatorioExportService
+from app.services.export_cache import export_cache
+from app.services.export_renderer import export_renderer
+from app.services.relatorio_export_service import RelatorioExportService, serialize_relatorio as _serialize_relatorio
 from app.services.relatorio_service import RelatorioService
-from app.workers.relatorio_tasks import generate_organizational_report, generate_sector_report
+from app.workers.relatorio_tasks import (
+    export_relatorios_zip,
+    generate_organizational_report,
+    generate_sector_report,
+)
 from app.api.deps import get_current_admin_user
 
 router = APIRouter(prefix="/relatorios", tags=["relatorios"])
 
+class ModoGeracao(str, Enum):
+    COMPLETO = "completo"
+    REFRESH = "refresh"
+
+
 class GerarRelatorioRequest(BaseModel):
     idQuestionario: str
     idOrganizacao: str
     idSetor: Optional[str] = None
     anonId: Optional[str] = None
     tipo: str # "organizacional", "setorial" ou "individual"
+    # "refresh": incorpora só os diagnósticos novos desde o último relatório do escopo
+    modo: ModoGeracao = ModoGeracao.COMPLETO
 
 
 class ExportFormat(str, Enum):
@@ -31,65 +44,64 @@ class ExportFormat(str, Enum):
     EXCEL = "excel"
 
 
-def _stringify_id(value: Any) -> Optional[str]:
-    if value is None:
-        return None
-    raw = str(value).strip()
-    return raw if raw else None
+class ExportLoteRequest(BaseModel):
+    idQuestionario: Optional[str] = None
+    idOrganizacao: Optional[str] = None
+    idSetor: Optional[str] = None
+    tipo: Optional[str] = None
+    format: ExportFormat = ExportFormat.PDF
 
 
-def _count_dimensoes(relatorio: Dict[str, Any]) -> int:
-    total = 0
-    for dominio in relatorio.get("dominios") or []:
-        total += len(dominio.get("dimensoes") or [])
-    return total
+def _export_lote_url(job_id: str, suffix: str = "") -> str:
+    return f"{settings.API_V1_STR}/relatorios/export-lote/{job_id}{suffix}"
 
 
-def _serialize_relatorio(relatorio_doc: Dict[str, Any], include_full_payload: bool) -> Dict[str, Any]:
-    encoded = jsonable_encoder(relatorio_doc, custom_encoder={ObjectId: str})
+def _serialize_exportacao(job: Dict[str, Any]) -> Dict[str, Any]:
+    job_id = str(job["_id"])
+    total = int(job.get("total") or 0)
+    processados = int(job.get("processados") or 0)
     result: Dict[str, Any] = {
-        "id": _stringify_id(encoded.pop("_id", None)),
-        "idQuestionario": _stringify_id(encoded.get("idQuestionario")),
-        "idOrganizacao": _stringify_id(encoded.get("idOrganizacao")),
-        "idSetor": _stringify_id(encoded.get("idSetor")),
-        "tipoRelatorio": encoded.get("tipoRelatorio"),
-        "geradoPor": encoded.get("geradoPor"),
-        "dataGeracao": encoded.get("dataGeracao"),
-        "metricas": encoded.get("metricas") or {},
-        "totalDominios": len(encoded.get("dominios") or []),
-        "totalDimensoes": _count_dimensoes(encoded),
+        "job_id": job_id,
+        "status": job.get("status"),
+        "formato": job.get("formato"),
+        "filtros": job.get("filtros") or {},
+        "total": total,
+        "processados": processados,
+        "falhas": int(job.get("falhas") or 0),
+        "progresso": round(100 * processados / total, 1) if total else 0.0,
+        "erros": job.get("erros") or [],
+        "erro": job.get("erro"),
+        "criadoEm": job.get("criadoEm"),
+        "atualizadoEm": job.get("atualizadoEm"),
+        "download_url": None,
     }
-
-    if include_full_payload:
-        result.update(
-            {
-                "dominios": encoded.get("dominios") or [],
-                "recomendacoes": encoded.get("recomendacoes") or [],
-                "observacoes": encoded.get("observacoes"),
-            }
-        )
-
+    if job.get("status") == STATUS_CONCLUIDO and job.get("idArquivo"):
+        result["download_url"] = _export_lote_url(job_id, "/download")
     return result
 
 
 @router.get("", response_model=List[Dict[str, Any]])
 async def listar_relatorios(
+    response: Response,
     questionario_id: Optional[str] = Query(default=None),
     org_id: Optional[str] = Query(default=None),
     setor_id: Optional[str] = Query(default=None),
     tipo: Optional[str] = Query(default=None),
     limit: int = Query(default=20, ge=1, le=200),
+    cursor: Optional[str] = Query(default=None),
     current_user: Usuario = Depends(get_current_admin_user),
 ) -> List[Dict[str, Any]]:
     _ = current_user
     repo = RelatoriosRepo()
-    relatorios = await repo.find_by_filters(
+    docs = await repo.find_by_filters(
         questionario_id=questionario_id,
         org_id=org_id,
         setor_id=setor_id,
         tipo=tipo,
-        limit=limit,
+        limit=limit + 1,
+        cursor=cursor,
     )
+    relatorios = apply_next_cursor(response, docs, limit, RelatoriosRepo.LIST_SORT)
     return [_serialize_relatorio(item, include_full_payload=False) for item in relatorios]
 
 @router.post("/gerar", status_code=status.HTTP_201_CREATED)
@@ -102,48 +114,36 @@ async def gerar_relatorio(
     Suporta tipos: organizacional, setorial e individual.
     """
     d_repo = DiagnosticosRepo()
+    service = RelatorioService()
 
     if req.tipo == "individual" and req.anonId:
         # Relatório individual: buscar diagnósticos de um único usuário
         diagnosticos = await d_repo.find_by_anon_ids([req.anonId], req.idQuestionario)
         if not diagnosticos:
             raise HTTPException(status_code=404, detail="Nenhum diagnóstico encontrado para este usuário.")
-        clean_diags = [diagnosticos[0]]
+        agregado = {"respondentes": 1, "dimensoes": service.agregar_dimensoes([diagnosticos[0]])}
     else:
-        # Relatório organizacional ou setorial
-        u_repo = UsuariosRepo()
-        users = await u_repo.list_users_by_org(req.idOrganizacao, req.idSetor)
-
-        if not users:
-            raise HTTPException(status_code=404, detail="Nenhum usuário encontrado para os filtros informados.")
-
-        anon_ids = [u["anonId"] for u in users if "anonId" in u]
-
-        if not anon_ids:
-            raise HTTPException(status_code=404, detail="Nenhum usuário com AnonID encontrado.")
-
-        diagnosticos = await d_repo.find_by_anon_ids(anon_ids, req.idQuestionario)
+        # Relatório organizacional ou setorial: seleção do diagnóstico mais
+        # recente e agregação por dimensão feitas no MongoDB, filtrando pelo
+        # escopo carimbado nos diagnósticos
+        agregado = await service.agregar_escopo(
+            req.idQuestionario,
+            req.tipo,
+            req.idOrganizacao,
+            req.idSetor,
+            refresh=req.modo == ModoGeracao.REFRESH,
+        )
 
-        if not diagnosticos:
+        if not agregado["respondentes"]:
             raise HTTPException(status_code=404, detail="Nenhum diagnóstico encontrado para gerar o relatório.")
 
-        # Filtrar apenas o diagnóstico mais recente de cada usuário
-        latest_diag_map = {}
-        for d in diagnosticos:
-            aid = d["anonId"]
-            if aid not in latest_diag_map:
-                latest_diag_map[aid] = d
-
-        clean_diags = list(latest_diag_map.values())
-
     # 4. Gerar Relatório usando Service
-    service = RelatorioService()
     # O Pydantic Model Relatorio espera IDs (Any). O service gera o objeto Pydantic.
-    relatorio = service.generate_relatorio(
-        clean_diags, 
-        req.idQuestionario, 
-        req.tipo, 
-        req.idOrganizacao, 
+    relatorio = service.generate_relatorio_agregado(
+        agregado,
+        req.idQuestionario,
+        req.tipo,
+        req.idOrganizacao,
         req.idSetor,
         gerado_por=current_user.telefone # Identifica quem gerou
     )
@@ -157,7 +157,7 @@ async def gerar_relatorio(
     
     return {
         "id": rid, 
-        "message": f"Relatório gerado com sucesso base em {len(clean_diags)} diagnósticos."
+        "message": f"Relatório gerado com sucesso base em {agregado['respondentes']} diagnósticos."
     }
 
 
@@ -177,12 +177,14 @@ async def gerar_relatorio_async(
             setor_id=req.idSetor,
             org_id=req.idOrganizacao,
             gerado_por=current_user.telefone,
+            refresh=req.modo == ModoGeracao.REFRESH,
         )
     else:
         task = generate_organizational_report.delay(
             questionario_id=req.idQuestionario,
             org_id=req.idOrganizacao,
             gerado_por=current_user.telefone,
+            refresh=req.modo == ModoGeracao.REFRESH,
         )
 
     return {
@@ -191,6 +193,93 @@ async def gerar_relatorio_async(
         "message": "Geração de relatório enviada para processamento assíncrono.",
     }
 
+@router.post("/export-lote", status_code=status.HTTP_202_ACCEPTED)
+async def exportar_relatorios_lote(
+    req: ExportLoteRequest,
+    current_user: Usuario = Depends(get_current_admin_user),
+) -> Dict[str, Any]:
+    """
+    Dispara a exportação, em um único ZIP, de todos os relatórios que casam com
+    os filtros. A renderização roda em paralelo no worker; acompanhe pelo
+    ``status_url`` e baixe pelo ``download_url`` quando o job concluir.
+    """
+    r_repo = RelatoriosRepo()
+    total = await r_repo.count_by_filters(
+        questionario_id=req.idQuestionario,
+        org_id=req.idOrganizacao,
+        setor_id=req.idSetor,
+        tipo=req.tipo,
+    )
+    if not total:
+        raise HTTPException(status_code=404, detail="Nenhum relatório encontrado para os filtros informados.")
+    if total > settings.EXPORT_ZIP_MAX_RELATORIOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Filtros retornam {total} relatórios; o máximo por exportação é {settings.EXPORT_ZIP_MAX_RELATORIOS}.",
+        )
+
+    repo = ExportacoesRepo()
+    await repo.purge_expired(timedelta(hours=settings.EXPORT_ZIP_TTL_HOURS))
+    filtros = req.model_dump(exclude={"format"}, exclude_none=True)
+    job_id = await repo.create_job(filtros, req.format.value, total, current_user.telefone)
+    export_relatorios_zip.delay(job_id=job_id)
+
+    return {
+        "job_id": job_id,
+        "status": STATUS_PENDENTE,
+        "total": total,
+        "status_url": _export_lote_url(job_id),
+        "message": "Exportação em lote enviada para processamento assíncrono.",
+    }
+
+
+@router.get("/export-lote/{job_id}", response_model=Dict[str, Any])
+async def status_exportacao_lote(
+    job_id: str,
+    current_user: Usuario = Depends(get_current_admin_user),
+) -> Dict[str, Any]:
+    """Progresso da exportação em lote e, ao concluir, o link de download."""
+    _ = current_user
+    job = await ExportacoesRepo().get_by_id(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Exportação não encontrada")
+    return _serialize_exportacao(job)
+
+
+@router.get("/export-lote/{job_id}/download")
+async def baixar_exportacao_lote(
+    job_id: str,
+    current_user: Usuario = Depends(get_current_admin_user),
+) -> StreamingResponse:
+    """Envia o ZIP da exportação em lote direto do GridFS, em chunks."""
+    _ = current_user
+    repo = ExportacoesRepo()
+    job = await repo.get_by_id(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Exportação não encontrada")
+    if job.get("status") != STATUS_CONCLUIDO or not job.get("idArquivo"):
+        raise HTTPException(status_code=409, detail="Exportação ainda não concluída")
+    arquivo = await repo.open_arquivo(job["idArquivo"])
+    if arquivo is None:
+        raise HTTPException(status_code=410, detail="Arquivo da exportação expirou")
+
+    async def _chunks():
+        while True:
+            chunk = await arquivo.readchunk()
+            if not chunk:
+                break
+            yield chunk
+
+    return StreamingResponse(
+        _chunks(),
+        media_type="application/zip",
+        headers={
+            **_download_headers(f"relatorios_{job_id}.zip", {"Cache-Control": "private, no-store"}),
+            "Content-Length": str(arquivo.length),
+        },
+    )
+
+
 @router.get("/{rel_id}", response_model=Dict[str, Any])
 async def get_relatorio(
     rel_id: str,
@@ -208,12 +297,33 @@ async def get_relatorio(
     return _serialize_relatorio(rel, include_full_payload=True)
 
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidatos = {valor.strip().removeprefix("W/") for valor in if_none_match.split(",")}
+    return "*" in candidatos or f'"{etag}"' in candidatos
+
+
+def _download_headers(filename: str, extra: Dict[str, str]) -> Dict[str, str]:
+    return {"Content-Disposition": f"attachment; filename=\"{filename}\"", **extra}
+
+
 @router.get("/{rel_id}/export")
 async def exportar_relatorio(
     rel_id: str,
     format: ExportFormat = Query(default=ExportFormat.PDF),
+    if_none_match: Optional[str] = Header(default=None),
     current_user: Usuario = Depends(get_current_admin_user),
-) -> StreamingResponse:
+) -> Response:
+    """
+    Exporta o relatório em PDF, CSV ou Excel.
+
+    O arquivo renderizado fica em cache por (conteúdo, formato, versão do
+    renderizador) e a mesma chave é enviada como ``ETag``: um ``If-None-Match``
+    correspondente recebe 304 sem nova renderização. PDF e Excel são
+    renderizados no pool de exportação, fora do event loop; o CSV é gerado
+    em streaming.
+    """
     _ = current_user
     repo = RelatoriosRepo()
     relatorio = await repo.get_by_id(rel_id)
@@ -222,19 +332,28 @@ async def exportar_relatorio(
 
     serializado = _serialize_relatorio(relatorio, include_full_payload=True)
     service = RelatorioExportService()
+    # Autenticado: o navegador pode guardar, mas sempre revalida pelo ETag
+    cache_headers = {"Cache-Control": "private, no-cache"}
     try:
-        exported = service.export(serializado, format.value)
+        etag = service.artifact_key(serializado, format.value)
+        cache_headers["ETag"] = f'"{etag}"'
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+        if format == ExportFormat.CSV:
+            # Iterador síncrono: o Starlette o consome em threadpool, bloco a bloco
+            return StreamingResponse(
+                service.iter_csv_chunks(serializado),
+                media_type=service.media_type_for(format.value),
+                headers=_download_headers(service.filename_for(serializado, format.value), cache_headers),
+            )
+        exported = await export_renderer.render(serializado, format.value, cache=export_cache, service=service)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
     except RuntimeError as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
-    headers = {
-        "Content-Disposition": f"attachment; filename=\"{exported['filename']}\"",
-        "Cache-Control": "no-store",
-    }
-    return StreamingResponse(
-        io.BytesIO(exported["payload"]),
+    return Response(
+        content=exported["payload"],
         media_type=exported["media_type"],
-        headers=headers,
+        headers=_download_headers(exported["filename"], cache_headers),
     )
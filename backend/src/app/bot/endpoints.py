@@ -4,6 +4,7 @@ from pydantic import BaseModel
 from twilio.twiml.messaging_response import MessagingResponse
 from twilio.request_validator import RequestValidator
 from app.bot.flow import BotFlow
+from app.bot.message_guard import message_dedupe, phone_locks
 from app.core.config import get_settings, Settings
 
 router = APIRouter(prefix="/bot", tags=["bot"])
@@ -20,7 +21,8 @@ class DevIncoming(BaseModel):
 async def dev_incoming(payload: DevIncoming):
     """Endpoint de desenvolvimento para testar o bot via JSON (sem Twilio)."""
     try:
-        reply = await bot_flow.handle_incoming(payload.phone, payload.text)
+        async with phone_locks.lock(payload.phone):
+            reply = await bot_flow.handle_incoming(payload.phone, payload.text)
     except Exception as exc:
         import logging
         logging.getLogger(__name__).exception(f"[DEV] Erro ao processar mensagem: {exc}")
@@ -107,8 +109,9 @@ async def twilio_whatsapp_webhook(request: Request, settings: Settings = Depends
     list_title = str(form.get("ListTitle", "")).strip()
     button_payload_raw = str(form.get("ButtonPayload", "")).strip()
     button_text = str(form.get("ButtonText", "")).strip()
+    message_sid = str(form.get("MessageSid", "")).strip()
 
-    logger.info(f"[TWILIO] From={from_} Body='{body}' ListId={list_id}")
+    logger.info(f"[TWILIO] From={from_} Body='{body}' ListId={list_id} Sid={message_sid}")
 
     if not from_:
         raise HTTPException(status_code=400, detail="Campo 'From' ausente.")
@@ -133,16 +136,26 @@ async def twilio_whatsapp_webhook(request: Request, settings: Settings = Depends
     elif button_payload_raw:
         button_payload = {"buttonPayload": button_payload_raw, "body": button_text or body}
 
-    try:
-        reply = await bot_flow.handle_incoming(
-            phone=phone,
-            incoming_text=body,
-            button_payload=button_payload,
-            send_interactive=True,
-        )
-    except Exception as exc:
-        logger.exception(f"[TWILIO] Erro ao processar mensagem de {phone}: {exc}")
-        reply = "Ocorreu um erro interno. Por favor, tente novamente em alguns instantes."
+    # Reenvio do Twilio: devolve a resposta já gerada sem reprocessar
+    reply = await message_dedupe.get(message_sid)
+    if reply is not None:
+        logger.info(f"[TWILIO] MessageSid {message_sid} já processado; reutilizando resposta")
+    else:
+        async with phone_locks.lock(phone):
+            # O reenvio pode ter chegado enquanto a primeira entrega estava em curso
+            reply = await message_dedupe.get(message_sid)
+            if reply is None:
+                try:
+                    reply = await bot_flow.handle_incoming(
+                        phone=phone,
+                        incoming_text=body,
+                        button_payload=button_payload,
+                        send_interactive=True,
+                    )
+                    await message_dedupe.set(message_sid, reply)
+                except Exception as exc:
+                    logger.exception(f"[TWILIO] Erro ao processar mensagem de {phone}: {exc}")
+                    reply = "Ocorreu um erro interno. Por favor, tente novamente em alguns instantes."
 
     logger.info(f"[TWILIO] Reply length={len(reply)} first_50={reply[:50] if reply else 'EMPTY'}")
 
@@ -3,8 +3,10 @@ from __future__ import annotations
 import logging
 import uuid
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Sequence, Union
 
+from app.bot.question_catalog import PerguntaCompilada, question_catalog
+from app.bot.session_store import build_session_store
 from app.core.config import get_settings
 from app.repositories.organizacoes import OrganizacoesRepo
 from app.repositories.questionarios import QuestionariosRepo, PerguntasRepo
@@ -25,6 +27,8 @@ class BotFlow:
         self.setores_repo = SetoresRepo()
         self.questionarios_repo = QuestionariosRepo()
         self.perguntas_repo = PerguntasRepo()
+        self.question_catalog = question_catalog
+        self.session_store = build_session_store(self.users_repo)
         self.respostas_repo = RespostasRepo()
         self.twilio_service = TwilioContentService()
 
@@ -206,28 +210,6 @@ class BotFlow:
         except (TypeError, ValueError):
             return None
 
-    @staticmethod
-    def _coletar_opcoes(pergunta: Dict[str, Any]) -> List[Dict[str, Any]]:
-        opcoes = pergunta.get("opcoesResposta") or []
-        normalizadas: List[Dict[str, Any]] = []
-        for opcao in opcoes:
-            if not isinstance(opcao, dict):
-                continue
-            if "valor" not in opcao or "texto" not in opcao:
-                continue
-            normalizadas.append({"valor": int(opcao["valor"]), "texto": str(opcao["texto"]).strip()})
-        return normalizadas
-
-    @staticmethod
-    def _intervalo_resposta(pergunta: Dict[str, Any], opcoes: List[Dict[str, Any]]) -> tuple[int, int]:
-        if opcoes:
-            valores = [int(o["valor"]) for o in opcoes]
-            return min(valores), max(valores)
-
-        min_v = int(pergunta.get("min", 1))
-        max_v = int(pergunta.get("max", 5))
-        return min_v, max_v
-
     @staticmethod
     def _in_range(valor: LikertValue, min_v: int, max_v: int) -> bool:
         if isinstance(valor, list):
@@ -267,26 +249,25 @@ class BotFlow:
         return valores if len(valores) > 1 else valores[0]
 
     @staticmethod
-    def _formatar_opcoes(opcoes: List[Dict[str, Any]]) -> str:
+    def _formatar_opcoes(opcoes: Sequence[Dict[str, Any]]) -> str:
         linhas: List[str] = []
         for o in opcoes:
             linhas.append(f"{o['valor']} - {o['texto']}")
         return "\n".join(linhas)
 
-    def _get_orientacao(self, pergunta: Dict[str, Any]) -> str:
-        ordem = int(pergunta.get("ordem") or 0)
-        return self.ORIENTACOES.get(ordem, "")
+    def _get_orientacao(self, pergunta: PerguntaCompilada) -> str:
+        return self.ORIENTACOES.get(pergunta.ordem, "")
 
     async def _enviar_pergunta_formatada(
         self,
         phone: str,
-        pergunta: Dict[str, Any],
+        pergunta: PerguntaCompilada,
         indice: int,
         total: int,
         send_interactive: bool,
     ) -> str:
-        texto = str(pergunta.get("texto") or "(Pergunta sem texto)")
-        tipo_escala = str(pergunta.get("tipoEscala") or "")
+        texto = pergunta.texto
+        tipo_escala = pergunta.tipo_escala
         numero_atual = indice + 1
         orientacao = self._get_orientacao(pergunta)
 
@@ -294,14 +275,14 @@ class BotFlow:
             corpo = f"{numero_atual}/{total} - {texto}"
             return f"{orientacao}\n\n{corpo}" if orientacao else corpo
 
-        opcoes = self._coletar_opcoes(pergunta)
+        opcoes = pergunta.opcoes
 
         if send_interactive and opcoes:
             sid = await self.twilio_service.enviar_pergunta_interativa(
                 telefone=phone,
                 texto_pergunta=texto,
                 tipo_escala=tipo_escala,
-                opcoes=opcoes,
+                opcoes=list(opcoes),
                 numero_atual=numero_atual,
                 total=total,
                 orientacao=orientacao,
@@ -316,15 +297,6 @@ class BotFlow:
             return base
         return f"{base}\n\n{self._formatar_opcoes(opcoes)}"
 
-    @staticmethod
-    def _parse_condicao(condicao: str) -> tuple:
-        """Parses conditions like 'valor > 0', 'valor >= 3', 'valor == 1'."""
-        import re
-        m = re.match(r"^valor\s*(>=|<=|!=|==|>|<)\s*(-?\d+)$", condicao.strip())
-        if not m:
-            return (">", 0)
-        return (m.group(1), int(m.group(2)))
-
     @staticmethod
     def _avaliar_condicao(v: int, op: str, threshold: int) -> bool:
         if op == ">":
@@ -342,31 +314,26 @@ class BotFlow:
         return v > 0
 
     @classmethod
-    def _deve_subpergunta(cls, pergunta: Dict[str, Any], valor: LikertValue) -> bool:
-        sub = pergunta.get("subPergunta")
+    def _deve_subpergunta(cls, pergunta: PerguntaCompilada, valor: LikertValue) -> bool:
+        sub = pergunta.sub_pergunta
         if not sub:
             return False
 
-        condicao = str(sub.get("condicao") or "valor > 0").strip()
-        op, threshold = cls._parse_condicao(condicao)
-
         if isinstance(valor, list):
-            return any(cls._avaliar_condicao(int(v), op, threshold) for v in valor)
-        return cls._avaliar_condicao(int(valor), op, threshold)
+            return any(cls._avaliar_condicao(int(v), sub.operador, sub.limiar) for v in valor)
+        return cls._avaliar_condicao(int(valor), sub.operador, sub.limiar)
 
     @staticmethod
-    def _build_subpergunta_state(pergunta: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        sub = pergunta.get("subPergunta") or {}
-        texto = str(sub.get("texto") or "").strip()
-        opcoes = sub.get("opcoes") or []
-        if not texto or not isinstance(opcoes, list) or not opcoes:
+    def _build_subpergunta_state(pergunta: PerguntaCompilada) -> Optional[Dict[str, Any]]:
+        sub = pergunta.sub_pergunta
+        if not sub:
             return None
 
         return {
-            "idPerguntaOrigem": str(pergunta.get("idPergunta") or ""),
-            "texto": texto,
-            "tipoResposta": str(sub.get("tipoResposta") or "").strip(),
-            "opcoes": [str(o).strip() for o in opcoes if str(o).strip()],
+            "idPerguntaOrigem": pergunta.id_pergunta,
+            "texto": sub.texto,
+            "tipoResposta": sub.tipo_resposta,
+            "opcoes": list(sub.opcoes),
         }
 
     def _formatar_subpergunta(self, sub_state: Dict[str, Any]) -> str:
@@ -420,10 +387,20 @@ class BotFlow:
 
         return respostas
 
+    @staticmethod
+    def _is_progress_checkpoint(perguntas_respondidas: Optional[int]) -> bool:
+        every = get_settings().BOT_SESSION_FLUSH_EVERY
+        return bool(perguntas_respondidas) and every > 0 and int(perguntas_respondidas) % every == 0
+
     async def _save_chat_state(self, phone: str, current_state: Dict[str, Any], **changes: Any) -> Dict[str, Any]:
         new_state = dict(current_state)
         new_state.update(changes)
-        await self.users_repo.update_chat_state(phone, new_state)
+        durable = new_state.get("statusChat") != current_state.get("statusChat") or (
+            "indicePergunta" in changes
+            and changes["indicePergunta"] != current_state.get("indicePergunta")
+            and self._is_progress_checkpoint(changes["indicePergunta"])
+        )
+        await self.session_store.save(phone, new_state, durable=durable)
         return new_state
 
     async def _save_fill_status(
@@ -437,6 +414,14 @@ class BotFlow:
         respondido: Optional[bool] = None,
         user_status: Optional[str] = None,
     ) -> None:
+        progress_only = fill_status == "em_andamento" and user_status is None and respondido is None
+        if (
+            progress_only
+            and not self.session_store.write_through
+            and not self._is_progress_checkpoint(perguntas_respondidas)
+        ):
+            # Com sessão no Redis o progresso por resposta é gravado só nos checkpoints.
+            return
         try:
             await self.users_repo.update_fill_status(
                 phone=phone,
@@ -481,7 +466,7 @@ class BotFlow:
         )
 
     async def _reset_user_chat(self, phone: str) -> None:
-        await self.users_repo.update_chat_state(
+        await self.session_store.save(
             phone,
             {
                 "statusChat": "INATIVO",
@@ -496,6 +481,7 @@ class BotFlow:
                 "setorNomeTemp": None,
                 "empresasCandidatas": None,
             },
+            durable=True,
         )
         await self._save_fill_status(
             phone,
@@ -505,7 +491,7 @@ class BotFlow:
         )
 
     async def _start_validation_flow(self, phone: str) -> None:
-        await self.users_repo.update_chat_state(
+        await self.session_store.save(
             phone,
             {
                 "statusChat": "VALIDACAO_EMPRESA",
@@ -520,6 +506,7 @@ class BotFlow:
                 "setorNomeTemp": None,
                 "empresasCandidatas": None,
             },
+            durable=True,
         )
         await self._save_fill_status(phone, fill_status="validando_cadastro")
 
@@ -553,7 +540,7 @@ class BotFlow:
             await self._start_validation_flow(phone)
             return self._intro_message()
 
-        chat_state: Dict[str, Any] = (user.get("metadata") or {}).get("chat_state") or {}
+        chat_state: Dict[str, Any] = await self.session_store.load(phone, user)
         status: str = chat_state.get("statusChat") or "INATIVO"
         indice: int = int(chat_state.get("indicePergunta") or 0)
         id_questionario: Optional[str] = chat_state.get("idQuestionario")
@@ -702,7 +689,7 @@ class BotFlow:
                     return "Não encontrei um questionário ativo no momento."
 
                 q_id = str(q["_id"])
-                questions = await self.perguntas_repo.get_questions(q_id)
+                questions = await self.question_catalog.get(q_id)
                 if not questions:
                     await self._reset_user_chat(phone)
                     return "O questionário está ativo, mas não há perguntas cadastradas."
@@ -749,7 +736,7 @@ class BotFlow:
                 await self._reset_user_chat(phone)
                 return self._empresa_prompt_message()
 
-            questions = await self.perguntas_repo.get_questions(id_questionario)
+            questions = await self.question_catalog.get(id_questionario)
             if not questions:
                 await self._reset_user_chat(phone)
                 return "Não há perguntas cadastradas. Tente novamente mais tarde."
@@ -818,9 +805,7 @@ class BotFlow:
                 )
 
             current_q = questions[indice]
-            tipo_escala = str(current_q.get("tipoEscala") or "")
-
-            if tipo_escala == "texto_livre":
+            if current_q.tipo_escala == "texto_livre":
                 if not raw_text:
                     return "Resposta inválida. Envie um texto curto."
                 if len(raw_text) > 1000:
@@ -833,7 +818,7 @@ class BotFlow:
                 await self.respostas_repo.push_answer(
                     anon_id=anon_id,
                     id_questionario=id_questionario,
-                    id_pergunta=str(current_q.get("idPergunta")),
+                    id_pergunta=current_q.id_pergunta,
                     valor=None,
                     valor_texto=raw_text,
                 )
@@ -866,9 +851,8 @@ class BotFlow:
                     send_interactive=send_interactive,
                 )
 
-            opcoes = self._coletar_opcoes(current_q)
-            min_v, max_v = self._intervalo_resposta(current_q, opcoes)
-            multipla = bool(current_q.get("multipla", False))
+            min_v, max_v = current_q.min_valor, current_q.max_valor
+            multipla = current_q.multipla
 
             if button_payload:
                 valor_parseado: Optional[LikertValue] = self._extrair_valor_botao(button_payload)
@@ -885,7 +869,7 @@ class BotFlow:
             await self.respostas_repo.push_answer(
                 anon_id=anon_id,
                 id_questionario=id_questionario,
-                id_pergunta=str(current_q.get("idPergunta")),
+                id_pergunta=current_q.id_pergunta,
                 valor=valor_parseado,
             )
 
@@ -0,0 +1,133 @@
+"""
+Serialização por telefone e deduplicação de mensagens do webhook do Twilio.
+
+Mensagens do mesmo telefone são processadas uma de cada vez (lock local por
+processo ou, com ``BOT_PHONE_LOCK_BACKEND=redis``, lock distribuído entre
+workers). Cada ``MessageSid`` processado guarda a resposta gerada, de modo que
+reenvios do Twilio recebem a mesma resposta sem tocar no MongoDB.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from app.core.cache import cache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as redis
+except Exception:  # pragma: no cover
+    redis = None
+
+LOCK_KEY_PREFIX = "bot:lock:"
+DEDUPE_KEY_PREFIX = "bot:msg:"
+
+
+class PhoneLocks:
+    """Locks assíncronos por telefone, descartados quando ninguém os aguarda."""
+
+    def __init__(self, backend: Optional[str] = None, client: Any = None):
+        self.backend = (backend or settings.BOT_PHONE_LOCK_BACKEND or "local").strip().lower()
+        self._client = client
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._waiters: Dict[str, int] = {}
+
+    async def _get_client(self):
+        if self._client is None and redis is not None:
+            self._client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        return self._client
+
+    @asynccontextmanager
+    async def _local(self, phone: str) -> AsyncIterator[None]:
+        lock = self._locks.setdefault(phone, asyncio.Lock())
+        self._waiters[phone] = self._waiters.get(phone, 0) + 1
+        acquired = False
+        try:
+            try:
+                await asyncio.wait_for(lock.acquire(), timeout=settings.BOT_PHONE_LOCK_TIMEOUT)
+                acquired = True
+            except asyncio.TimeoutError:
+                logger.warning("Timeout aguardando lock do telefone %s; processando sem lock", phone)
+            yield
+        finally:
+            if acquired:
+                lock.release()
+            self._waiters[phone] -= 1
+            if not self._waiters[phone]:
+                self._waiters.pop(phone, None)
+                self._locks.pop(phone, None)
+
+    @asynccontextmanager
+    async def _redis(self, phone: str) -> AsyncIterator[None]:
+        client = await self._get_client()
+        if client is None:
+            async with self._local(phone):
+                yield
+            return
+        timeout = settings.BOT_PHONE_LOCK_TIMEOUT
+        lock = client.lock(f"{LOCK_KEY_PREFIX}{phone}", timeout=timeout, blocking_timeout=timeout)
+        try:
+            acquired = await lock.acquire()
+        except Exception as exc:
+            logger.warning("Lock Redis indisponível para %s (%s); usando lock local", phone, exc)
+            async with self._local(phone):
+                yield
+            return
+        if not acquired:
+            logger.warning("Timeout aguardando lock do telefone %s; processando sem lock", phone)
+        try:
+            yield
+        finally:
+            if acquired:
+                try:
+                    await lock.release()
+                except Exception as exc:
+                    logger.warning("Falha ao liberar lock Redis de %s: %s", phone, exc)
+
+    def lock(self, phone: str):
+        """Context manager assíncrono que serializa o processamento do telefone."""
+        if self.backend == "redis":
+            return self._redis(phone)
+        return self._local(phone)
+
+
+class MessageDedupe:
+    """Respostas já geradas por ``MessageSid`` (memória local + Redis)."""
+
+    def __init__(self, max_local: int = 10_000):
+        self.max_local = max_local
+        self._local: OrderedDict[str, str] = OrderedDict()
+
+    def _remember(self, sid: str, reply: str) -> None:
+        self._local[sid] = reply
+        self._local.move_to_end(sid)
+        while len(self._local) > self.max_local:
+            self._local.popitem(last=False)
+
+    async def get(self, sid: str) -> Optional[str]:
+        if not sid:
+            return None
+        if sid in self._local:
+            self._local.move_to_end(sid)
+            return self._local[sid]
+        cached = await cache.get(f"{DEDUPE_KEY_PREFIX}{sid}")
+        if not isinstance(cached, dict) or "reply" not in cached:
+            return None
+        reply = str(cached["reply"])
+        self._remember(sid, reply)
+        return reply
+
+    async def set(self, sid: str, reply: str) -> None:
+        if not sid:
+            return
+        self._remember(sid, reply)
+        await cache.set(f"{DEDUPE_KEY_PREFIX}{sid}", {"reply": reply}, ttl=settings.BOT_MESSAGE_DEDUPE_TTL)
+
+
+phone_locks = PhoneLocks()
+message_dedupe = MessageDedupe()
@@ -0,0 +1,164 @@
+"""
+Catálogo compilado de perguntas usado pelo bot do WhatsApp.
+
+Cada questionário é carregado uma vez por processo e convertido em uma tupla
+ordenada de ``PerguntaCompilada``: opções, intervalo aceito e condição da
+subpergunta já vêm interpretados, evitando reler e reprocessar as perguntas
+no Mongo a cada mensagem respondida.
+
+A validade do catálogo é controlada pelo campo ``perguntasVersao`` do
+questionário, incrementado pelas mutações do ``PerguntasRepo``. A versão é
+reconferida no máximo a cada ``BOT_QUESTION_CATALOG_CHECK_SECONDS``; escritas
+feitas no próprio processo invalidam a entrada imediatamente.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.repositories.perguntas import PerguntasRepo
+from app.repositories.questionarios import QuestionariosRepo
+
+logger = logging.getLogger(__name__)
+
+_CONDICAO_RE = re.compile(r"^valor\s*(>=|<=|!=|==|>|<)\s*(-?\d+)$")
+CONDICAO_PADRAO = (">", 0)
+
+
+@dataclass(frozen=True, slots=True)
+class SubPerguntaCompilada:
+    texto: str
+    tipo_resposta: str
+    opcoes: Tuple[str, ...]
+    operador: str
+    limiar: int
+
+
+@dataclass(frozen=True, slots=True)
+class PerguntaCompilada:
+    id_pergunta: str
+    texto: str
+    tipo_escala: str
+    ordem: int
+    opcoes: Tuple[Dict[str, Any], ...]
+    min_valor: int
+    max_valor: int
+    multipla: bool
+    sub_pergunta: Optional[SubPerguntaCompilada] = None
+
+
+def parse_condicao(condicao: str) -> Tuple[str, int]:
+    """Interpreta condições como 'valor > 0', 'valor >= 3' ou 'valor == 1'."""
+    m = _CONDICAO_RE.match(condicao.strip())
+    if not m:
+        return CONDICAO_PADRAO
+    return (m.group(1), int(m.group(2)))
+
+
+def _compilar_opcoes(pergunta: Dict[str, Any]) -> Tuple[Dict[str, Any], ...]:
+    normalizadas = []
+    for opcao in pergunta.get("opcoesResposta") or []:
+        if not isinstance(opcao, dict):
+            continue
+        if "valor" not in opcao or "texto" not in opcao:
+            continue
+        normalizadas.append({"valor": int(opcao["valor"]), "texto": str(opcao["texto"]).strip()})
+    return tuple(normalizadas)
+
+
+def _compilar_sub_pergunta(pergunta: Dict[str, Any]) -> Optional[SubPerguntaCompilada]:
+    sub = pergunta.get("subPergunta") or {}
+    texto = str(sub.get("texto") or "").strip()
+    opcoes = sub.get("opcoes") or []
+    if not texto or not isinstance(opcoes, list) or not opcoes:
+        return None
+    operador, limiar = parse_condicao(str(sub.get("condicao") or "valor > 0"))
+    return SubPerguntaCompilada(
+        texto=texto,
+        tipo_resposta=str(sub.get("tipoResposta") or "").strip(),
+        opcoes=tuple(str(o).strip() for o in opcoes if str(o).strip()),
+        operador=operador,
+        limiar=limiar,
+    )
+
+
+def compilar_pergunta(pergunta: Dict[str, Any]) -> PerguntaCompilada:
+    opcoes = _compilar_opcoes(pergunta)
+    if opcoes:
+        valores = [o["valor"] for o in opcoes]
+        min_v, max_v = min(valores), max(valores)
+    else:
+        min_v, max_v = int(pergunta.get("min", 1)), int(pergunta.get("max", 5))
+    return PerguntaCompilada(
+        id_pergunta=str(pergunta.get("idPergunta") or ""),
+        texto=str(pergunta.get("texto") or "(Pergunta sem texto)"),
+        tipo_escala=str(pergunta.get("tipoEscala") or ""),
+        ordem=int(pergunta.get("ordem") or 0),
+        opcoes=opcoes,
+        min_valor=min_v,
+        max_valor=max_v,
+        multipla=bool(pergunta.get("multipla", False)),
+        sub_pergunta=_compilar_sub_pergunta(pergunta),
+    )
+
+
+@dataclass
+class _Entrada:
+    versao: int
+    perguntas: Tuple[PerguntaCompilada, ...]
+    conferido_em: float
+
+
+class QuestionCatalog:
+    """Cache em processo das perguntas compiladas de cada questionário."""
+
+    def __init__(
+        self,
+        perguntas_repo: Optional[PerguntasRepo] = None,
+        questionarios_repo: Optional[QuestionariosRepo] = None,
+    ):
+        self.perguntas_repo = perguntas_repo or PerguntasRepo()
+        self.questionarios_repo = questionarios_repo or QuestionariosRepo()
+        self._entradas: Dict[str, _Entrada] = {}
+
+    async def get(self, id_questionario: str) -> Tuple[PerguntaCompilada, ...]:
+        """Retorna as perguntas ativas compiladas, recarregando se a versão mudou."""
+        chave = str(id_questionario)
+        entrada = self._entradas.get(chave)
+        agora = time.monotonic()
+        if entrada and agora - entrada.conferido_em < settings.BOT_QUESTION_CATALOG_CHECK_SECONDS:
+            return entrada.perguntas
+
+        versao = await self.questionarios_repo.get_questions_version(chave)
+        if versao is None:
+            self._entradas.pop(chave, None)
+            return ()
+        if entrada and entrada.versao == versao:
+            entrada.conferido_em = agora
+            return entrada.perguntas
+
+        documentos = await self.perguntas_repo.get_questions(chave)
+        perguntas = tuple(compilar_pergunta(doc) for doc in documentos)
+        if perguntas:
+            self._entradas[chave] = _Entrada(versao=versao, perguntas=perguntas, conferido_em=agora)
+            logger.info(
+                "Catálogo de perguntas compilado: questionário %s v%s (%d perguntas)",
+                chave, versao, len(perguntas),
+            )
+        else:
+            self._entradas.pop(chave, None)
+        return perguntas
+
+    def invalidate(self, id_questionario: Optional[str] = None) -> None:
+        """Descarta o catálogo de um questionário (ou de todos, sem argumento)."""
+        if id_questionario is None:
+            self._entradas.clear()
+        else:
+            self._entradas.pop(str(id_questionario), None)
+
+
+question_catalog = QuestionCatalog()
@@ -0,0 +1,132 @@
+"""
+Armazenamento do estado de conversa (chat_state) do bot.
+
+O ``MongoSessionStore`` mantém o comportamento original: cada passo grava
+``usuarios.metadata.chat_state``. O ``RedisSessionStore`` guarda o estado em
+um hash ``bot:session:{telefone}`` com TTL igual a
+``QUESTIONNAIRE_TIMEOUT_MINUTES`` e só grava no Mongo nos marcos do fluxo
+(mudança de ``statusChat`` e checkpoints de progresso), reduzindo as escritas
+em ``usuarios`` durante campanhas com muitos respondentes simultâneos.
+"""
+from __future__ import annotations
+
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from bson import json_util
+
+from app.core.config import settings
+from app.repositories.usuarios import UsuariosRepo
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as redis
+except Exception:  # pragma: no cover
+    redis = None
+
+SESSION_KEY_PREFIX = "bot:session:"
+
+
+def chat_state_from_user(user: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return dict(((user or {}).get("metadata") or {}).get("chat_state") or {})
+
+
+class ChatSessionStore(ABC):
+    """Interface dos armazenamentos de sessão usados pelo ``BotFlow``."""
+
+    #: True quando cada ``save`` já é durável (não há o que adiar).
+    write_through = True
+
+    def __init__(self, users_repo: UsuariosRepo):
+        self.users_repo = users_repo
+
+    @abstractmethod
+    async def load(self, phone: str, user: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Retorna o chat_state atual do telefone."""
+
+    @abstractmethod
+    async def save(self, phone: str, state: Dict[str, Any], *, durable: bool = False) -> None:
+        """Grava o chat_state; ``durable`` exige persistência no Mongo."""
+
+
+class MongoSessionStore(ChatSessionStore):
+    """Estado persistido diretamente em ``usuarios.metadata.chat_state``."""
+
+    async def load(self, phone: str, user: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return chat_state_from_user(user)
+
+    async def save(self, phone: str, state: Dict[str, Any], *, durable: bool = False) -> None:
+        await self.users_repo.update_chat_state(phone, state)
+
+
+class RedisSessionStore(ChatSessionStore):
+    """
+    Estado em hash do Redis, um campo por chave do chat_state.
+
+    Na ausência da sessão (primeiro acesso, TTL expirado ou Redis reiniciado)
+    o estado é lido do último marco gravado no Mongo. Falhas do Redis caem
+    para o Mongo, sem interromper a conversa.
+    """
+
+    write_through = False
+
+    def __init__(self, users_repo: UsuariosRepo, client: Any = None):
+        super().__init__(users_repo)
+        self._client = client
+
+    async def _get_client(self):
+        if self._client is None and redis is not None:
+            self._client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        return self._client
+
+    @staticmethod
+    def _key(phone: str) -> str:
+        return f"{SESSION_KEY_PREFIX}{phone}"
+
+    @staticmethod
+    def _ttl_seconds() -> int:
+        return max(int(settings.QUESTIONNAIRE_TIMEOUT_MINUTES) * 60, 60)
+
+    async def load(self, phone: str, user: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        client = await self._get_client()
+        if client is None:
+            return chat_state_from_user(user)
+        try:
+            raw = await client.hgetall(self._key(phone))
+        except Exception as exc:
+            logger.warning("Sessão do bot indisponível no Redis para %s: %s", phone, exc)
+            return chat_state_from_user(user)
+        if not raw:
+            return chat_state_from_user(user)
+        return {field: json_util.loads(value) for field, value in raw.items()}
+
+    async def save(self, phone: str, state: Dict[str, Any], *, durable: bool = False) -> None:
+        client = await self._get_client()
+        stored = False
+        if client is not None:
+            key = self._key(phone)
+            mapping = {field: json_util.dumps(value) for field, value in state.items()}
+            try:
+                async with client.pipeline(transaction=True) as pipe:
+                    pipe.delete(key)
+                    if mapping:
+                        pipe.hset(key, mapping=mapping)
+                        pipe.expire(key, self._ttl_seconds())
+                    await pipe.execute()
+                stored = True
+            except Exception as exc:
+                logger.warning("Falha ao gravar sessão do bot no Redis para %s: %s", phone, exc)
+        if durable or not stored:
+            await self.users_repo.update_chat_state(phone, state)
+
+
+def build_session_store(users_repo: UsuariosRepo) -> ChatSessionStore:
+    """Instancia o armazenamento configurado em ``BOT_SESSION_STORE``."""
+    backend = (settings.BOT_SESSION_STORE or "mongo").strip().lower()
+    if backend == "redis":
+        return RedisSessionStore(users_repo)
+    if backend != "mongo":
+        logger.warning("BOT_SESSION_STORE desconhecido (%s); usando mongo", backend)
+    return MongoSessionStore(users_repo)
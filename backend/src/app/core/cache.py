@@ -1,8 +1,46 @@
+"""
+Cache de aplicação em dois níveis.
+
+- **L2 (Redis)**: compartilhado entre réplicas da API e workers, com o TTL
+  pedido em ``set`` (ou ``CACHE_TTL``).
+- **L1 (memória do processo)**: opcional (``CACHE_L1_MAX_ENTRIES > 0``), LRU
+  limitado com TTL próprio por chave, sempre menor ou igual ao do L2 e a
+  ``CACHE_L1_TTL``. Leituras quentes (overview do dashboard, saldo do Twilio)
+  deixam de ir ao Redis e de desserializar a cada requisição.
+
+As entradas são gravadas em msgpack tipado (``app.core.serialization``):
+datas e ObjectIds voltam com o tipo original.
+
+``set``/``delete``/``invalidate_tags`` publicam no canal
+``CACHE_INVALIDATION_CHANNEL``; cada processo que chamou ``start()`` escuta o
+canal e remove as entradas correspondentes do seu L1. Sem o listener (ou com o
+Redis fora), a defasagem do L1 fica limitada a ``CACHE_L1_TTL``.
+
+Chaves podem ser registradas em tags (``org:{id}``, ``questionario:{id}``...)
+ao gravar; ``invalidate_tags`` remove todas as chaves de uma tag com um único
+script no Redis (``SMEMBERS`` + ``UNLINK``), em O(chaves da tag), sem varrer o
+keyspace.
+
+``get_or_compute`` protege chaves caras contra estouro de recálculo na
+expiração: cálculo único por processo e por réplica (lock no Redis) e
+stale-while-revalidate. ``delete``/``invalidate_tags`` incrementam a geração
+da chave (``{key}:gen``); um cálculo que começou antes da invalidação não grava
+o resultado, que poderia refletir o estado anterior à escrita.
+
+Os valores do L1 são compartilhados entre chamadas: trate o retorno de ``get``
+como somente leitura.
+"""
+import asyncio
 import json
 import logging
-from typing import Any, Optional
+import math
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
 
 from app.core.config import settings
+from app.core.serialization import pack, unpack
 
 logger = logging.getLogger(__name__)
 
@@ -11,59 +49,454 @@ try:
 except Exception:  # pragma: no cover
     redis = None
 
+# Pausa entre tentativas de reconectar o listener de invalidação
+_LISTENER_RETRY_SECONDS = 5.0
+# Intervalo de consulta enquanto outra réplica calcula a mesma chave
+_LOCK_POLL_SECONDS = 0.05
+LOCK_SUFFIX = ":lock"
+# Libera o lock apenas se ainda pertencer a quem o adquiriu
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+# Contador de invalidações de cada chave; vive bem mais que qualquer cálculo
+GEN_SUFFIX = ":gen"
+_GEN_TTL_SECONDS = 24 * 3600
+# Remove a chave e incrementa sua geração
+_DELETE_SCRIPT = """
+local removida = redis.call('DEL', KEYS[1])
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return removida
+"""
+# Grava a chave (e suas tags) só se a geração ainda for a lida antes do cálculo.
+# KEYS = {chave, geração, conjuntos das tags...}; ARGV = {geração lida, payload, expire}
+_STORE_IF_GEN_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] then
+    return 0
+end
+local expire = tonumber(ARGV[3])
+redis.call('SET', KEYS[1], ARGV[2], 'EX', expire)
+for i = 3, #KEYS do
+    redis.call('SADD', KEYS[i], KEYS[1])
+    -- O conjunto da tag vive ao menos tanto quanto sua chave mais longa
+    if redis.call('TTL', KEYS[i]) < expire then
+        redis.call('EXPIRE', KEYS[i], expire)
+    end
+end
+return 1
+"""
+# Conjunto Redis com as chaves registradas em cada tag
+TAG_KEY_PREFIX = "cache:tag:"
+# Remove, atomicamente, as chaves de cada tag e o próprio conjunto da tag, e
+# incrementa a geração de cada chave removida.
+# Retorna {chaves removidas, membros}; UNLINK em blocos respeita o limite do unpack.
+_INVALIDATE_TAGS_SCRIPT = """
+local removidas = 0
+local membros = {}
+for _, tag in ipairs(KEYS) do
+    local chaves = redis.call('SMEMBERS', tag)
+    for i = 1, #chaves, 1000 do
+        removidas = removidas + redis.call('UNLINK', unpack(chaves, i, math.min(i + 999, #chaves)))
+    end
+    for _, chave in ipairs(chaves) do
+        membros[#membros + 1] = chave
+        redis.call('INCR', chave .. ARGV[1])
+        redis.call('EXPIRE', chave .. ARGV[1], ARGV[2])
+    end
+    redis.call('UNLINK', tag)
+end
+return {removidas, membros}
+"""
+# Retorno de um recálculo em background que cedeu a vez a outra réplica
+_SKIPPED = object()
+
+
+class LocalCache:
+    """LRU em memória com expiração por chave (relógio monotônico)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(0, max_entries)
+        self._entries: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        if not self.enabled or ttl <= 0:
+            self._entries.pop(key, None)
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
 
 class CacheClient:
-    def __init__(self) -> None:
-        self._client = None
+    def __init__(
+        self,
+        client: Any = None,
+        l1_max_entries: Optional[int] = None,
+        l1_ttl: Optional[float] = None,
+        channel: Optional[str] = None,
+        lock_timeout: Optional[float] = None,
+    ) -> None:
+        self._client = client
+        self.local = LocalCache(
+            l1_max_entries if l1_max_entries is not None else settings.CACHE_L1_MAX_ENTRIES
+        )
+        self.l1_ttl = l1_ttl if l1_ttl is not None else settings.CACHE_L1_TTL
+        self.channel = channel or settings.CACHE_INVALIDATION_CHANNEL
+        # Identifica as mensagens publicadas por este processo (já aplicadas localmente)
+        self.instance_id = uuid.uuid4().hex
+        self.lock_timeout = lock_timeout if lock_timeout is not None else settings.CACHE_LOCK_TIMEOUT
+        self._listener: Optional[asyncio.Task] = None
+        # Cálculos em andamento de get_or_compute, por chave (single-flight local)
+        self._inflight: Dict[str, asyncio.Task] = {}
 
     async def _get_client(self):
-        if redis is None:
-            return None
-        if self._client is None:
-            self._client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        if self._client is None and redis is not None:
+            # Bytes crus: as entradas são msgpack (app.core.serialization.pack)
+            self._client = redis.from_url(settings.REDIS_URL)
         return self._client
 
-    async def get(self, key: str) -> Optional[Any]:
+    def _l1_ttl(self, ttl: Optional[float]) -> float:
+        return min(self.l1_ttl, ttl) if ttl is not None else self.l1_ttl
+
+    async def _lookup(self, key: str, with_ttl: bool) -> Tuple[bool, Any, Optional[float]]:
+        """
+        Lê a chave do Redis: (encontrada, valor, segundos restantes).
+
+        Segundos restantes é None quando não pedido ou quando a chave não expira.
+        """
         client = await self._get_client()
         if client is None:
-            return None
+            return False, None, None
         try:
-            payload = await client.get(key)
-            return json.loads(payload) if payload else None
+            if with_ttl:
+                async with client.pipeline(transaction=False) as pipe:
+                    payload, pttl = await pipe.get(key).pttl(key).execute()
+            else:
+                payload, pttl = await client.get(key), None
+            if not payload:
+                return False, None, None
+            value = unpack(payload)
         except Exception as exc:
             logger.warning("Cache get falhou para %s: %s", key, exc)
+            return False, None, None
+        # pttl: -1 = chave sem expiração no Redis; -2 = removida entre os comandos
+        if pttl == -2:
+            return True, value, 0.0
+        return True, value, pttl / 1000 if pttl and pttl > 0 else None
+
+    async def get(self, key: str) -> Optional[Any]:
+        hit, value = self.local.get(key)
+        if hit:
+            return value
+        found, value, restante = await self._lookup(key, with_ttl=self.local.enabled)
+        if not found:
             return None
+        if self.local.enabled:
+            self.local.set(key, value, self._l1_ttl(restante))
+        return value
 
-    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+    async def _store(
+        self, key: str, value: Any, expire: int, fresh_for: float, tags: Iterable[str] = ()
+    ) -> bool:
+        """Grava no Redis por ``expire`` segundos e no L1 por até ``fresh_for``."""
         client = await self._get_client()
         if client is None:
-            return
-        expire = ttl if ttl is not None else settings.CACHE_TTL
+            return False
+        payload = pack(value)
+        try:
+            if tags:
+                async with client.pipeline(transaction=False) as pipe:
+                    pipe.set(key, payload, ex=expire)
+                    for tag in tags:
+                        tag_key = f"{TAG_KEY_PREFIX}{tag}"
+                        pipe.sadd(tag_key, key)
+                        # O conjunto da tag vive ao menos tanto quanto sua chave mais longa
+                        pipe.expire(tag_key, expire, nx=True)
+                        pipe.expire(tag_key, expire, gt=True)
+                    await pipe.execute()
+            else:
+                await client.set(key, payload, ex=expire)
+        except Exception as exc:
+            logger.warning("Cache set falhou para %s: %s", key, exc)
+            self.local.delete(key)
+            return False
+        await self._after_store(key, payload, fresh_for)
+        return True
+
+    async def _store_if_generation(
+        self, key: str, value: Any, expire: int, fresh_for: float, tags: Tuple[str, ...], geracao: bytes
+    ) -> bool:
+        """Como ``_store``, mas só grava se ``{key}:gen`` ainda valer ``geracao``."""
+        client = await self._get_client()
+        if client is None:
+            return False
+        payload = pack(value)
+        tag_keys = [f"{TAG_KEY_PREFIX}{tag}" for tag in tags]
         try:
-            await client.set(key, json.dumps(value, default=str), ex=expire)
+            gravado = await client.eval(
+                _STORE_IF_GEN_SCRIPT, 2 + len(tag_keys), key, f"{key}{GEN_SUFFIX}", *tag_keys,
+                geracao, payload, int(expire),
+            )
         except Exception as exc:
             logger.warning("Cache set falhou para %s: %s", key, exc)
+            self.local.delete(key)
+            return False
+        if not gravado:
+            logger.info("Cache de %s invalidado durante o cálculo; resultado não gravado", key)
+            return False
+        await self._after_store(key, payload, fresh_for)
+        return True
+
+    async def _after_store(self, key: str, payload: bytes, fresh_for: float) -> None:
+        if self.local.enabled:
+            # Cópia desserializada: o chamador pode seguir alterando o original
+            self.local.set(key, unpack(payload), self._l1_ttl(fresh_for))
+            await self._publish({"key": key})
+
+    async def _generation(self, client: Any, key: str) -> Optional[bytes]:
+        """Geração atual da chave (``b""`` se nunca invalidada); None se o Redis falhar."""
+        try:
+            geracao = await client.get(f"{key}{GEN_SUFFIX}")
+        except Exception as exc:
+            logger.warning("Geração do cache indisponível para %s: %s", key, exc)
+            return None
+        if geracao is None:
+            return b""
+        return geracao if isinstance(geracao, bytes) else str(geracao).encode()
+
+    async def set(
+        self, key: str, value: Any, ttl: Optional[int] = None, tags: Iterable[str] = ()
+    ) -> None:
+        expire = ttl if ttl is not None else settings.CACHE_TTL
+        await self._store(key, value, expire, expire, tuple(tags))
+
+    async def get_or_compute(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None,
+        stale_ttl: Optional[int] = None,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """
+        Lê a chave ou a calcula com ``fn``, uma única vez por vez.
+
+        O valor fica fresco por ``ttl`` segundos e continua no Redis por mais
+        ``stale_ttl``. Nessa janela ele é servido imediatamente enquanto uma
+        única tarefa em background o recalcula. Em um miss, chamadas
+        concorrentes do mesmo processo aguardam o mesmo cálculo. Entre réplicas,
+        um lock no Redis (``{key}:lock``) faz as demais aguardarem o valor em vez
+        de recalcular. Sem Redis, ``fn`` é chamada diretamente. ``tags`` são
+        registradas a cada gravação, como em ``set``.
+        """
+        ttl = ttl if ttl is not None else settings.CACHE_TTL
+        stale_ttl = stale_ttl if stale_ttl is not None else settings.CACHE_STALE_TTL
+        tags = tuple(tags)
+        hit, value = self.local.get(key)
+        if hit:
+            return value
+
+        found, value, restante = await self._lookup(key, with_ttl=True)
+        if found:
+            fresco = restante is None or restante > stale_ttl
+            if fresco:
+                if self.local.enabled:
+                    self.local.set(key, value, self._l1_ttl(None if restante is None else restante - stale_ttl))
+            elif key not in self._inflight:
+                self._flight(key, fn, ttl, stale_ttl, tags, wait=False)
+            return value
+
+        value = await asyncio.shield(self._flight(key, fn, ttl, stale_ttl, tags, wait=True))
+        if value is _SKIPPED:
+            # Pegamos carona num recálculo em background que cedeu a outra réplica
+            value = await self._compute(key, fn, ttl, stale_ttl, tags, wait=True)
+        return value
+
+    def _flight(
+        self, key: str, fn, ttl: int, stale_ttl: int, tags: Tuple[str, ...], wait: bool
+    ) -> "asyncio.Task":
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._compute(key, fn, ttl, stale_ttl, tags, wait))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._flight_done(key, t))
+        return task
+
+    def _flight_done(self, key: str, task: "asyncio.Task") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Cálculo do cache falhou para %s: %s", key, task.exception())
+
+    async def _compute(
+        self, key: str, fn, ttl: int, stale_ttl: int, tags: Tuple[str, ...], wait: bool
+    ) -> Any:
+        client = await self._get_client()
+        lock_key = f"{key}{LOCK_SUFFIX}"
+        token = uuid.uuid4().hex
+        adquirido = False
+        if client is not None:
+            loop = asyncio.get_running_loop()
+            prazo = loop.time() + self.lock_timeout
+            while True:
+                try:
+                    adquirido = bool(
+                        await client.set(lock_key, token, nx=True, ex=max(1, math.ceil(self.lock_timeout)))
+                    )
+                except Exception as exc:
+                    logger.warning("Lock do cache indisponível para %s: %s", key, exc)
+                    break
+                if adquirido:
+                    break
+                if not wait:
+                    # Outra réplica já está recalculando; o valor antigo segue servido
+                    return _SKIPPED
+                await asyncio.sleep(_LOCK_POLL_SECONDS)
+                found, value, _ = await self._lookup(key, with_ttl=False)
+                if found:
+                    return value
+                if loop.time() >= prazo:
+                    logger.warning("Timeout aguardando cálculo de %s em outra réplica; calculando localmente", key)
+                    break
+        try:
+            geracao = await self._generation(client, key) if client is not None else None
+            value = await fn()
+            if geracao is not None:
+                await self._store_if_generation(key, value, ttl + stale_ttl, ttl, tags, geracao)
+            return value
+        finally:
+            if adquirido:
+                try:
+                    await client.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+                except Exception as exc:
+                    logger.warning("Falha ao liberar lock do cache %s: %s", lock_key, exc)
 
     async def delete(self, key: str) -> None:
+        self.local.delete(key)
         client = await self._get_client()
         if client is None:
             return
         try:
-            await client.delete(key)
+            await client.eval(_DELETE_SCRIPT, 2, key, f"{key}{GEN_SUFFIX}", _GEN_TTL_SECONDS)
         except Exception as exc:
             logger.warning("Cache delete falhou para %s: %s", key, exc)
+        await self._publish({"key": key})
 
-    async def invalidate_pattern(self, pattern: str) -> int:
+    async def invalidate_tags(self, *tags: str) -> int:
+        """Remove todas as chaves registradas nas tags; retorna quantas existiam."""
+        if not tags:
+            return 0
         client = await self._get_client()
         if client is None:
             return 0
-        deleted = 0
+        tag_keys = [f"{TAG_KEY_PREFIX}{tag}" for tag in tags]
         try:
-            async for key in client.scan_iter(match=pattern):
-                deleted += await client.delete(key)
+            removidas, membros = await client.eval(
+                _INVALIDATE_TAGS_SCRIPT, len(tag_keys), *tag_keys, GEN_SUFFIX, _GEN_TTL_SECONDS
+            )
         except Exception as exc:
-            logger.warning("Cache invalidate_pattern falhou para %s: %s", pattern, exc)
-        return deleted
+            logger.warning("Cache invalidate_tags falhou para %s: %s", tags, exc)
+            return 0
+        membros = [m.decode("utf-8") if isinstance(m, bytes) else m for m in membros]
+        for key in membros:
+            self.local.delete(key)
+        if membros:
+            await self._publish({"keys": membros})
+        return int(removidas)
+
+    async def _publish(self, message: dict) -> None:
+        if not self.local.enabled:
+            return
+        client = await self._get_client()
+        if client is None:
+            return
+        try:
+            await client.publish(self.channel, json.dumps({**message, "origem": self.instance_id}))
+        except Exception as exc:
+            logger.warning("Cache publish de invalidação falhou: %s", exc)
+
+    def apply_invalidation(self, payload: Any) -> None:
+        """Aplica ao L1 uma mensagem recebida do canal de invalidação."""
+        try:
+            message = json.loads(payload)
+        except (TypeError, ValueError):
+            logger.warning("Mensagem de invalidação de cache inválida: %r", payload)
+            return
+        if message.get("origem") == self.instance_id:
+            return
+        if message.get("key") is not None:
+            self.local.delete(message["key"])
+        for key in message.get("keys") or ():
+            self.local.delete(key)
+
+    async def _listen(self) -> None:
+        while True:
+            client = await self._get_client()
+            if client is None:
+                return
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                # Mensagens perdidas enquanto desconectado não são recuperáveis
+                self.local.clear()
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.apply_invalidation(message.get("data"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Listener de invalidação do cache caiu: %s", exc)
+                self.local.clear()
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(_LISTENER_RETRY_SECONDS)
+
+    async def start(self) -> None:
+        """Inicia o listener de invalidação do L1 (no startup da API)."""
+        if not self.local.enabled or self._listener is not None:
+            return
+        self._listener = asyncio.create_task(self._listen(), name="cache-invalidation")
+
+    async def stop(self) -> None:
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.cancel()
+            try:
+                await listener
+            except asyncio.CancelledError:
+                pass
+        self.local.clear()
 
 
 cache = CacheClient()
@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Carrega as variáveis de ambiente do arquivo .env
@@ -21,6 +22,8 @@ class Settings(BaseSettings):
     # Configurações de Segurança
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 dias
+    # Cache (s) do usuário autenticado por jti do token; 0 desativa
+    AUTH_PRINCIPAL_CACHE_TTL: int = int(os.getenv("AUTH_PRINCIPAL_CACHE_TTL", "30"))
 
     # CORS - lista separada por vírgula ou "*" para permitir qualquer origem
     CORS_ORIGINS: str = os.getenv(
@@ -48,13 +51,62 @@ class Settings(BaseSettings):
     TWILIO_TEMPLATE_CONFLITO_TF: str = os.getenv("TWILIO_TEMPLATE_CONFLITO_TF", "")
     TWILIO_TEMPLATE_SAUDE_GERAL: str = os.getenv("TWILIO_TEMPLATE_SAUDE_GERAL", "")
     TWILIO_TEMPLATE_COMPORTAMENTO_OFENSIVO: str = os.getenv("TWILIO_TEMPLATE_COMPORTAMENTO_OFENSIVO", "")
+    # Fila de envios ao Twilio (workers, tamanho máximo, envios/s por remetente e retentativas)
+    TWILIO_DISPATCH_WORKERS: int = int(os.getenv("TWILIO_DISPATCH_WORKERS", "4"))
+    TWILIO_DISPATCH_QUEUE_SIZE: int = int(os.getenv("TWILIO_DISPATCH_QUEUE_SIZE", "1000"))
+    TWILIO_SEND_RATE_PER_SECOND: float = float(os.getenv("TWILIO_SEND_RATE_PER_SECOND", "10"))
+    TWILIO_SEND_MAX_RETRIES: int = int(os.getenv("TWILIO_SEND_MAX_RETRIES", "3"))
+    TWILIO_SEND_BACKOFF_SECONDS: float = float(os.getenv("TWILIO_SEND_BACKOFF_SECONDS", "0.5"))
+
+    # Planos de scoring compilados mantidos em memória (questionário x versão das perguntas)
+    SCORING_PLAN_CACHE_SIZE: int = int(os.getenv("SCORING_PLAN_CACHE_SIZE", "64"))
+    # Recálculo em lote: diagnósticos pontuados e gravados (insert_many) por bloco
+    DIAGNOSTICO_BATCH_CHUNK_SIZE: int = int(os.getenv("DIAGNOSTICO_BATCH_CHUNK_SIZE", "500"))
+    # Refresh incremental de relatórios: o estado guardado cobre diagnósticos
+    # criados até agora - margem (segundos), atrás de gravações ainda em curso
+    RELATORIO_REFRESH_MARGEM: int = int(os.getenv("RELATORIO_REFRESH_MARGEM", "300"))
+    # Cache em disco dos arquivos exportados (PDF/XLSX/CSV); EXPORT_CACHE_MAX_MB=0 desativa
+    EXPORT_CACHE_DIR: str = os.getenv("EXPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "luzia-exports"))
+    EXPORT_CACHE_MAX_MB: int = int(os.getenv("EXPORT_CACHE_MAX_MB", "256"))
+    # Threads dedicadas à renderização de PDF/XLSX (fora do event loop)
+    EXPORT_RENDER_WORKERS: int = int(os.getenv("EXPORT_RENDER_WORKERS", "2"))
+    # Exportação em lote (ZIP): máximo de relatórios por job e retenção dos arquivos (horas)
+    EXPORT_ZIP_MAX_RELATORIOS: int = int(os.getenv("EXPORT_ZIP_MAX_RELATORIOS", "1000"))
+    EXPORT_ZIP_TTL_HOURS: int = int(os.getenv("EXPORT_ZIP_TTL_HOURS", "24"))
+    # Relatórios renderizados por task na exportação em lote (as tasks rodam em paralelo nos workers)
+    EXPORT_ZIP_PARTE_RELATORIOS: int = int(os.getenv("EXPORT_ZIP_PARTE_RELATORIOS", "25"))
 
     # Timeout do questionário (minutos) — padrão 24h
     QUESTIONNAIRE_TIMEOUT_MINUTES: int = int(os.getenv("QUESTIONNAIRE_TIMEOUT_MINUTES", "1440"))
+    # Intervalo (s) para reconferir a versão das perguntas em cache no bot
+    BOT_QUESTION_CATALOG_CHECK_SECONDS: int = int(os.getenv("BOT_QUESTION_CATALOG_CHECK_SECONDS", "30"))
+    # Estado da conversa do bot: "mongo" (padrão) ou "redis" (TTL = QUESTIONNAIRE_TIMEOUT_MINUTES)
+    BOT_SESSION_STORE: str = os.getenv("BOT_SESSION_STORE", "mongo")
+    # Com sessão no Redis, grava progresso no Mongo a cada N perguntas respondidas
+    BOT_SESSION_FLUSH_EVERY: int = int(os.getenv("BOT_SESSION_FLUSH_EVERY", "10"))
+    # Serialização do webhook por telefone: "local" (por processo) ou "redis" (entre workers)
+    BOT_PHONE_LOCK_BACKEND: str = os.getenv("BOT_PHONE_LOCK_BACKEND", "local")
+    BOT_PHONE_LOCK_TIMEOUT: int = int(os.getenv("BOT_PHONE_LOCK_TIMEOUT", "30"))
+    # Por quanto tempo (s) a resposta de cada MessageSid é reaproveitada em reenvios
+    BOT_MESSAGE_DEDUPE_TTL: int = int(os.getenv("BOT_MESSAGE_DEDUPE_TTL", "3600"))
 
     # Configurações Celery
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379")
     CACHE_TTL: int = int(os.getenv("CACHE_TTL", "300"))
+    # Cache L1 em memória por processo (0 desativa) e TTL máximo (s) de cada entrada
+    CACHE_L1_MAX_ENTRIES: int = int(os.getenv("CACHE_L1_MAX_ENTRIES", "0"))
+    CACHE_L1_TTL: float = float(os.getenv("CACHE_L1_TTL", "5"))
+    # get_or_compute: janela (s) em que o valor expirado ainda é servido enquanto
+    # é recalculado, e validade (s) do lock de cálculo entre réplicas
+    CACHE_STALE_TTL: int = int(os.getenv("CACHE_STALE_TTL", "60"))
+    CACHE_LOCK_TIMEOUT: float = float(os.getenv("CACHE_LOCK_TIMEOUT", "10"))
+    # Canal pub/sub que propaga invalidações do L1 entre réplicas
+    CACHE_INVALIDATION_CHANNEL: str = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache:invalidate")
+    # Lê contadores do dashboard da coleção dashboard_rollups (rode o rebuild antes de ativar)
+    DASHBOARD_USE_ROLLUPS: bool = os.getenv("DASHBOARD_USE_ROLLUPS", "false").lower() == "true"
+    # TTL de segurança do overview; a invalidação normal ocorre nas escritas. Fica
+    # no patamar do CACHE_TTL: limita o erro se uma invalidação se perder (falha do Redis)
+    DASHBOARD_OVERVIEW_TTL: int = int(os.getenv("DASHBOARD_OVERVIEW_TTL", "300"))
     CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL", f"{REDIS_URL}/0")
     CELERY_RESULT_BACKEND: str = os.getenv("CELERY_RESULT_BACKEND", f"{REDIS_URL}/1")
     
@@ -23,17 +23,22 @@ async def get_db():
         raise RuntimeError("Database client is not initialized.")
     return db.client[settings.MONGO_DB_NAME]
 
-async def connect_to_mongo():
+def create_mongo_client() -> AsyncIOMotorClient:
     """
-    Initialize MongoDB connection with retry.
-    The app starts even if MongoDB is temporarily unreachable.
+    Create the Motor client without touching the network.
+    Motor/PyMongo only connect on the first operation.
     """
-    db.client = AsyncIOMotorClient(
+    return AsyncIOMotorClient(
         settings.MONGO_URI,
         maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
         minPoolSize=settings.MONGO_MIN_POOL_SIZE,
         serverSelectionTimeoutMS=settings.MONGO_TIMEOUT_MS,
     )
+
+async def verify_mongo_connection():
+    """
+    Ping the current client with retry and update ``db.connected``.
+    """
     for attempt in range(1, MAX_RETRIES + 1):
         try:
             await db.client.admin.command('ping')
@@ -53,6 +58,14 @@ async def connect_to_mongo():
         MAX_RETRIES,
     )
 
+async def connect_to_mongo():
+    """
+    Initialize MongoDB connection with retry.
+    The app starts even if MongoDB is temporarily unreachable.
+    """
+    db.client = create_mongo_client()
+    await verify_mongo_connection()
+
 async def close_mongo_connection():
     """
     Close MongoDB connection.
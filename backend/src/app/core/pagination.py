@@ -0,0 +1,161 @@
+"""
+Paginação por cursor (keyset) para listagens do MongoDB.
+
+O cursor é opaco para o cliente: um JSON estendido (bson.json_util) com os
+valores das chaves de ordenação do último item retornado, codificado em
+base64 url-safe. A próxima página é obtida com um filtro ``$or`` que avança
+a partir desses valores, sem ``skip``.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+from bson import ObjectId, json_util
+
+T = TypeVar("T")
+
+SortSpec = Sequence[Tuple[str, int]]
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Tipos aceitos nos valores do cursor. Documentos, listas e regex vindos do
+# cliente virariam operadores ($ne, $where, ...) nos filtros de ``keyset_filter``.
+_CURSOR_VALUE_TYPES = (str, int, float, bool, ObjectId, datetime, type(None))
+
+
+class InvalidCursorError(ValueError):
+    """Cursor de paginação malformado ou incompatível com a listagem."""
+
+
+@dataclass
+class Page(Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    raw = json_util.dumps(values, json_options=json_util.CANONICAL_JSON_OPTIONS)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        values = json_util.loads(raw)
+    except (binascii.Error, UnicodeError, ValueError, json.JSONDecodeError) as exc:
+        raise InvalidCursorError("Cursor de paginação inválido") from exc
+    if not isinstance(values, dict):
+        raise InvalidCursorError("Cursor de paginação inválido")
+    if not all(isinstance(value, _CURSOR_VALUE_TYPES) for value in values.values()):
+        raise InvalidCursorError("Cursor de paginação inválido")
+    return values
+
+
+def _get_path(doc: Dict[str, Any], path: str) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def normalize_sort(sort: Optional[SortSpec]) -> List[Tuple[str, int]]:
+    """Garante `_id` como desempate final para que a ordenação seja total."""
+    spec = list(sort or [])
+    if not any(field == "_id" for field, _ in spec):
+        spec.append(("_id", 1))
+    return spec
+
+
+def cursor_from_doc(doc: Dict[str, Any], sort: SortSpec) -> str:
+    return encode_cursor({field: _get_path(doc, field) for field, _ in normalize_sort(sort)})
+
+
+def keyset_filter(cursor: Optional[str], sort: SortSpec) -> Dict[str, Any]:
+    """
+    Monta o filtro que retorna apenas documentos posteriores ao cursor.
+
+    Para ordenação (a asc, _id asc) gera
+    ``{"$or": [{"a": {"$gt": va}}, {"a": va, "_id": {"$gt": vid}}]}``.
+    """
+    if not cursor:
+        return {}
+    spec = normalize_sort(sort)
+    values = decode_cursor(cursor)
+    if set(values) != {field for field, _ in spec}:
+        raise InvalidCursorError("Cursor não corresponde à ordenação da listagem")
+
+    clauses: List[Dict[str, Any]] = []
+    for index, (field, direction) in enumerate(spec):
+        clause: Dict[str, Any] = {prev: values[prev] for prev, _ in spec[:index]}
+        clause[field] = {"$gt" if direction >= 0 else "$lt": values[field]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def merge_filters(query: Optional[Dict[str, Any]], after: Dict[str, Any]) -> Dict[str, Any]:
+    """Combina o filtro da listagem com o filtro do cursor sem colidir operadores."""
+    if not after:
+        return dict(query or {})
+    if not query:
+        return after
+    return {"$and": [query, after]}
+
+
+def with_sort_fields(
+    projection: Optional[Dict[str, Any]],
+    sort: SortSpec,
+) -> Optional[Dict[str, Any]]:
+    """Inclui as chaves de ordenação em projeções de inclusão (necessárias ao cursor)."""
+    if not projection:
+        return projection
+    inclusive = any(value and field != "_id" for field, value in projection.items())
+    if not inclusive:
+        return projection
+    merged = dict(projection)
+    for field, _ in normalize_sort(sort):
+        merged.setdefault(field, 1)
+    if merged.get("_id") == 0:
+        merged["_id"] = 1
+    return merged
+
+
+def apply_next_cursor(response: Any, docs: List[Dict[str, Any]], limit: int, sort: SortSpec) -> List[Dict[str, Any]]:
+    """
+    Recebe até ``limit + 1`` documentos (ver ``build_page``), publica o cursor
+    da próxima página no header da resposta HTTP e retorna a página.
+    """
+    page = build_page(docs, limit, sort)
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page.items
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_LIMIT
+    return min(int(limit), MAX_PAGE_LIMIT)
+
+
+def clamp_fetch_limit(limit: Optional[int]) -> int:
+    """Como ``clamp_limit``, admitindo o documento extra que indica a próxima página."""
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_LIMIT
+    return min(int(limit), MAX_PAGE_LIMIT + 1)
+
+
+def build_page(docs: List[Dict[str, Any]], limit: int, sort: SortSpec) -> Page[Dict[str, Any]]:
+    """
+    Recebe até ``limit + 1`` documentos e separa a página do indicador de próxima.
+    """
+    has_more = len(docs) > limit
+    items = docs[:limit]
+    next_cursor = cursor_from_doc(items[-1], sort) if has_more and items else None
+    return Page(items=items, next_cursor=next_cursor)
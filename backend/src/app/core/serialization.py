@@ -0,0 +1,124 @@
+"""
+Serialização rápida para respostas HTTP e entradas de cache.
+
+- **HTTP**: ``to_jsonable`` substitui o ``jsonable_encoder`` na conversão dos
+  documentos do MongoDB (relatórios completos), e ``json_dumps`` usa orjson
+  onde o código monta JSON por conta própria. A serialização final das rotas
+  fica com o FastAPI, que já gera os bytes via pydantic-core quando há
+  ``response_model`` (uma classe de resposta customizada desativaria isso).
+- **Cache**: ``pack``/``unpack`` usam msgpack com extensões tipadas para
+  ``datetime``, ``date`` e ``ObjectId``; o valor lido do Redis volta com os
+  mesmos tipos gravados, sem reparse de strings.
+
+orjson e msgpack são opcionais: sem eles, tudo cai para ``json`` da stdlib
+(datas viram string ISO). ``unpack`` também lê entradas JSON gravadas antes do
+msgpack, então a troca não exige limpar o Redis.
+"""
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Union
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except Exception:  # pragma: no cover
+    msgpack = None
+
+# Primeiro byte das entradas msgpack; 0xc1 nunca é usado pelo formato e não
+# inicia JSON válido, o que separa os dois formatos sem ambiguidade
+_MSGPACK_MAGIC = b"\xc1"
+_EXT_DATETIME = 1
+_EXT_DATE = 2
+_EXT_OBJECTID = 3
+
+
+def to_jsonable(value: Any) -> Any:
+    """
+    Converte documentos do MongoDB em tipos JSON (ObjectId e datas viram string).
+
+    Equivalente ao ``jsonable_encoder(..., custom_encoder={ObjectId: str})``
+    para os tipos que aparecem nos documentos, sem o custo da introspecção
+    genérica; tipos desconhecidos ainda passam pelo ``jsonable_encoder``.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return to_jsonable(value.value)
+    return jsonable_encoder(value, custom_encoder={ObjectId: str})
+
+
+def _json_default(value: Any) -> Any:
+    # ObjectId, Decimal128 etc. (orjson já trata datas e Enum nativamente)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+def json_dumps(value: Any, sort_keys: bool = False) -> bytes:
+    """JSON em bytes (orjson quando disponível; senão ``json`` com ``default=str``)."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(value, default=_json_default, option=option)
+    return json.dumps(
+        value, default=_json_default, ensure_ascii=False, sort_keys=sort_keys, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return msgpack.ExtType(_EXT_DATETIME, value.isoformat().encode("ascii"))
+    if isinstance(value, date):
+        return msgpack.ExtType(_EXT_DATE, value.isoformat().encode("ascii"))
+    if isinstance(value, ObjectId):
+        return msgpack.ExtType(_EXT_OBJECTID, value.binary)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == _EXT_DATETIME:
+        return datetime.fromisoformat(data.decode("ascii"))
+    if code == _EXT_DATE:
+        return date.fromisoformat(data.decode("ascii"))
+    if code == _EXT_OBJECTID:
+        return ObjectId(data)
+    return msgpack.ExtType(code, data)
+
+
+def pack(value: Any) -> bytes:
+    """Serializa uma entrada de cache (msgpack tipado ou, sem msgpack, JSON)."""
+    if msgpack is not None:
+        return _MSGPACK_MAGIC + msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+    return json_dumps(value)
+
+
+def unpack(payload: Union[bytes, str]) -> Any:
+    """Lê uma entrada gravada por ``pack`` (ou JSON legado)."""
+    if isinstance(payload, bytes) and payload[:1] == _MSGPACK_MAGIC:
+        if msgpack is None:
+            raise ValueError("Entrada de cache em msgpack, mas o pacote msgpack não está instalado")
+        return msgpack.unpackb(payload[1:], ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+    return json.loads(payload)
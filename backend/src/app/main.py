@@ -1,19 +1,31 @@
 import json
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.core.database import connect_to_mongo, close_mongo_connection, db
 from app.api.v1 import api_router
 from app.bot.endpoints import router as bot_router
+from app.core.cache import cache
 from app.core.config import settings
+from app.core.pagination import NEXT_CURSOR_HEADER, InvalidCursorError
+from app.services.export_renderer import export_renderer
+from app.services.twilio_dispatcher import twilio_dispatcher
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Connect to MongoDB
     await connect_to_mongo()
+    # Fila de envios ao Twilio (o webhook apenas enfileira)
+    await twilio_dispatcher.start()
+    # Listener de invalidação do cache L1 (no-op com CACHE_L1_MAX_ENTRIES=0)
+    await cache.start()
     yield
-    # Shutdown: Close MongoDB connection
+    # Shutdown: drena a fila de envios, encerra o pool de exportação e fecha o MongoDB
+    await twilio_dispatcher.stop()
+    await cache.stop()
+    export_renderer.shutdown()
     await close_mongo_connection()
 
 
@@ -97,6 +109,11 @@ CORS_ORIGINS = _parse_cors_origins(getattr(settings, "CORS_ORIGINS", None))
 CORS_ORIGIN_REGEX = _normalize_origin(getattr(settings, "CORS_ORIGIN_REGEX", None))
 ALLOW_CREDENTIALS = CORS_ORIGINS != ["*"]
 
+@app.exception_handler(InvalidCursorError)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursorError) -> JSONResponse:
+    return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(exc)})
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=CORS_ORIGINS,
@@ -104,6 +121,7 @@ app.add_middleware(
     allow_credentials=ALLOW_CREDENTIALS,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Authorization", "Content-Type", "Accept"],
+    expose_headers=[NEXT_CURSOR_HEADER],
     max_age=600,  # Cache preflight por 10 minutos
 )
 
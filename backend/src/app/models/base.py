@@ -291,3 +291,5 @@ class Relatorio(BaseModel):
     dominios: List[RelatorioDominio]
     recomendacoes: List[str] = Field(default_factory=list)
     observacoes: Optional[str] = None
+    # Soma/contagem por dimensão, marca de dataCriacao e flag "obsoleto", usados no refresh incremental
+    estadoAgregacao: Optional[Dict[str, Any]] = None
@@ -10,6 +10,8 @@ from app.repositories.perguntas import PerguntasRepo
 from app.repositories.respostas import RespostasRepo
 from app.repositories.diagnosticos import DiagnosticosRepo
 from app.repositories.relatorios import RelatoriosRepo
+from app.repositories.dashboard_rollups import DashboardRollupsRepo
+from app.repositories.envios_twilio import EnviosTwilioRepo
 
 __all__ = [
     "BaseRepository",
@@ -21,4 +23,6 @@ __all__ = [
     "RespostasRepo",
     "DiagnosticosRepo",
     "RelatoriosRepo",
+    "DashboardRollupsRepo",
+    "EnviosTwilioRepo",
 ]
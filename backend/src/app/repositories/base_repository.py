@@ -2,7 +2,20 @@
 Interface base para repositories.
 """
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Generic, Optional, TypeVar
+from typing import Any, AsyncIterator, Dict, Generic, List, Optional, TypeVar
+
+from app.core.database import get_db
+from app.core.pagination import (
+    DEFAULT_PAGE_LIMIT,
+    SortSpec,
+    build_page,
+    clamp_fetch_limit,
+    clamp_limit,
+    keyset_filter,
+    merge_filters,
+    normalize_sort,
+    with_sort_fields,
+)
 
 T = TypeVar("T")
 
@@ -10,6 +23,8 @@ T = TypeVar("T")
 class BaseRepository(ABC, Generic[T]):
     """Contrato CRUD mínimo para repositories."""
 
+    collection_name: str
+
     @abstractmethod
     async def create(self, data: Dict[str, Any]) -> str:
         """Cria um novo documento e retorna o ID."""
@@ -25,3 +40,72 @@ class BaseRepository(ABC, Generic[T]):
     @abstractmethod
     async def delete(self, id: str) -> bool:
         """Remove um documento por ID."""
+
+    async def find_keyset(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        *,
+        sort: Optional[SortSpec] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> List[T]:
+        """
+        Busca uma página de documentos por keyset (sem skip).
+
+        Args:
+            query: Filtro da listagem.
+            sort: Ordenação; `_id` é adicionado como desempate.
+            limit: Documentos a buscar (até MAX_PAGE_LIMIT + 1: quem pagina
+                pede um a mais e separa a página com ``build_page``).
+            cursor: Cursor opaco retornado pela página anterior.
+            projection: Projeção opcional; as chaves de ordenação são sempre incluídas.
+
+        Raises:
+            InvalidCursorError: Se o cursor não puder ser decodificado.
+        """
+        spec = normalize_sort(sort)
+        fetch_size = clamp_fetch_limit(limit)
+        db = await get_db()
+        find_cursor = db[self.collection_name].find(
+            merge_filters(query, keyset_filter(cursor, spec)),
+            with_sort_fields(projection, spec),
+        )
+        return await find_cursor.sort(spec).limit(fetch_size).to_list(length=fetch_size)
+
+    async def iter_keyset(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        *,
+        sort: Optional[SortSpec] = None,
+        batch_size: int = DEFAULT_PAGE_LIMIT,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[T]:
+        """Percorre todos os documentos do filtro em páginas de tamanho fixo."""
+        spec = normalize_sort(sort)
+        page_size = clamp_limit(batch_size)
+        cursor: Optional[str] = None
+        while True:
+            docs = await self.find_keyset(
+                query,
+                sort=spec,
+                limit=page_size + 1,
+                cursor=cursor,
+                projection=projection,
+            )
+            page = build_page(docs, page_size, spec)
+            for item in page.items:
+                yield item
+            if not page.next_cursor:
+                return
+            cursor = page.next_cursor
+
+    async def list_all(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        *,
+        sort: Optional[SortSpec] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> List[T]:
+        """Lista todos os documentos do filtro, sem truncar, lendo em páginas."""
+        return [item async for item in self.iter_keyset(query, sort=sort, projection=projection)]
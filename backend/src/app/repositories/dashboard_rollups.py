@@ -0,0 +1,492 @@
+"""
+Repositório de contadores materializados do dashboard.
+
+Cada documento de ``dashboard_rollups`` é identificado por
+(idOrganizacao, idSetor, idQuestionario). Documentos com ``idQuestionario``
+nulo guardam os contadores de usuários do escopo; os demais guardam
+contadores de respostas e diagnósticos daquele questionário.
+
+Os contadores são mantidos com ``$inc`` a partir dos caminhos de escrita
+(usuários, respostas e diagnósticos) e podem ser recalculados do zero com
+``rebuild()`` (ver ``scripts/rebuild_dashboard_rollups.py``). Escritas que
+alteram contadores lidos pelo overview (``OVERVIEW_COUNTERS``) o invalidam no
+cache; as demais (ex.: ``respostas`` a cada resposta do bot) ficam para o
+TTL/stale-while-revalidate do overview.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+
+from app.core.cache import cache
+from app.core.database import get_db
+from app.models.base import StatusEnum, normalize_user_status
+
+logger = logging.getLogger(__name__)
+
+RollupKey = Tuple[Optional[ObjectId], Optional[ObjectId], Optional[ObjectId]]
+UserSnapshot = Tuple[Optional[ObjectId], Optional[ObjectId], Optional[str], bool]
+
+STATUS_COUNTERS: Dict[str, str] = {
+    StatusEnum.FINALIZADO.value: "status.finalizado",
+    StatusEnum.EM_ANDAMENTO.value: "status.emAndamento",
+    StatusEnum.NAO_INICIADO.value: "status.naoIniciado",
+}
+
+CLASSIFICACOES = ("favoravel", "intermediario", "risco")
+
+OVERVIEW_CACHE_KEY = "dashboard:overview"
+# Contadores que entram no overview (total/ativos, concluídos, questionários
+# em andamento e dimensões em risco)
+OVERVIEW_COUNTERS = frozenset(
+    {"usuarios", "status.emAndamento", "respondidos", "respondentes", "dimensoesRisco"}
+)
+
+
+async def invalidate_overview() -> None:
+    """Descarta o overview em cache após escritas que alteram seus contadores."""
+    await cache.delete(OVERVIEW_CACHE_KEY)
+
+
+def _afeta_overview(inc: Dict[str, int]) -> bool:
+    return not OVERVIEW_COUNTERS.isdisjoint(inc)
+
+
+def _as_object_id(value: Any) -> Optional[ObjectId]:
+    if value is None or isinstance(value, ObjectId):
+        return value
+    try:
+        return ObjectId(str(value))
+    except (InvalidId, TypeError):
+        return None
+
+
+def _classificacao(value: Any) -> str:
+    if hasattr(value, "value"):
+        value = value.value
+    return str(value or "intermediario")
+
+
+def user_snapshot(doc: Optional[Dict[str, Any]]) -> Optional[UserSnapshot]:
+    """Extrai de um documento de usuário os campos que afetam os contadores."""
+    if not doc:
+        return None
+    status = STATUS_COUNTERS.get(normalize_user_status(doc.get("status")))
+    return (
+        _as_object_id(doc.get("idOrganizacao")),
+        _as_object_id(doc.get("idSetor")),
+        status,
+        doc.get("respondido") is True,
+    )
+
+
+def _user_contribution(snapshot: UserSnapshot, sign: int) -> Dict[str, int]:
+    _, _, status, respondido = snapshot
+    contribution = {"usuarios": sign}
+    if status:
+        contribution[status] = sign
+    if respondido:
+        contribution["respondidos"] = sign
+    return contribution
+
+
+def risco_dimensoes(dimensoes: List[Any]) -> int:
+    """Conta as dimensões classificadas como risco em um diagnóstico."""
+    total = 0
+    for dim in dimensoes or []:
+        classificacao = dim.get("classificacao") if isinstance(dim, dict) else getattr(dim, "classificacao", None)
+        if _classificacao(classificacao) == "risco":
+            total += 1
+    return total
+
+
+class DashboardRollupsRepo:
+    """Mantém os contadores pré-agregados usados pelo dashboard."""
+
+    def __init__(self):
+        self.collection_name = "dashboard_rollups"
+
+    def _key_filter(
+        self,
+        org_id: Any,
+        setor_id: Any,
+        questionario_id: Any,
+    ) -> Dict[str, Any]:
+        return {
+            "idOrganizacao": _as_object_id(org_id),
+            "idSetor": _as_object_id(setor_id),
+            "idQuestionario": _as_object_id(questionario_id),
+        }
+
+    async def increment(
+        self,
+        org_id: Any,
+        setor_id: Any,
+        questionario_id: Any,
+        deltas: Dict[str, int],
+    ) -> bool:
+        """
+        Aplica incrementos atômicos nos contadores de um escopo.
+
+        Falhas são apenas registradas: os contadores podem ser reconstruídos
+        com ``rebuild()`` e nunca devem interromper a escrita principal.
+        """
+        inc = {field: int(value) for field, value in deltas.items() if value}
+        if not inc:
+            return False
+        try:
+            db = await get_db()
+            await db[self.collection_name].update_one(
+                self._key_filter(org_id, setor_id, questionario_id),
+                {"$inc": inc, "$set": {"atualizadoEm": datetime.utcnow()}},
+                upsert=True,
+            )
+        except Exception as exc:
+            logger.warning("Falha ao atualizar rollup do dashboard: %s", exc)
+            return False
+        if _afeta_overview(inc):
+            await invalidate_overview()
+        return True
+
+    async def increment_many(self, deltas: Dict[RollupKey, Dict[str, int]]) -> bool:
+        """Aplica incrementos de vários escopos em um único ``bulk_write``."""
+        now = datetime.utcnow()
+        operations = []
+        afeta_overview = False
+        for key, values in deltas.items():
+            inc = {field: int(value) for field, value in values.items() if value}
+            if inc:
+                afeta_overview = afeta_overview or _afeta_overview(inc)
+                operations.append(
+                    UpdateOne(
+                        self._key_filter(*key),
+                        {"$inc": inc, "$set": {"atualizadoEm": now}},
+                        upsert=True,
+                    )
+                )
+        if not operations:
+            return False
+        try:
+            db = await get_db()
+            await db[self.collection_name].bulk_write(operations, ordered=False)
+        except Exception as exc:
+            logger.warning("Falha ao atualizar rollups do dashboard em lote: %s", exc)
+            return False
+        if afeta_overview:
+            await invalidate_overview()
+        return True
+
+    async def apply_user_change(
+        self,
+        before: Optional[Dict[str, Any]],
+        after: Optional[Dict[str, Any]],
+    ) -> None:
+        """
+        Ajusta os contadores de usuários a partir do estado anterior e posterior
+        de um documento (None representa inexistência).
+        """
+        old = user_snapshot(before)
+        new = user_snapshot(after)
+        if old == new:
+            return
+
+        deltas: Dict[Tuple[Any, Any], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        if old:
+            for field, value in _user_contribution(old, -1).items():
+                deltas[(old[0], old[1])][field] += value
+        if new:
+            for field, value in _user_contribution(new, 1).items():
+                deltas[(new[0], new[1])][field] += value
+
+        for (org_id, setor_id), inc in deltas.items():
+            await self.increment(org_id, setor_id, None, inc)
+
+    async def scope_for_anon_id(self, anon_id: str) -> Tuple[Optional[ObjectId], Optional[ObjectId]]:
+        """Resolve organização e setor de um respondente pelo anonId."""
+        try:
+            db = await get_db()
+            user = await db["usuarios"].find_one(
+                {"anonId": anon_id},
+                {"idOrganizacao": 1, "idSetor": 1},
+            )
+        except Exception as exc:
+            logger.warning("Falha ao resolver escopo do respondente %s: %s", anon_id, exc)
+            return None, None
+        if not user:
+            return None, None
+        return _as_object_id(user.get("idOrganizacao")), _as_object_id(user.get("idSetor"))
+
+    async def scopes_for_anon_ids(
+        self, anon_ids: List[str]
+    ) -> Dict[str, Tuple[Optional[ObjectId], Optional[ObjectId]]]:
+        """Resolve organização e setor de vários respondentes em uma consulta."""
+        if not anon_ids:
+            return {}
+        try:
+            db = await get_db()
+            cursor = db["usuarios"].find(
+                {"anonId": {"$in": anon_ids}},
+                {"anonId": 1, "idOrganizacao": 1, "idSetor": 1},
+            )
+            return {
+                user["anonId"]: (_as_object_id(user.get("idOrganizacao")), _as_object_id(user.get("idSetor")))
+                async for user in cursor
+            }
+        except Exception as exc:
+            logger.warning("Falha ao resolver escopo de %d respondentes: %s", len(anon_ids), exc)
+            return {}
+
+    async def _scope_of(self, doc: Dict[str, Any]) -> Tuple[Optional[ObjectId], Optional[ObjectId]]:
+        """Usa o escopo carimbado no documento ou, na falta dele, resolve pelo anonId."""
+        if "idOrganizacao" in doc:
+            return _as_object_id(doc["idOrganizacao"]), _as_object_id(doc.get("idSetor"))
+        return await self.scope_for_anon_id(doc["anonId"])
+
+    async def record_answers(
+        self,
+        anon_id: str,
+        questionario_id: Any,
+        *,
+        respondentes: int = 0,
+        respostas: int = 0,
+        escopo: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Registra novos respondentes e variação no total de itens respondidos.
+
+        ``escopo`` evita nova leitura de ``usuarios`` quando quem grava já o resolveu.
+        """
+        if not respondentes and not respostas:
+            return
+        if escopo is not None:
+            org_id, setor_id = _as_object_id(escopo.get("idOrganizacao")), _as_object_id(escopo.get("idSetor"))
+        else:
+            org_id, setor_id = await self.scope_for_anon_id(anon_id)
+        await self.increment(
+            org_id,
+            setor_id,
+            questionario_id,
+            {"respondentes": respondentes, "respostas": respostas},
+        )
+
+    async def record_diagnostico(self, diagnostico: Dict[str, Any]) -> None:
+        """Contabiliza um diagnóstico recém-criado no escopo do respondente."""
+        anon_id = diagnostico.get("anonId")
+        if not anon_id:
+            return
+        org_id, setor_id = await self._scope_of(diagnostico)
+        classificacao = _classificacao(diagnostico.get("resultadoGlobal"))
+        deltas = {
+            "diagnosticos": 1,
+            "dimensoesRisco": risco_dimensoes(diagnostico.get("dimensoes", [])),
+        }
+        if classificacao in CLASSIFICACOES:
+            deltas[f"classificacoes.{classificacao}"] = 1
+        await self.increment(org_id, setor_id, diagnostico.get("idQuestionario"), deltas)
+
+    async def record_diagnosticos(self, diagnosticos: List[Dict[str, Any]]) -> None:
+        """Contabiliza diagnósticos criados em lote (uma leitura de escopo e um bulk_write)."""
+        # Diagnósticos já carimbados com o escopo dispensam a leitura de usuarios
+        anon_ids = list({d["anonId"] for d in diagnosticos if d.get("anonId") and "idOrganizacao" not in d})
+        scopes = await self.scopes_for_anon_ids(anon_ids)
+        deltas: Dict[RollupKey, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for diagnostico in diagnosticos:
+            anon_id = diagnostico.get("anonId")
+            if not anon_id:
+                continue
+            if "idOrganizacao" in diagnostico:
+                org_id, setor_id = _as_object_id(diagnostico["idOrganizacao"]), _as_object_id(diagnostico.get("idSetor"))
+            else:
+                org_id, setor_id = scopes.get(anon_id, (None, None))
+            counters = deltas[(org_id, setor_id, _as_object_id(diagnostico.get("idQuestionario")))]
+            counters["diagnosticos"] += 1
+            counters["dimensoesRisco"] += risco_dimensoes(diagnostico.get("dimensoes", []))
+            classificacao = _classificacao(diagnostico.get("resultadoGlobal"))
+            if classificacao in CLASSIFICACOES:
+                counters[f"classificacoes.{classificacao}"] += 1
+        await self.increment_many(deltas)
+
+    async def find(self, query: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Lista documentos de rollup que atendem ao filtro."""
+        db = await get_db()
+        cursor = db[self.collection_name].find(query or {})
+        return await cursor.to_list(length=None)
+
+    async def summarize(
+        self,
+        group_by: Optional[str],
+        match: Optional[Dict[str, Any]] = None,
+    ) -> Dict[Any, Dict[str, Any]]:
+        """
+        Soma os contadores agrupando por um campo da chave (ex.: idOrganizacao).
+        Com ``group_by=None`` retorna os totais gerais sob a chave None.
+
+        Returns:
+            Mapa valor do campo -> totais, incluindo o conjunto de questionários
+            com ao menos um respondente.
+        """
+        db = await get_db()
+        pipeline: List[Dict[str, Any]] = []
+        if match:
+            pipeline.append({"$match": match})
+        pipeline.append(
+            {
+                "$group": {
+                    "_id": f"${group_by}" if group_by else None,
+                    "usuarios": {"$sum": {"$ifNull": ["$usuarios", 0]}},
+                    "emAndamento": {"$sum": {"$ifNull": ["$status.emAndamento", 0]}},
+                    "finalizados": {"$sum": {"$ifNull": ["$status.finalizado", 0]}},
+                    "naoIniciados": {"$sum": {"$ifNull": ["$status.naoIniciado", 0]}},
+                    "respondidos": {"$sum": {"$ifNull": ["$respondidos", 0]}},
+                    "respondentes": {"$sum": {"$ifNull": ["$respondentes", 0]}},
+                    "diagnosticos": {"$sum": {"$ifNull": ["$diagnosticos", 0]}},
+                    "dimensoesRisco": {"$sum": {"$ifNull": ["$dimensoesRisco", 0]}},
+                    "questionarios": {
+                        "$addToSet": {
+                            "$cond": [{"$gt": ["$respondentes", 0]}, "$idQuestionario", None]
+                        }
+                    },
+                }
+            }
+        )
+        rows = await db[self.collection_name].aggregate(pipeline).to_list(length=None)
+        summary: Dict[Any, Dict[str, Any]] = {}
+        for row in rows:
+            row["questionarios"] = [q for q in row.get("questionarios", []) if q is not None]
+            summary[row.pop("_id")] = row
+        return summary
+
+    async def rebuild(self) -> int:
+        """
+        Recalcula todos os contadores a partir de usuarios, respostas e diagnosticos.
+
+        Destinado a backfills: incrementos concorrentes durante a execução
+        podem ser sobrescritos, então rode em janela de baixo tráfego.
+
+        Returns:
+            Quantidade de documentos de rollup gravados.
+        """
+        db = await get_db()
+        docs: Dict[RollupKey, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+        users_pipeline = [
+            {
+                "$group": {
+                    "_id": {"org": "$idOrganizacao", "setor": "$idSetor", "status": "$status"},
+                    "total": {"$sum": 1},
+                    "respondidos": {"$sum": {"$cond": [{"$eq": ["$respondido", True]}, 1, 0]}},
+                }
+            }
+        ]
+        async for row in db["usuarios"].aggregate(users_pipeline):
+            group = row["_id"]
+            key = (_as_object_id(group.get("org")), _as_object_id(group.get("setor")), None)
+            counters = docs[key]
+            counters["usuarios"] += row["total"]
+            counters["respondidos"] += row["respondidos"]
+            status = STATUS_COUNTERS.get(normalize_user_status(group.get("status")))
+            if status:
+                counters[status] += row["total"]
+
+        scope_lookup = [
+            {
+                "$lookup": {
+                    "from": "usuarios",
+                    "localField": "anonId",
+                    "foreignField": "anonId",
+                    "pipeline": [{"$project": {"idOrganizacao": 1, "idSetor": 1}}],
+                    "as": "usuario",
+                }
+            },
+            {"$unwind": {"path": "$usuario", "preserveNullAndEmptyArrays": True}},
+        ]
+
+        respostas_pipeline = scope_lookup + [
+            {
+                "$group": {
+                    "_id": {
+                        "org": "$usuario.idOrganizacao",
+                        "setor": "$usuario.idSetor",
+                        "questionario": "$idQuestionario",
+                    },
+                    "respondentes": {"$sum": 1},
+                    "respostas": {"$sum": {"$size": {"$ifNull": ["$respostas", []]}}},
+                }
+            }
+        ]
+        async for row in db["respostas"].aggregate(respostas_pipeline):
+            group = row["_id"]
+            key = (
+                _as_object_id(group.get("org")),
+                _as_object_id(group.get("setor")),
+                _as_object_id(group.get("questionario")),
+            )
+            docs[key]["respondentes"] += row["respondentes"]
+            docs[key]["respostas"] += row["respostas"]
+
+        diagnosticos_pipeline = scope_lookup + [
+            {
+                "$group": {
+                    "_id": {
+                        "org": "$usuario.idOrganizacao",
+                        "setor": "$usuario.idSetor",
+                        "questionario": "$idQuestionario",
+                        "classificacao": "$resultadoGlobal",
+                    },
+                    "total": {"$sum": 1},
+                    "dimensoesRisco": {
+                        "$sum": {
+                            "$size": {
+                                "$filter": {
+                                    "input": {"$ifNull": ["$dimensoes", []]},
+                                    "as": "dim",
+                                    "cond": {"$eq": ["$$dim.classificacao", "risco"]},
+                                }
+                            }
+                        }
+                    },
+                }
+            }
+        ]
+        async for row in db["diagnosticos"].aggregate(diagnosticos_pipeline):
+            group = row["_id"]
+            key = (
+                _as_object_id(group.get("org")),
+                _as_object_id(group.get("setor")),
+                _as_object_id(group.get("questionario")),
+            )
+            counters = docs[key]
+            counters["diagnosticos"] += row["total"]
+            counters["dimensoesRisco"] += row["dimensoesRisco"]
+            classificacao = _classificacao(group.get("classificacao"))
+            if classificacao in CLASSIFICACOES:
+                counters[f"classificacoes.{classificacao}"] += row["total"]
+
+        now = datetime.utcnow()
+        payload: List[Dict[str, Any]] = []
+        for (org_id, setor_id, questionario_id), counters in docs.items():
+            doc: Dict[str, Any] = {
+                "idOrganizacao": org_id,
+                "idSetor": setor_id,
+                "idQuestionario": questionario_id,
+                "atualizadoEm": now,
+            }
+            for field, value in counters.items():
+                if "." in field:
+                    parent, child = field.split(".", 1)
+                    doc.setdefault(parent, {})[child] = value
+                else:
+                    doc[field] = value
+            payload.append(doc)
+
+        collection = db[self.collection_name]
+        await collection.delete_many({})
+        if payload:
+            await collection.insert_many(payload)
+        logger.info("Rollups do dashboard reconstruídos: %s documentos", len(payload))
+        await invalidate_overview()
+        return len(payload)
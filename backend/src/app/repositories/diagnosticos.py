@@ -1,9 +1,17 @@
 """
 Repositório para gerenciamento de diagnósticos individuais.
 """
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable
+from pymongo.errors import BulkWriteError
 from app.core.database import get_db
 from app.repositories.base_repository import BaseRepository
+from app.repositories.dashboard_rollups import DashboardRollupsRepo
+from app.repositories.escopo import (
+    escopo_do_usuario,
+    escopo_por_anon_id,
+    escopos_por_anon_ids,
+    tem_escopo,
+)
 from bson import ObjectId
 from bson.errors import InvalidId
 from datetime import datetime
@@ -17,6 +25,7 @@ class DiagnosticosRepo(BaseRepository[Dict[str, Any]]):
 
     def __init__(self):
         self.collection_name = "diagnosticos"
+        self._rollups = DashboardRollupsRepo()
 
     async def create(self, data: Dict[str, Any]) -> str:
         return await self.create_diagnostico(data)
@@ -30,6 +39,9 @@ class DiagnosticosRepo(BaseRepository[Dict[str, Any]]):
         """
         Cria um novo diagnóstico para um respondente.
 
+        O escopo atual do usuário (organização, setor e unidade) é carimbado
+        no documento, salvo se já vier informado.
+
         Args:
             diagnostico_data: Dicionário contendo 'anonId', 'idQuestionario',
                               'resultadoGlobal', 'dimensoes', etc.
@@ -41,6 +53,8 @@ class DiagnosticosRepo(BaseRepository[Dict[str, Any]]):
         
         # Converte IDs para ObjectId
         self._ensure_object_id(diagnostico_data, "idQuestionario")
+        if diagnostico_data.get("anonId") and not tem_escopo(diagnostico_data):
+            diagnostico_data.update(await escopo_por_anon_id(diagnostico_data["anonId"]))
 
         # Adiciona timestamps se não existirem
         now = datetime.utcnow()
@@ -50,10 +64,54 @@ class DiagnosticosRepo(BaseRepository[Dict[str, Any]]):
 
         result = await db[self.collection_name].insert_one(diagnostico_data)
         logger.info(f"Diagnóstico criado com ID: {result.inserted_id}")
+        await self._rollups.record_diagnostico(diagnostico_data)
         return str(result.inserted_id)
 
+    async def create_many(self, diagnosticos: List[Dict[str, Any]]) -> int:
+        """
+        Insere diagnósticos em lote com ``insert_many`` (não ordenado).
+
+        O escopo dos respondentes é resolvido em uma única consulta e carimbado
+        nos documentos. Os contadores do dashboard são atualizados apenas para
+        os documentos efetivamente gravados.
+
+        Returns:
+            Quantidade de diagnósticos inseridos.
+        """
+        if not diagnosticos:
+            return 0
+        db = await get_db()
+        sem_escopo = [d["anonId"] for d in diagnosticos if d.get("anonId") and not tem_escopo(d)]
+        escopos = await escopos_por_anon_ids(list(dict.fromkeys(sem_escopo)))
+        now = datetime.utcnow()
+        for diagnostico_data in diagnosticos:
+            self._ensure_object_id(diagnostico_data, "idQuestionario")
+            if diagnostico_data.get("anonId") and not tem_escopo(diagnostico_data):
+                diagnostico_data.update(escopos.get(diagnostico_data["anonId"]) or escopo_do_usuario(None))
+            diagnostico_data.setdefault("dataAnalise", now)
+            diagnostico_data.setdefault("dataCriacao", now)
+            diagnostico_data["atualizadoEm"] = now
+
+        try:
+            await db[self.collection_name].insert_many(diagnosticos, ordered=False)
+            inseridos = diagnosticos
+        except BulkWriteError as exc:
+            falhas = {erro["index"] for erro in exc.details.get("writeErrors", [])}
+            inseridos = [d for i, d in enumerate(diagnosticos) if i not in falhas]
+            logger.warning(f"{len(falhas)} diagnósticos não foram gravados no lote: {exc}")
+        logger.info(f"{len(inseridos)} diagnósticos criados em lote")
+        await self._rollups.record_diagnosticos(inseridos)
+        return len(inseridos)
+
+    LIST_SORT = [("dataAnalise", -1), ("_id", -1)]
+
     async def get_by_anon_id(
-        self, anon_id: str, questionario_id: Optional[str] = None
+        self,
+        anon_id: str,
+        questionario_id: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
         """
         Busca diagnósticos por anonId, opcionalmente filtrados por questionário.
@@ -61,11 +119,13 @@ class DiagnosticosRepo(BaseRepository[Dict[str, Any]]):
         Args:
             anon_id: ID anônimo do respondente.
             questionario_id: ID do questionário (opcional).
+            limit: Tamanho da página (padrão: 100).
+            cursor: Cursor da página anterior (opcional).
+            projection: Projeção de campos (opcional).
 
         Returns:
             Lista de diagnósticos ordenados por data (mais recente primeiro).
         """
-        db = await get_db()
         query: Dict[str, Any] = {"anonId": anon_id}
 
         if questionario_id:
@@ -75,8 +135,13 @@ class DiagnosticosRepo(BaseRepository[Dict[str, Any]]):
                 logger.warning(f"ID de questionário inválido: {questionario_id}")
                 return []
 
-        cursor = db[self.collection_name].find(query).sort("dataAnalise", -1)
-        return await cursor.to_list(length=100)
+        return await self.find_keyset(
+            query,
+            sort=self.LIST_SORT,
+            limit=limit,
+            cursor=cursor,
+            projection=projection,
+        )
 
     async def list_by_user(self, anon_id: str) -> List[Dict[str, Any]]:
         """
@@ -153,32 +218,192 @@ class DiagnosticosRepo(BaseRepository[Dict[str, Any]]):
         return await db[self.collection_name].count_documents(query or {})
 
     async def find_by_anon_ids(
-        self, anon_ids: List[str], questionario_id: str
+        self,
+        anon_ids: List[str],
+        questionario_id: str,
+        projection: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
         """
         Busca diagnósticos para uma lista de IDs anônimos e um questionário.
         Útil para relatórios consolidados.
-        
+
+        Os documentos são lidos em páginas por keyset, sem truncar o resultado.
+
         Args:
             anon_ids: Lista de strings (anonId).
             questionario_id: ID do questionário.
-            
+            projection: Projeção de campos (opcional).
+
         Returns:
-            Lista de diagnósticos (somente o mais recente por usuário se necessário, 
-            mas aqui trazemos todos e o service filtra).
-            Para simplificar, trazemos o último de cada user usando sort/limit ou let service handle.
-            Aqui: trazemos todos por data desc.
+            Todos os diagnósticos encontrados, por data desc (o service filtra
+            o mais recente de cada usuário).
         """
         try:
-            db = await get_db()
             q_id = ObjectId(questionario_id)
-            
-            cursor = db[self.collection_name].find({
-                "anonId": {"$in": anon_ids},
-                "idQuestionario": q_id
-            }).sort("dataAnalise", -1)
-            
-            return await cursor.to_list(length=2000)
+            return await self.list_all(
+                {"anonId": {"$in": anon_ids}, "idQuestionario": q_id},
+                sort=self.LIST_SORT,
+                projection=projection,
+            )
         except InvalidId:
             logger.warning(f"ID inválido: {questionario_id}")
             return []
+
+    async def aggregate_latest_dimensoes(
+        self,
+        questionario_id: str,
+        *,
+        org_id: Optional[str] = None,
+        setor_id: Optional[str] = None,
+        anon_ids: Optional[List[str]] = None,
+        apos: Optional[datetime] = None,
+        ate: Optional[datetime] = None,
+        incluir_anon_ids: bool = False,
+        dimensoes_protecao: Iterable[str] = (),
+    ) -> Dict[str, Any]:
+        """
+        Agrega no MongoDB o diagnóstico mais recente de cada respondente.
+
+        O escopo é filtrado pelos campos ``idOrganizacao``/``idSetor`` carimbados
+        nos diagnósticos, em uma consulta coberta pelos índices
+        ``ix_diagnosticos_questionario_{org,setor}_anon_data``. O diagnóstico
+        mais recente por anonId é escolhido com ``$sort`` + ``$group``/``$first``;
+        em seguida as dimensões são agrupadas por (codigoDominio, domínio,
+        dimensão, sinal) com soma, total e distribuição das classificações.
+        Nada é truncado: apenas as linhas agregadas (uma por dimensão) voltam
+        para a aplicação.
+
+        Args:
+            questionario_id: ID do questionário.
+            org_id: Organização do escopo (opcional).
+            setor_id: Setor do escopo (opcional).
+            anon_ids: Restringe a estes respondentes (para deltas pequenos).
+            apos: Considera apenas diagnósticos com ``dataCriacao`` posterior.
+            ate: Considera apenas diagnósticos com ``dataCriacao`` até esta data.
+            incluir_anon_ids: Retorna também os anonIds agregados (para deltas pequenos).
+            dimensoes_protecao: Dimensões de proteção, para classificar o sinal
+                de dimensões gravadas sem ``sinal`` (as demais contam como risco).
+
+        Returns:
+            ``{"respondentes", "dimensoes"}`` com as dimensões
+            na ordem em que aparecem nos diagnósticos. Cada linha tem ``codigo``,
+            ``dominio``, ``dimensao``, ``sinal``, ``soma``, ``total`` e
+            ``distribuicao``; com ``incluir_anon_ids``, há ainda ``anonIds``.
+        """
+        vazio: Dict[str, Any] = {"respondentes": 0, "dimensoes": []}
+        if incluir_anon_ids:
+            vazio["anonIds"] = []
+        if anon_ids is not None and not anon_ids:
+            return vazio
+        try:
+            match: Dict[str, Any] = {"idQuestionario": ObjectId(questionario_id)}
+            if org_id:
+                match["idOrganizacao"] = ObjectId(org_id)
+            if setor_id:
+                match["idSetor"] = ObjectId(setor_id)
+        except InvalidId as e:
+            logger.warning(f"ID inválido: {e}")
+            return vazio
+        if anon_ids is not None:
+            match["anonId"] = {"$in": anon_ids}
+        periodo: Dict[str, Any] = {}
+        if apos is not None:
+            periodo["$gt"] = apos
+        if ate is not None:
+            periodo["$lte"] = ate
+        if periodo:
+            match["dataCriacao"] = periodo
+
+        db = await get_db()
+        cursor = db[self.collection_name].aggregate(
+            self._latest_dimensoes_pipeline(match, incluir_anon_ids, dimensoes_protecao),
+            allowDiskUse=True,
+        )
+        resultado = await cursor.to_list(length=1)
+        if not resultado:
+            return vazio
+        facet = resultado[0]
+        resumo = (facet.get("respondentes") or [{}])[0]
+        agregado: Dict[str, Any] = {
+            "respondentes": int(resumo.get("total", 0)),
+            "dimensoes": [
+                {
+                    **row["_id"],
+                    "soma": float(row["soma"]),
+                    "total": int(row["total"]),
+                    "distribuicao": {
+                        "favoravel": int(row["favoravel"]),
+                        "intermediario": int(row["intermediario"]),
+                        "risco": int(row["risco"]),
+                    },
+                }
+                for row in facet.get("dimensoes") or []
+            ],
+        }
+        if incluir_anon_ids:
+            agregado["anonIds"] = list(resumo.get("anonIds") or [])
+        return agregado
+
+    @staticmethod
+    def _latest_dimensoes_pipeline(
+        match: Dict[str, Any],
+        incluir_anon_ids: bool = False,
+        dimensoes_protecao: Iterable[str] = (),
+    ) -> List[Dict[str, Any]]:
+        """Pipeline de agregação por dimensão do diagnóstico mais recente de cada anonId."""
+        dominio = {"$ifNull": ["$dimensoes.dominio", "Sem domínio"]}
+        dimensao = {"$ifNull": ["$dimensoes.dimensao", "Sem dimensão"]}
+        codigo = {"$ifNull": ["$dimensoes.codigoDominio", ""]}
+        sinal = {"$ifNull": ["$dimensoes.sinal", ""]}
+        classificacao = {"$ifNull": ["$dimensoes.classificacao", ""]}
+        sinal_padrao = {
+            "$cond": [
+                {"$in": [dimensao, sorted(dimensoes_protecao)]},
+                "protecao",
+                "risco",
+            ]
+        }
+
+        def _conta(valores: List[str]) -> Dict[str, Any]:
+            return {"$sum": {"$cond": [{"$in": [classificacao, valores]}, 1, 0]}}
+
+        resumo: Dict[str, Any] = {"_id": None, "total": {"$sum": 1}}
+        if incluir_anon_ids:
+            resumo["anonIds"] = {"$push": "$_id"}
+
+        return [
+            {"$match": match},
+            {"$sort": {"anonId": 1, "dataCriacao": -1, "_id": -1}},
+            {
+                "$group": {
+                    "_id": "$anonId",
+                    "dimensoes": {"$first": "$dimensoes"},
+                }
+            },
+            {
+                "$facet": {
+                    "respondentes": [{"$group": resumo}],
+                    "dimensoes": [
+                        {"$unwind": {"path": "$dimensoes", "includeArrayIndex": "posicao"}},
+                        {
+                            "$group": {
+                                "_id": {
+                                    "codigo": {"$cond": [{"$eq": [codigo, ""]}, dominio, codigo]},
+                                    "dominio": dominio,
+                                    "dimensao": dimensao,
+                                    "sinal": {"$cond": [{"$eq": [sinal, ""]}, sinal_padrao, sinal]},
+                                },
+                                "soma": {"$sum": {"$ifNull": ["$dimensoes.pontuacao", 0]}},
+                                "total": {"$sum": 1},
+                                "favoravel": _conta(["favoravel"]),
+                                # Classificação ausente conta como intermediária
+                                "intermediario": _conta(["intermediario", ""]),
+                                "risco": _conta(["risco"]),
+                                "ordem": {"$min": "$posicao"},
+                            }
+                        },
+                        {"$sort": {"ordem": 1, "_id.codigo": 1, "_id.dimensao": 1}},
+                    ],
+                }
+            },
+        ]
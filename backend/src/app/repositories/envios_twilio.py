@@ -0,0 +1,51 @@
+"""
+Repositório do histórico de envios ao Twilio (coleção ``envios_twilio``).
+
+Cada documento registra o resultado de um envio despachado pela fila de
+saída: SIDs das mensagens aceitas, número de tentativas e erro final.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import logging
+
+from app.core.database import get_db
+
+logger = logging.getLogger(__name__)
+
+
+class EnviosTwilioRepo:
+    """Grava o resultado dos envios despachados ao Twilio."""
+
+    collection_name = "envios_twilio"
+
+    async def record(
+        self,
+        *,
+        envio_id: str,
+        telefone: str,
+        status: str,
+        sids: List[str],
+        tentativas: int,
+        erro: Optional[str] = None,
+    ) -> bool:
+        doc: Dict[str, Any] = {
+            "envioId": envio_id,
+            "telefone": telefone,
+            "status": status,
+            "sids": sids,
+            "tentativas": tentativas,
+            "erro": erro,
+            "criadoEm": datetime.utcnow(),
+        }
+        try:
+            db = await get_db()
+            await db[self.collection_name].insert_one(doc)
+            return True
+        except Exception as exc:
+            logger.warning("Falha ao registrar envio Twilio %s: %s", envio_id, exc)
+            return False
+
+    async def find_by_phone(self, telefone: str, limit: int = 50) -> List[Dict[str, Any]]:
+        db = await get_db()
+        cursor = db[self.collection_name].find({"telefone": telefone}).sort("criadoEm", -1)
+        return await cursor.to_list(length=limit)
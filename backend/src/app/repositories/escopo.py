@@ -0,0 +1,55 @@
+"""
+Escopo organizacional (organização, setor e unidade) dos respondentes.
+
+Respostas e diagnósticos guardam uma cópia de ``idOrganizacao``, ``idSetor`` e
+``numeroUnidade`` do usuário no momento da escrita. Assim, relatórios por
+organização/setor filtram direto por escopo, com uma consulta indexada, em vez
+de listar antes os anonIds em ``usuarios`` e montar um ``$in``.
+
+Quando o usuário muda de organização/setor, ``propagar_escopo`` reescreve as
+cópias; documentos antigos são preenchidos por
+``scripts/backfill_escopo_respondentes.py``.
+"""
+from typing import Any, Dict, List, Mapping, Optional
+
+from app.core.database import get_db
+
+CAMPOS_ESCOPO = ("idOrganizacao", "idSetor", "numeroUnidade")
+COLECOES_COM_ESCOPO = ("respostas", "diagnosticos")
+
+_PROJECTION = {"anonId": 1, **{campo: 1 for campo in CAMPOS_ESCOPO}}
+
+
+def escopo_do_usuario(usuario: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Extrai os campos de escopo de um documento de usuário (None se ausentes)."""
+    usuario = usuario or {}
+    return {campo: usuario.get(campo) for campo in CAMPOS_ESCOPO}
+
+
+def tem_escopo(doc: Mapping[str, Any]) -> bool:
+    """Indica se o documento já traz o escopo carimbado."""
+    return any(campo in doc for campo in CAMPOS_ESCOPO)
+
+
+async def escopo_por_anon_id(anon_id: str) -> Dict[str, Any]:
+    """Resolve o escopo atual de um respondente pelo anonId."""
+    db = await get_db()
+    usuario = await db["usuarios"].find_one({"anonId": anon_id}, _PROJECTION)
+    return escopo_do_usuario(usuario)
+
+
+async def escopos_por_anon_ids(anon_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Resolve o escopo de vários respondentes em uma única consulta."""
+    if not anon_ids:
+        return {}
+    db = await get_db()
+    cursor = db["usuarios"].find({"anonId": {"$in": anon_ids}}, _PROJECTION)
+    return {usuario["anonId"]: escopo_do_usuario(usuario) async for usuario in cursor}
+
+
+async def propagar_escopo(anon_id: str, escopo: Mapping[str, Any]) -> None:
+    """Reescreve o escopo nas respostas e diagnósticos já gravados do respondente."""
+    db = await get_db()
+    payload = escopo_do_usuario(escopo)
+    for colecao in COLECOES_COM_ESCOPO:
+        await db[colecao].update_many({"anonId": anon_id}, {"$set": payload})
@@ -0,0 +1,179 @@
+"""
+Repositório dos jobs de exportação em lote (coleção ``exportacoes``).
+
+Cada job guarda os filtros, o progresso (total/processados/falhas) e, ao
+terminar, o ID do ZIP gravado no GridFS (bucket ``exportacoes_arquivos``),
+compartilhado entre a API e os workers Celery. As partes renderizadas por
+cada task do job também ficam no bucket (``metadata.idExportacao``) até a
+montagem do ZIP final.
+"""
+from datetime import datetime, timedelta
+from typing import Any, BinaryIO, Dict, List, Optional
+import logging
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from gridfs.errors import NoFile
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+from app.core.database import get_db
+from app.repositories.base_repository import BaseRepository
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDENTE = "pendente"
+STATUS_PROCESSANDO = "processando"
+STATUS_CONCLUIDO = "concluido"
+STATUS_ERRO = "erro"
+
+
+class ExportacoesRepo(BaseRepository[Dict[str, Any]]):
+    """Gerencia jobs de exportação em lote e seus arquivos no GridFS."""
+
+    bucket_name = "exportacoes_arquivos"
+
+    def __init__(self):
+        self.collection_name = "exportacoes"
+
+    async def _bucket(self) -> AsyncIOMotorGridFSBucket:
+        db = await get_db()
+        return AsyncIOMotorGridFSBucket(db, bucket_name=self.bucket_name)
+
+    async def create_job(
+        self,
+        filtros: Dict[str, Any],
+        formato: str,
+        total: int,
+        solicitado_por: str,
+    ) -> str:
+        """
+        Registra um job pendente.
+
+        Args:
+            filtros: Filtros dos relatórios (idQuestionario, idOrganizacao, idSetor, tipo).
+            formato: Formato de cada arquivo (pdf, csv ou excel).
+            total: Relatórios que casavam com os filtros na criação.
+            solicitado_por: Telefone do admin que pediu a exportação.
+
+        Returns:
+            ID do job criado como string.
+        """
+        now = datetime.utcnow()
+        return await self.create(
+            {
+                "status": STATUS_PENDENTE,
+                "filtros": filtros,
+                "formato": formato,
+                "total": total,
+                "processados": 0,
+                "falhas": 0,
+                "erros": [],
+                "idArquivo": None,
+                "solicitadoPor": solicitado_por,
+                "criadoEm": now,
+                "atualizadoEm": now,
+            }
+        )
+
+    async def create(self, data: Dict[str, Any]) -> str:
+        db = await get_db()
+        result = await db[self.collection_name].insert_one(data)
+        return str(result.inserted_id)
+
+    async def get_by_id(self, id: str) -> Optional[Dict[str, Any]]:
+        try:
+            db = await get_db()
+            return await db[self.collection_name].find_one({"_id": ObjectId(id)})
+        except InvalidId:
+            logger.warning(f"ID de exportação inválido: {id}")
+            return None
+
+    async def update(self, id: str, data: Dict[str, Any]) -> bool:
+        try:
+            db = await get_db()
+            result = await db[self.collection_name].update_one(
+                {"_id": ObjectId(id)},
+                {"$set": {**data, "atualizadoEm": datetime.utcnow()}},
+            )
+            return result.modified_count > 0
+        except InvalidId:
+            logger.warning(f"ID de exportação inválido para atualização: {id}")
+            return False
+
+    async def delete(self, id: str) -> bool:
+        job = await self.get_by_id(id)
+        if not job:
+            return False
+        await self.delete_arquivo(job.get("idArquivo"))
+        db = await get_db()
+        result = await db[self.collection_name].delete_one({"_id": job["_id"]})
+        return result.deleted_count > 0
+
+    async def registrar_progresso(
+        self, id: str, processados: int, falhas: int, erros: List[Dict[str, Any]], max_erros: int
+    ) -> None:
+        """Soma o progresso de uma parte do job (atômico entre tasks concorrentes)."""
+        db = await get_db()
+        await db[self.collection_name].update_one(
+            {"_id": ObjectId(id)},
+            {
+                "$inc": {"processados": processados, "falhas": falhas},
+                "$push": {"erros": {"$each": erros, "$slice": max_erros}},
+                "$set": {"atualizadoEm": datetime.utcnow()},
+            },
+        )
+
+    async def save_arquivo(self, filename: str, source: BinaryIO, job_id: str) -> ObjectId:
+        """Grava o ZIP no GridFS a partir de um arquivo aberto (lido em chunks)."""
+        bucket = await self._bucket()
+        return await bucket.upload_from_stream(
+            filename,
+            source,
+            metadata={"idExportacao": job_id, "contentType": "application/zip"},
+        )
+
+    async def read_arquivo(self, file_id: Any) -> Optional[bytes]:
+        """Lê um arquivo inteiro do bucket (partes do job); None se não existir."""
+        stream = await self.open_arquivo(file_id)
+        if stream is None:
+            return None
+        return await stream.read()
+
+    async def open_arquivo(self, file_id: Any):
+        """Abre o ZIP para leitura em streaming; None se o arquivo não existir mais."""
+        bucket = await self._bucket()
+        try:
+            return await bucket.open_download_stream(file_id)
+        except NoFile:
+            return None
+
+    async def delete_arquivo(self, file_id: Any) -> None:
+        if not file_id:
+            return
+        bucket = await self._bucket()
+        try:
+            await bucket.delete(file_id)
+        except NoFile:
+            pass
+
+    async def delete_arquivos_job(self, job_id: str) -> None:
+        """Remove todos os arquivos do job no bucket (partes e ZIP final)."""
+        bucket = await self._bucket()
+        async for arquivo in bucket.find({"metadata.idExportacao": job_id}):
+            await self.delete_arquivo(arquivo._id)
+
+    async def purge_expired(self, max_age: timedelta) -> int:
+        """Remove jobs (e seus ZIPs) criados há mais de ``max_age``."""
+        db = await get_db()
+        limite = datetime.utcnow() - max_age
+        removidos = 0
+        cursor = db[self.collection_name].find({"criadoEm": {"$lt": limite}}, {"idArquivo": 1})
+        async for job in cursor:
+            await self.delete_arquivo(job.get("idArquivo"))
+            # Partes que sobraram de um job interrompido antes do ZIP final
+            await self.delete_arquivos_job(str(job["_id"]))
+            await db[self.collection_name].delete_one({"_id": job["_id"]})
+            removidos += 1
+        if removidos:
+            logger.info("%d exportações expiradas removidas", removidos)
+        return removidos
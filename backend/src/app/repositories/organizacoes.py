@@ -5,6 +5,7 @@ import re
 from typing import Optional, List, Dict, Any
 from app.core.database import get_db
 from app.repositories.base_repository import BaseRepository
+from app.repositories.dashboard_rollups import invalidate_overview
 from bson import ObjectId
 from bson.errors import InvalidId
 import logging
@@ -43,6 +44,7 @@ class OrganizacoesRepo(BaseRepository[Dict[str, Any]]):
         db = await get_db()
         result = await db[self.collection_name].insert_one(org_data)
         logger.info(f"Organização criada com ID: {result.inserted_id}")
+        await invalidate_overview()
         return str(result.inserted_id)
 
     async def get_organization(self, org_id: str) -> Optional[Dict[str, Any]]:
@@ -125,19 +127,31 @@ class OrganizacoesRepo(BaseRepository[Dict[str, Any]]):
         )
         return await cursor.to_list(length=limit)
 
-    async def list_organizations(self, limit: int = 100) -> List[Dict[str, Any]]:
+    LIST_SORT = [("_id", 1)]
+
+    async def list_organizations(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
         """
-        Lista todas as organizações cadastradas.
+        Lista organizações cadastradas, paginando por cursor.
 
         Args:
             limit: Número máximo de resultados (padrão: 100).
+            cursor: Cursor da página anterior (opcional).
+            projection: Projeção de campos (opcional).
 
         Returns:
             Lista de documentos de organizações.
         """
-        db = await get_db()
-        cursor = db[self.collection_name].find()
-        return await cursor.to_list(length=limit)
+        return await self.find_keyset(
+            sort=self.LIST_SORT,
+            limit=limit,
+            cursor=cursor,
+            projection=projection,
+        )
 
     async def update_organization(self, org_id: str, update_data: Dict[str, Any]) -> bool:
         """
@@ -174,6 +188,8 @@ class OrganizacoesRepo(BaseRepository[Dict[str, Any]]):
         try:
             db = await get_db()
             result = await db[self.collection_name].delete_one({"_id": ObjectId(org_id)})
+            if result.deleted_count > 0:
+                await invalidate_overview()
             return result.deleted_count > 0
         except InvalidId:
             logger.warning(f"ID de organização inválido para remoção: {org_id}")
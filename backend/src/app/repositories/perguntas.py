@@ -1,7 +1,10 @@
 """
 Repositório para gerenciamento de perguntas.
+
+Toda mutação incrementa ``perguntasVersao`` no questionário afetado, usado
+pelo catálogo compilado do bot para detectar mudanças.
 """
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 import logging
 
 from bson import ObjectId
@@ -31,11 +34,34 @@ class PerguntasRepo(BaseRepository[Dict[str, Any]]):
     async def delete(self, id: str) -> bool:
         try:
             db = await get_db()
-            result = await db[self.collection_name].delete_one({"idPergunta": id})
-            return result.deleted_count > 0
+            removida = await db[self.collection_name].find_one_and_delete(
+                {"idPergunta": id},
+                projection={"idQuestionario": 1},
+            )
         except Exception as exc:
             logger.warning(f"Erro removendo pergunta {id}: {exc}")
             return False
+        if not removida:
+            return False
+        await self._bump_version(db, [removida.get("idQuestionario")])
+        return True
+
+    async def _bump_version(self, db, ids_questionario: Iterable[Any]) -> None:
+        """Incrementa ``perguntasVersao`` e descarta o catálogo do bot e o plano de scoring locais."""
+        object_ids = list({oid for oid in ids_questionario if isinstance(oid, ObjectId)})
+        if not object_ids:
+            return
+        await db["questionarios"].update_many(
+            {"_id": {"$in": object_ids}},
+            {"$inc": {"perguntasVersao": 1}},
+        )
+        # Import tardio: catálogo e planos dependem deste repositório.
+        from app.bot.question_catalog import question_catalog
+        from app.services.scoring_plan import scoring_plans
+
+        for oid in object_ids:
+            question_catalog.invalidate(str(oid))
+            scoring_plans.invalidate(str(oid))
 
     MAX_QUESTIONS = 500
 
@@ -75,6 +101,32 @@ class PerguntasRepo(BaseRepository[Dict[str, Any]]):
             logger.warning(f"ID de questionário inválido: {id_questionario}")
             return 0
 
+    async def count_questions_by_questionnaire(self, ids_questionario: List[Any]) -> Dict[str, int]:
+        """
+        Conta perguntas ativas de vários questionários em uma única agregação.
+
+        Returns:
+            Mapa id do questionário (string) -> total de perguntas ativas.
+        """
+        object_ids: List[ObjectId] = []
+        for value in ids_questionario:
+            try:
+                object_ids.append(value if isinstance(value, ObjectId) else ObjectId(value))
+            except (InvalidId, TypeError):
+                logger.warning(f"ID de questionário inválido: {value}")
+        if not object_ids:
+            return {}
+        db = await get_db()
+        rows = await db[self.collection_name].aggregate(
+            [
+                {"$match": {"idQuestionario": {"$in": object_ids}, "ativo": True}},
+                {"$group": {"_id": "$idQuestionario", "total": {"$sum": 1}}},
+            ]
+        ).to_list(length=None)
+        counts = {str(oid): 0 for oid in object_ids}
+        counts.update({str(row["_id"]): int(row["total"]) for row in rows})
+        return counts
+
     async def create_question(self, data: Dict[str, Any]) -> str:
         db = await get_db()
         payload = dict(data)
@@ -82,6 +134,7 @@ class PerguntasRepo(BaseRepository[Dict[str, Any]]):
             payload["idQuestionario"] = ObjectId(payload["idQuestionario"])
         payload.setdefault("ativo", True)
         result = await db[self.collection_name].insert_one(payload)
+        await self._bump_version(db, [payload.get("idQuestionario")])
         return str(result.inserted_id)
 
     async def update_question(self, id: str, data: Dict[str, Any]) -> bool:
@@ -93,10 +146,15 @@ class PerguntasRepo(BaseRepository[Dict[str, Any]]):
             except InvalidId:
                 logger.warning(f"ID de questionário inválido na atualização: {payload['idQuestionario']}")
                 return False
+        anterior = await db[self.collection_name].find_one({"idPergunta": id}, {"idQuestionario": 1})
         result = await db[self.collection_name].update_one(
             {"idPergunta": id},
             {"$set": payload},
         )
+        if result.modified_count > 0:
+            await self._bump_version(
+                db, [(anterior or {}).get("idQuestionario"), payload.get("idQuestionario")]
+            )
         return result.modified_count > 0
 
     async def activate_question(self, id: str) -> bool:
@@ -123,5 +181,6 @@ class PerguntasRepo(BaseRepository[Dict[str, Any]]):
         if not payload:
             return []
         result = await db[self.collection_name].insert_many(payload)
+        await self._bump_version(db, [item.get("idQuestionario") for item in payload])
         return [str(i) for i in result.inserted_ids]
 
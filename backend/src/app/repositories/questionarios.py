@@ -51,11 +51,43 @@ class QuestionariosRepo(BaseRepository[Dict[str, Any]]):
             query["nome"] = name
         return await db[self.collection_name].find_one(query)
 
-    async def list_questionnaires(self, only_active: bool = True) -> List[Dict[str, Any]]:
-        db = await get_db()
+    async def get_questions_version(self, questionario_id: str) -> Optional[int]:
+        """
+        Versão das perguntas do questionário (``perguntasVersao``).
+
+        Returns:
+            0 para questionários ainda sem versão e None se o questionário não existe.
+        """
+        try:
+            db = await get_db()
+            doc = await db[self.collection_name].find_one(
+                {"_id": ObjectId(questionario_id)},
+                {"perguntasVersao": 1},
+            )
+        except InvalidId:
+            logger.warning(f"ID de questionário inválido: {questionario_id}")
+            return None
+        if not doc:
+            return None
+        return int(doc.get("perguntasVersao") or 0)
+
+    LIST_SORT = [("_id", 1)]
+
+    async def list_questionnaires(
+        self,
+        only_active: bool = True,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
         query = {"ativo": True} if only_active else {}
-        cursor = db[self.collection_name].find(query)
-        return await cursor.to_list(length=100)
+        return await self.find_keyset(
+            query,
+            sort=self.LIST_SORT,
+            limit=limit,
+            cursor=cursor,
+            projection=projection,
+        )
 
     async def create_questionnaire(self, data: Dict[str, Any]) -> str:
         db = await get_db()
@@ -1,7 +1,7 @@
 """
 Repositório para gerenciamento de relatórios consolidados.
 """
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterable
 from app.core.database import get_db
 from app.repositories.base_repository import BaseRepository
 from bson import ObjectId
@@ -47,13 +47,17 @@ class RelatoriosRepo(BaseRepository[Dict[str, Any]]):
         logger.info(f"Relatório criado com ID: {result.inserted_id}")
         return str(result.inserted_id)
 
+    LIST_SORT = [("dataGeracao", -1), ("_id", -1)]
+
     async def find_by_filters(
         self,
         questionario_id: Optional[str] = None,
         org_id: Optional[str] = None,
         setor_id: Optional[str] = None,
         tipo: Optional[str] = None,
-        limit: int = 100
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
         """
         Busca relatórios utilizando filtros opcionais.
@@ -64,13 +68,33 @@ class RelatoriosRepo(BaseRepository[Dict[str, Any]]):
             setor_id: Filtrar por setor.
             tipo: Filtrar por tipo (organizacional, setorial, individual).
             limit: Número máximo de resultados.
+            cursor: Cursor da página anterior (opcional).
+            projection: Projeção de campos (opcional).
 
         Returns:
             Lista de relatórios ordenados por data de geração (mais recente primeiro).
         """
-        db = await get_db()
-        query: Dict[str, Any] = {}
+        query = self._filters_query(questionario_id, org_id, setor_id, tipo)
+        if query is None:
+            return []
 
+        return await self.find_keyset(
+            query,
+            sort=self.LIST_SORT,
+            limit=limit,
+            cursor=cursor,
+            projection=projection,
+        )
+
+    def _filters_query(
+        self,
+        questionario_id: Optional[str] = None,
+        org_id: Optional[str] = None,
+        setor_id: Optional[str] = None,
+        tipo: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Monta o filtro das listagens; None se algum ID for inválido."""
+        query: Dict[str, Any] = {}
         try:
             if questionario_id:
                 query["idQuestionario"] = ObjectId(questionario_id)
@@ -80,13 +104,130 @@ class RelatoriosRepo(BaseRepository[Dict[str, Any]]):
                 query["idSetor"] = ObjectId(setor_id)
         except InvalidId as e:
             logger.warning(f"ID inválido nos filtros: {e}")
-            return []
+            return None
 
         if tipo:
             query["tipoRelatorio"] = tipo
+        return query
 
-        cursor = db[self.collection_name].find(query).sort("dataGeracao", -1)
-        return await cursor.to_list(length=limit)
+    async def count_by_filters(
+        self,
+        questionario_id: Optional[str] = None,
+        org_id: Optional[str] = None,
+        setor_id: Optional[str] = None,
+        tipo: Optional[str] = None,
+    ) -> int:
+        """Conta os relatórios que casam com os mesmos filtros de ``find_by_filters``."""
+        query = self._filters_query(questionario_id, org_id, setor_id, tipo)
+        if query is None:
+            return 0
+        return await self.count_by_filter(query)
+
+    async def iter_by_filters(
+        self,
+        questionario_id: Optional[str] = None,
+        org_id: Optional[str] = None,
+        setor_id: Optional[str] = None,
+        tipo: Optional[str] = None,
+        batch_size: int = 50,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Percorre todos os relatórios dos filtros em páginas por keyset."""
+        query = self._filters_query(questionario_id, org_id, setor_id, tipo)
+        if query is None:
+            return
+        async for relatorio in self.iter_keyset(
+            query, sort=self.LIST_SORT, batch_size=batch_size, projection=projection
+        ):
+            yield relatorio
+
+    async def find_by_ids(self, relatorio_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Busca relatórios pelos IDs em uma única consulta.
+
+        Returns:
+            Documentos na ordem de ``relatorio_ids`` (IDs inválidos ou
+            inexistentes são omitidos).
+        """
+        oids = [ObjectId(i) for i in relatorio_ids if ObjectId.is_valid(i)]
+        if not oids:
+            return []
+        db = await get_db()
+        cursor = db[self.collection_name].find({"_id": {"$in": oids}})
+        docs = {doc["_id"]: doc async for doc in cursor}
+        return [docs[oid] for oid in oids if oid in docs]
+
+    async def find_latest_snapshot(
+        self,
+        questionario_id: str,
+        tipo: str,
+        org_id: Optional[str] = None,
+        setor_id: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Busca o relatório mais recente do escopo que guarda estado de agregação.
+
+        Relatórios marcados como obsoletos (``marcar_snapshots_obsoletos``) não
+        servem de base para o refresh incremental.
+
+        Args:
+            questionario_id: ID do questionário.
+            tipo: Tipo do relatório (organizacional ou setorial).
+            org_id: ID da organização.
+            setor_id: ID do setor (None para relatório organizacional).
+
+        Returns:
+            Documento do relatório ou None.
+        """
+        try:
+            query: Dict[str, Any] = {
+                "idQuestionario": ObjectId(questionario_id),
+                "idOrganizacao": ObjectId(org_id) if org_id else None,
+                "idSetor": ObjectId(setor_id) if setor_id else None,
+                "tipoRelatorio": tipo,
+                "estadoAgregacao.marcaDataCriacao": {"$ne": None},
+                "estadoAgregacao.obsoleto": {"$ne": True},
+            }
+        except InvalidId as e:
+            logger.warning(f"ID inválido ao buscar relatório anterior: {e}")
+            return None
+        db = await get_db()
+        return await db[self.collection_name].find_one(query, sort=self.LIST_SORT)
+
+    async def marcar_snapshots_obsoletos(
+        self,
+        org_ids: Iterable[Any] = (),
+        setor_ids: Iterable[Any] = (),
+    ) -> int:
+        """
+        Marca como obsoleto o estado de agregação dos relatórios de escopos cuja
+        composição mudou (usuário que entrou ou saiu de organização/setor).
+
+        O estado guardado não sabe retirar um respondente do escopo, então o
+        próximo refresh desses escopos faz a agregação completa.
+
+        Args:
+            org_ids: Organizações cujos relatórios organizacionais mudaram.
+            setor_ids: Setores cujos relatórios setoriais mudaram.
+
+        Returns:
+            Quantidade de relatórios marcados.
+        """
+        escopos: List[Dict[str, Any]] = []
+        orgs = [ObjectId(str(o)) for o in org_ids if o and ObjectId.is_valid(str(o))]
+        setores = [ObjectId(str(s)) for s in setor_ids if s and ObjectId.is_valid(str(s))]
+        if orgs:
+            escopos.append({"idOrganizacao": {"$in": orgs}, "idSetor": None})
+        if setores:
+            escopos.append({"idSetor": {"$in": setores}})
+        if not escopos:
+            return 0
+        db = await get_db()
+        result = await db[self.collection_name].update_many(
+            {"$or": escopos, "estadoAgregacao.marcaDataCriacao": {"$ne": None}},
+            {"$set": {"estadoAgregacao.obsoleto": True}},
+        )
+        return result.modified_count
 
     async def get_by_id(self, relatorio_id: str) -> Optional[Dict[str, Any]]:
         """
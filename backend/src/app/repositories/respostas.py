@@ -1,12 +1,15 @@
 """
 Repositório para gerenciamento de respostas a questionários.
 """
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
 from app.core.database import get_db
 from app.repositories.base_repository import BaseRepository
+from app.repositories.dashboard_rollups import DashboardRollupsRepo
+from app.repositories.escopo import escopo_por_anon_id, tem_escopo
 from bson import ObjectId
 from bson.errors import InvalidId
 from datetime import datetime
+from pymongo import ReturnDocument
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,6 +20,7 @@ class RespostasRepo(BaseRepository[Dict[str, Any]]):
 
     def __init__(self):
         self.collection_name = "respostas"
+        self._rollups = DashboardRollupsRepo()
 
     def _ensure_object_id(self, value: Any) -> ObjectId:
         """Converte string para ObjectId se necessário."""
@@ -35,7 +39,7 @@ class RespostasRepo(BaseRepository[Dict[str, Any]]):
         """
         Adiciona ou atualiza uma resposta no array de respostas de uma sessão.
         Se já existir resposta para o mesmo idPergunta, sobrescreve (evita duplicatas).
-        Cria a sessão se não existir (upsert).
+        Cria a sessão se não existir (upsert), carimbando o escopo atual do usuário.
         """
         try:
             db = await get_db()
@@ -65,14 +69,22 @@ class RespostasRepo(BaseRepository[Dict[str, Any]]):
                 return result.acknowledged
 
             # Elemento não existe — insere no array (com upsert para criar doc)
+            escopo = await escopo_por_anon_id(anon_id)
             result = await col.update_one(
                 filter_doc,
                 {
                     "$push": {"respostas": resposta_payload},
-                    "$set": {"data": datetime.utcnow()},
+                    "$set": {"data": datetime.utcnow(), **escopo},
                 },
                 upsert=True,
             )
+            await self._rollups.record_answers(
+                anon_id,
+                q_id,
+                respondentes=1 if result.upserted_id is not None else 0,
+                respostas=1,
+                escopo=escopo,
+            )
             return result.acknowledged
         except InvalidId:
             logger.warning(f"ID de questionário inválido: {id_questionario}")
@@ -109,27 +121,77 @@ class RespostasRepo(BaseRepository[Dict[str, Any]]):
         """
         return await self.get_answers(anon_id, id_questionario)
 
+    LIST_SORT = [("_id", 1)]
+
     async def get_all_answers_for_questionnaire(
-        self, id_questionario: str
+        self,
+        id_questionario: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
         """
-        Busca todas as respostas de um questionário (para cálculo de métricas).
+        Busca as respostas de um questionário (para cálculo de métricas).
+
+        Sem `limit`, percorre todas as sessões em páginas (sem truncar);
+        com `limit`, retorna uma única página a partir de `cursor`.
 
         Args:
             id_questionario: ID do questionário.
+            limit: Tamanho da página (opcional).
+            cursor: Cursor da página anterior (opcional).
+            projection: Projeção de campos (opcional).
 
         Returns:
             Lista de documentos de respostas.
         """
         try:
-            db = await get_db()
             q_id = self._ensure_object_id(id_questionario)
-            cursor = db[self.collection_name].find({"idQuestionario": q_id})
-            return await cursor.to_list(length=1000)
+            query = {"idQuestionario": q_id}
+            if limit is None:
+                return await self.list_all(query, sort=self.LIST_SORT, projection=projection)
+            return await self.find_keyset(
+                query,
+                sort=self.LIST_SORT,
+                limit=limit,
+                cursor=cursor,
+                projection=projection,
+            )
         except InvalidId:
             logger.warning(f"ID de questionário inválido: {id_questionario}")
             return []
 
+    async def iter_answers_for_anon_ids(
+        self,
+        anon_ids: List[str],
+        id_questionario: str,
+        batch_size: int = 500,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Percorre, em um único cursor ``$in``, as respostas de vários respondentes.
+
+        Args:
+            anon_ids: IDs anônimos dos respondentes.
+            id_questionario: ID do questionário.
+            batch_size: Documentos trazidos por ida ao servidor.
+            projection: Projeção de campos (padrão: anonId e respostas).
+        """
+        if not anon_ids:
+            return
+        try:
+            q_id = self._ensure_object_id(id_questionario)
+        except InvalidId:
+            logger.warning(f"ID de questionário inválido: {id_questionario}")
+            return
+        db = await get_db()
+        cursor = db[self.collection_name].find(
+            {"anonId": {"$in": anon_ids}, "idQuestionario": q_id},
+            projection or {"anonId": 1, "respostas": 1},
+        ).batch_size(batch_size)
+        async for doc in cursor:
+            yield doc
+
     async def count_respondents(self, id_questionario: str) -> int:
         """
         Conta o número de respondentes de um questionário.
@@ -162,10 +224,19 @@ class RespostasRepo(BaseRepository[Dict[str, Any]]):
         try:
             db = await get_db()
             q_id = self._ensure_object_id(id_questionario)
-            result = await db[self.collection_name].delete_one(
-                {"anonId": anon_id, "idQuestionario": q_id}
+            removed = await db[self.collection_name].find_one_and_delete(
+                {"anonId": anon_id, "idQuestionario": q_id},
+                projection={"respostas.idPergunta": 1},
             )
-            return result.deleted_count > 0
+            if removed is None:
+                return False
+            await self._rollups.record_answers(
+                anon_id,
+                q_id,
+                respondentes=-1,
+                respostas=-len(removed.get("respostas") or []),
+            )
+            return True
         except InvalidId:
             logger.warning(f"ID de questionário inválido: {id_questionario}")
             return False
@@ -188,18 +259,30 @@ class RespostasRepo(BaseRepository[Dict[str, Any]]):
         try:
             db = await get_db()
             q_id = self._ensure_object_id(id_questionario)
+            escopo = await escopo_por_anon_id(anon_id)
 
-            result = await db[self.collection_name].update_one(
+            before = await db[self.collection_name].find_one_and_update(
                 {"anonId": anon_id, "idQuestionario": q_id},
                 {
                     "$set": {
                         "respostas": respostas,
-                        "data": datetime.utcnow()
+                        "data": datetime.utcnow(),
+                        **escopo,
                     }
                 },
-                upsert=True
+                projection={"respostas.idPergunta": 1},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE,
             )
-            return result.acknowledged
+            anteriores = len(before.get("respostas") or []) if before else 0
+            await self._rollups.record_answers(
+                anon_id,
+                q_id,
+                respondentes=0 if before else 1,
+                respostas=len(respostas) - anteriores,
+                escopo=escopo,
+            )
+            return True
         except InvalidId:
             logger.warning(f"ID de questionário inválido: {id_questionario}")
             return False
@@ -209,6 +292,8 @@ class RespostasRepo(BaseRepository[Dict[str, Any]]):
         if "idQuestionario" in payload:
             payload["idQuestionario"] = self._ensure_object_id(payload["idQuestionario"])
         payload.setdefault("data", datetime.utcnow())
+        if payload.get("anonId") and not tem_escopo(payload):
+            payload.update(await escopo_por_anon_id(payload["anonId"]))
         result = await db[self.collection_name].insert_one(payload)
         return str(result.inserted_id)
 
@@ -4,6 +4,7 @@ Repositório para gerenciamento de setores.
 from typing import Optional, List, Dict, Any
 from app.core.database import get_db
 from app.repositories.base_repository import BaseRepository
+from app.repositories.dashboard_rollups import invalidate_overview
 from bson import ObjectId
 from bson.errors import InvalidId
 import logging
@@ -38,6 +39,7 @@ class SetoresRepo(BaseRepository[Dict[str, Any]]):
 
         result = await db[self.collection_name].insert_one(sector_data)
         logger.info(f"Setor criado com ID: {result.inserted_id}")
+        await invalidate_overview()
         return str(result.inserted_id)
 
     async def get_sector(self, sector_id: str) -> Optional[Dict[str, Any]]:
@@ -57,20 +59,35 @@ class SetoresRepo(BaseRepository[Dict[str, Any]]):
             logger.warning(f"ID de setor inválido: {sector_id}")
             return None
 
-    async def get_sectors_by_org(self, org_id: str) -> List[Dict[str, Any]]:
+    LIST_SORT = [("_id", 1)]
+
+    async def get_sectors_by_org(
+        self,
+        org_id: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
         """
-        Lista todos os setores de uma organização.
+        Lista os setores de uma organização, paginando por cursor.
 
         Args:
             org_id: ID da organização.
+            limit: Tamanho da página (padrão: 100).
+            cursor: Cursor da página anterior (opcional).
+            projection: Projeção de campos (opcional).
 
         Returns:
             Lista de documentos de setores.
         """
         try:
-            db = await get_db()
-            cursor = db[self.collection_name].find({"idOrganizacao": ObjectId(org_id)})
-            return await cursor.to_list(length=100)
+            return await self.find_keyset(
+                {"idOrganizacao": ObjectId(org_id)},
+                sort=self.LIST_SORT,
+                limit=limit,
+                cursor=cursor,
+                projection=projection,
+            )
         except InvalidId:
             logger.warning(f"ID de organização inválido: {org_id}")
             return []
@@ -135,6 +152,8 @@ class SetoresRepo(BaseRepository[Dict[str, Any]]):
         try:
             db = await get_db()
             result = await db[self.collection_name].delete_one({"_id": ObjectId(sector_id)})
+            if result.deleted_count > 0:
+                await invalidate_overview()
             return result.deleted_count > 0
         except InvalidId:
             logger.warning(f"ID de setor inválido para remoção: {sector_id}")
@@ -2,53 +2,136 @@
 Repositório para gerenciamento de usuários.
 """
 from typing import Optional, Dict, Any, List
+from app.core.cache import cache
 from app.core.database import get_db
 from app.repositories.base_repository import BaseRepository
+from app.repositories.dashboard_rollups import DashboardRollupsRepo
+from app.repositories.escopo import escopo_do_usuario, propagar_escopo
+from app.repositories.relatorios import RelatoriosRepo
 from app.models.base import StatusEnum, VALID_USER_STATUSES, normalize_user_status
 from bson import ObjectId
 from bson.errors import InvalidId
 from datetime import datetime
+from pymongo import ReturnDocument
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Campos do usuário que alimentam os contadores do dashboard
+_ROLLUP_PROJECTION = {"idOrganizacao": 1, "idSetor": 1, "status": 1, "respondido": 1}
+# Campos lidos nas atualizações: rollups + escopo carimbado em respostas/diagnósticos
+_TRACKED_PROJECTION = {**_ROLLUP_PROJECTION, "anonId": 1, "numeroUnidade": 1}
+# Campos do usuário autenticado (api.deps): sem chat_state, senha ou progresso do bot
+PRINCIPAL_PROJECTION = {
+    **_TRACKED_PROJECTION,
+    "telefone": 1,
+    "email": 1,
+    "dataCadastro": 1,
+    "metadata.is_admin": 1,
+}
+_PRINCIPAL_FIELDS = frozenset(PRINCIPAL_PROJECTION) | {"metadata"}
+
+
+def principal_cache_tag(user_id: Any) -> str:
+    """Tag das entradas de cache do usuário autenticado (ver api.deps)."""
+    return f"usuario:{user_id}"
+
+
+def _altera_principal(before: Dict[str, Any], set_payload: Dict[str, Any]) -> bool:
+    # Campo fora da projeção lida conta como alterado (invalidação conservadora)
+    return any(
+        campo in _PRINCIPAL_FIELDS and before.get(campo) != valor
+        for campo, valor in set_payload.items()
+    )
+
 
 class UsuariosRepo(BaseRepository[Dict[str, Any]]):
     """Gerencia operações CRUD para a coleção de usuários."""
 
     def __init__(self):
         self.collection_name = "usuarios"
+        self._rollups = DashboardRollupsRepo()
 
     def _ensure_object_id(self, data: Dict[str, Any], field: str) -> None:
         """Converte um campo string para ObjectId se necessário."""
         if field in data and isinstance(data[field], str):
             data[field] = ObjectId(data[field])
 
-    async def find_by_phone(self, phone: str) -> Optional[Dict[str, Any]]:
+    async def _update_tracked(
+        self,
+        query: Dict[str, Any],
+        set_payload: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = _TRACKED_PROJECTION,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Aplica um $set e propaga a mudança para os rollups do dashboard e,
+        se o escopo mudou, para as respostas e diagnósticos do usuário; os
+        relatórios dos escopos de origem e destino ficam obsoletos para o
+        refresh incremental.
+
+        Returns:
+            Documento anterior à atualização ou None se nenhum usuário casou.
+        """
+        db = await get_db()
+        before = await db[self.collection_name].find_one_and_update(
+            query,
+            {"$set": set_payload},
+            projection=projection,
+            return_document=ReturnDocument.BEFORE,
+        )
+        if before is not None:
+            after = {**before, **set_payload}
+            await self._rollups.apply_user_change(before, after)
+            if before.get("anonId") and escopo_do_usuario(before) != escopo_do_usuario(after):
+                await propagar_escopo(before["anonId"], after)
+                await self._marcar_relatorios_obsoletos(before, after)
+            if before.get("_id") is not None and _altera_principal(before, set_payload):
+                await cache.invalidate_tags(principal_cache_tag(before["_id"]))
+        return before
+
+    @staticmethod
+    async def _marcar_relatorios_obsoletos(before: Dict[str, Any], after: Dict[str, Any]) -> None:
+        def _mudou(campo: str) -> List[Any]:
+            antes, depois = before.get(campo), after.get(campo)
+            if str(antes or "") == str(depois or ""):
+                return []
+            return [antes, depois]
+
+        await RelatoriosRepo().marcar_snapshots_obsoletos(
+            org_ids=_mudou("idOrganizacao"), setor_ids=_mudou("idSetor")
+        )
+
+    async def find_by_phone(
+        self, phone: str, projection: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Busca um usuário pelo número de telefone.
 
         Args:
             phone: Número de telefone no formato E.164.
+            projection: Campos a retornar (None = documento inteiro).
 
         Returns:
             Documento do usuário ou None.
         """
         db = await get_db()
-        return await db[self.collection_name].find_one({"telefone": phone})
+        return await db[self.collection_name].find_one({"telefone": phone}, projection)
 
-    async def find_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+    async def find_by_email(
+        self, email: str, projection: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Busca um usuário pelo email.
 
         Args:
             email: Email do usuário.
+            projection: Campos a retornar (None = documento inteiro).
 
         Returns:
             Documento do usuário ou None.
         """
         db = await get_db()
-        return await db[self.collection_name].find_one({"email": email.strip().lower()})
+        return await db[self.collection_name].find_one({"email": email.strip().lower()}, projection)
 
     async def find_by_anon_id(self, anon_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -93,6 +176,7 @@ class UsuariosRepo(BaseRepository[Dict[str, Any]]):
 
         result = await db[self.collection_name].insert_one(user_data)
         logger.info(f"Usuário criado com ID: {result.inserted_id}")
+        await self._rollups.apply_user_change(None, user_data)
         return str(result.inserted_id)
 
     async def update_chat_state(self, phone: str, state_update: Dict[str, Any]) -> bool:
@@ -129,12 +213,11 @@ class UsuariosRepo(BaseRepository[Dict[str, Any]]):
             logger.warning("Status de usuário inválido recebido: %s", status)
             return False
 
-        db = await get_db()
-        result = await db[self.collection_name].update_one(
+        before = await self._update_tracked(
             {"telefone": phone},
-            {"$set": {"status": normalized_status, "ultimoAcesso": datetime.utcnow()}}
+            {"status": normalized_status, "ultimoAcesso": datetime.utcnow()},
         )
-        return result.modified_count > 0
+        return before is not None
 
     async def mark_as_responded(self, phone: str) -> bool:
         """
@@ -146,12 +229,11 @@ class UsuariosRepo(BaseRepository[Dict[str, Any]]):
         Returns:
             True se a atualização foi bem-sucedida.
         """
-        db = await get_db()
-        result = await db[self.collection_name].update_one(
+        before = await self._update_tracked(
             {"telefone": phone},
-            {"$set": {"respondido": True, "ultimoAcesso": datetime.utcnow()}}
+            {"respondido": True, "ultimoAcesso": datetime.utcnow()},
         )
-        return result.modified_count > 0
+        return before is not None
 
     async def update_fill_status(
         self,
@@ -169,7 +251,6 @@ class UsuariosRepo(BaseRepository[Dict[str, Any]]):
 
         Os dados ficam em metadata.preenchimento para rastrear progresso por telefone.
         """
-        db = await get_db()
         now = datetime.utcnow()
         set_payload: Dict[str, Any] = {
             "metadata.preenchimento.origem": "twilio",
@@ -193,33 +274,49 @@ class UsuariosRepo(BaseRepository[Dict[str, Any]]):
             else:
                 logger.warning("Status de usuário inválido recebido no fluxo Twilio: %s", user_status)
 
-        result = await db[self.collection_name].update_one(
-            {"telefone": phone},
-            {"$set": set_payload},
-        )
-        return result.matched_count > 0
+        before = await self._update_tracked({"telefone": phone}, set_payload)
+        return before is not None
+
+    LIST_SORT = [("_id", 1)]
 
     async def list_users_by_org(
-        self, org_id: str, setor_id: Optional[str] = None
+        self,
+        org_id: str,
+        setor_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
         """
         Lista usuários de uma organização, opcionalmente filtrados por setor.
 
+        Sem `limit`, percorre todos os usuários em páginas (sem truncar);
+        com `limit`, retorna uma única página a partir de `cursor`.
+
         Args:
             org_id: ID da organização.
             setor_id: ID do setor (opcional).
+            limit: Tamanho da página (opcional).
+            cursor: Cursor da página anterior (opcional).
+            projection: Projeção de campos (opcional).
 
         Returns:
             Lista de usuários.
         """
         try:
-            db = await get_db()
             query: Dict[str, Any] = {"idOrganizacao": ObjectId(org_id)}
             if setor_id:
                 query["idSetor"] = ObjectId(setor_id)
 
-            cursor = db[self.collection_name].find(query)
-            return await cursor.to_list(length=1000)
+            if limit is None:
+                return await self.list_all(query, sort=self.LIST_SORT, projection=projection)
+            return await self.find_keyset(
+                query,
+                sort=self.LIST_SORT,
+                limit=limit,
+                cursor=cursor,
+                projection=projection,
+            )
         except InvalidId as e:
             logger.warning(f"ID inválido: {e}")
             return []
@@ -253,12 +350,10 @@ class UsuariosRepo(BaseRepository[Dict[str, Any]]):
             else:
                 update["numeroUnidade"] = None
 
-            db = await get_db()
-            result = await db[self.collection_name].update_one(
-                {"telefone": phone},
-                {"$set": update},
-            )
-            return result.modified_count > 0
+            before = await self._update_tracked({"telefone": phone}, update)
+            if before is None:
+                return False
+            return any(before.get(field) != value for field, value in update.items())
         except InvalidId as e:
             logger.warning(f"ID inválido ao atualizar organização/setor do usuário: {e}")
             return False
@@ -274,8 +369,15 @@ class UsuariosRepo(BaseRepository[Dict[str, Any]]):
             True se a remoção foi bem-sucedida.
         """
         db = await get_db()
-        result = await db[self.collection_name].delete_one({"telefone": phone})
-        return result.deleted_count > 0
+        removed = await db[self.collection_name].find_one_and_delete(
+            {"telefone": phone},
+            projection=_ROLLUP_PROJECTION,
+        )
+        if removed is None:
+            return False
+        await self._rollups.apply_user_change(removed, None)
+        await cache.invalidate_tags(principal_cache_tag(removed["_id"]))
+        return True
     async def create(self, data: Dict[str, Any]) -> str:
         return await self.create_user(data)
 
@@ -289,12 +391,10 @@ class UsuariosRepo(BaseRepository[Dict[str, Any]]):
 
     async def update(self, id: str, data: Dict[str, Any]) -> bool:
         try:
-            db = await get_db()
-            result = await db[self.collection_name].update_one(
-                {"_id": ObjectId(id)},
-                {"$set": data},
-            )
-            return result.modified_count > 0
+            before = await self._update_tracked({"_id": ObjectId(id)}, data, projection=None)
+            if before is None:
+                return False
+            return any(before.get(field) != value for field, value in data.items())
         except InvalidId:
             logger.warning(f"ID de usuário inválido para atualização: {id}")
             return False
@@ -302,8 +402,15 @@ class UsuariosRepo(BaseRepository[Dict[str, Any]]):
     async def delete(self, id: str) -> bool:
         try:
             db = await get_db()
-            result = await db[self.collection_name].delete_one({"_id": ObjectId(id)})
-            return result.deleted_count > 0
+            removed = await db[self.collection_name].find_one_and_delete(
+                {"_id": ObjectId(id)},
+                projection=_ROLLUP_PROJECTION,
+            )
+            if removed is None:
+                return False
+            await self._rollups.apply_user_change(removed, None)
+            await cache.invalidate_tags(principal_cache_tag(removed["_id"]))
+            return True
         except InvalidId:
             logger.warning(f"ID de usuário inválido para remoção: {id}")
             return False
@@ -0,0 +1,286 @@
+"""
+Scoring COPSOQ II em lote (vetorizado com NumPy).
+
+Equivalente a ``COPSOQScoringService.processar_dimensao`` aplicado a N
+respondentes de uma vez: as respostas entram como uma matriz inteira
+(N respondentes x M itens, ``AUSENTE`` para itens não respondidos) e o
+mapeamento item -> dimensão/inversão/sinal é compilado uma única vez em um
+``MapaItens``. Médias, somas e classificações (tercis ou faixas de soma da
+versão curta brasileira) são calculadas com operações matriciais, o que
+permite reprocessar uma campanha inteira após mudança de regra em segundos.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.services.copsoq_scoring_service import (
+    ClassificacaoTercil,
+    COPSOQScoringService,
+    ResultadoDimensao,
+    copsoq_scoring_service,
+)
+
+AUSENTE = -1
+SEM_CLASSIFICACAO = -1
+
+#: Códigos usados na matriz de classificações (índice -> classificação).
+CLASSIFICACOES: Tuple[ClassificacaoTercil, ...] = (
+    ClassificacaoTercil.FAVORAVEL,
+    ClassificacaoTercil.INTERMEDIARIO,
+    ClassificacaoTercil.RISCO,
+)
+_CODIGO = {c: i for i, c in enumerate(CLASSIFICACOES)}
+
+
+@dataclass(frozen=True)
+class DimensaoMapa:
+    dimensao: str
+    dominio: str
+    codigo_dominio: str
+    sinal: str
+    protecao: bool
+
+
+@dataclass(frozen=True)
+class MapaItens:
+    """
+    Mapeamento compilado de um questionário para scoring em lote.
+
+    Attributes:
+        item_ids: ID de pergunta de cada coluna da matriz de respostas.
+        dimensoes: Dimensões na ordem das colunas do resultado.
+        item_dimensao: (M,) índice da dimensão de cada item.
+        invertido: (M,) itens com valor invertido.
+        pertencimento: (M, D) matriz one-hot item -> dimensão.
+        fora_da_regra: (M, D) itens da dimensão que não constam na regra de soma.
+        tem_regra: (D,) dimensões com faixas de soma aplicáveis.
+        faixas: (D, S) classificação por soma (``SEM_CLASSIFICACAO`` fora das faixas).
+    """
+
+    codigo_questionario: str
+    item_ids: Tuple[str, ...]
+    dimensoes: Tuple[DimensaoMapa, ...]
+    item_dimensao: np.ndarray
+    invertido: np.ndarray
+    pertencimento: np.ndarray
+    fora_da_regra: np.ndarray
+    tem_regra: np.ndarray
+    faixas: np.ndarray
+
+    @property
+    def protecao(self) -> np.ndarray:
+        return np.array([d.protecao for d in self.dimensoes], dtype=bool)
+
+    def coluna(self) -> Dict[str, int]:
+        return {item_id: i for i, item_id in enumerate(self.item_ids)}
+
+
+def _tabela_faixas(regra: Mapping[str, Any], tamanho: int) -> np.ndarray:
+    tabela = np.full(tamanho, SEM_CLASSIFICACAO, dtype=np.int8)
+    # Ordem inversa para que, em faixas sobrepostas, prevaleça a ordem do serviço
+    for classificacao in reversed(CLASSIFICACOES):
+        for inicio, fim in regra.get(classificacao.value, []):
+            tabela[max(inicio, 0): min(fim, tamanho - 1) + 1] = _CODIGO[classificacao]
+    return tabela
+
+
+def compilar_mapa_itens(
+    perguntas: Sequence[Mapping[str, Any]],
+    codigo_questionario: str,
+    service: COPSOQScoringService = copsoq_scoring_service,
+) -> MapaItens:
+    """
+    Compila as perguntas pontuáveis de um questionário em um ``MapaItens``.
+
+    Perguntas de texto livre são ignoradas. A dimensão é agrupada por
+    (codigoDominio, domínio, dimensão, sinal), como em ``DiagnosticoService``.
+    """
+    itens: List[str] = []
+    dimensoes: List[DimensaoMapa] = []
+    indice_dimensao: Dict[Tuple[str, str, str, str], int] = {}
+    item_dimensao: List[int] = []
+    invertidos = service.ITENS_INVERTIDOS.get(codigo_questionario, set())
+
+    for p in perguntas:
+        if p.get("tipoEscala") == "texto_livre":
+            continue
+        item_id = p.get("idPergunta") or p.get("id_pergunta")
+        if not item_id or item_id in itens:
+            continue
+        nome = p.get("dimensao", "sem_dimensao")
+        dominio = p.get("dominio", "sem_dominio")
+        protecao = service.eh_dimensao_protecao(p.get("dimensao", ""))
+        chave = (
+            p.get("codigoDominio") or dominio,
+            dominio,
+            nome,
+            p.get("sinal") or ("protecao" if protecao else "risco"),
+        )
+        if chave not in indice_dimensao:
+            indice_dimensao[chave] = len(dimensoes)
+            dimensoes.append(
+                DimensaoMapa(
+                    dimensao=nome,
+                    dominio=dominio,
+                    codigo_dominio=chave[0],
+                    sinal=chave[3],
+                    protecao=service.eh_dimensao_protecao(nome),
+                )
+            )
+        itens.append(str(item_id))
+        item_dimensao.append(indice_dimensao[chave])
+
+    m, d = len(itens), len(dimensoes)
+    item_dim = np.array(item_dimensao, dtype=np.intp)
+    pertencimento = np.zeros((m, d), dtype=np.int64)
+    pertencimento[np.arange(m), item_dim] = 1
+
+    regras = service.REGRAS_SOMA_CURTA_BR if codigo_questionario == "COPSOQ_CURTA_BR" else {}
+    tamanho = 1 + max(
+        [fim for regra in regras.values() for c in CLASSIFICACOES for _, fim in regra.get(c.value, [])] or [0]
+    )
+    tem_regra = np.zeros(d, dtype=bool)
+    faixas = np.full((d, tamanho), SEM_CLASSIFICACAO, dtype=np.int8)
+    fora_da_regra = pertencimento.copy()
+    for j, dim in enumerate(dimensoes):
+        regra = regras.get(dim.dimensao)
+        if not regra:
+            continue
+        tem_regra[j] = True
+        faixas[j] = _tabela_faixas(regra, tamanho)
+        ids_regra = regra["ids"]
+        for i, item_id in enumerate(itens):
+            if item_dim[i] == j and item_id in ids_regra:
+                fora_da_regra[i, j] = 0
+
+    return MapaItens(
+        codigo_questionario=codigo_questionario,
+        item_ids=tuple(itens),
+        dimensoes=tuple(dimensoes),
+        item_dimensao=item_dim,
+        invertido=np.array([item in invertidos for item in itens], dtype=bool),
+        pertencimento=pertencimento,
+        fora_da_regra=fora_da_regra,
+        tem_regra=tem_regra,
+        faixas=faixas,
+    )
+
+
+def montar_matriz(
+    respostas: Sequence[Mapping[str, Any]],
+    mapa: MapaItens,
+) -> np.ndarray:
+    """
+    Monta a matriz N x M a partir de mapas id_pergunta -> valor por respondente.
+
+    Valores não inteiros (texto livre, listas) e itens fora do mapa são ignorados.
+    """
+    coluna = mapa.coluna()
+    matriz = np.full((len(respostas), len(mapa.item_ids)), AUSENTE, dtype=np.int64)
+    for linha, valores in enumerate(respostas):
+        for item_id, valor in valores.items():
+            j = coluna.get(item_id)
+            if j is not None and isinstance(valor, int) and not isinstance(valor, bool):
+                matriz[linha, j] = valor
+    return matriz
+
+
+def detectar_escala_max(matriz: np.ndarray) -> np.ndarray:
+    """Escala por respondente: 5 se algum valor passa de 4, senão 4 (0-4)."""
+    if matriz.size == 0:
+        return np.full(matriz.shape[0], 4, dtype=np.int64)
+    return np.where(matriz.max(axis=1) > 4, 5, 4).astype(np.int64)
+
+
+@dataclass
+class ResultadoLote:
+    """Resultados por respondente (linhas) e dimensão (colunas)."""
+
+    mapa: MapaItens
+    somas: np.ndarray
+    contagens: np.ndarray
+    medias: np.ndarray
+    classificacoes: np.ndarray
+
+    def dimensoes_respondente(self, linha: int) -> List[ResultadoDimensao]:
+        """Converte a linha para ``ResultadoDimensao`` (apenas dimensões respondidas)."""
+        resultado: List[ResultadoDimensao] = []
+        for j, dim in enumerate(self.mapa.dimensoes):
+            total = int(self.contagens[linha, j])
+            if not total:
+                continue
+            resultado.append(
+                ResultadoDimensao(
+                    dimensao=dim.dimensao,
+                    dominio=dim.dominio,
+                    media=round(float(self.medias[linha, j]), 2),
+                    classificacao=CLASSIFICACOES[int(self.classificacoes[linha, j])],
+                    total_itens=total,
+                    itens_respondidos=total,
+                )
+            )
+        return resultado
+
+
+def pontuar_lote(
+    matriz: np.ndarray,
+    mapa: MapaItens,
+    escala_max: Optional[Union[int, np.ndarray]] = None,
+    service: COPSOQScoringService = copsoq_scoring_service,
+) -> ResultadoLote:
+    """
+    Calcula médias, somas e classificações de todas as dimensões para N respondentes.
+
+    Args:
+        matriz: (N, M) valores inteiros; ``AUSENTE`` (negativo) para não respondido.
+        mapa: Mapeamento compilado por ``compilar_mapa_itens``.
+        escala_max: Escala máxima (4 ou 5) única ou por respondente; detectada se omitida.
+    """
+    matriz = np.asarray(matriz, dtype=np.int64)
+    respondido = matriz >= 0
+    brutos = np.where(respondido, matriz, 0)
+
+    escala = detectar_escala_max(matriz) if escala_max is None else np.broadcast_to(
+        np.asarray(escala_max, dtype=np.int64), (matriz.shape[0],)
+    )
+    # Mesma regra de inverter_valor: 0-4 -> 4 - v; 1-5 -> 6 - v
+    limite = np.where(escala == 4, 4, escala + 1)[:, None]
+    pontos = np.where(mapa.invertido[None, :] & respondido, limite - brutos, brutos)
+
+    contagens = respondido.astype(np.int64) @ mapa.pertencimento
+    somas = pontos @ mapa.pertencimento
+    with np.errstate(invalid="ignore", divide="ignore"):
+        medias = np.where(contagens > 0, somas / np.maximum(contagens, 1), np.nan)
+
+    inf, sup = service.LIMITE_INFERIOR, service.LIMITE_SUPERIOR
+    protecao = mapa.protecao[None, :]
+    tercil = np.where(
+        protecao,
+        np.where(medias >= sup, 0, np.where(medias > inf, 1, 2)),
+        np.where(medias <= inf, 0, np.where(medias < sup, 1, 2)),
+    ).astype(np.int8)
+
+    classificacoes = tercil
+    if mapa.tem_regra.any():
+        # A regra usa a soma dos valores brutos e só vale se todos os itens
+        # respondidos da dimensão pertencem ao conjunto esperado pela regra.
+        somas_brutas = brutos @ mapa.pertencimento
+        fora = respondido.astype(np.int64) @ mapa.fora_da_regra
+        aplica = mapa.tem_regra[None, :] & (contagens > 0) & (fora == 0)
+        tamanho = mapa.faixas.shape[1]
+        indice = np.clip(somas_brutas, 0, tamanho - 1)
+        por_soma = mapa.faixas[np.arange(mapa.faixas.shape[0])[None, :], indice]
+        por_soma = np.where((somas_brutas >= 0) & (somas_brutas < tamanho), por_soma, SEM_CLASSIFICACAO)
+        classificacoes = np.where(aplica & (por_soma != SEM_CLASSIFICACAO), por_soma, tercil).astype(np.int8)
+
+    classificacoes = np.where(contagens > 0, classificacoes, SEM_CLASSIFICACAO).astype(np.int8)
+    return ResultadoLote(
+        mapa=mapa,
+        somas=somas,
+        contagens=contagens,
+        medias=medias,
+        classificacoes=classificacoes,
+    )
@@ -8,6 +8,7 @@ from bson.errors import InvalidId
 from app.core.database import get_db
 from app.core.cache import cache
 from app.core.config import settings
+from app.core.pagination import Page, build_page, clamp_limit, keyset_filter, merge_filters
 from app.models.dashboard import (
     AlertaDashboard,
     DashboardOverview,
@@ -31,12 +32,15 @@ from app.models.base import (
     normalize_user_status,
     user_status_values,
 )
+from app.repositories.dashboard_rollups import OVERVIEW_CACHE_KEY, DashboardRollupsRepo
 from app.repositories.perguntas import PerguntasRepo
 
 
 class DashboardService:
     def __init__(self):
         self._perguntas_repo = PerguntasRepo()
+        self._rollups = DashboardRollupsRepo()
+        self._question_counts: Dict[str, int] = {}
 
     def _to_object_id(self, value: str) -> Optional[ObjectId]:
         try:
@@ -58,39 +62,170 @@ class DashboardService:
             return str(value.value)
         return str(value or "intermediario")
 
-    async def list_organizacoes(self) -> List[OrganizacaoDashboard]:
+    def _organizacoes_pipeline(
+        self,
+        after: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Pipeline único que agrega, por organização, setores, usuários por status,
+        finalizados e questionários distintos com respostas.
+
+        `after` e `limit` restringem a página antes dos $lookup.
+        """
+        page_stages: List[Dict[str, Any]] = []
+        if after:
+            page_stages.append({"$match": after})
+        page_stages.append({"$sort": {"_id": 1}})
+        if limit:
+            page_stages.append({"$limit": limit})
+        return page_stages + [
+            {
+                "$lookup": {
+                    "from": "setores",
+                    "localField": "_id",
+                    "foreignField": "idOrganizacao",
+                    "pipeline": [{"$count": "total"}],
+                    "as": "setores",
+                }
+            },
+            {
+                "$lookup": {
+                    "from": "usuarios",
+                    "localField": "_id",
+                    "foreignField": "idOrganizacao",
+                    "pipeline": [
+                        {
+                            "$facet": {
+                                "por_status": [
+                                    {"$group": {"_id": "$status", "total": {"$sum": 1}}},
+                                ],
+                                "finalizados": [
+                                    {"$match": {"respondido": True}},
+                                    {"$count": "total"},
+                                ],
+                                "questionarios": [
+                                    {"$match": {"anonId": {"$nin": [None, ""]}}},
+                                    {
+                                        "$lookup": {
+                                            "from": "respostas",
+                                            "localField": "anonId",
+                                            "foreignField": "anonId",
+                                            "pipeline": [{"$project": {"_id": 0, "idQuestionario": 1}}],
+                                            "as": "respostas",
+                                        }
+                                    },
+                                    {"$unwind": "$respostas"},
+                                    {"$match": {"respostas.idQuestionario": {"$ne": None}}},
+                                    {"$group": {"_id": "$respostas.idQuestionario"}},
+                                ],
+                            }
+                        }
+                    ],
+                    "as": "usuarios",
+                }
+            },
+            {
+                "$project": {
+                    "nome": 1,
+                    "cnpj": 1,
+                    "total_setores": {"$ifNull": [{"$first": "$setores.total"}, 0]},
+                    "por_status": {"$ifNull": [{"$first": "$usuarios.por_status"}, []]},
+                    "finalizados": {
+                        "$ifNull": [{"$first": {"$first": "$usuarios.finalizados.total"}}, 0]
+                    },
+                    "questionarios": {"$size": {"$ifNull": [{"$first": "$usuarios.questionarios"}, []]}},
+                }
+            },
+        ]
+
+    async def _list_organizacoes_from_rollups(
+        self,
+        after: Dict[str, Any],
+        page_size: int,
+    ) -> Page[OrganizacaoDashboard]:
         db = await get_db()
-        orgs = await db["organizacoes"].find().to_list(length=1000)
-        results: List[OrganizacaoDashboard] = []
+        orgs = await (
+            db["organizacoes"]
+            .find(after, {"nome": 1, "cnpj": 1})
+            .sort("_id", 1)
+            .limit(page_size + 1)
+            .to_list(length=page_size + 1)
+        )
+        page = build_page(orgs, page_size, [("_id", 1)])
+        orgs = page.items
+        org_ids = [org["_id"] for org in orgs]
+        setores_rows = await db["setores"].aggregate(
+            [
+                {"$match": {"idOrganizacao": {"$in": org_ids}}},
+                {"$group": {"_id": "$idOrganizacao", "total": {"$sum": 1}}},
+            ]
+        ).to_list(length=None)
+        setores_por_org = {row["_id"]: int(row["total"]) for row in setores_rows}
+        resumo = await self._rollups.summarize("idOrganizacao", {"idOrganizacao": {"$in": org_ids}})
 
+        results: List[OrganizacaoDashboard] = []
         for org in orgs:
-            org_id = org["_id"]
-            setores = await db["setores"].count_documents({"idOrganizacao": org_id})
-            users = await db["usuarios"].find({"idOrganizacao": org_id}).to_list(length=2000)
-            total_usuarios = len(users)
-            usuarios_ativos = sum(1 for u in users if is_in_progress_user_status(u.get("status")))
-            anon_ids = [u.get("anonId") for u in users if u.get("anonId")]
-            if anon_ids:
-                respostas_docs = await db["respostas"].find({"anonId": {"$in": anon_ids}}).to_list(length=5000)
-            else:
-                respostas_docs = []
-            q_ids = {str(r.get("idQuestionario")) for r in respostas_docs if r.get("idQuestionario")}
-            finalizados = sum(1 for u in users if u.get("respondido") is True)
-            taxa = round((finalizados / total_usuarios) * 100, 2) if total_usuarios else 0.0
-
+            totais = resumo.get(org["_id"], {})
+            total_usuarios = int(totais.get("usuarios", 0))
+            respondidos = int(totais.get("respondidos", 0))
+            taxa = round((respondidos / total_usuarios) * 100, 2) if total_usuarios else 0.0
             results.append(
                 OrganizacaoDashboard(
-                    id=str(org_id),
+                    id=str(org["_id"]),
                     cnpj=org.get("cnpj", ""),
                     nome=org.get("nome", ""),
-                    total_setores=setores,
+                    total_setores=setores_por_org.get(org["_id"], 0),
+                    total_usuarios=total_usuarios,
+                    usuarios_ativos=int(totais.get("emAndamento", 0)),
+                    questionarios_em_andamento=len(totais.get("questionarios", [])),
+                    taxa_conclusao=taxa,
+                )
+            )
+        return Page(items=results, next_cursor=page.next_cursor)
+
+    async def list_organizacoes(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Page[OrganizacaoDashboard]:
+        sort = [("_id", 1)]
+        page_size = clamp_limit(limit)
+        after = keyset_filter(cursor, sort)
+        if settings.DASHBOARD_USE_ROLLUPS:
+            return await self._list_organizacoes_from_rollups(after, page_size)
+
+        db = await get_db()
+        rows = await db["organizacoes"].aggregate(
+            self._organizacoes_pipeline(after, page_size + 1)
+        ).to_list(length=None)
+        page = build_page(rows, page_size, sort)
+        results: List[OrganizacaoDashboard] = []
+
+        for row in page.items:
+            por_status = row.get("por_status") or []
+            total_usuarios = sum(int(item.get("total", 0)) for item in por_status)
+            usuarios_ativos = sum(
+                int(item.get("total", 0))
+                for item in por_status
+                if is_in_progress_user_status(item.get("_id"))
+            )
+            finalizados = int(row.get("finalizados") or 0)
+            taxa = round((finalizados / total_usuarios) * 100, 2) if total_usuarios else 0.0
+
+            results.append(
+                OrganizacaoDashboard(
+                    id=str(row["_id"]),
+                    cnpj=row.get("cnpj", ""),
+                    nome=row.get("nome", ""),
+                    total_setores=int(row.get("total_setores") or 0),
                     total_usuarios=total_usuarios,
                     usuarios_ativos=usuarios_ativos,
-                    questionarios_em_andamento=len(q_ids),
+                    questionarios_em_andamento=int(row.get("questionarios") or 0),
                     taxa_conclusao=taxa,
                 )
             )
-        return results
+        return Page(items=results, next_cursor=page.next_cursor)
 
     async def get_organizacao_detalhada(self, org_id: str) -> Optional[OrganizacaoDetalhada]:
         db = await get_db()
@@ -157,25 +292,80 @@ class DashboardService:
             questionarios_status=questionarios_status,
         )
 
-    async def list_setores(self, org_id: Optional[str] = None) -> List[SetorDashboard]:
+    async def list_setores(
+        self,
+        org_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Page[SetorDashboard]:
         db = await get_db()
         query: Dict[str, Any] = {}
         if org_id:
             oid = self._to_object_id(org_id)
             if not oid:
-                return []
+                return Page(items=[])
             query["idOrganizacao"] = oid
-        setores = await db["setores"].find(query).to_list(length=1000)
-        orgs = await db["organizacoes"].find().to_list(length=1000)
+
+        sort = [("_id", 1)]
+        page_size = clamp_limit(limit)
+        setores = await (
+            db["setores"]
+            .find(merge_filters(query, keyset_filter(cursor, sort)))
+            .sort(sort)
+            .limit(page_size + 1)
+            .to_list(length=page_size + 1)
+        )
+        page = build_page(setores, page_size, sort)
+        setores = page.items
+        if not setores:
+            return Page(items=[])
+
+        setor_ids = [s["_id"] for s in setores]
+        org_ids = list({s["idOrganizacao"] for s in setores if s.get("idOrganizacao")})
+        orgs = await db["organizacoes"].find({"_id": {"$in": org_ids}}, {"nome": 1}).to_list(length=None) if org_ids else []
         org_map = {str(o["_id"]): o.get("nome", "Organização") for o in orgs}
-        results: List[SetorDashboard] = []
 
+        if settings.DASHBOARD_USE_ROLLUPS:
+            resumo = await self._rollups.summarize(
+                "idSetor",
+                {"idSetor": {"$in": setor_ids}, "idQuestionario": None},
+            )
+            totais_por_setor = {
+                sid: {
+                    "total": int(totais.get("usuarios", 0)),
+                    "ativos": int(totais.get("emAndamento", 0)),
+                    "respondidos": int(totais.get("respondidos", 0)),
+                }
+                for sid, totais in resumo.items()
+            }
+        else:
+            rows = await db["usuarios"].aggregate(
+                [
+                    {"$match": {"idSetor": {"$in": setor_ids}}},
+                    {
+                        "$group": {
+                            "_id": {"setor": "$idSetor", "status": "$status"},
+                            "total": {"$sum": 1},
+                            "respondidos": {"$sum": {"$cond": [{"$eq": ["$respondido", True]}, 1, 0]}},
+                        }
+                    },
+                ]
+            ).to_list(length=None)
+            totais_por_setor: Dict[Any, Dict[str, int]] = {}
+            for row in rows:
+                sid = row["_id"].get("setor")
+                totais = totais_por_setor.setdefault(sid, {"total": 0, "ativos": 0, "respondidos": 0})
+                totais["total"] += int(row["total"])
+                totais["respondidos"] += int(row["respondidos"])
+                if is_in_progress_user_status(row["_id"].get("status")):
+                    totais["ativos"] += int(row["total"])
+
+        results: List[SetorDashboard] = []
         for setor in setores:
             sid = setor["_id"]
-            users = await db["usuarios"].find({"idSetor": sid}).to_list(length=3000)
-            total = len(users)
-            ativos = sum(1 for u in users if is_in_progress_user_status(u.get("status")))
-            respondidos = sum(1 for u in users if u.get("respondido"))
+            totais = totais_por_setor.get(sid, {})
+            total = totais.get("total", 0)
+            respondidos = totais.get("respondidos", 0)
             taxa = round((respondidos / total) * 100, 2) if total else 0.0
             results.append(
                 SetorDashboard(
@@ -183,11 +373,11 @@ class DashboardService:
                     nome=setor.get("nome", ""),
                     organizacao_nome=org_map.get(str(setor.get("idOrganizacao")), "Organização"),
                     total_usuarios=total,
-                    usuarios_ativos=ativos,
+                    usuarios_ativos=totais.get("ativos", 0),
                     taxa_resposta=taxa,
                 )
             )
-        return results
+        return Page(items=results, next_cursor=page.next_cursor)
 
     async def get_setor_detalhado(self, setor_id: str) -> Optional[SetorDetalhado]:
         db = await get_db()
@@ -229,44 +419,89 @@ class DashboardService:
             progresso_questionarios=progresso_questionarios,
         )
 
+    async def _count_questions(self, questionario_ids: List[str]) -> Dict[str, int]:
+        """Total de perguntas por questionário, memoizado na instância do serviço."""
+        missing = [qid for qid in set(questionario_ids) if qid not in self._question_counts]
+        if missing:
+            self._question_counts.update(
+                await self._perguntas_repo.count_questions_by_questionnaire(missing)
+            )
+        return self._question_counts
+
+    async def _latest_respostas_by_anon_id(self, db, anon_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Sessão de respostas mais recente de cada anonId, com o total respondido."""
+        if not anon_ids:
+            return {}
+        rows = await db["respostas"].aggregate(
+            [
+                {"$match": {"anonId": {"$in": anon_ids}}},
+                {"$sort": {"anonId": 1, "data": -1}},
+                {
+                    "$group": {
+                        "_id": "$anonId",
+                        "idQuestionario": {"$first": "$idQuestionario"},
+                        "respondidas": {"$first": {"$size": {"$ifNull": ["$respostas", []]}}},
+                    }
+                },
+            ]
+        ).to_list(length=None)
+        return {row["_id"]: row for row in rows}
+
     async def list_usuarios_ativos(
         self,
         org_id: Optional[str] = None,
         setor_id: Optional[str] = None,
-    ) -> List[UsuarioAtivo]:
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Page[UsuarioAtivo]:
         db = await get_db()
         query: Dict[str, Any] = {"status": {"$in": user_status_values(StatusEnum.EM_ANDAMENTO)}}
         if org_id:
             oid = self._to_object_id(org_id)
             if not oid:
-                return []
+                return Page(items=[])
             query["idOrganizacao"] = oid
         if setor_id:
             sid = self._to_object_id(setor_id)
             if not sid:
-                return []
+                return Page(items=[])
             query["idSetor"] = sid
 
-        users = await db["usuarios"].find(query).to_list(length=3000)
-        orgs = await db["organizacoes"].find().to_list(length=1000)
-        setores = await db["setores"].find().to_list(length=1000)
+        sort = [("_id", 1)]
+        page_size = clamp_limit(limit)
+        after = keyset_filter(cursor, sort)
+        users = await (
+            db["usuarios"]
+            .find({**query, **after})
+            .sort(sort)
+            .limit(page_size + 1)
+            .to_list(length=page_size + 1)
+        )
+        page = build_page(users, page_size, sort)
+        users = page.items
+
+        org_ids = list({u["idOrganizacao"] for u in users if u.get("idOrganizacao")})
+        setor_ids = list({u["idSetor"] for u in users if u.get("idSetor")})
+        orgs = await db["organizacoes"].find({"_id": {"$in": org_ids}}, {"nome": 1}).to_list(length=None) if org_ids else []
+        setores = await db["setores"].find({"_id": {"$in": setor_ids}}, {"nome": 1}).to_list(length=None) if setor_ids else []
         org_map = {str(o["_id"]): o.get("nome", "Organização") for o in orgs}
         setor_map = {str(s["_id"]): s.get("nome", "Setor") for s in setores}
-        questionarios = await db["questionarios"].find().to_list(length=300)
+
+        latest = await self._latest_respostas_by_anon_id(
+            db, [u["anonId"] for u in users if u.get("anonId")]
+        )
+        q_ids = list({str(r["idQuestionario"]) for r in latest.values() if r.get("idQuestionario")})
+        question_counts = await self._count_questions(q_ids)
+        q_oids = [oid for oid in (self._to_object_id(qid) for qid in q_ids) if oid]
+        questionarios = await db["questionarios"].find({"_id": {"$in": q_oids}}, {"nome": 1}).to_list(length=None) if q_oids else []
         q_map = {str(q["_id"]): q for q in questionarios}
 
         items: List[UsuarioAtivo] = []
         for user in users:
-            anon_id = user.get("anonId")
-            resposta = None
-            if anon_id:
-                resposta = await db["respostas"].find_one(
-                    {"anonId": anon_id},
-                    sort=[("data", -1)],
-                )
+            resposta = latest.get(user.get("anonId")) if user.get("anonId") else None
             qid = str(resposta.get("idQuestionario")) if resposta and resposta.get("idQuestionario") else None
-            total_perguntas = await self._perguntas_repo.count_questions(qid) if qid else 0
-            respondidas = len(resposta.get("respostas", [])) if resposta else 0
+            total_perguntas = question_counts.get(qid, 0) if qid else 0
+            respondidas = int(resposta.get("respondidas", 0)) if resposta else 0
             progresso = round((respondidas / total_perguntas) * 100, 2) if total_perguntas else 0.0
             ultima = user.get("ultimoAcesso") or user.get("dataCadastro") or datetime.utcnow()
             items.append(
@@ -281,7 +516,7 @@ class DashboardService:
                     setor=setor_map.get(str(user.get("idSetor"))) if user.get("idSetor") else None,
                 )
             )
-        return items
+        return Page(items=items, next_cursor=page.next_cursor)
 
     async def get_usuario_progresso(self, user_id: str) -> Optional[ProgressoUsuario]:
         db = await get_db()
@@ -326,19 +561,45 @@ class DashboardService:
             ultima_resposta=resposta.get("data"),
         )
 
-    async def list_questionarios_status(self) -> List[QuestionarioStatus]:
+    async def list_questionarios_status(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Page[QuestionarioStatus]:
         db = await get_db()
-        questionarios = await db["questionarios"].find().to_list(length=300)
+        sort = [("_id", 1)]
+        page_size = clamp_limit(limit)
+        questionarios = await (
+            db["questionarios"]
+            .find(keyset_filter(cursor, sort), {"nome": 1, "versao": 1, "codigo": 1})
+            .sort(sort)
+            .limit(page_size + 1)
+            .to_list(length=page_size + 1)
+        )
+        page = build_page(questionarios, page_size, sort)
+        questionarios = page.items
         total_usuarios = await db["usuarios"].count_documents({})
+
+        completos_rows = await db["respostas"].aggregate(
+            [
+                {
+                    "$match": {
+                        "idQuestionario": {"$in": [q["_id"] for q in questionarios]},
+                        "respostas.0": {"$exists": True},
+                    }
+                },
+                {"$group": {"_id": "$idQuestionario", "total": {"$sum": 1}}},
+            ]
+        ).to_list(length=None) if questionarios else []
+        completos_map = {row["_id"]: int(row["total"]) for row in completos_rows}
+
         resultados: List[QuestionarioStatus] = []
         for q in questionarios:
-            qid = str(q["_id"])
-            respostas = await db["respostas"].find({"idQuestionario": q["_id"]}).to_list(length=5000)
-            completos = len([r for r in respostas if r.get("respostas")])
+            completos = completos_map.get(q["_id"], 0)
             taxa = round((completos / total_usuarios) * 100, 2) if total_usuarios else 0.0
             resultados.append(
                 QuestionarioStatus(
-                    id=qid,
+                    id=str(q["_id"]),
                     nome=q.get("nome", ""),
                     versao=q.get("versao", ""),
                     codigo=q.get("codigo"),
@@ -348,37 +609,121 @@ class DashboardService:
                     tempo_medio_conclusao=None,
                 )
             )
-        return resultados
+        return Page(items=resultados, next_cursor=page.next_cursor)
+
+    def _questionario_metricas_pipeline(self, qid: ObjectId) -> List[Dict[str, Any]]:
+        """
+        Pipeline único para as métricas de um questionário: distribuição do
+        resultado global, top 5 dimensões em risco e organizações/setores
+        participantes.
+        """
+        return [
+            {"$match": {"_id": qid}},
+            {
+                "$lookup": {
+                    "from": "diagnosticos",
+                    "localField": "_id",
+                    "foreignField": "idQuestionario",
+                    "pipeline": [
+                        {
+                            "$facet": {
+                                "distribuicao": [
+                                    {"$group": {"_id": "$resultadoGlobal", "total": {"$sum": 1}}},
+                                ],
+                                "criticas": [
+                                    {"$unwind": "$dimensoes"},
+                                    {"$match": {"dimensoes.classificacao": "risco"}},
+                                    {
+                                        "$group": {
+                                            "_id": {"$ifNull": ["$dimensoes.dimensao", "Sem dimensão"]},
+                                            "total": {"$sum": 1},
+                                        }
+                                    },
+                                    {"$sort": {"total": -1, "_id": 1}},
+                                    {"$limit": 5},
+                                ],
+                            }
+                        }
+                    ],
+                    "as": "diagnosticos",
+                }
+            },
+            {
+                "$lookup": {
+                    "from": "respostas",
+                    "localField": "_id",
+                    "foreignField": "idQuestionario",
+                    "pipeline": [
+                        {"$group": {"_id": "$anonId"}},
+                        {
+                            "$lookup": {
+                                "from": "usuarios",
+                                "localField": "_id",
+                                "foreignField": "anonId",
+                                "pipeline": [{"$project": {"_id": 0, "idOrganizacao": 1, "idSetor": 1}}],
+                                "as": "usuario",
+                            }
+                        },
+                        {"$unwind": "$usuario"},
+                        {
+                            "$group": {
+                                "_id": None,
+                                "organizacoes": {"$addToSet": "$usuario.idOrganizacao"},
+                                "setores": {"$addToSet": "$usuario.idSetor"},
+                            }
+                        },
+                        {
+                            "$lookup": {
+                                "from": "organizacoes",
+                                "localField": "organizacoes",
+                                "foreignField": "_id",
+                                "pipeline": [{"$project": {"nome": 1}}],
+                                "as": "organizacoes",
+                            }
+                        },
+                        {
+                            "$lookup": {
+                                "from": "setores",
+                                "localField": "setores",
+                                "foreignField": "_id",
+                                "pipeline": [{"$project": {"nome": 1}}],
+                                "as": "setores",
+                            }
+                        },
+                    ],
+                    "as": "participantes",
+                }
+            },
+            {
+                "$project": {
+                    "nome": 1,
+                    "diagnosticos": {"$first": "$diagnosticos"},
+                    "participantes": {"$first": "$participantes"},
+                }
+            },
+        ]
 
     async def get_questionario_metricas(self, questionario_id: str) -> Optional[QuestionarioMetricas]:
         db = await get_db()
         qid = self._to_object_id(questionario_id)
         if not qid:
             return None
-        q = await db["questionarios"].find_one({"_id": qid})
-        if not q:
+        rows = await db["questionarios"].aggregate(
+            self._questionario_metricas_pipeline(qid)
+        ).to_list(length=1)
+        if not rows:
             return None
+        q = rows[0]
 
-        diags = await db["diagnosticos"].find({"idQuestionario": qid}).to_list(length=10000)
-        dist = Counter(self._extract_classificacao(d.get("resultadoGlobal")) for d in diags)
-
-        dims = Counter()
-        for d in diags:
-            for dim in d.get("dimensoes", []):
-                if self._extract_classificacao(dim.get("classificacao")) == "risco":
-                    dims[dim.get("dimensao", "Sem dimensão")] += 1
+        diagnosticos = q.get("diagnosticos") or {}
+        dist = Counter()
+        for item in diagnosticos.get("distribuicao", []):
+            dist[self._extract_classificacao(item.get("_id"))] += int(item.get("total", 0))
         criticas = [
-            DimensaoCritica(dimensao=nome, total_risco=total)
-            for nome, total in dims.most_common(5)
+            DimensaoCritica(dimensao=item["_id"], total_risco=int(item["total"]))
+            for item in diagnosticos.get("criticas", [])
         ]
-
-        respostas = await db["respostas"].find({"idQuestionario": qid}).to_list(length=10000)
-        anon_ids = list({r.get("anonId") for r in respostas if r.get("anonId")})
-        users = await db["usuarios"].find({"anonId": {"$in": anon_ids}}).to_list(length=10000) if anon_ids else []
-        org_ids = list({u.get("idOrganizacao") for u in users if u.get("idOrganizacao")})
-        setor_ids = list({u.get("idSetor") for u in users if u.get("idSetor")})
-        orgs = await db["organizacoes"].find({"_id": {"$in": org_ids}}).to_list(length=1000) if org_ids else []
-        setores = await db["setores"].find({"_id": {"$in": setor_ids}}).to_list(length=1000) if setor_ids else []
+        participantes = q.get("participantes") or {}
 
         return QuestionarioMetricas(
             id=str(q["_id"]),
@@ -389,30 +734,69 @@ class DashboardService:
                 "risco": int(dist.get("risco", 0)),
             },
             dimensoes_criticas=criticas,
-            organizacoes_participantes=[o.get("nome", "Organização") for o in orgs],
-            setores_participantes=[s.get("nome", "Setor") for s in setores],
+            organizacoes_participantes=[
+                o.get("nome", "Organização") for o in participantes.get("organizacoes", [])
+            ],
+            setores_participantes=[s.get("nome", "Setor") for s in participantes.get("setores", [])],
         )
 
-    async def get_overview(self) -> DashboardOverview:
-        cached = await cache.get("dashboard:overview")
-        if cached:
-            return DashboardOverview(**cached)
+    async def _overview_totais(self, db) -> Dict[str, Any]:
+        """Contadores do overview: rollups materializados ou agregações pontuais."""
+        if settings.DASHBOARD_USE_ROLLUPS:
+            totais = (await self._rollups.summarize(None)).get(None, {})
+            return {
+                "total_usuarios": int(totais.get("usuarios", 0)),
+                "usuarios_ativos": int(totais.get("emAndamento", 0)),
+                "concluidos": int(totais.get("respondidos", 0)),
+                "questionarios_em_andamento": len(totais.get("questionarios", [])),
+                "risco_count": int(totais.get("dimensoesRisco", 0)),
+            }
 
-        db = await get_db()
-        total_organizacoes = await db["organizacoes"].count_documents({})
-        total_setores = await db["setores"].count_documents({})
-        total_usuarios = await db["usuarios"].count_documents({})
-        usuarios_ativos = await db["usuarios"].count_documents(
-            {"status": {"$in": user_status_values(StatusEnum.EM_ANDAMENTO)}}
+        usuarios_rows = await db["usuarios"].aggregate(
+            [
+                {
+                    "$group": {
+                        "_id": "$status",
+                        "total": {"$sum": 1},
+                        "respondidos": {"$sum": {"$cond": [{"$eq": ["$respondido", True]}, 1, 0]}},
+                    }
+                }
+            ]
+        ).to_list(length=None)
+        questionarios_com_respostas = await db["respostas"].distinct("idQuestionario")
+        risco_rows = await db["diagnosticos"].aggregate(
+            [
+                {"$unwind": "$dimensoes"},
+                {"$match": {"dimensoes.classificacao": "risco"}},
+                {"$count": "total"},
+            ]
+        ).to_list(length=1)
+        return {
+            "total_usuarios": sum(int(row["total"]) for row in usuarios_rows),
+            "usuarios_ativos": sum(
+                int(row["total"]) for row in usuarios_rows if is_in_progress_user_status(row["_id"])
+            ),
+            "concluidos": sum(int(row["respondidos"]) for row in usuarios_rows),
+            "questionarios_em_andamento": len([q for q in questionarios_com_respostas if q is not None]),
+            "risco_count": int(risco_rows[0]["total"]) if risco_rows else 0,
+        }
+
+    async def get_overview(self) -> DashboardOverview:
+        cached = await cache.get_or_compute(
+            OVERVIEW_CACHE_KEY,
+            self._compute_overview,
+            ttl=settings.DASHBOARD_OVERVIEW_TTL,
+            stale_ttl=settings.CACHE_STALE_TTL,
         )
-        questionarios = await db["questionarios"].find().to_list(length=500)
-        questionarios_em_andamento = 0
-        for q in questionarios:
-            respostas = await db["respostas"].count_documents({"idQuestionario": q["_id"]})
-            if respostas > 0:
-                questionarios_em_andamento += 1
+        return DashboardOverview(**cached)
 
-        concluidos = await db["usuarios"].count_documents({"respondido": True})
+    async def _compute_overview(self) -> Dict[str, Any]:
+        db = await get_db()
+        total_organizacoes = await db["organizacoes"].estimated_document_count()
+        total_setores = await db["setores"].estimated_document_count()
+        totais = await self._overview_totais(db)
+        total_usuarios = totais["total_usuarios"]
+        concluidos = totais["concluidos"]
         taxa_conclusao = round((concluidos / total_usuarios) * 100, 2) if total_usuarios else 0.0
 
         alertas: List[AlertaDashboard] = []
@@ -426,13 +810,7 @@ class DashboardService:
                 )
             )
 
-        diags = await db["diagnosticos"].find().to_list(length=5000)
-        risco_count = 0
-        for d in diags:
-            risco_count += sum(
-                1 for dim in d.get("dimensoes", [])
-                if self._extract_classificacao(dim.get("classificacao")) == "risco"
-            )
+        risco_count = totais["risco_count"]
         if risco_count > 0:
             alertas.append(
                 AlertaDashboard(
@@ -447,11 +825,10 @@ class DashboardService:
             total_organizacoes=total_organizacoes,
             total_setores=total_setores,
             total_usuarios=total_usuarios,
-            usuarios_ativos=usuarios_ativos,
-            questionarios_em_andamento=questionarios_em_andamento,
+            usuarios_ativos=totais["usuarios_ativos"],
+            questionarios_em_andamento=totais["questionarios_em_andamento"],
             taxa_conclusao_geral=taxa_conclusao,
             alertas=alertas,
             ultima_atualizacao=datetime.utcnow(),
         )
-        await cache.set("dashboard:overview", result.model_dump(), ttl=settings.CACHE_TTL)
-        return result
+        return result.model_dump()
@@ -1,9 +1,9 @@
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import numpy as np
 from app.models.base import RespostaItem, Diagnostico, DiagnosticoDimensao
-from app.services.copsoq_scoring_service import (
-    copsoq_scoring_service,
-    ClassificacaoTercil,
-)
+from app.services.copsoq_batch_scoring import CLASSIFICACOES, ResultadoLote, montar_matriz, pontuar_lote
+from app.services.copsoq_scoring_service import ClassificacaoTercil
+from app.services.scoring_plan import ScoringPlan, compilar_plano
 
 class DiagnosticoService:
     def _detectar_escala_max(self, respostas: List[RespostaItem]) -> int:
@@ -35,72 +35,82 @@ class DiagnosticoService:
         pontuacao = ((qtd_risco + (qtd_intermediario * 0.5)) / total) * 4
         return resultado, round(pontuacao, 2)
 
-    def calculate_score(self, respostas: List[RespostaItem], questionario: Dict[str, Any], perguntas: List[Dict[str, Any]]) -> Diagnostico:
-        perguntas_map = {p["idPergunta"]: p for p in perguntas}
-        codigo_questionario = questionario.get("codigo") or ""
-        is_copsoq = isinstance(codigo_questionario, str) and codigo_questionario.startswith("COPSOQ_")
-        escala_max = self._detectar_escala_max(respostas)
+    def calculate_score(
+        self,
+        respostas: List[RespostaItem],
+        questionario: Dict[str, Any],
+        perguntas: Optional[List[Dict[str, Any]]] = None,
+        plano: Optional[ScoringPlan] = None,
+    ) -> Diagnostico:
+        """
+        Calcula o diagnóstico de um respondente.
 
-        domain_scores: Dict[Tuple[str, str, str, str], List[Dict[str, int]]] = {}
+        Informe ``plano`` (ver ``scoring_plans``) para reaproveitar o mapeamento
+        compilado do questionário; sem ele, o plano é compilado a partir de ``perguntas``.
+        """
+        if plano is None:
+            plano = compilar_plano(questionario, perguntas or [])
+        return self._montar_diagnostico(questionario, plano.pontuar(respostas))
 
-        for resp in respostas:
-            p = perguntas_map.get(resp.idPergunta)
-            if not p:
-                continue
-            if p.get("tipoEscala") == "texto_livre":
-                continue
-            if not isinstance(resp.valor, int):
-                continue
+    def calculate_scores(
+        self,
+        respostas_lote: Sequence[List[RespostaItem]],
+        questionario: Dict[str, Any],
+        plano: ScoringPlan,
+    ) -> List[Diagnostico]:
+        """
+        Calcula os diagnósticos de vários respondentes de uma vez.
 
-            key = (
-                p.get("codigoDominio") or p.get("dominio", "sem_dominio"),
-                p.get("dominio", "sem_dominio"),
-                p.get("dimensao", "sem_dimensao"),
-                p.get("sinal") or ("protecao" if copsoq_scoring_service.eh_dimensao_protecao(p.get("dimensao", "")) else "risco"),
-            )
-            if key not in domain_scores:
-                domain_scores[key] = []
-            domain_scores[key].append({"id_pergunta": resp.idPergunta, "valor": int(resp.valor)})
+        Em questionários COPSOQ, as respostas viram uma matriz pontuada por
+        ``pontuar_lote`` com o ``MapaItens`` do plano; nos demais, cada
+        respondente passa por ``plano.pontuar``. O resultado é o mesmo de
+        ``calculate_score``, com as dimensões na ordem das respostas.
+        """
+        if not plano.is_copsoq:
+            return [self.calculate_score(respostas, questionario, plano=plano) for respostas in respostas_lote]
+        if not respostas_lote:
+            return []
+        matriz = montar_matriz([{r.idPergunta: r.valor for r in respostas} for respostas in respostas_lote], plano.mapa)
+        # Escala detectada sobre todas as respostas numéricas, como em plano.pontuar
+        escalas = np.array([self._detectar_escala_max(respostas) for respostas in respostas_lote], dtype=np.int64)
+        lote = pontuar_lote(matriz, plano.mapa, escala_max=escalas)
+        return [
+            self._montar_diagnostico(questionario, self._dimensoes_lote(plano, lote, linha, respostas))
+            for linha, respostas in enumerate(respostas_lote)
+        ]
 
-        dimensoes_result: List[DiagnosticoDimensao] = []
-
-        for (codigo_dominio, dominio, dimensao, sinal), items in domain_scores.items():
-            if is_copsoq:
-                resultado = copsoq_scoring_service.processar_dimensao(
-                    dimensao=dimensao,
-                    dominio=dominio,
-                    respostas=items,
-                    codigo_questionario=codigo_questionario,
-                    escala_max=escala_max,
-                )
-                pontuacao = resultado.media
-                classificacao = resultado.classificacao
-                total_itens = resultado.total_itens
-                itens_respondidos = resultado.itens_respondidos
-            else:
-                avg = sum(i["valor"] for i in items) / len(items)
-                pontuacao = round(avg, 2)
-                if avg <= 2.33:
-                    classificacao = ClassificacaoTercil.FAVORAVEL
-                elif avg < 3.67:
-                    classificacao = ClassificacaoTercil.INTERMEDIARIO
-                else:
-                    classificacao = ClassificacaoTercil.RISCO
-                total_itens = len(items)
-                itens_respondidos = len(items)
+    @staticmethod
+    def _dimensoes_lote(
+        plano: ScoringPlan, lote: ResultadoLote, linha: int, respostas: List[RespostaItem]
+    ) -> List[DiagnosticoDimensao]:
+        ordem: Dict[int, None] = {}
+        for resp in respostas:
+            j = plano.coluna.get(resp.idPergunta)
+            if j is not None:
+                ordem.setdefault(plano.item_dimensao[j], None)
 
-            dimensoes_result.append(DiagnosticoDimensao(
-                dominio=dominio,
-                codigoDominio=codigo_dominio,
-                dimensao=dimensao,
-                pontuacao=pontuacao,
-                classificacao=classificacao,
-                sinal=sinal,
-                total_itens=total_itens,
-                itens_respondidos=itens_respondidos,
+        resultado: List[DiagnosticoDimensao] = []
+        for d in ordem:
+            n = int(lote.contagens[linha, d])
+            if not n:
+                continue
+            dim = plano.dimensoes[d]
+            resultado.append(DiagnosticoDimensao(
+                dominio=dim.dominio,
+                codigoDominio=dim.codigo_dominio,
+                dimensao=dim.dimensao,
+                pontuacao=round(float(lote.medias[linha, d]), 2),
+                classificacao=CLASSIFICACOES[int(lote.classificacoes[linha, d])],
+                sinal=dim.sinal,
+                total_itens=n,
+                itens_respondidos=n,
             ))
+        return resultado
+
+    def _montar_diagnostico(
+        self, questionario: Dict[str, Any], dimensoes_result: List[DiagnosticoDimensao]
+    ) -> Diagnostico:
         resultado_global, pontuacao_global = self._resultado_global(dimensoes_result)
-        
         return Diagnostico(
             anonId="calculated",
             idQuestionario=questionario["_id"],
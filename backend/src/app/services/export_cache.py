@@ -0,0 +1,117 @@
+"""
+Cache em disco dos arquivos exportados de relatórios.
+
+Um relatório gravado não muda, mas ``/relatorios/{id}/export`` renderizava o
+PDF/XLSX/CSV do zero a cada download. Os artefatos agora são guardados em
+disco sob uma chave derivada do conteúdo: hash do relatório serializado, do
+formato e da versão do renderizador (``RelatorioExportService.RENDERER_VERSION``).
+A mesma chave é usada como ``ETag``, então um ``If-None-Match`` válido é
+respondido com 304 sem renderizar nem ler o arquivo.
+
+O diretório tem um teto de tamanho (``EXPORT_CACHE_MAX_MB``); ao ultrapassá-lo,
+os arquivos menos usados recentemente (mtime, renovado a cada leitura) são
+removidos. Falhas de disco nunca interrompem a exportação.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Any, Mapping, Optional
+
+from app.core.config import settings
+from app.core.serialization import json_dumps
+
+logger = logging.getLogger(__name__)
+
+
+def artifact_key(relatorio: Mapping[str, Any], formato: str, versao: Any) -> str:
+    """Chave estável para (conteúdo do relatório, formato, versão do renderizador)."""
+    digest = hashlib.sha256()
+    digest.update(f"{formato}:{versao}:".encode())
+    digest.update(json_dumps(relatorio, sort_keys=True))
+    return digest.hexdigest()
+
+
+class ExportArtifactCache:
+    """Artefatos renderizados em disco, com limite de tamanho e remoção LRU."""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.directory = directory or settings.EXPORT_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else settings.EXPORT_CACHE_MAX_MB * 1024 * 1024
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.bin")
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                payload = fh.read()
+            os.utime(path)
+            return payload
+        except FileNotFoundError:
+            return None
+        except OSError as exc:
+            logger.warning("Falha ao ler export em cache %s: %s", key, exc)
+            return None
+
+    def put(self, key: str, payload: bytes) -> None:
+        if not self.enabled or len(payload) > self.max_bytes:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Escrita atômica: leitores concorrentes nunca veem arquivo parcial
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as fh:
+                    fh.write(payload)
+                os.replace(tmp_path, self._path(key))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._evict()
+        except OSError as exc:
+            logger.warning("Falha ao gravar export em cache %s: %s", key, exc)
+
+    def _evict(self) -> None:
+        entradas = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".bin"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entradas.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entradas):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> None:
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(".bin"):
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+
+export_cache = ExportArtifactCache()
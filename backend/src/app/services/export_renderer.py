@@ -0,0 +1,61 @@
+"""
+Renderização de exportações fora do event loop.
+
+openpyxl e fpdf2 são puramente síncronos e consomem CPU; chamados dentro do
+handler async, travavam todas as outras requisições do worker enquanto um
+arquivo era montado. ``ExportRenderer`` despacha a renderização (incluindo a
+leitura/gravação do cache em disco) para um pool de threads limitado a
+``EXPORT_RENDER_WORKERS``: requisições excedentes aguardam na fila do pool em
+vez de disputar CPU com o loop.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.services.export_cache import ExportArtifactCache
+from app.services.relatorio_export_service import RelatorioExportService
+
+logger = logging.getLogger(__name__)
+
+
+class ExportRenderer:
+    """Pool de threads dedicado às exportações de relatórios."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max(1, max_workers if max_workers is not None else settings.EXPORT_RENDER_WORKERS)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="export-render",
+                )
+            return self._executor
+
+    async def render(
+        self,
+        relatorio: Dict[str, Any],
+        formato: str,
+        cache: Optional[ExportArtifactCache] = None,
+        service: Optional[RelatorioExportService] = None,
+    ) -> Dict[str, Any]:
+        """Executa ``RelatorioExportService.export`` no pool e aguarda o resultado."""
+        service = service or RelatorioExportService()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), service.export, relatorio, formato, cache)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+            logger.info("Pool de renderização de exportações encerrado")
+
+
+export_renderer = ExportRenderer()
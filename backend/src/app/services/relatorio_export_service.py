@@ -1,10 +1,78 @@
+import codecs
 import csv
 from datetime import datetime
 from io import BytesIO, StringIO
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.serialization import to_jsonable
+from app.services.export_cache import ExportArtifactCache, artifact_key
+
+
+def _stringify_id(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    raw = str(value).strip()
+    return raw if raw else None
+
+
+def _count_dimensoes(relatorio: Dict[str, Any]) -> int:
+    total = 0
+    for dominio in relatorio.get("dominios") or []:
+        total += len(dominio.get("dimensoes") or [])
+    return total
+
+
+def serialize_relatorio(relatorio_doc: Dict[str, Any], include_full_payload: bool) -> Dict[str, Any]:
+    """Converte o documento do relatório no payload da API (também a entrada das exportações)."""
+    encoded = to_jsonable(relatorio_doc)
+    result: Dict[str, Any] = {
+        "id": _stringify_id(encoded.pop("_id", None)),
+        "idQuestionario": _stringify_id(encoded.get("idQuestionario")),
+        "idOrganizacao": _stringify_id(encoded.get("idOrganizacao")),
+        "idSetor": _stringify_id(encoded.get("idSetor")),
+        "tipoRelatorio": encoded.get("tipoRelatorio"),
+        "geradoPor": encoded.get("geradoPor"),
+        "dataGeracao": encoded.get("dataGeracao"),
+        "metricas": encoded.get("metricas") or {},
+        "totalDominios": len(encoded.get("dominios") or []),
+        "totalDimensoes": _count_dimensoes(encoded),
+    }
+
+    if include_full_payload:
+        result.update(
+            {
+                "dominios": encoded.get("dominios") or [],
+                "recomendacoes": encoded.get("recomendacoes") or [],
+                "observacoes": encoded.get("observacoes"),
+            }
+        )
+
+    return result
 
 
 class RelatorioExportService:
+    DIMENSION_HEADERS = (
+        "Código Domínio",
+        "Domínio",
+        "Dimensão",
+        "Média",
+        "Classificação",
+        "Sinal",
+        "Favorável",
+        "Intermediário",
+        "Risco",
+    )
+
+    # Incrementar ao mudar o layout de qualquer formato: invalida os artefatos em cache
+    RENDERER_VERSION = 2
+
+    # formato -> (extensão, media type, método de renderização)
+    FORMATOS = {
+        "pdf": ("pdf", "application/pdf", "build_pdf_bytes"),
+        "csv": ("csv", "text/csv; charset=utf-8", "build_csv_bytes"),
+        "excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "build_excel_bytes"),
+    }
+
     def _as_text(self, value: Any) -> str:
         if value is None:
             return ""
@@ -68,105 +136,104 @@ class RelatorioExportService:
         timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
         return f"{tipo}_{relatorio_id[:8]}_{timestamp}"
 
-    def build_csv_bytes(self, relatorio: Dict[str, Any]) -> bytes:
-        output = StringIO()
-        writer = csv.writer(output, delimiter=";")
+    def _csv_rows(self, relatorio: Dict[str, Any]) -> Iterator[List[Any]]:
         metricas = relatorio.get("metricas") or {}
 
-        writer.writerow(["Relatório", self._as_text(relatorio.get("id"))])
-        writer.writerow(["Tipo", self._as_text(relatorio.get("tipoRelatorio"))])
-        writer.writerow(["Gerado por", self._as_text(relatorio.get("geradoPor"))])
-        writer.writerow(["Data de geração", self._as_text(relatorio.get("dataGeracao"))])
-        writer.writerow([])
-        writer.writerow(["Métrica", "Valor"])
-        writer.writerow(["Média de Risco Global", f"{self._as_float(metricas.get('mediaRiscoGlobal')):.2f}"])
-        writer.writerow(["Índice de Proteção (%)", f"{self._as_float(metricas.get('indiceProtecao')):.2f}"])
-        writer.writerow(["Total de Respondentes", self._as_int(metricas.get("totalRespondentes"))])
-        writer.writerow([])
-        writer.writerow(
-            [
-                "Código Domínio",
-                "Domínio",
-                "Dimensão",
-                "Média",
-                "Classificação",
-                "Sinal",
-                "Favorável",
-                "Intermediário",
-                "Risco",
-            ]
-        )
+        yield ["Relatório", self._as_text(relatorio.get("id"))]
+        yield ["Tipo", self._as_text(relatorio.get("tipoRelatorio"))]
+        yield ["Gerado por", self._as_text(relatorio.get("geradoPor"))]
+        yield ["Data de geração", self._as_text(relatorio.get("dataGeracao"))]
+        yield []
+        yield ["Métrica", "Valor"]
+        yield ["Média de Risco Global", f"{self._as_float(metricas.get('mediaRiscoGlobal')):.2f}"]
+        yield ["Índice de Proteção (%)", f"{self._as_float(metricas.get('indiceProtecao')):.2f}"]
+        yield ["Total de Respondentes", self._as_int(metricas.get("totalRespondentes"))]
+        yield []
+        yield list(self.DIMENSION_HEADERS)
 
         for row in self._build_dimension_rows(relatorio):
-            writer.writerow(
-                [
-                    row["dominio_codigo"],
-                    row["dominio_nome"],
-                    row["dimensao"],
-                    f"{row['media']:.2f}",
-                    row["classificacao"],
-                    row["sinal"],
-                    row["favoravel"],
-                    row["intermediario"],
-                    row["risco"],
-                ]
-            )
+            yield [
+                row["dominio_codigo"],
+                row["dominio_nome"],
+                row["dimensao"],
+                f"{row['media']:.2f}",
+                row["classificacao"],
+                row["sinal"],
+                row["favoravel"],
+                row["intermediario"],
+                row["risco"],
+            ]
 
-        writer.writerow([])
-        writer.writerow(["Recomendações"])
+        yield []
+        yield ["Recomendações"]
         recomendacoes = relatorio.get("recomendacoes") or []
         if recomendacoes:
             for index, recomendacao in enumerate(recomendacoes, start=1):
-                writer.writerow([f"{index}. {self._as_text(recomendacao)}"])
+                yield [f"{index}. {self._as_text(recomendacao)}"]
         else:
-            writer.writerow(["Sem recomendações."])
+            yield ["Sem recomendações."]
+
+    def iter_csv_chunks(self, relatorio: Dict[str, Any], rows_per_chunk: int = 200) -> Iterator[bytes]:
+        """
+        Gera o CSV em blocos de bytes (UTF-8 com BOM), sem montar o arquivo inteiro
+        em memória. Usado diretamente como corpo de ``StreamingResponse``.
+        """
+        buffer = StringIO()
+        writer = csv.writer(buffer, delimiter=";")
+        yield codecs.BOM_UTF8
+        for count, row in enumerate(self._csv_rows(relatorio), start=1):
+            writer.writerow(row)
+            if count % rows_per_chunk == 0:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
 
-        return output.getvalue().encode("utf-8-sig")
+    def build_csv_bytes(self, relatorio: Dict[str, Any]) -> bytes:
+        return b"".join(self.iter_csv_chunks(relatorio))
 
     def build_excel_bytes(self, relatorio: Dict[str, Any]) -> bytes:
+        """
+        Monta o XLSX em modo write-only do openpyxl: as linhas são serializadas
+        à medida que são anexadas, sem manter a árvore de células em memória.
+        """
         try:
             from openpyxl import Workbook
+            from openpyxl.cell import WriteOnlyCell
             from openpyxl.styles import Font
         except ImportError as exc:
             raise RuntimeError("Dependência 'openpyxl' não instalada para exportação Excel.") from exc
 
-        wb = Workbook()
-        ws_resumo = wb.active
-        ws_resumo.title = "Resumo"
-        metricas = relatorio.get("metricas") or {}
+        wb = Workbook(write_only=True)
+        bold = Font(bold=True)
 
-        ws_resumo.append(["Relatório", self._as_text(relatorio.get("id"))])
+        def _bold(ws: Any, value: Any) -> Any:
+            cell = WriteOnlyCell(ws, value=value)
+            cell.font = bold
+            return cell
+
+        def _widths(ws: Any, widths: Dict[str, int]) -> None:
+            # Em write-only, larguras precisam ser definidas antes das linhas
+            for column, width in widths.items():
+                ws.column_dimensions[column].width = width
+
+        ws_resumo = wb.create_sheet("Resumo")
+        _widths(ws_resumo, {"A": 30, "B": 36})
+        metricas = relatorio.get("metricas") or {}
+        ws_resumo.append([_bold(ws_resumo, "Relatório"), self._as_text(relatorio.get("id"))])
         ws_resumo.append(["Tipo", self._as_text(relatorio.get("tipoRelatorio"))])
         ws_resumo.append(["Gerado por", self._as_text(relatorio.get("geradoPor"))])
         ws_resumo.append(["Data de geração", self._as_text(relatorio.get("dataGeracao"))])
         ws_resumo.append([])
-        ws_resumo.append(["Métrica", "Valor"])
+        ws_resumo.append([_bold(ws_resumo, "Métrica"), "Valor"])
         ws_resumo.append(["Média de Risco Global", round(self._as_float(metricas.get("mediaRiscoGlobal")), 2)])
         ws_resumo.append(["Índice de Proteção (%)", round(self._as_float(metricas.get("indiceProtecao")), 2)])
         ws_resumo.append(["Total de Respondentes", self._as_int(metricas.get("totalRespondentes"))])
 
-        ws_resumo["A1"].font = Font(bold=True)
-        ws_resumo["A6"].font = Font(bold=True)
-        ws_resumo.column_dimensions["A"].width = 30
-        ws_resumo.column_dimensions["B"].width = 36
-
         ws_dimensoes = wb.create_sheet("Dominios e Dimensoes")
-        ws_dimensoes.append(
-            [
-                "Código Domínio",
-                "Domínio",
-                "Dimensão",
-                "Média",
-                "Classificação",
-                "Sinal",
-                "Favorável",
-                "Intermediário",
-                "Risco",
-            ]
-        )
-        for cell in ws_dimensoes[1]:
-            cell.font = Font(bold=True)
-
+        _widths(ws_dimensoes, {"A": 16, "B": 28, "C": 34, "D": 10, "E": 16, "F": 10, "G": 12, "H": 14, "I": 10})
+        ws_dimensoes.append([_bold(ws_dimensoes, header) for header in self.DIMENSION_HEADERS])
         for row in self._build_dimension_rows(relatorio):
             ws_dimensoes.append(
                 [
@@ -182,28 +249,15 @@ class RelatorioExportService:
                 ]
             )
 
-        ws_dimensoes.column_dimensions["A"].width = 16
-        ws_dimensoes.column_dimensions["B"].width = 28
-        ws_dimensoes.column_dimensions["C"].width = 34
-        ws_dimensoes.column_dimensions["D"].width = 10
-        ws_dimensoes.column_dimensions["E"].width = 16
-        ws_dimensoes.column_dimensions["F"].width = 10
-        ws_dimensoes.column_dimensions["G"].width = 12
-        ws_dimensoes.column_dimensions["H"].width = 14
-        ws_dimensoes.column_dimensions["I"].width = 10
-
         ws_recomendacoes = wb.create_sheet("Recomendacoes")
-        ws_recomendacoes.append(["Prioridade", "Recomendação"])
-        ws_recomendacoes["A1"].font = Font(bold=True)
-        ws_recomendacoes["B1"].font = Font(bold=True)
+        _widths(ws_recomendacoes, {"A": 12, "B": 90})
+        ws_recomendacoes.append([_bold(ws_recomendacoes, "Prioridade"), _bold(ws_recomendacoes, "Recomendação")])
         recomendacoes = relatorio.get("recomendacoes") or []
         if recomendacoes:
             for index, recomendacao in enumerate(recomendacoes, start=1):
                 ws_recomendacoes.append([index, self._as_text(recomendacao)])
         else:
             ws_recomendacoes.append([1, "Sem recomendações."])
-        ws_recomendacoes.column_dimensions["A"].width = 12
-        ws_recomendacoes.column_dimensions["B"].width = 90
 
         output = BytesIO()
         wb.save(output)
@@ -270,30 +324,48 @@ class RelatorioExportService:
             return bytes(output)
         return output.encode("latin-1", errors="replace")
 
+    def _formato(self, formato: str) -> str:
+        normalized = (formato or "").strip().lower()
+        if normalized not in self.FORMATOS:
+            raise ValueError("Formato de exportação inválido. Use: pdf, csv ou excel.")
+        return normalized
+
+    def media_type_for(self, formato: str) -> str:
+        return self.FORMATOS[self._formato(formato)][1]
+
+    def filename_for(self, relatorio: Dict[str, Any], formato: str) -> str:
+        extension = self.FORMATOS[self._formato(formato)][0]
+        return f"{self._build_filename_base(relatorio)}.{extension}"
+
+    def archive_name(self, relatorio: Dict[str, Any], formato: str) -> str:
+        """Nome do arquivo dentro de um ZIP com vários relatórios (ID completo, sem data)."""
+        extension = self.FORMATOS[self._formato(formato)][0]
+        tipo = self._as_text(relatorio.get("tipoRelatorio") or "relatorio")
+        return f"{tipo}_{self._as_text(relatorio.get('id') or 'sem_id')}.{extension}"
+
+    def artifact_key(self, relatorio: Dict[str, Any], formato: str) -> str:
+        """Chave de cache (e ETag) do arquivo exportado; não renderiza nada."""
+        return artifact_key(relatorio, self._formato(formato), self.RENDERER_VERSION)
+
     def export(
         self,
         relatorio: Dict[str, Any],
         formato: str,
+        cache: Optional[ExportArtifactCache] = None,
     ) -> Dict[str, Any]:
-        normalized = (formato or "").strip().lower()
-        if normalized == "pdf":
-            payload = self.build_pdf_bytes(relatorio)
-            extension = "pdf"
-            media_type = "application/pdf"
-        elif normalized == "csv":
-            payload = self.build_csv_bytes(relatorio)
-            extension = "csv"
-            media_type = "text/csv; charset=utf-8"
-        elif normalized == "excel":
-            payload = self.build_excel_bytes(relatorio)
-            extension = "xlsx"
-            media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        else:
-            raise ValueError("Formato de exportação inválido. Use: pdf, csv ou excel.")
+        normalized = self._formato(formato)
+        _, media_type, builder = self.FORMATOS[normalized]
+        etag = self.artifact_key(relatorio, normalized)
+
+        payload = cache.get(etag) if cache is not None else None
+        if payload is None:
+            payload = getattr(self, builder)(relatorio)
+            if cache is not None:
+                cache.put(etag, payload)
 
-        filename = f"{self._build_filename_base(relatorio)}.{extension}"
         return {
             "payload": payload,
             "media_type": media_type,
-            "filename": filename,
+            "filename": self.filename_for(relatorio, normalized),
+            "etag": etag,
         }
@@ -1,16 +1,23 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from collections import defaultdict
+from datetime import datetime, timedelta
+import logging
+from app.core.config import settings
 from app.models.base import (
     Relatorio,
     RelatorioMetricas,
     RelatorioDimensao,
     RelatorioDominio,
 )
+from app.repositories.diagnosticos import DiagnosticosRepo
+from app.repositories.relatorios import RelatoriosRepo
 from app.services.copsoq_scoring_service import (
     copsoq_scoring_service,
     ClassificacaoTercil,
 )
 
+logger = logging.getLogger(__name__)
+
 class RelatorioService: 
     def _normalize_classificacao(self, valor: Any) -> str:
         if isinstance(valor, ClassificacaoTercil):
@@ -41,29 +48,13 @@ class RelatorioService:
                     recomendacoes.append(recomendacao)
         return recomendacoes or ["Manter monitoramento contínuo das dimensões avaliadas."]
 
-    def generate_relatorio(
-        self, 
-        diagnosticos: List[Dict[str, Any]], 
-        questionario_id: Any,
-        tipo: str,
-        org_id: Any = None,
-        setor_id: Any = None,
-        gerado_por: str = "system"
-    ) -> Relatorio:
-        
-        if not diagnosticos:
-            return Relatorio(
-                idQuestionario=questionario_id,
-                idOrganizacao=org_id,
-                idSetor=setor_id,
-                tipoRelatorio=tipo,
-                geradoPor=gerado_por,
-                metricas=RelatorioMetricas(mediaRiscoGlobal=0, indiceProtecao=0, totalRespondentes=0),
-                dominios=[],
-                recomendacoes=["Sem dados suficientes."]
-            )
+    def agregar_dimensoes(self, diagnosticos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Agrega em memória as dimensões dos diagnósticos informados.
 
-        total_respondentes = len(diagnosticos)
+        Produz as mesmas linhas de ``DiagnosticosRepo.aggregate_latest_dimensoes``
+        (usado nos relatórios organizacionais e setoriais, agregados no MongoDB).
+        """
         agregacao_dimensoes: Dict[tuple, Dict[str, Any]] = {}
 
         for diag in diagnosticos:
@@ -85,9 +76,220 @@ class RelatorioService:
                 agregacao_dimensoes[key]["medias"].append(pontuacao)
                 agregacao_dimensoes[key]["distribuicao"][classificacao] += 1
 
+        return [
+            {
+                "codigo": codigo,
+                "dominio": dominio,
+                "dimensao": dimensao,
+                "sinal": sinal,
+                "soma": sum(dados["medias"]),
+                "total": len(dados["medias"]),
+                "distribuicao": dict(dados["distribuicao"]),
+            }
+            for (codigo, dominio, dimensao, sinal), dados in agregacao_dimensoes.items()
+        ]
+
+    @staticmethod
+    def _chave_dimensao(linha: Dict[str, Any]) -> tuple:
+        return (linha["codigo"], linha["dominio"], linha["dimensao"], linha["sinal"])
+
+    @staticmethod
+    def _estado_agregacao(agregado: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "respondentes": int(agregado.get("respondentes") or 0),
+            "marcaDataCriacao": agregado.get("marcaDataCriacao"),
+            "dimensoes": [
+                {**linha, "distribuicao": dict(linha.get("distribuicao") or {})}
+                for linha in agregado.get("dimensoes") or []
+            ],
+        }
+
+    def combinar_agregados(
+        self,
+        base: Dict[str, Any],
+        novos: Dict[str, Any],
+        retirados: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Incorpora um delta a um estado de agregação.
+
+        ``novos`` são os diagnósticos mais recentes criados após a marca do
+        estado; ``retirados`` são os diagnósticos que eles substituem (os mais
+        recentes, até a marca, dos mesmos respondentes), subtraídos do estado.
+        """
+        linhas: Dict[tuple, Dict[str, Any]] = {}
+        for linha in base.get("dimensoes") or []:
+            linhas[self._chave_dimensao(linha)] = {
+                **linha,
+                "distribuicao": dict(linha.get("distribuicao") or {}),
+            }
+
+        def _aplicar(agregado: Dict[str, Any], sinal: int) -> None:
+            for linha in agregado.get("dimensoes") or []:
+                chave = self._chave_dimensao(linha)
+                atual = linhas.setdefault(
+                    chave,
+                    {**{k: linha[k] for k in ("codigo", "dominio", "dimensao", "sinal")},
+                     "soma": 0.0, "total": 0, "distribuicao": {}},
+                )
+                atual["soma"] += sinal * float(linha["soma"])
+                atual["total"] += sinal * int(linha["total"])
+                for classificacao, quantidade in (linha.get("distribuicao") or {}).items():
+                    atual["distribuicao"][classificacao] = (
+                        atual["distribuicao"].get(classificacao, 0) + sinal * int(quantidade)
+                    )
+
+        _aplicar(novos, 1)
+        if retirados:
+            _aplicar(retirados, -1)
+
+        respondentes = (
+            int(base.get("respondentes") or 0)
+            + int(novos.get("respondentes") or 0)
+            - int((retirados or {}).get("respondentes") or 0)
+        )
+        return {
+            "respondentes": max(respondentes, 0),
+            "dimensoes": [linha for linha in linhas.values() if linha["total"] > 0],
+        }
+
+    @staticmethod
+    async def _agregar_dimensoes_mongo(d_repo: DiagnosticosRepo, questionario_id: str, **filtros: Any) -> Dict[str, Any]:
+        """``aggregate_latest_dimensoes`` com as dimensões de proteção do COPSOQ."""
+        return await d_repo.aggregate_latest_dimensoes(
+            questionario_id,
+            dimensoes_protecao=copsoq_scoring_service.DIMENSOES_PROTECAO,
+            **filtros,
+        )
+
+    async def _delta(
+        self,
+        d_repo: DiagnosticosRepo,
+        questionario_id: str,
+        org_id: Optional[str],
+        setor_id: Optional[str],
+        apos: datetime,
+        ate: Optional[datetime] = None,
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """Diagnósticos criados em (``apos``, ``ate``] e os que eles substituem até ``apos``."""
+        novos = await self._agregar_dimensoes_mongo(
+            d_repo, questionario_id, org_id=org_id, setor_id=setor_id, apos=apos, ate=ate, incluir_anon_ids=True
+        )
+        if not novos["respondentes"]:
+            return novos, None
+        retirados = await self._agregar_dimensoes_mongo(
+            d_repo, questionario_id, org_id=org_id, setor_id=setor_id, anon_ids=novos["anonIds"], ate=apos
+        )
+        return novos, retirados
+
+    async def agregar_escopo(
+        self,
+        questionario_id: str,
+        tipo: str,
+        org_id: Optional[str] = None,
+        setor_id: Optional[str] = None,
+        refresh: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Agrega os diagnósticos de um escopo (organização/setor) no MongoDB,
+        filtrando pelo escopo carimbado nos próprios diagnósticos.
+
+        O estado guardado no relatório (``estadoAgregacao``) cobre só os
+        diagnósticos com ``dataCriacao`` até a marca ``agora -
+        RELATORIO_REFRESH_MARGEM``. Um diagnóstico pode ser gravado depois de
+        carimbado (``create_many`` carimba o lote antes do ``insert_many``);
+        com a margem, a marca fica atrás de qualquer gravação em curso e o
+        estado não perde diagnósticos. Os criados depois da marca entram no
+        relatório como delta sobre o estado.
+
+        Com ``refresh``, o estado parte do último relatório do mesmo escopo e
+        incorpora apenas os diagnósticos criados entre as duas marcas,
+        retirando os que eles substituem. Sem relatório anterior válido (ou
+        com o escopo marcado como obsoleto por mudança de organização/setor de
+        um respondente), faz a agregação completa.
+
+        Returns:
+            Agregado do relatório, com o estado a guardar em ``estadoAgregacao``.
+        """
+        d_repo = DiagnosticosRepo()
+        marca = datetime.utcnow() - timedelta(seconds=settings.RELATORIO_REFRESH_MARGEM)
+        estado: Optional[Dict[str, Any]] = None
+        if refresh:
+            anterior = await RelatoriosRepo().find_latest_snapshot(questionario_id, tipo, org_id, setor_id)
+            estado_anterior = (anterior or {}).get("estadoAgregacao") or {}
+            marca_anterior = estado_anterior.get("marcaDataCriacao")
+            if marca_anterior and marca_anterior <= marca:
+                novos, retirados = await self._delta(
+                    d_repo, questionario_id, org_id, setor_id, apos=marca_anterior, ate=marca
+                )
+                estado = self.combinar_agregados(estado_anterior, novos, retirados)
+                logger.info(
+                    "Relatório %s atualizado de forma incremental: %d novos, %d substituídos",
+                    anterior.get("_id"), novos["respondentes"], (retirados or {}).get("respondentes", 0),
+                )
+        if estado is None:
+            estado = await self._agregar_dimensoes_mongo(
+                d_repo, questionario_id, org_id=org_id, setor_id=setor_id, ate=marca
+            )
+        estado["marcaDataCriacao"] = marca
+
+        recentes, substituidos = await self._delta(d_repo, questionario_id, org_id, setor_id, apos=marca)
+        agregado = self.combinar_agregados(estado, recentes, substituidos)
+        agregado["estadoAgregacao"] = self._estado_agregacao(estado)
+        return agregado
+
+    def generate_relatorio(
+        self, 
+        diagnosticos: List[Dict[str, Any]], 
+        questionario_id: Any,
+        tipo: str,
+        org_id: Any = None,
+        setor_id: Any = None,
+        gerado_por: str = "system"
+    ) -> Relatorio:
+        agregado = {
+            "respondentes": len(diagnosticos),
+            "dimensoes": self.agregar_dimensoes(diagnosticos),
+        }
+        return self.generate_relatorio_agregado(
+            agregado, questionario_id, tipo, org_id, setor_id, gerado_por=gerado_por
+        )
+
+    def generate_relatorio_agregado(
+        self,
+        agregado: Dict[str, Any],
+        questionario_id: Any,
+        tipo: str,
+        org_id: Any = None,
+        setor_id: Any = None,
+        gerado_por: str = "system"
+    ) -> Relatorio:
+        """
+        Monta o relatório a partir das dimensões já agregadas.
+
+        ``agregado`` segue o formato de ``DiagnosticosRepo.aggregate_latest_dimensoes``:
+        total de respondentes e uma linha por dimensão com soma, total e
+        distribuição. O ``estadoAgregacao`` montado por ``agregar_escopo`` é
+        guardado no relatório para permitir a atualização incremental.
+        """
+        total_respondentes = int(agregado.get("respondentes") or 0)
+        if not total_respondentes:
+            return Relatorio(
+                idQuestionario=questionario_id,
+                idOrganizacao=org_id,
+                idSetor=setor_id,
+                tipoRelatorio=tipo,
+                geradoPor=gerado_por,
+                metricas=RelatorioMetricas(mediaRiscoGlobal=0, indiceProtecao=0, totalRespondentes=0),
+                dominios=[],
+                recomendacoes=["Sem dados suficientes."]
+            )
+
         dominios_map: Dict[tuple, List[RelatorioDimensao]] = {}
-        for (codigo, dominio, dimensao, sinal), dados in agregacao_dimensoes.items():
-            media = sum(dados["medias"]) / len(dados["medias"])
+        for dados in agregado.get("dimensoes") or []:
+            codigo, dominio = dados["codigo"], dados["dominio"]
+            dimensao, sinal = dados["dimensao"], dados["sinal"]
+            media = float(dados["soma"]) / int(dados["total"])
             classificacao_media = copsoq_scoring_service.classificar_tercil(media, dimensao)
             dim = RelatorioDimensao(
                 dimensao=dimensao,
@@ -150,5 +352,6 @@ class RelatorioService:
                 totalRespondentes=total_respondentes
             ),
             dominios=dominios_result,
-            recomendacoes=self._gerar_recomendacoes(dominios_result)
+            recomendacoes=self._gerar_recomendacoes(dominios_result),
+            estadoAgregacao=agregado.get("estadoAgregacao"),
         )
@@ -0,0 +1,259 @@
+"""
+Plano de scoring compilado por questionário.
+
+``DiagnosticoService.calculate_score`` precisava, a cada respondente, montar o
+mapa de perguntas, recalcular a chave (codigoDominio, domínio, dimensão, sinal)
+de cada resposta, consultar itens invertidos e regras de soma por nome. Tudo
+isso depende apenas do questionário e das suas perguntas, então é compilado
+uma vez em um ``ScoringPlan``:
+
+- ``coluna``: idPergunta -> índice do item;
+- ``item_dimensao``/``invertido``/``na_regra``: vetores por item;
+- ``dimensoes``: metadados por dimensão, incluindo a tabela soma -> classificação
+  da versão curta brasileira.
+
+O mapeamento é o ``MapaItens`` de ``copsoq_batch_scoring`` (guardado em
+``mapa``), convertido em tuplas para o laço por respondente; o recálculo em
+lote pontua com o mesmo mapa.
+
+A pontuação de um respondente vira um laço sobre inteiros em listas de tamanho
+fixo. Os planos ficam em um LRU em processo (``scoring_plans``) chaveado por
+(questionário, ``perguntasVersao``); mutações do ``PerguntasRepo`` descartam o
+plano local e, nos demais processos (workers Celery), a mudança de versão no
+documento do questionário já força a recompilação.
+"""
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.base import DiagnosticoDimensao, RespostaItem
+from app.repositories.perguntas import PerguntasRepo
+from app.services.copsoq_batch_scoring import (
+    CLASSIFICACOES,
+    SEM_CLASSIFICACAO,
+    MapaItens,
+    compilar_mapa_itens,
+)
+from app.services.copsoq_scoring_service import (
+    ClassificacaoTercil,
+    COPSOQScoringService,
+    copsoq_scoring_service,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class DimensaoPlano:
+    codigo_dominio: str
+    dominio: str
+    dimensao: str
+    sinal: str
+    protecao: bool
+    # Índice = soma bruta; None fora das faixas. None se a dimensão não tem regra.
+    faixas: Optional[Tuple[Optional[ClassificacaoTercil], ...]] = None
+
+
+@dataclass(frozen=True, slots=True)
+class ScoringPlan:
+    id_questionario: str
+    versao: int
+    codigo_questionario: str
+    is_copsoq: bool
+    coluna: Mapping[str, int]
+    item_dimensao: Tuple[int, ...]
+    invertido: Tuple[bool, ...]
+    na_regra: Tuple[bool, ...]
+    dimensoes: Tuple[DimensaoPlano, ...]
+    mapa: MapaItens = field(compare=False, repr=False)
+    limite_inferior: float = COPSOQScoringService.LIMITE_INFERIOR
+    limite_superior: float = COPSOQScoringService.LIMITE_SUPERIOR
+
+    def pontuar(self, respostas: Sequence[RespostaItem]) -> List[DiagnosticoDimensao]:
+        """
+        Pontua um respondente. As dimensões saem na ordem em que aparecem nas
+        respostas, como no cálculo original.
+        """
+        total = len(self.dimensoes)
+        contagens = [0] * total
+        somas = [0] * total
+        somas_invertidas = [0] * total
+        invertidos = [0] * total
+        fora_da_regra = [0] * total
+        ordem: List[int] = []
+        maximo: Optional[int] = None
+
+        coluna = self.coluna
+        item_dimensao = self.item_dimensao
+        invertido = self.invertido
+        na_regra = self.na_regra
+        for resp in respostas:
+            valor = resp.valor
+            if not isinstance(valor, int):
+                continue
+            if maximo is None or valor > maximo:
+                maximo = valor
+            j = coluna.get(resp.idPergunta)
+            if j is None:
+                continue
+            d = item_dimensao[j]
+            if not contagens[d]:
+                ordem.append(d)
+            contagens[d] += 1
+            somas[d] += valor
+            if invertido[j]:
+                invertidos[d] += 1
+                somas_invertidas[d] += valor
+            if not na_regra[j]:
+                fora_da_regra[d] += 1
+
+        escala_max = 5 if maximo is not None and maximo > 4 else 4
+        # Mesma regra de inverter_valor: 0-4 -> 4 - v; 1-5 -> 6 - v
+        limite = 4 if escala_max == 4 else escala_max + 1
+
+        resultado: List[DiagnosticoDimensao] = []
+        for d in ordem:
+            dim = self.dimensoes[d]
+            n = contagens[d]
+            if self.is_copsoq:
+                pontos = somas[d] + invertidos[d] * limite - 2 * somas_invertidas[d]
+                media = pontos / n
+                classificacao = None
+                if dim.faixas is not None and not fora_da_regra[d] and 0 <= somas[d] < len(dim.faixas):
+                    classificacao = dim.faixas[somas[d]]
+                if classificacao is None:
+                    classificacao = self._tercil(media, dim.protecao)
+            else:
+                media = somas[d] / n
+                classificacao = self._tercil(media, False)
+            resultado.append(DiagnosticoDimensao(
+                dominio=dim.dominio,
+                codigoDominio=dim.codigo_dominio,
+                dimensao=dim.dimensao,
+                pontuacao=round(media, 2),
+                classificacao=classificacao,
+                sinal=dim.sinal,
+                total_itens=n,
+                itens_respondidos=n,
+            ))
+        return resultado
+
+    def _tercil(self, media: float, protecao: bool) -> ClassificacaoTercil:
+        if protecao:
+            if media >= self.limite_superior:
+                return ClassificacaoTercil.FAVORAVEL
+            if media > self.limite_inferior:
+                return ClassificacaoTercil.INTERMEDIARIO
+            return ClassificacaoTercil.RISCO
+        if media <= self.limite_inferior:
+            return ClassificacaoTercil.FAVORAVEL
+        if media < self.limite_superior:
+            return ClassificacaoTercil.INTERMEDIARIO
+        return ClassificacaoTercil.RISCO
+
+
+def _faixas(mapa: MapaItens, j: int) -> Optional[Tuple[Optional[ClassificacaoTercil], ...]]:
+    if not mapa.tem_regra[j]:
+        return None
+    return tuple(None if c == SEM_CLASSIFICACAO else CLASSIFICACOES[c] for c in mapa.faixas[j].tolist())
+
+
+def compilar_plano(
+    questionario: Mapping[str, Any],
+    perguntas: Sequence[Mapping[str, Any]],
+    service: COPSOQScoringService = copsoq_scoring_service,
+) -> ScoringPlan:
+    """Compila as perguntas pontuáveis do questionário em um ``ScoringPlan``."""
+    codigo = questionario.get("codigo") or ""
+    is_copsoq = isinstance(codigo, str) and codigo.startswith("COPSOQ_")
+
+    # Última definição de cada idPergunta prevalece (como em um dict por id)
+    por_id = {p["idPergunta"]: p for p in perguntas if p.get("idPergunta")}
+    mapa = compilar_mapa_itens(list(por_id.values()), codigo, service)
+
+    itens = np.arange(len(mapa.item_ids))
+    na_regra = mapa.tem_regra[mapa.item_dimensao] & (mapa.fora_da_regra[itens, mapa.item_dimensao] == 0)
+    return ScoringPlan(
+        id_questionario=str(questionario.get("_id", "")),
+        versao=int(questionario.get("perguntasVersao") or 0),
+        codigo_questionario=codigo,
+        is_copsoq=is_copsoq,
+        coluna=mapa.coluna(),
+        item_dimensao=tuple(mapa.item_dimensao.tolist()),
+        invertido=tuple(mapa.invertido.tolist()),
+        na_regra=tuple(na_regra.tolist()),
+        dimensoes=tuple(
+            DimensaoPlano(
+                codigo_dominio=dim.codigo_dominio,
+                dominio=dim.dominio,
+                dimensao=dim.dimensao,
+                sinal=dim.sinal,
+                protecao=dim.protecao,
+                faixas=_faixas(mapa, j),
+            )
+            for j, dim in enumerate(mapa.dimensoes)
+        ),
+        mapa=mapa,
+        limite_inferior=service.LIMITE_INFERIOR,
+        limite_superior=service.LIMITE_SUPERIOR,
+    )
+
+
+class ScoringPlanCache:
+    """LRU em processo de planos por (questionário, ``perguntasVersao``)."""
+
+    def __init__(self, maxsize: Optional[int] = None, perguntas_repo: Optional[PerguntasRepo] = None):
+        self.maxsize = maxsize if maxsize is not None else settings.SCORING_PLAN_CACHE_SIZE
+        self.perguntas_repo = perguntas_repo or PerguntasRepo()
+        self._planos: OrderedDict[Tuple[str, int], ScoringPlan] = OrderedDict()
+
+    @staticmethod
+    def _chave(questionario: Mapping[str, Any]) -> Tuple[str, int]:
+        return str(questionario["_id"]), int(questionario.get("perguntasVersao") or 0)
+
+    async def get(
+        self,
+        questionario: Mapping[str, Any],
+        perguntas: Optional[Sequence[Mapping[str, Any]]] = None,
+    ) -> ScoringPlan:
+        """
+        Retorna o plano da versão atual do questionário, compilando se preciso.
+
+        As perguntas ativas só são lidas do banco quando não há plano em cache
+        e ``perguntas`` não foi informado.
+        """
+        chave = self._chave(questionario)
+        plano = self._planos.get(chave)
+        if plano is not None:
+            self._planos.move_to_end(chave)
+            return plano
+
+        if perguntas is None:
+            perguntas = await self.perguntas_repo.get_questions(chave[0])
+        plano = compilar_plano(questionario, perguntas)
+        self.invalidate(chave[0])
+        self._planos[chave] = plano
+        while len(self._planos) > max(1, self.maxsize):
+            self._planos.popitem(last=False)
+        logger.info(
+            "Plano de scoring compilado: questionário %s v%s (%d itens, %d dimensões)",
+            chave[0], chave[1], len(plano.item_dimensao), len(plano.dimensoes),
+        )
+        return plano
+
+    def invalidate(self, id_questionario: Optional[str] = None) -> None:
+        """Descarta os planos de um questionário (ou de todos, sem argumento)."""
+        if id_questionario is None:
+            self._planos.clear()
+            return
+        for chave in [c for c in self._planos if c[0] == str(id_questionario)]:
+            del self._planos[chave]
+
+
+scoring_plans = ScoringPlanCache()
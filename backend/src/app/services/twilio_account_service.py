@@ -3,7 +3,7 @@ from __future__ import annotations
 import asyncio
 import logging
 from datetime import datetime, timezone
-from typing import Any, Optional
+from typing import Any, Dict, Optional
 
 from app.core.cache import cache
 from app.core.config import get_settings
@@ -64,13 +64,16 @@ class TwilioAccountService:
             return None, "Não foi possível inicializar o cliente do Twilio."
 
     async def get_balance(self) -> TwilioSaldo:
-        cached = await cache.get(self._cache_key())
-        if cached:
-            return TwilioSaldo(**cached)
-
-        result = await self._fetch_balance()
-        await cache.set(self._cache_key(), result.model_dump(), ttl=self.CACHE_TTL_SECONDS)
-        return result
+        async def _fetch() -> Dict[str, Any]:
+            return (await self._fetch_balance()).model_dump()
+
+        cached = await cache.get_or_compute(
+            self._cache_key(),
+            _fetch,
+            ttl=self.CACHE_TTL_SECONDS,
+            stale_ttl=self.settings.CACHE_STALE_TTL,
+        )
+        return TwilioSaldo(**cached)
 
     async def _fetch_balance(self) -> TwilioSaldo:
         if not self._is_configured():
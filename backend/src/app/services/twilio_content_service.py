@@ -5,12 +5,19 @@ import logging
 from typing import Any, Dict, List, Optional
 
 from app.core.config import get_settings
+from app.services.twilio_dispatcher import EnvioTwilio, TwilioDispatcher, twilio_dispatcher
 
 logger = logging.getLogger(__name__)
 
 
 class TwilioContentService:
-    """Gerencia envio de perguntas com Content Templates e fallback em texto."""
+    """
+    Gerencia envio de perguntas com Content Templates e fallback em texto.
+
+    Com a fila de envios em execução (ver ``twilio_dispatcher``), os métodos
+    apenas enfileiram e retornam o id do envio; sem ela, enviam na hora em
+    uma thread, sem bloquear o event loop.
+    """
 
     ESCALA_TEMPLATES: Dict[str, str] = {
         "frequencia": "TWILIO_TEMPLATE_FREQUENCIA",
@@ -21,9 +28,10 @@ class TwilioContentService:
         "comportamento_ofensivo": "TWILIO_TEMPLATE_COMPORTAMENTO_OFENSIVO",
     }
 
-    def __init__(self, client: Any = None):
+    def __init__(self, client: Any = None, dispatcher: Optional[TwilioDispatcher] = None):
         self.settings = get_settings()
         self._client = client
+        self.dispatcher = dispatcher or twilio_dispatcher
         self._templates_cache: Dict[str, str] = {}
 
     def _get_client(self):
@@ -51,6 +59,19 @@ class TwilioContentService:
             return ""
         return sender if sender.startswith("whatsapp:") else f"whatsapp:{sender}"
 
+    def _sender_params(self) -> Dict[str, Any]:
+        if self.settings.TWILIO_MESSAGING_SERVICE_SID:
+            return {"messaging_service_sid": self.settings.TWILIO_MESSAGING_SERVICE_SID}
+        from_ = self._from_sender()
+        return {"from_": from_} if from_ else {}
+
+    async def _despachar(self, envio: EnvioTwilio) -> str:
+        """Enfileira o envio ou, sem fila ativa, envia imediatamente."""
+        if self.dispatcher.running:
+            return envio.id if self.dispatcher.submit(envio) else ""
+        resultado = await self.dispatcher.deliver(envio)
+        return resultado.sids[-1] if resultado.ok else ""
+
     @staticmethod
     def _montar_texto_pergunta(texto_pergunta: str, numero_atual: int, total: int) -> str:
         return f"{numero_atual}/{total} - {texto_pergunta}"
@@ -87,26 +108,19 @@ class TwilioContentService:
             logger.info("Twilio não configurado; mensagem de texto não enviada externamente.")
             return ""
 
-        params: Dict[str, Any] = {
-            "to": self._normalize_to(telefone),
-            "body": texto,
-        }
-
-        if self.settings.TWILIO_MESSAGING_SERVICE_SID:
-            params["messaging_service_sid"] = self.settings.TWILIO_MESSAGING_SERVICE_SID
-        else:
-            from_ = self._from_sender()
-            if not from_:
-                logger.warning("TWILIO_WHATSAPP_FROM/TWILIO_WHATSAPP_NUMBER não configurado.")
-                return ""
-            params["from_"] = from_
-
-        try:
-            message = client.messages.create(**params)
-            return str(message.sid)
-        except Exception as exc:
-            logger.warning(f"Falha ao enviar mensagem de texto no Twilio: {exc}")
+        sender = self._sender_params()
+        if not sender:
+            logger.warning("TWILIO_WHATSAPP_FROM/TWILIO_WHATSAPP_NUMBER não configurado.")
             return ""
+        params: Dict[str, Any] = {"to": self._normalize_to(telefone), "body": texto, **sender}
+
+        envio = EnvioTwilio(
+            client=client,
+            telefone=telefone,
+            mensagens=[params],
+            sender=next(iter(sender.values())),
+        )
+        return await self._despachar(envio)
 
     async def enviar_pergunta_interativa(
         self,
@@ -121,14 +135,11 @@ class TwilioContentService:
         """Envia pergunta usando Content Template.
 
         Returns:
-            SID da mensagem se o template foi enviado com sucesso, "" caso contrário.
-            Quando retorna "", o chamador deve enviar a pergunta via TwiML.
+            SID da mensagem (ou id do envio enfileirado) se o template foi aceito,
+            "" caso contrário. Quando retorna "", o chamador deve enviar a pergunta
+            (com a orientação) via TwiML.
         """
 
-        # Se há orientação, envia como mensagem de texto separada antes da pergunta
-        if orientacao:
-            await self.enviar_mensagem_texto(telefone, orientacao)
-
         templates = await self.criar_content_templates()
         content_sid = templates.get(tipo_escala)
         if not content_sid:
@@ -140,28 +151,40 @@ class TwilioContentService:
 
         texto_base = self._montar_texto_pergunta(texto_pergunta, numero_atual, total)
         opcoes_texto = self._montar_opcoes_texto(opcoes)
-
-        params: Dict[str, Any] = {
-            "to": self._normalize_to(telefone),
-            "content_sid": content_sid,
-            "content_variables": json.dumps(
-                {
-                    "1": texto_base,
-                    "2": opcoes_texto,
-                },
-                ensure_ascii=False,
-            ),
-        }
-        if self.settings.TWILIO_MESSAGING_SERVICE_SID:
-            params["messaging_service_sid"] = self.settings.TWILIO_MESSAGING_SERVICE_SID
-        else:
-            from_ = self._from_sender()
-            if from_:
-                params["from_"] = from_
-
-        try:
-            message = client.messages.create(**params)
-            return str(message.sid)
-        except Exception as exc:
-            logger.warning(f"Falha ao enviar template interativo; fallback TwiML. Erro: {exc}")
-            return ""
+        sender = self._sender_params()
+        to = self._normalize_to(telefone)
+
+        mensagens: List[Dict[str, Any]] = []
+        # Se há orientação, vai como mensagem de texto separada antes da pergunta
+        if orientacao and sender:
+            mensagens.append({"to": to, "body": orientacao, **sender})
+        mensagens.append(
+            {
+                "to": to,
+                "content_sid": content_sid,
+                "content_variables": json.dumps(
+                    {
+                        "1": texto_base,
+                        "2": opcoes_texto,
+                    },
+                    ensure_ascii=False,
+                ),
+                **sender,
+            }
+        )
+        fallback = None
+        if sender:
+            corpo = f"{texto_base}\n\n{opcoes_texto}" if opcoes_texto else texto_base
+            fallback = {"to": to, "body": corpo, **sender}
+
+        envio = EnvioTwilio(
+            client=client,
+            telefone=telefone,
+            mensagens=mensagens,
+            sender=next(iter(sender.values()), ""),
+            fallback=fallback,
+        )
+        sid = await self._despachar(envio)
+        if not sid:
+            logger.warning("Template interativo não enviado; fallback TwiML.")
+        return sid
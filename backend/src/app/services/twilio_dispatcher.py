@@ -0,0 +1,222 @@
+"""
+Fila assíncrona de envio de mensagens ao Twilio.
+
+O ``client.messages.create`` do SDK do Twilio é síncrono (HTTPS bloqueante).
+Os envios são colocados em uma fila limitada e processados por um pool de
+workers que executam a chamada em thread, respeitando um limite de envios por
+segundo por remetente e repetindo falhas transitórias com backoff exponencial.
+O resultado (SIDs ou erro) é registrado em ``envios_twilio`` após o envio.
+
+Mensagens de um mesmo ``EnvioTwilio`` são enviadas em ordem pelo mesmo
+worker (ex.: orientação seguida da pergunta).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.repositories.envios_twilio import EnviosTwilioRepo
+
+logger = logging.getLogger(__name__)
+
+Recorder = Callable[..., Awaitable[Any]]
+
+
+@dataclass
+class EnvioTwilio:
+    """Grupo de mensagens para um destinatário, enviado em sequência."""
+
+    client: Any
+    telefone: str
+    mensagens: List[Dict[str, Any]]
+    sender: str = ""
+    # Parâmetros de texto usados se uma mensagem (template) falhar em definitivo
+    fallback: Optional[Dict[str, Any]] = None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+
+@dataclass
+class ResultadoEnvio:
+    sids: List[str]
+    tentativas: int
+    status: str
+    erro: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "enviado"
+
+
+class FalhaEnvio(Exception):
+    """Falha definitiva de uma mensagem após esgotar as tentativas."""
+
+    def __init__(self, erro: Exception, tentativas: int):
+        super().__init__(str(erro))
+        self.erro = erro
+        self.tentativas = tentativas
+
+
+class RateLimiter:
+    """Token bucket por remetente."""
+
+    def __init__(self, rate_per_second: float, burst: Optional[int] = None):
+        self.rate = float(rate_per_second)
+        self.burst = float(burst or max(1, int(rate_per_second)))
+        self._buckets: Dict[str, List[float]] = {}
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, key: str) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                tokens, updated = self._buckets.get(key, [self.burst, now])
+                tokens = min(self.burst, tokens + (now - updated) * self.rate)
+                if tokens >= 1:
+                    self._buckets[key] = [tokens - 1, now]
+                    return
+                self._buckets[key] = [tokens, now]
+                wait = (1 - tokens) / self.rate
+            await asyncio.sleep(wait)
+
+
+def _is_retryable(exc: Exception) -> bool:
+    """Erros 4xx do Twilio (exceto 429) não melhoram com nova tentativa."""
+    status = getattr(exc, "status", None)
+    if isinstance(status, int) and 400 <= status < 500 and status != 429:
+        return False
+    return True
+
+
+class TwilioDispatcher:
+    """Pool de workers que consome a fila de envios."""
+
+    def __init__(
+        self,
+        *,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        rate_per_second: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        recorder: Optional[Recorder] = None,
+    ):
+        self.workers = workers if workers is not None else settings.TWILIO_DISPATCH_WORKERS
+        self.queue_size = queue_size if queue_size is not None else settings.TWILIO_DISPATCH_QUEUE_SIZE
+        self.max_retries = max_retries if max_retries is not None else settings.TWILIO_SEND_MAX_RETRIES
+        self.backoff_base = backoff_base if backoff_base is not None else settings.TWILIO_SEND_BACKOFF_SECONDS
+        self.rate_limiter = RateLimiter(
+            rate_per_second if rate_per_second is not None else settings.TWILIO_SEND_RATE_PER_SECOND
+        )
+        self._recorder = recorder or EnviosTwilioRepo().record
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"twilio-dispatch-{i}")
+            for i in range(max(1, self.workers))
+        ]
+        logger.info("Fila de envios Twilio iniciada com %d workers", len(self._tasks))
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Aguarda a fila esvaziar (até ``timeout``) e encerra os workers."""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Fila de envios Twilio encerrada com %d envios pendentes", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def submit(self, envio: EnvioTwilio) -> bool:
+        """Enfileira o envio sem bloquear; retorna False se a fila não aceitar."""
+        if not self.running:
+            return False
+        try:
+            self._queue.put_nowait(envio)
+            return True
+        except asyncio.QueueFull:
+            logger.warning("Fila de envios Twilio cheia; envio %s recusado", envio.id)
+            return False
+
+    async def _worker(self) -> None:
+        while True:
+            envio = await self._queue.get()
+            try:
+                resultado = await self.deliver(envio, use_fallback=True)
+                await self._record(envio, resultado)
+            except Exception as exc:  # pragma: no cover - proteção do worker
+                logger.exception("Erro inesperado no envio Twilio %s: %s", envio.id, exc)
+            finally:
+                self._queue.task_done()
+
+    async def _send(self, envio: EnvioTwilio, params: Dict[str, Any]) -> tuple[str, int]:
+        """Envia uma mensagem com retentativas; retorna (SID, tentativas) ou levanta FalhaEnvio."""
+        tentativas = 0
+        while True:
+            tentativas += 1
+            await self.rate_limiter.acquire(envio.sender)
+            try:
+                message = await asyncio.to_thread(envio.client.messages.create, **params)
+                return str(message.sid), tentativas
+            except Exception as exc:
+                if tentativas > self.max_retries or not _is_retryable(exc):
+                    raise FalhaEnvio(exc, tentativas) from exc
+                delay = self.backoff_base * (2 ** (tentativas - 1))
+                logger.info(
+                    "Envio Twilio %s falhou (tentativa %d), nova tentativa em %.2fs: %s",
+                    envio.id, tentativas, delay, exc,
+                )
+                await asyncio.sleep(delay)
+
+    async def deliver(self, envio: EnvioTwilio, use_fallback: bool = False) -> ResultadoEnvio:
+        """Envia as mensagens do grupo em ordem; interrompe na primeira falha definitiva."""
+        sids: List[str] = []
+        total_tentativas = 0
+        for params in envio.mensagens:
+            try:
+                sid, tentativas = await self._send(envio, params)
+            except FalhaEnvio as exc:
+                total_tentativas += exc.tentativas
+                logger.warning("Falha definitiva no envio Twilio %s: %s", envio.id, exc)
+                if use_fallback and envio.fallback and params.get("content_sid"):
+                    try:
+                        sid, tentativas = await self._send(envio, envio.fallback)
+                        return ResultadoEnvio(sids + [sid], total_tentativas + tentativas, "fallback", str(exc))
+                    except FalhaEnvio as fallback_exc:
+                        total_tentativas += fallback_exc.tentativas
+                return ResultadoEnvio(sids, total_tentativas, "falhou", str(exc))
+            sids.append(sid)
+            total_tentativas += tentativas
+        return ResultadoEnvio(sids, total_tentativas, "enviado")
+
+    async def _record(self, envio: EnvioTwilio, resultado: ResultadoEnvio) -> None:
+        await self._recorder(
+            envio_id=envio.id,
+            telefone=envio.telefone,
+            status=resultado.status,
+            sids=resultado.sids,
+            tentativas=resultado.tentativas,
+            erro=resultado.erro,
+        )
+
+
+twilio_dispatcher = TwilioDispatcher()
@@ -1,14 +1,18 @@
-import asyncio
-from typing import List
+import logging
+from typing import Dict, List, Optional, Tuple
 
+from app.core.config import settings
 from app.core.database import connect_to_mongo, db
 from app.models.base import RespostaItem
 from app.repositories.diagnosticos import DiagnosticosRepo
-from app.repositories.perguntas import PerguntasRepo
 from app.repositories.questionarios import QuestionariosRepo
 from app.repositories.respostas import RespostasRepo
 from app.services.diagnostico_service import DiagnosticoService
+from app.services.scoring_plan import scoring_plans
 from app.workers import celery_app
+from app.workers.runtime import run_in_worker
+
+logger = logging.getLogger(__name__)
 
 
 async def _ensure_db_connection() -> None:
@@ -17,7 +21,7 @@ async def _ensure_db_connection() -> None:
 
 
 def _run(coro):
-    return asyncio.run(coro)
+    return run_in_worker(coro)
 
 
 async def _calculate_diagnostico_async(anon_id: str, questionario_id: str) -> str:
@@ -34,20 +38,91 @@ async def _calculate_diagnostico_async(anon_id: str, questionario_id: str) -> st
     if not questionario:
         return "questionario_nao_encontrado"
 
-    perguntas = await PerguntasRepo().get_questions(questionario_id)
+    plano = await scoring_plans.get(questionario)
     respostas = [RespostaItem(**r) for r in respostas_doc.get("respostas", [])]
 
     service = DiagnosticoService()
     diagnostico = service.calculate_score(
         respostas=respostas,
         questionario=questionario,
-        perguntas=perguntas,
+        plano=plano,
     )
     diagnostico.anonId = anon_id
     await d_repo.create_diagnostico(diagnostico.model_dump())
     return "ok"
 
 
+async def _batch_calculate_diagnosticos_async(
+    anon_ids: List[str],
+    questionario_id: str,
+    chunk_size: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Recalcula diagnósticos de vários respondentes em um único event loop.
+
+    Questionário e plano de scoring são carregados uma vez; as respostas vêm
+    de um único cursor ``$in``. A cada ``chunk_size`` respondentes, o bloco é
+    pontuado de uma vez (``DiagnosticoService.calculate_scores``, matricial
+    com NumPy nos questionários COPSOQ) e gravado com ``insert_many``.
+    """
+    await _ensure_db_connection()
+    resultados = {"ok": 0, "erro": 0}
+    pendentes = dict.fromkeys(anon_ids)
+    if not pendentes:
+        return resultados
+
+    questionario = await QuestionariosRepo().get_by_id(questionario_id)
+    if not questionario:
+        resultados["erro"] = len(pendentes)
+        return resultados
+
+    plano = await scoring_plans.get(questionario)
+    service = DiagnosticoService()
+    d_repo = DiagnosticosRepo()
+    chunk_size = max(1, chunk_size or settings.DIAGNOSTICO_BATCH_CHUNK_SIZE)
+    bloco: List[Tuple[str, List[RespostaItem]]] = []
+
+    async def _gravar() -> None:
+        try:
+            diagnosticos = service.calculate_scores([respostas for _, respostas in bloco], questionario, plano)
+        except Exception as exc:
+            logger.warning("Falha ao calcular %d diagnósticos em lote: %s", len(bloco), exc)
+            resultados["erro"] += len(bloco)
+            bloco.clear()
+            return
+        lote = []
+        for (anon_id, _), diagnostico in zip(bloco, diagnosticos, strict=True):
+            diagnostico.anonId = anon_id
+            lote.append(diagnostico.model_dump())
+        bloco.clear()
+        inseridos = await d_repo.create_many(lote)
+        resultados["ok"] += inseridos
+        resultados["erro"] += len(lote) - inseridos
+
+    async for respostas_doc in RespostasRepo().iter_answers_for_anon_ids(
+        list(pendentes), questionario_id, batch_size=chunk_size
+    ):
+        anon_id = respostas_doc.get("anonId")
+        if anon_id not in pendentes:
+            continue
+        del pendentes[anon_id]
+        try:
+            respostas = [RespostaItem(**r) for r in respostas_doc.get("respostas", [])]
+        except Exception as exc:
+            logger.warning("Falha ao ler respostas de %s: %s", anon_id, exc)
+            resultados["erro"] += 1
+            continue
+        bloco.append((anon_id, respostas))
+        if len(bloco) >= chunk_size:
+            await _gravar()
+
+    if bloco:
+        await _gravar()
+    # Respondentes sem documento de respostas
+    resultados["erro"] += len(pendentes)
+    return resultados
+
+
 @celery_app.task(name="calculate_diagnostico")
 def calculate_diagnostico(anon_id: str, questionario_id: str) -> str:
     return _run(_calculate_diagnostico_async(anon_id, questionario_id))
@@ -55,14 +130,4 @@ def calculate_diagnostico(anon_id: str, questionario_id: str) -> str:
 
 @celery_app.task(name="batch_calculate_diagnosticos")
 def batch_calculate_diagnosticos(anon_ids: List[str], questionario_id: str) -> dict:
-    resultados = {"ok": 0, "erro": 0}
-    for anon_id in anon_ids:
-        try:
-            status = _run(_calculate_diagnostico_async(anon_id, questionario_id))
-            if status == "ok":
-                resultados["ok"] += 1
-            else:
-                resultados["erro"] += 1
-        except Exception:
-            resultados["erro"] += 1
-    return resultados
+    return _run(_batch_calculate_diagnosticos_async(anon_ids, questionario_id))
@@ -1,12 +1,33 @@
-import asyncio
-from typing import Optional
+import io
+import logging
+import tempfile
+import zipfile
+from typing import Any, Dict, List, Optional
 
+from bson import ObjectId
+from celery import chord, group
+
+from app.core.config import settings
 from app.core.database import connect_to_mongo, db
-from app.repositories.diagnosticos import DiagnosticosRepo
+from app.repositories.exportacoes import (
+    STATUS_CONCLUIDO,
+    STATUS_ERRO,
+    STATUS_PROCESSANDO,
+    ExportacoesRepo,
+)
 from app.repositories.relatorios import RelatoriosRepo
-from app.repositories.usuarios import UsuariosRepo
+from app.services.export_cache import export_cache
+from app.services.relatorio_export_service import RelatorioExportService, serialize_relatorio
 from app.services.relatorio_service import RelatorioService
 from app.workers import celery_app
+from app.workers.runtime import run_in_worker
+
+logger = logging.getLogger(__name__)
+
+# Erros individuais guardados no job (o restante só entra na contagem de falhas)
+_MAX_ERROS_REGISTRADOS = 20
+# ZIP fica em memória até este tamanho; acima disso, em arquivo temporário
+_ZIP_SPOOL_BYTES = 16 * 1024 * 1024
 
 
 async def _ensure_db_connection() -> None:
@@ -15,7 +36,7 @@ async def _ensure_db_connection() -> None:
 
 
 def _run(coro):
-    return asyncio.run(coro)
+    return run_in_worker(coro)
 
 
 async def _generate_report_async(
@@ -24,31 +45,18 @@ async def _generate_report_async(
     setor_id: Optional[str],
     tipo: str,
     gerado_por: str,
+    refresh: bool = False,
 ) -> Optional[str]:
     await _ensure_db_connection()
-    u_repo = UsuariosRepo()
-    d_repo = DiagnosticosRepo()
     r_repo = RelatoriosRepo()
     service = RelatorioService()
 
-    users = await u_repo.list_users_by_org(org_id, setor_id)
-    anon_ids = [u.get("anonId") for u in users if u.get("anonId")]
-    if not anon_ids:
-        return None
-
-    diagnosticos = await d_repo.find_by_anon_ids(anon_ids, questionario_id)
-    if not diagnosticos:
+    agregado = await service.agregar_escopo(questionario_id, tipo, org_id, setor_id, refresh=refresh)
+    if not agregado["respondentes"]:
         return None
 
-    latest_diag_map = {}
-    for d in diagnosticos:
-        aid = d.get("anonId")
-        if aid and aid not in latest_diag_map:
-            latest_diag_map[aid] = d
-    clean_diags = list(latest_diag_map.values())
-
-    relatorio = service.generate_relatorio(
-        clean_diags,
+    relatorio = service.generate_relatorio_agregado(
+        agregado,
         questionario_id,
         tipo,
         org_id,
@@ -64,6 +72,7 @@ def generate_organizational_report(
     questionario_id: str,
     org_id: str,
     gerado_por: str = "system",
+    refresh: bool = False,
 ) -> Optional[str]:
     return _run(
         _generate_report_async(
@@ -72,6 +81,7 @@ def generate_organizational_report(
             setor_id=None,
             tipo="organizacional",
             gerado_por=gerado_por,
+            refresh=refresh,
         )
     )
 
@@ -82,6 +92,7 @@ def generate_sector_report(
     setor_id: str,
     org_id: str,
     gerado_por: str = "system",
+    refresh: bool = False,
 ) -> Optional[str]:
     return _run(
         _generate_report_async(
@@ -90,6 +101,205 @@ def generate_sector_report(
             setor_id=setor_id,
             tipo="setorial",
             gerado_por=gerado_por,
+            refresh=refresh,
         )
     )
 
+
+def _zip_compressao(formato: str) -> int:
+    # PDF e XLSX já são comprimidos; só o CSV ganha com deflate
+    return zipfile.ZIP_DEFLATED if formato == "csv" else zipfile.ZIP_STORED
+
+
+async def _export_relatorios_zip_async(job_id: str) -> Optional[str]:
+    """
+    Divide o job em partes e dispara a renderização em paralelo.
+
+    fpdf2/openpyxl são CPU-bound: threads no mesmo processo ficam presas ao
+    GIL. Cada parte de ``EXPORT_ZIP_PARTE_RELATORIOS`` relatórios vira uma
+    task ``render_relatorios_zip_parte``, distribuída entre os processos dos
+    workers; um ``chord`` chama ``finalizar_exportacao_zip`` quando todas
+    terminam, ou ``falhar_exportacao_zip`` se alguma delas (ou a finalização)
+    levantar exceção.
+    """
+    await _ensure_db_connection()
+    repo = ExportacoesRepo()
+    job = await repo.get_by_id(job_id)
+    if not job:
+        return None
+
+    filtros = job.get("filtros") or {}
+    tamanho_parte = max(1, settings.EXPORT_ZIP_PARTE_RELATORIOS)
+    try:
+        ids = [
+            str(relatorio["_id"])
+            async for relatorio in RelatoriosRepo().iter_by_filters(
+                questionario_id=filtros.get("idQuestionario"),
+                org_id=filtros.get("idOrganizacao"),
+                setor_id=filtros.get("idSetor"),
+                tipo=filtros.get("tipo"),
+                projection={"_id": 1},
+            )
+        ]
+        await repo.update(job_id, {"status": STATUS_PROCESSANDO, "total": len(ids)})
+        if not ids:
+            return await _finalizar_exportacao_zip_async([], job_id)
+        partes = [ids[i:i + tamanho_parte] for i in range(0, len(ids), tamanho_parte)]
+        chord(
+            group(
+                render_relatorios_zip_parte.s(job_id, job["formato"], parte_ids, numero)
+                for numero, parte_ids in enumerate(partes)
+            ),
+            finalizar_exportacao_zip.s(job_id),
+        ).on_error(falhar_exportacao_zip.s(job_id)).apply_async()
+    except Exception as exc:
+        logger.exception("Exportação em lote %s falhou ao distribuir as partes", job_id)
+        await repo.update(job_id, {"status": STATUS_ERRO, "erro": str(exc)})
+        return None
+    logger.info("Exportação em lote %s: %d relatórios em %d partes", job_id, len(ids), len(partes))
+    return job_id
+
+
+async def _render_relatorios_zip_parte_async(
+    job_id: str,
+    formato: str,
+    relatorio_ids: List[str],
+    numero: int,
+) -> Dict[str, Any]:
+    """
+    Renderiza uma parte do job em um ZIP parcial gravado no GridFS.
+
+    Falhas não interrompem o ``chord``: a parte sempre retorna o resumo
+    (``idArquivo``, ``processados``, ``falhas``, ``erros``), com os relatórios
+    que não puderam ser renderizados contados como falha.
+    """
+    await _ensure_db_connection()
+    repo = ExportacoesRepo()
+    service = RelatorioExportService()
+    falhas = 0
+    erros: List[Dict[str, Any]] = []
+    file_id = None
+    try:
+        relatorios = await RelatoriosRepo().find_by_ids(relatorio_ids)
+        encontrados = {str(relatorio["_id"]) for relatorio in relatorios}
+        for relatorio_id in relatorio_ids:
+            if relatorio_id not in encontrados:
+                falhas += 1
+                erros.append({"idRelatorio": relatorio_id, "erro": "relatório não encontrado"})
+
+        with tempfile.SpooledTemporaryFile(max_size=_ZIP_SPOOL_BYTES) as destino:
+            with zipfile.ZipFile(destino, "w") as arquivo:
+                for relatorio in relatorios:
+                    serializado = serialize_relatorio(relatorio, include_full_payload=True)
+                    try:
+                        resultado = service.export(serializado, formato, export_cache)
+                    except Exception as exc:
+                        falhas += 1
+                        erros.append({"idRelatorio": serializado.get("id"), "erro": str(exc)})
+                        continue
+                    arquivo.writestr(
+                        service.archive_name(serializado, formato),
+                        resultado["payload"],
+                        compress_type=_zip_compressao(formato),
+                    )
+            destino.seek(0)
+            file_id = await repo.save_arquivo(f"relatorios_{job_id}_parte_{numero}.zip", destino, job_id)
+    except Exception as exc:
+        logger.exception("Parte %d da exportação em lote %s falhou", numero, job_id)
+        falhas = len(relatorio_ids)
+        erros = [{"idRelatorio": None, "erro": str(exc)}]
+        file_id = None
+
+    erros = erros[:_MAX_ERROS_REGISTRADOS]
+    try:
+        await repo.registrar_progresso(job_id, len(relatorio_ids), falhas, erros, _MAX_ERROS_REGISTRADOS)
+    except Exception:
+        logger.warning("Não foi possível registrar o progresso da parte %d do job %s", numero, job_id)
+    return {
+        "idArquivo": str(file_id) if file_id else None,
+        "processados": len(relatorio_ids),
+        "falhas": falhas,
+        "erros": erros,
+    }
+
+
+async def _finalizar_exportacao_zip_async(partes: List[Dict[str, Any]], job_id: str) -> Optional[str]:
+    """Junta os ZIPs parciais (na ordem das partes) no ZIP final do job."""
+    await _ensure_db_connection()
+    repo = ExportacoesRepo()
+    arquivos_partes: List[ObjectId] = []
+    try:
+        partes = [parte for parte in partes if parte]
+        arquivos_partes = [ObjectId(parte["idArquivo"]) for parte in partes if parte.get("idArquivo")]
+        processados = sum(parte["processados"] for parte in partes)
+        falhas = sum(parte["falhas"] for parte in partes)
+        erros = [erro for parte in partes for erro in parte["erros"]][:_MAX_ERROS_REGISTRADOS]
+
+        with tempfile.SpooledTemporaryFile(max_size=_ZIP_SPOOL_BYTES) as destino:
+            with zipfile.ZipFile(destino, "w") as arquivo:
+                for file_id in arquivos_partes:
+                    conteudo = await repo.read_arquivo(file_id)
+                    if conteudo is None:
+                        continue
+                    with zipfile.ZipFile(io.BytesIO(conteudo)) as parte:
+                        for info in parte.infolist():
+                            arquivo.writestr(info, parte.read(info))
+            destino.seek(0)
+            file_id = await repo.save_arquivo(f"relatorios_{job_id}.zip", destino, job_id)
+    except Exception as exc:
+        logger.exception("Exportação em lote %s falhou", job_id)
+        await repo.update(job_id, {"status": STATUS_ERRO, "erro": str(exc)})
+        await repo.delete_arquivos_job(job_id)
+        return None
+    finally:
+        for parte_id in arquivos_partes:
+            await repo.delete_arquivo(parte_id)
+
+    await repo.update(
+        job_id,
+        {
+            "processados": processados,
+            "falhas": falhas,
+            "erros": erros,
+            "total": processados,
+            "status": STATUS_CONCLUIDO,
+            "idArquivo": file_id,
+        },
+    )
+    logger.info("Exportação em lote %s concluída: %d relatórios (%d falhas)", job_id, processados, falhas)
+    return str(file_id)
+
+
+async def _falhar_exportacao_zip_async(job_id: str, erro: str) -> None:
+    """
+    Marca o job como ``erro`` e remove os arquivos já gravados no GridFS.
+
+    Partes ainda em execução podem gravar seus ZIPs depois disso; esses
+    arquivos são removidos junto com o job por ``purge_expired``.
+    """
+    await _ensure_db_connection()
+    repo = ExportacoesRepo()
+    await repo.update(job_id, {"status": STATUS_ERRO, "erro": erro})
+    await repo.delete_arquivos_job(job_id)
+
+
+@celery_app.task(name="export_relatorios_zip")
+def export_relatorios_zip(job_id: str) -> Optional[str]:
+    return _run(_export_relatorios_zip_async(job_id))
+
+
+@celery_app.task(name="render_relatorios_zip_parte")
+def render_relatorios_zip_parte(job_id: str, formato: str, relatorio_ids: List[str], numero: int) -> Dict[str, Any]:
+    return _run(_render_relatorios_zip_parte_async(job_id, formato, relatorio_ids, numero))
+
+
+@celery_app.task(name="finalizar_exportacao_zip")
+def finalizar_exportacao_zip(partes: List[Dict[str, Any]], job_id: str) -> Optional[str]:
+    return _run(_finalizar_exportacao_zip_async(partes, job_id))
+
+
+@celery_app.task(name="falhar_exportacao_zip")
+def falhar_exportacao_zip(request, exc, traceback, job_id: str) -> None:
+    # Errback do chord: o Celery chama com (request, exc, traceback) antes dos argumentos parciais.
+    logger.error("Exportação em lote %s interrompida pela task %s: %s", job_id, request.id, exc)
+    _run(_falhar_exportacao_zip_async(job_id, str(exc)))
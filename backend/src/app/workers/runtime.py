@@ -0,0 +1,140 @@
+"""
+Event loop e cliente Motor persistentes por processo worker do Celery.
+
+Antes, cada task rodava em ``asyncio.run``: um event loop novo por execução,
+com o cliente Motor (preso ao loop que o criou) reaproveitado de forma frágil
+e o pool de conexões refeito. Agora cada processo worker mantém um único loop
+em uma thread dedicada, criado no ``worker_process_init`` junto com o cliente
+Motor; as tasks apenas submetem suas corrotinas a esse loop.
+
+O hook de init não faz I/O: o Celery mata o filho que não responde em
+``worker_proc_alive_timeout`` (4 s), e o ping ao MongoDB com retentativas pode
+levar dezenas de segundos. O cliente é criado sem conectar e o ping roda na
+primeira task do processo (``run_in_worker``).
+
+Fora de um worker prefork (``-P solo``/``threads``, scripts, testes) o loop é
+iniciado sob demanda na primeira submissão.
+"""
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Optional, TypeVar
+
+from celery.signals import worker_process_init, worker_process_shutdown
+
+from app.core.database import (
+    close_mongo_connection,
+    create_mongo_client,
+    db,
+    verify_mongo_connection,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class WorkerRuntime:
+    """Loop asyncio de longa duração, executado em thread própria."""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._verified = False
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        return self._loop if self.running else None
+
+    def start(self, connect: bool = True) -> None:
+        """Inicia o loop (se ainda não estiver ativo) e, opcionalmente, cria o cliente MongoDB.
+
+        A criação não acessa a rede; a conexão é verificada em ``ensure_connected``.
+        """
+        with self._lock:
+            if not self.running:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def _main() -> None:
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+                    loop.run_until_complete(loop.shutdown_asyncgens())
+                    loop.close()
+
+                thread = threading.Thread(target=_main, name="worker-event-loop", daemon=True)
+                thread.start()
+                ready.wait()
+                self._loop, self._thread = loop, thread
+                logger.info("Event loop do worker iniciado")
+        if connect:
+            self.run(self._create_client())
+
+    @staticmethod
+    async def _create_client() -> None:
+        if db.client is None:
+            db.client = create_mongo_client()
+
+    @staticmethod
+    async def _verify() -> None:
+        if db.client is None:
+            db.client = create_mongo_client()
+        if not db.connected:
+            await verify_mongo_connection()
+
+    def ensure_connected(self) -> None:
+        """Verifica a conexão ao MongoDB (ping com retentativas) uma vez por processo."""
+        if not self._verified:
+            self.run(self._verify())
+            self._verified = True
+
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """Executa a corrotina no loop do processo e aguarda o resultado."""
+        if not self.running:
+            self.start(connect=False)
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        return future.result(timeout)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Fecha o cliente MongoDB e encerra o loop."""
+        with self._lock:
+            if not self.running:
+                return
+            loop, thread = self._loop, self._thread
+            try:
+                asyncio.run_coroutine_threadsafe(close_mongo_connection(), loop).result(timeout)
+            except Exception as exc:
+                logger.warning("Falha ao fechar conexão MongoDB do worker: %s", exc)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            self._loop, self._thread = None, None
+            self._verified = False
+            logger.info("Event loop do worker encerrado")
+
+
+worker_runtime = WorkerRuntime()
+
+
+def run_in_worker(coro: Awaitable[Any]) -> Any:
+    """Ponto único usado pelas tasks para executar código assíncrono."""
+    worker_runtime.ensure_connected()
+    return worker_runtime.run(coro)
+
+
+@worker_process_init.connect
+def _init_worker_process(**_: Any) -> None:
+    # Cliente herdado do processo pai pelo fork não é seguro para reutilizar.
+    db.client = None
+    db.connected = False
+    worker_runtime.start()
+
+
+@worker_process_shutdown.connect
+def _shutdown_worker_process(**_: Any) -> None:
+    worker_runtime.stop()
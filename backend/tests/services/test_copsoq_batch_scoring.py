@@ -0,0 +1,99 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.services.copsoq_batch_scoring import (
+    AUSENTE,
+    SEM_CLASSIFICACAO,
+    compilar_mapa_itens,
+    montar_matriz,
+    pontuar_lote,
+)
+from app.services.copsoq_scoring_service import COPSOQScoringService, ClassificacaoTercil
+
+service = COPSOQScoringService()
+
+
+def _perguntas_curta_br():
+    perguntas = []
+    for dimensao, regra in service.REGRAS_SOMA_CURTA_BR.items():
+        for item_id in sorted(regra["ids"]):
+            perguntas.append({"idPergunta": item_id, "dimensao": dimensao, "dominio": "D"})
+    perguntas.append({"idPergunta": "LIVRE", "dimensao": "Texto", "dominio": "D", "tipoEscala": "texto_livre"})
+    return perguntas
+
+
+def _perguntas_media_pt():
+    return [
+        {"idPergunta": "VLT_CV_01", "dimensao": "Confiança vertical", "dominio": "VLT"},
+        {"idPergunta": "VLT_CV_03", "dimensao": "Confiança vertical", "dominio": "VLT"},
+        {"idPergunta": "VLT_CH_01", "dimensao": "Confiança horizontal", "dominio": "VLT"},
+        {"idPergunta": "SBE_BO_01", "dimensao": "Burnout", "dominio": "SBE"},
+        {"idPergunta": "SBE_BO_02", "dimensao": "Burnout", "dominio": "SBE"},
+    ]
+
+
+def _esperado(perguntas, respostas, codigo, escala_max):
+    por_dimensao = {}
+    for p in perguntas:
+        if p["idPergunta"] in respostas and p.get("tipoEscala") != "texto_livre":
+            por_dimensao.setdefault((p["dimensao"], p["dominio"]), []).append(
+                {"id_pergunta": p["idPergunta"], "valor": respostas[p["idPergunta"]]}
+            )
+    return {
+        dim: service.processar_dimensao(dim, dom, itens, codigo, escala_max)
+        for (dim, dom), itens in por_dimensao.items()
+    }
+
+
+@pytest.mark.parametrize(
+    "codigo,perguntas,valores",
+    [
+        ("COPSOQ_CURTA_BR", _perguntas_curta_br(), range(0, 5)),
+        ("COPSOQ_MEDIA_PT", _perguntas_media_pt(), range(1, 6)),
+    ],
+)
+def test_lote_equivale_ao_scoring_por_respondente(codigo, perguntas, valores):
+    rng = random.Random(42)
+    mapa = compilar_mapa_itens(perguntas, codigo)
+    respondentes = [
+        {
+            p["idPergunta"]: rng.choice(list(valores))
+            for p in perguntas
+            if rng.random() > 0.15
+        }
+        for _ in range(300)
+    ]
+
+    lote = pontuar_lote(montar_matriz(respondentes, mapa), mapa)
+
+    for linha, respostas in enumerate(respondentes):
+        numericas = [v for k, v in respostas.items() if k != "LIVRE"]
+        escala = 5 if numericas and max(numericas) > 4 else 4
+        esperado = _esperado(perguntas, respostas, codigo, escala)
+        obtido = {r.dimensao: r for r in lote.dimensoes_respondente(linha)}
+        assert set(obtido) == set(esperado)
+        for dimensao, resultado in esperado.items():
+            assert obtido[dimensao].media == resultado.media
+            assert obtido[dimensao].classificacao == resultado.classificacao
+            assert obtido[dimensao].total_itens == resultado.total_itens
+
+
+def test_faixas_de_soma_curta_br_e_itens_ausentes():
+    mapa = compilar_mapa_itens(_perguntas_curta_br(), "COPSOQ_CURTA_BR")
+    colunas = mapa.coluna()
+    burnout = [i for i, d in enumerate(mapa.dimensoes) if d.dimensao == "Burnout"][0]
+    matriz = np.full((2, len(mapa.item_ids)), AUSENTE)
+    matriz[0, colunas["SBE_BO_01A"]] = 2
+    matriz[0, colunas["SBE_BO_01B"]] = 1
+
+    lote = pontuar_lote(matriz, mapa, escala_max=4)
+
+    assert lote.somas[0, burnout] == 3
+    assert lote.medias[0, burnout] == 1.5
+    assert lote.classificacoes[0, burnout] == 1  # soma 3 -> intermediário
+    assert lote.dimensoes_respondente(0)[0].classificacao == ClassificacaoTercil.INTERMEDIARIO
+    assert lote.classificacoes[1, burnout] == SEM_CLASSIFICACAO
+    assert np.isnan(lote.medias[1, burnout])
+    assert lote.dimensoes_respondente(1) == []
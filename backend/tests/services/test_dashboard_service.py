@@ -0,0 +1,222 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from bson import ObjectId
+
+from app.services.dashboard_service import DashboardService
+
+
+class _FakeCursor:
+    def __init__(self, rows):
+        self._rows = rows
+        self._limit = None
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, value):
+        self._limit = value
+        return self
+
+    async def to_list(self, length=None):
+        rows = list(self._rows)
+        return rows[: self._limit] if self._limit else rows
+
+
+class _FakeCollection:
+    def __init__(self, rows=None):
+        self.rows = rows or []
+        self.pipelines = []
+        self.queries = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return _FakeCursor(self.rows)
+
+    def find(self, query=None, projection=None):
+        self.queries.append(query)
+        return _FakeCursor(self.rows)
+
+    async def distinct(self, field):
+        return sorted({row.get(field) for row in self.rows if row.get(field) is not None}, key=str)
+
+    async def estimated_document_count(self):
+        return len(self.rows)
+
+
+class _FakeDb(dict):
+    def __getitem__(self, name):
+        if name not in self:
+            self[name] = _FakeCollection()
+        return dict.__getitem__(self, name)
+
+
+@pytest.mark.asyncio
+async def test_list_organizacoes_usa_um_unico_aggregate():
+    org_id = ObjectId()
+    db = _FakeDb()
+    db["organizacoes"] = _FakeCollection(
+        [
+            {
+                "_id": org_id,
+                "nome": "Org A",
+                "cnpj": "12345678000199",
+                "total_setores": 3,
+                "por_status": [
+                    {"_id": "em andamento", "total": 2},
+                    {"_id": "ativo", "total": 1},
+                    {"_id": "finalizado", "total": 1},
+                ],
+                "finalizados": 1,
+                "questionarios": 2,
+            }
+        ]
+    )
+
+    with patch("app.services.dashboard_service.get_db", AsyncMock(return_value=db)):
+        result = (await DashboardService().list_organizacoes()).items
+
+    assert len(db["organizacoes"].pipelines) == 1
+    assert set(db.keys()) == {"organizacoes"}
+    assert len(result) == 1
+    org = result[0]
+    assert org.id == str(org_id)
+    assert org.total_setores == 3
+    assert org.total_usuarios == 4
+    assert org.usuarios_ativos == 3
+    assert org.questionarios_em_andamento == 2
+    assert org.taxa_conclusao == 25.0
+
+
+@pytest.mark.asyncio
+async def test_list_organizacoes_sem_usuarios():
+    db = _FakeDb()
+    db["organizacoes"] = _FakeCollection([{"_id": ObjectId(), "nome": "Vazia", "cnpj": ""}])
+
+    with patch("app.services.dashboard_service.get_db", AsyncMock(return_value=db)):
+        result = (await DashboardService().list_organizacoes()).items
+
+    assert result[0].total_usuarios == 0
+    assert result[0].taxa_conclusao == 0.0
+    assert result[0].questionarios_em_andamento == 0
+
+
+@pytest.mark.asyncio
+async def test_list_usuarios_ativos_em_lote_com_cursor():
+    org_id, qid = ObjectId(), ObjectId()
+    users = [
+        {"_id": ObjectId(), "telefone": "+5511999990001", "status": "em andamento", "anonId": "a1", "idOrganizacao": org_id},
+        {"_id": ObjectId(), "telefone": "+5511999990002", "status": "ativo", "anonId": "a2", "idOrganizacao": org_id},
+        {"_id": ObjectId(), "telefone": "+5511999990003", "status": "em andamento", "anonId": "a3", "idOrganizacao": org_id},
+    ]
+    db = _FakeDb()
+    db["usuarios"] = _FakeCollection(users)
+    db["organizacoes"] = _FakeCollection([{"_id": org_id, "nome": "Org A"}])
+    db["respostas"] = _FakeCollection(
+        [
+            {"_id": "a1", "idQuestionario": qid, "respondidas": 5},
+            {"_id": "a2", "idQuestionario": qid, "respondidas": 10},
+        ]
+    )
+    db["questionarios"] = _FakeCollection([{"_id": qid, "nome": "COPSOQ"}])
+    db["perguntas"] = _FakeCollection([{"_id": qid, "total": 20}])
+
+    with patch("app.services.dashboard_service.get_db", AsyncMock(return_value=db)), patch(
+        "app.repositories.perguntas.get_db", AsyncMock(return_value=db)
+    ):
+        page = await DashboardService().list_usuarios_ativos(limit=2)
+
+    assert [u.progresso_atual for u in page.items] == [25.0, 50.0]
+    assert page.items[0].questionario_em_andamento == "COPSOQ"
+    assert page.items[0].organizacao == "Org A"
+    assert page.next_cursor
+    assert len(db["respostas"].pipelines) == 1
+    assert len(db["perguntas"].pipelines) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_questionario_metricas_em_um_pipeline():
+    qid = ObjectId()
+    db = _FakeDb()
+    db["questionarios"] = _FakeCollection(
+        [
+            {
+                "_id": qid,
+                "nome": "COPSOQ",
+                "diagnosticos": {
+                    "distribuicao": [
+                        {"_id": "risco", "total": 3},
+                        {"_id": "favoravel", "total": 2},
+                        {"_id": None, "total": 1},
+                    ],
+                    "criticas": [
+                        {"_id": "Burnout", "total": 4},
+                        {"_id": "Estresse", "total": 2},
+                    ],
+                },
+                "participantes": {
+                    "organizacoes": [{"_id": ObjectId(), "nome": "Org A"}],
+                    "setores": [{"_id": ObjectId(), "nome": "RH"}],
+                },
+            }
+        ]
+    )
+
+    with patch("app.services.dashboard_service.get_db", AsyncMock(return_value=db)):
+        result = await DashboardService().get_questionario_metricas(str(qid))
+
+    assert len(db["questionarios"].pipelines) == 1
+    assert set(db.keys()) == {"questionarios"}
+    assert result.distribuicao_classificacoes == {"favoravel": 2, "intermediario": 1, "risco": 3}
+    assert [(d.dimensao, d.total_risco) for d in result.dimensoes_criticas] == [("Burnout", 4), ("Estresse", 2)]
+    assert result.organizacoes_participantes == ["Org A"]
+    assert result.setores_participantes == ["RH"]
+
+
+@pytest.mark.asyncio
+async def test_get_questionario_metricas_inexistente():
+    db = _FakeDb()
+    with patch("app.services.dashboard_service.get_db", AsyncMock(return_value=db)):
+        assert await DashboardService().get_questionario_metricas(str(ObjectId())) is None
+        assert await DashboardService().get_questionario_metricas("invalido") is None
+
+
+@pytest.mark.asyncio
+async def test_get_overview_a_partir_dos_rollups():
+    db = _FakeDb()
+    db["organizacoes"] = _FakeCollection([{"_id": ObjectId()}])
+    db["setores"] = _FakeCollection([{"_id": ObjectId()}, {"_id": ObjectId()}])
+    db["dashboard_rollups"] = _FakeCollection(
+        [
+            {
+                "_id": None,
+                "usuarios": 4,
+                "emAndamento": 3,
+                "respondidos": 1,
+                "dimensoesRisco": 2,
+                "questionarios": [ObjectId(), None],
+            }
+        ]
+    )
+    cache_keys = []
+
+    async def _get_or_compute(key, fn, ttl=None, stale_ttl=None, tags=()):
+        cache_keys.append(key)
+        return await fn()
+
+    with patch("app.services.dashboard_service.get_db", AsyncMock(return_value=db)), patch(
+        "app.repositories.dashboard_rollups.get_db", AsyncMock(return_value=db)
+    ), patch("app.services.dashboard_service.settings.DASHBOARD_USE_ROLLUPS", True), patch(
+        "app.services.dashboard_service.cache.get_or_compute", _get_or_compute
+    ):
+        overview = await DashboardService().get_overview()
+
+    assert "usuarios" not in db and "diagnosticos" not in db
+    assert overview.total_organizacoes == 1
+    assert overview.total_setores == 2
+    assert overview.total_usuarios == 4
+    assert overview.usuarios_ativos == 3
+    assert overview.questionarios_em_andamento == 1
+    assert overview.taxa_conclusao_geral == 25.0
+    assert [a.tipo for a in overview.alertas] == ["baixa_taxa_conclusao", "dimensao_risco"]
+    assert cache_keys == ["dashboard:overview"]
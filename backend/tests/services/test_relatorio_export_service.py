@@ -58,3 +58,103 @@ def test_export_pdf_content():
     assert exported["filename"].endswith(".pdf")
     assert exported["media_type"] == "application/pdf"
     assert exported["payload"].startswith(b"%PDF")
+
+
+def test_export_reaproveita_artefato_em_cache(tmp_path, monkeypatch):
+    from app.services.export_cache import ExportArtifactCache
+
+    cache = ExportArtifactCache(directory=str(tmp_path), max_bytes=1024 * 1024)
+    service = RelatorioExportService()
+    primeiro = service.export(_sample_relatorio(), "csv", cache=cache)
+
+    def _nao_renderiza(_relatorio):
+        raise AssertionError("artefato deveria vir do cache")
+
+    monkeypatch.setattr(service, "build_csv_bytes", _nao_renderiza)
+    segundo = service.export(_sample_relatorio(), "csv", cache=cache)
+
+    assert segundo["payload"] == primeiro["payload"]
+    assert segundo["etag"] == primeiro["etag"] == service.artifact_key(_sample_relatorio(), "CSV")
+
+
+def test_chave_do_artefato_muda_com_conteudo_formato_e_versao(monkeypatch):
+    service = RelatorioExportService()
+    base = service.artifact_key(_sample_relatorio(), "csv")
+    alterado = _sample_relatorio()
+    alterado["recomendacoes"] = ["Outra recomendação"]
+
+    assert service.artifact_key(alterado, "csv") != base
+    assert service.artifact_key(_sample_relatorio(), "pdf") != base
+    monkeypatch.setattr(RelatorioExportService, "RENDERER_VERSION", RelatorioExportService.RENDERER_VERSION + 1)
+    assert service.artifact_key(_sample_relatorio(), "csv") != base
+    with pytest.raises(ValueError):
+        service.artifact_key(_sample_relatorio(), "docx")
+
+
+def test_cache_de_exports_remove_os_menos_usados_ao_passar_do_limite(tmp_path):
+    import os
+
+    from app.services.export_cache import ExportArtifactCache
+
+    cache = ExportArtifactCache(directory=str(tmp_path), max_bytes=250)
+    cache.put("a", b"x" * 100)
+    cache.put("b", b"y" * 100)
+    os.utime(tmp_path / "a.bin", (1, 1))
+    os.utime(tmp_path / "b.bin", (2, 2))
+    assert cache.get("a") == b"x" * 100  # leitura renova "a"
+    cache.put("c", b"z" * 100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    cache.put("grande", b"g" * 300)
+    assert cache.get("grande") is None
+
+
+def test_csv_em_blocos_equivale_ao_arquivo_completo():
+    service = RelatorioExportService()
+    relatorio = _sample_relatorio()
+    relatorio["dominios"][0]["dimensoes"] *= 50
+
+    blocos = list(service.iter_csv_chunks(relatorio, rows_per_chunk=10))
+
+    assert blocos[0] == b"\xef\xbb\xbf"
+    assert len(blocos) > 5
+    assert b"".join(blocos) == service.build_csv_bytes(relatorio)
+    assert b"".join(blocos).decode("utf-8-sig").count("Exigências quantitativas") == 50
+
+
+def test_excel_write_only_preserva_conteudo_e_estilo():
+    openpyxl = pytest.importorskip("openpyxl")
+    from io import BytesIO
+
+    payload = RelatorioExportService().build_excel_bytes(_sample_relatorio())
+    wb = openpyxl.load_workbook(BytesIO(payload))
+
+    assert wb.sheetnames == ["Resumo", "Dominios e Dimensoes", "Recomendacoes"]
+    dimensoes = wb["Dominios e Dimensoes"]
+    assert dimensoes["A1"].font.b
+    assert dimensoes["C2"].value == "Exigências quantitativas"
+    assert dimensoes.column_dimensions["C"].width == 34
+
+
+@pytest.mark.asyncio
+async def test_renderizacao_roda_fora_do_event_loop():
+    import threading
+
+    from app.services.export_renderer import ExportRenderer
+
+    threads = []
+
+    class _Service(RelatorioExportService):
+        def build_csv_bytes(self, relatorio):
+            threads.append(threading.current_thread().name)
+            return super().build_csv_bytes(relatorio)
+
+    renderer = ExportRenderer(max_workers=1)
+    try:
+        exported = await renderer.render(_sample_relatorio(), "csv", service=_Service())
+    finally:
+        renderer.shutdown()
+
+    assert exported["payload"].startswith(b"\xef\xbb\xbf")
+    assert threads and threads[0].startswith("export-render")
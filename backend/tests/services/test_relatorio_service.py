@@ -61,3 +61,19 @@ def test_diagnosticos_vazios():
     rel = service.generate_relatorio([], "qid", "organizacional")
     assert rel.metricas.totalRespondentes == 0
     assert rel.recomendacoes == ["Sem dados suficientes."]
+
+
+def test_relatorio_agregado_equivale_ao_calculo_em_memoria():
+    service = RelatorioService()
+    diagnosticos = [
+        _diagnostico_exemplo("risco", 4.0),
+        _diagnostico_exemplo("favoravel", 2.0),
+        _diagnostico_exemplo("intermediario", 3.0, dim="Burnout"),
+    ]
+    agregado = {"respondentes": 3, "dimensoes": service.agregar_dimensoes(diagnosticos)}
+
+    em_memoria = service.generate_relatorio(diagnosticos, "qid", "organizacional")
+    via_agregado = service.generate_relatorio_agregado(agregado, "qid", "organizacional")
+
+    assert agregado["dimensoes"][0]["total"] == 2
+    assert via_agregado.model_dump(exclude={"dataGeracao"}) == em_memoria.model_dump(exclude={"dataGeracao"})
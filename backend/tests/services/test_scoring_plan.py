@@ -0,0 +1,165 @@
+import random
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.base import RespostaItem
+from app.services.copsoq_scoring_service import ClassificacaoTercil, COPSOQScoringService
+from app.services.diagnostico_service import DiagnosticoService
+from app.services.scoring_plan import ScoringPlanCache, compilar_plano
+
+service = COPSOQScoringService()
+
+
+def _perguntas_curta_br():
+    perguntas = []
+    for dimensao, regra in service.REGRAS_SOMA_CURTA_BR.items():
+        for item_id in sorted(regra["ids"]):
+            perguntas.append({"idPergunta": item_id, "dimensao": dimensao, "dominio": "D", "codigoDominio": "D"})
+    # Item fora da regra na mesma dimensão: a classificação volta para tercis
+    perguntas.append({"idPergunta": "EXTRA_BO", "dimensao": "Burnout", "dominio": "D", "codigoDominio": "D"})
+    perguntas.append({"idPergunta": "LIVRE", "dimensao": "Texto", "dominio": "D", "tipoEscala": "texto_livre"})
+    return perguntas
+
+
+def _perguntas_media_pt():
+    return [
+        {"idPergunta": "VLT_CV_01", "dimensao": "Confiança vertical", "dominio": "VLT"},
+        {"idPergunta": "VLT_CV_03", "dimensao": "Confiança vertical", "dominio": "VLT"},
+        {"idPergunta": "VLT_CH_01", "dimensao": "Confiança horizontal", "dominio": "VLT", "sinal": "protecao"},
+        {"idPergunta": "SBE_BO_01", "dimensao": "Burnout", "dominio": "SBE"},
+        {"idPergunta": "SBE_BO_02", "dimensao": "Burnout", "dominio": "SBE", "sinal": "risco"},
+    ]
+
+
+def _esperado(perguntas, respostas, codigo):
+    """Cálculo de referência por respondente, dimensão a dimensão."""
+    perguntas_map = {p["idPergunta"]: p for p in perguntas}
+    valores = [r.valor for r in respostas if isinstance(r.valor, int)]
+    escala_max = 5 if valores and max(valores) > 4 else 4
+    grupos = {}
+    for r in respostas:
+        p = perguntas_map.get(r.idPergunta)
+        if not p or p.get("tipoEscala") == "texto_livre" or not isinstance(r.valor, int):
+            continue
+        sinal = p.get("sinal") or ("protecao" if service.eh_dimensao_protecao(p["dimensao"]) else "risco")
+        chave = (p["dimensao"], sinal)
+        grupos.setdefault(chave, []).append({"id_pergunta": r.idPergunta, "valor": r.valor})
+    return [
+        service.processar_dimensao(dimensao, "D", itens, codigo, escala_max)
+        for (dimensao, _), itens in grupos.items()
+    ]
+
+
+@pytest.mark.parametrize(
+    "codigo,perguntas,valores",
+    [
+        ("COPSOQ_CURTA_BR", _perguntas_curta_br(), range(0, 5)),
+        ("COPSOQ_MEDIA_PT", _perguntas_media_pt(), range(1, 6)),
+    ],
+)
+def test_plano_equivale_ao_calculo_por_dimensao(codigo, perguntas, valores):
+    rng = random.Random(7)
+    questionario = {"_id": "q", "codigo": codigo}
+    plano = compilar_plano(questionario, perguntas)
+    ids = [p["idPergunta"] for p in perguntas] + ["DESCONHECIDA"]
+
+    for _ in range(300):
+        selecionados = rng.sample(ids, rng.randint(0, len(ids)))
+        respostas = [RespostaItem(idPergunta=i, valor=rng.choice(list(valores))) for i in selecionados]
+
+        obtido = DiagnosticoService().calculate_score(respostas, questionario, plano=plano).dimensoes
+        esperado = _esperado(perguntas, respostas, codigo)
+
+        assert [d.dimensao for d in obtido] == [e.dimensao for e in esperado]
+        for d, e in zip(obtido, esperado, strict=True):
+            assert d.pontuacao == e.media
+            assert d.classificacao == e.classificacao
+            assert d.total_itens == e.total_itens
+
+
+@pytest.mark.parametrize(
+    "codigo,perguntas,valores",
+    [
+        ("COPSOQ_CURTA_BR", _perguntas_curta_br(), range(0, 5)),
+        ("COPSOQ_MEDIA_PT", _perguntas_media_pt(), range(1, 6)),
+        ("OUTRO", _perguntas_media_pt(), range(1, 6)),
+    ],
+)
+def test_calculo_em_lote_equivale_ao_calculo_por_respondente(codigo, perguntas, valores):
+    rng = random.Random(11)
+    questionario = {"_id": "q", "codigo": codigo}
+    plano = compilar_plano(questionario, perguntas)
+    ids = [p["idPergunta"] for p in perguntas] + ["DESCONHECIDA"]
+    lote = []
+    for _ in range(200):
+        selecionados = rng.sample(ids, rng.randint(0, len(ids)))
+        lote.append([RespostaItem(idPergunta=i, valor=rng.choice(list(valores))) for i in selecionados])
+
+    service = DiagnosticoService()
+    obtidos = service.calculate_scores(lote, questionario, plano)
+
+    esperados = [service.calculate_score(respostas, questionario, plano=plano) for respostas in lote]
+    sem_data = {"dataAnalise"}
+    assert [d.model_dump(exclude=sem_data) for d in obtidos] == [e.model_dump(exclude=sem_data) for e in esperados]
+
+
+def test_questionario_nao_copsoq_usa_media_simples_sem_inversao():
+    questionario = {"_id": "q", "codigo": "OUTRO"}
+    perguntas = [
+        {"idPergunta": "VLT_CV_03", "dimensao": "Confiança vertical", "dominio": "VLT"},
+        {"idPergunta": "X2", "dimensao": "Confiança vertical", "dominio": "VLT"},
+    ]
+    respostas = [RespostaItem(idPergunta="VLT_CV_03", valor=4), RespostaItem(idPergunta="X2", valor=5)]
+
+    diag = DiagnosticoService().calculate_score(respostas, questionario, perguntas)
+
+    assert diag.dimensoes[0].pontuacao == 4.5
+    assert diag.dimensoes[0].classificacao == ClassificacaoTercil.RISCO
+    assert diag.dimensoes[0].sinal == "protecao"
+
+
+def _cache(perguntas, maxsize=2):
+    repo = MagicMock()
+    repo.get_questions = AsyncMock(return_value=perguntas)
+    return ScoringPlanCache(maxsize=maxsize, perguntas_repo=repo), repo
+
+
+@pytest.mark.asyncio
+async def test_cache_reaproveita_plano_da_mesma_versao():
+    cache, repo = _cache(_perguntas_media_pt())
+    questionario = {"_id": "q1", "codigo": "COPSOQ_MEDIA_PT", "perguntasVersao": 3}
+
+    primeiro = await cache.get(questionario)
+    segundo = await cache.get(dict(questionario))
+
+    assert primeiro is segundo
+    assert primeiro.versao == 3
+    repo.get_questions.assert_awaited_once_with("q1")
+
+
+@pytest.mark.asyncio
+async def test_cache_recompila_quando_versao_muda_e_descarta_a_anterior():
+    cache, repo = _cache(_perguntas_media_pt())
+    antigo = await cache.get({"_id": "q1", "codigo": "COPSOQ_MEDIA_PT", "perguntasVersao": 1})
+    novo = await cache.get({"_id": "q1", "codigo": "COPSOQ_MEDIA_PT", "perguntasVersao": 2})
+
+    assert novo is not antigo
+    assert list(cache._planos) == [("q1", 2)]
+    assert repo.get_questions.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_lru_e_invalidacao():
+    cache, repo = _cache(_perguntas_media_pt(), maxsize=2)
+    for qid in ("a", "b"):
+        await cache.get({"_id": qid, "codigo": "COPSOQ_MEDIA_PT"})
+    await cache.get({"_id": "a", "codigo": "COPSOQ_MEDIA_PT"})
+    await cache.get({"_id": "c", "codigo": "COPSOQ_MEDIA_PT"})
+
+    assert [c[0] for c in cache._planos] == ["a", "c"]
+
+    cache.invalidate("a")
+    assert [c[0] for c in cache._planos] == ["c"]
+    cache.invalidate()
+    assert not cache._planos
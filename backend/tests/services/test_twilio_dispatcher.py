@@ -0,0 +1,149 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.services.twilio_content_service import TwilioContentService
+from app.services.twilio_dispatcher import EnvioTwilio, RateLimiter, TwilioDispatcher
+
+
+class _TwilioError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class _FakeMessages:
+    def __init__(self, falhas=None):
+        self.enviadas = []
+        self.falhas = list(falhas or [])
+
+    def create(self, **params):
+        if self.falhas:
+            raise self.falhas.pop(0)
+        self.enviadas.append(params)
+        return SimpleNamespace(sid=f"SM{len(self.enviadas)}")
+
+
+class _FakeTwilioClient:
+    def __init__(self, falhas=None):
+        self.messages = _FakeMessages(falhas)
+
+
+def _dispatcher(**kwargs):
+    kwargs.setdefault("recorder", AsyncMock())
+    kwargs.setdefault("rate_per_second", 0)
+    kwargs.setdefault("backoff_base", 0)
+    kwargs.setdefault("workers", 2)
+    return TwilioDispatcher(**kwargs)
+
+
+def _service(client, dispatcher):
+    service = TwilioContentService(client=client, dispatcher=dispatcher)
+    service.settings = SimpleNamespace(
+        **{**vars(service.settings), "TWILIO_TEMPLATE_FREQUENCIA": "HXFREQ", "TWILIO_WHATSAPP_FROM": "+551100000000",
+           "TWILIO_MESSAGING_SERVICE_SID": ""}
+    )
+    return service
+
+
+async def _enviar_pergunta(service):
+    return await service.enviar_pergunta_interativa(
+        telefone="+5511999999999",
+        texto_pergunta="Com que frequência?",
+        tipo_escala="frequencia",
+        opcoes=[{"valor": 1, "texto": "Nunca"}, {"valor": 5, "texto": "Sempre"}],
+        numero_atual=1,
+        total=40,
+        orientacao="Leia com atenção.",
+    )
+
+
+@pytest.mark.asyncio
+async def test_pergunta_enfileirada_envia_orientacao_antes_e_registra_sids():
+    client = _FakeTwilioClient()
+    dispatcher = _dispatcher()
+    await dispatcher.start()
+
+    envio_id = await _enviar_pergunta(_service(client, dispatcher))
+    assert envio_id
+    await dispatcher.stop()
+
+    assert [m.get("body") or m["content_sid"] for m in client.messages.enviadas] == ["Leia com atenção.", "HXFREQ"]
+    assert client.messages.enviadas[0]["from_"] == "whatsapp:+551100000000"
+    registro = dispatcher._recorder.await_args.kwargs
+    assert registro["envio_id"] == envio_id
+    assert registro["status"] == "enviado"
+    assert registro["sids"] == ["SM1", "SM2"]
+
+
+@pytest.mark.asyncio
+async def test_falha_transitoria_e_repetida_com_backoff():
+    client = _FakeTwilioClient(falhas=[_TwilioError(500), _TwilioError(429)])
+    dispatcher = _dispatcher(max_retries=3)
+
+    resultado = await dispatcher.deliver(EnvioTwilio(client=client, telefone="+55", mensagens=[{"body": "oi"}]))
+
+    assert resultado.ok
+    assert resultado.tentativas == 3
+
+
+@pytest.mark.asyncio
+async def test_template_rejeitado_usa_fallback_em_texto():
+    client = _FakeTwilioClient(falhas=[_TwilioError(400)])
+    dispatcher = _dispatcher(max_retries=3)
+    envio = EnvioTwilio(
+        client=client,
+        telefone="+55",
+        mensagens=[{"content_sid": "HX"}],
+        fallback={"body": "1/40 - Pergunta"},
+    )
+
+    resultado = await dispatcher.deliver(envio, use_fallback=True)
+
+    assert resultado.status == "fallback"
+    assert resultado.tentativas == 2
+    assert client.messages.enviadas == [{"body": "1/40 - Pergunta"}]
+
+
+@pytest.mark.asyncio
+async def test_fila_cheia_retorna_vazio_para_fallback_twiml():
+    class _LentoMessages(_FakeMessages):
+        def create(self, **params):
+            time.sleep(0.05)
+            return super().create(**params)
+
+    lento = SimpleNamespace(messages=_LentoMessages())
+    dispatcher = _dispatcher(queue_size=1, workers=1)
+    await dispatcher.start()
+    assert dispatcher.submit(EnvioTwilio(client=lento, telefone="+55", mensagens=[{"body": "a"}]))
+    await asyncio.sleep(0.01)
+    assert dispatcher.submit(EnvioTwilio(client=lento, telefone="+55", mensagens=[{"body": "b"}]))
+
+    sid = await _enviar_pergunta(_service(_FakeTwilioClient(), dispatcher))
+    await dispatcher.stop()
+
+    assert sid == ""
+    assert [m["body"] for m in lento.messages.enviadas] == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_sem_fila_ativa_envia_na_hora():
+    client = _FakeTwilioClient()
+
+    sid = await _enviar_pergunta(_service(client, _dispatcher()))
+
+    assert sid == "SM2"
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_espaca_envios_do_mesmo_remetente():
+    limiter = RateLimiter(rate_per_second=20, burst=1)
+    inicio = time.monotonic()
+    for _ in range(3):
+        await limiter.acquire("whatsapp:+55")
+    await limiter.acquire("outro")
+
+    assert time.monotonic() - inicio >= 0.09
@@ -0,0 +1,116 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from bson import ObjectId
+
+from app.api import deps
+from app.core.security import TokenData
+from app.repositories.usuarios import UsuariosRepo, principal_cache_tag
+
+
+class _FakeCache:
+    def __init__(self):
+        self.data = {}
+        self.tags = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ttl=None, tags=()):
+        self.data[key] = value
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(key)
+
+    async def invalidate_tags(self, *tags):
+        removidas = 0
+        for tag in tags:
+            for key in self.tags.pop(tag, ()):
+                removidas += 1 if self.data.pop(key, None) is not None else 0
+        return removidas
+
+
+class _Usuarios:
+    def __init__(self, doc):
+        self.doc = doc
+        self.projections = []
+
+    async def find_one(self, query, projection=None):
+        self.projections.append(projection)
+        if projection is None:
+            return self.doc
+        projetado = {k: v for k, v in self.doc.items() if k in projection or k == "_id"}
+        if "metadata.is_admin" in projection:
+            projetado["metadata"] = {"is_admin": self.doc["metadata"].get("is_admin")}
+        return projetado
+
+    async def find_one_and_update(self, query, update, **kwargs):
+        before = dict(self.doc)
+        self.doc.update(update["$set"])
+        return before
+
+
+def _usuario():
+    return {
+        "_id": ObjectId(),
+        "telefone": "+5511999999999",
+        "email": "admin@luzia.com",
+        "idOrganizacao": ObjectId(),
+        "anonId": "anon-1",
+        "status": "em andamento",
+        "metadata": {"is_admin": True, "chat_state": {"step": 3}},
+    }
+
+
+@pytest.mark.asyncio
+async def test_principal_em_cache_por_jti_sem_chat_state():
+    usuarios = _Usuarios(_usuario())
+    fake_cache = _FakeCache()
+    token = TokenData(sub="+5511999999999", email="admin@luzia.com", jti="jti-1")
+
+    with patch("app.repositories.usuarios.get_db", AsyncMock(return_value={"usuarios": usuarios})), patch.object(
+        deps, "cache", fake_cache
+    ):
+        primeiro = await deps.get_current_user(token)
+        segundo = await deps.get_current_user(token)
+
+    assert len(usuarios.projections) == 1
+    assert "metadata.is_admin" in usuarios.projections[0]
+    assert primeiro.metadata == segundo.metadata == {"is_admin": True}
+    assert await deps.get_current_admin_user(segundo) is segundo
+
+
+@pytest.mark.asyncio
+async def test_atualizacao_do_usuario_invalida_principal_em_cache():
+    doc = _usuario()
+    usuarios = _Usuarios(doc)
+    fake_cache = _FakeCache()
+    token = TokenData(email="admin@luzia.com", jti="jti-2")
+    get_db = AsyncMock(return_value={"usuarios": usuarios})
+    rollups = SimpleNamespace(apply_user_change=AsyncMock())
+
+    with patch("app.repositories.usuarios.get_db", get_db), patch.object(deps, "cache", fake_cache), patch(
+        "app.repositories.usuarios.cache", fake_cache
+    ), patch("app.repositories.usuarios.DashboardRollupsRepo", return_value=rollups):
+        await deps.get_current_user(token)
+        assert principal_cache_tag(doc["_id"]) in fake_cache.tags
+
+        await UsuariosRepo().update(str(doc["_id"]), {"status": "finalizado"})
+        atualizado = await deps.get_current_user(token)
+
+    assert len(usuarios.projections) == 2
+    assert atualizado.status == "finalizado"
+
+
+@pytest.mark.asyncio
+async def test_cache_desativado_le_sempre_do_banco():
+    usuarios = _Usuarios(_usuario())
+    token = TokenData(email="admin@luzia.com", jti="jti-3")
+
+    with patch("app.repositories.usuarios.get_db", AsyncMock(return_value={"usuarios": usuarios})), patch.object(
+        deps.settings, "AUTH_PRINCIPAL_CACHE_TTL", 0
+    ):
+        await deps.get_current_user(token)
+        await deps.get_current_user(token)
+
+    assert len(usuarios.projections) == 2
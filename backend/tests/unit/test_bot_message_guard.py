@@ -0,0 +1,77 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.bot import endpoints
+from app.bot.message_guard import MessageDedupe, PhoneLocks
+from app.main import app
+
+
+@pytest.mark.asyncio
+async def test_lock_local_serializa_mesmo_telefone():
+    locks = PhoneLocks(backend="local")
+    eventos = []
+
+    async def processar(tag):
+        async with locks.lock("+5511"):
+            eventos.append(f"inicio-{tag}")
+            await asyncio.sleep(0.01)
+            eventos.append(f"fim-{tag}")
+
+    await asyncio.gather(processar("a"), processar("b"))
+
+    assert eventos == ["inicio-a", "fim-a", "inicio-b", "fim-b"]
+    assert locks._locks == {} and locks._waiters == {}
+
+
+@pytest.mark.asyncio
+async def test_lock_local_nao_bloqueia_telefones_diferentes():
+    locks = PhoneLocks(backend="local")
+    eventos = []
+
+    async def processar(phone):
+        async with locks.lock(phone):
+            eventos.append(f"inicio-{phone}")
+            await asyncio.sleep(0.01)
+            eventos.append(f"fim-{phone}")
+
+    await asyncio.gather(processar("+1"), processar("+2"))
+
+    assert eventos[:2] == ["inicio-+1", "inicio-+2"]
+
+
+@pytest.mark.asyncio
+async def test_dedupe_guarda_resposta_vazia_e_limita_memoria():
+    dedupe = MessageDedupe(max_local=2)
+    with patch("app.bot.message_guard.cache.get", AsyncMock(return_value=None)), patch(
+        "app.bot.message_guard.cache.set", AsyncMock()
+    ):
+        await dedupe.set("SM1", "")
+        await dedupe.set("SM2", "oi")
+        await dedupe.set("SM3", "tchau")
+
+        assert await dedupe.get("SM2") == "oi"
+        assert await dedupe.get("SM3") == "tchau"
+        assert await dedupe.get("SM1") is None
+        assert await dedupe.get("") is None
+
+
+def test_webhook_reenvio_com_mesmo_message_sid_nao_reprocessa():
+    handle = AsyncMock(return_value="Pergunta 2")
+    form = {"From": "whatsapp:+5511999990000", "Body": "3", "MessageSid": "SM-retry-1"}
+
+    with patch.object(endpoints.bot_flow, "handle_incoming", handle), patch.object(
+        endpoints, "message_dedupe", MessageDedupe()
+    ), patch("app.bot.message_guard.cache.get", AsyncMock(return_value=None)), patch(
+        "app.bot.message_guard.cache.set", AsyncMock()
+    ):
+        client = TestClient(app)
+        primeira = client.post("/bot/twilio/whatsapp", data=form)
+        segunda = client.post("/bot/twilio/whatsapp", data=form)
+
+    assert primeira.status_code == segunda.status_code == 200
+    assert primeira.text == segunda.text
+    assert "Pergunta 2" in segunda.text
+    handle.assert_awaited_once()
@@ -0,0 +1,124 @@
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.bot.flow import BotFlow
+from app.bot.session_store import MongoSessionStore, RedisSessionStore, build_session_store
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def delete(self, key):
+        self.ops.append(("delete", key))
+
+    def hset(self, key, mapping):
+        self.ops.append(("hset", key, mapping))
+
+    def expire(self, key, ttl):
+        self.ops.append(("expire", key, ttl))
+
+    async def execute(self):
+        for op in self.ops:
+            if op[0] == "delete":
+                self.redis.hashes.pop(op[1], None)
+            elif op[0] == "hset":
+                self.redis.hashes[op[1]] = dict(op[2])
+            else:
+                self.redis.ttls[op[1]] = op[2]
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+        self.ttls = {}
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+def _users_repo():
+    repo = MagicMock()
+    repo.update_chat_state = AsyncMock(return_value=True)
+    repo.update_fill_status = AsyncMock(return_value=True)
+    return repo
+
+
+def test_build_session_store_padrao_e_mongo():
+    assert isinstance(build_session_store(_users_repo()), MongoSessionStore)
+    with patch("app.bot.session_store.settings.BOT_SESSION_STORE", "redis"):
+        assert isinstance(build_session_store(_users_repo()), RedisSessionStore)
+
+
+@pytest.mark.asyncio
+async def test_redis_store_preserva_tipos_e_aplica_ttl():
+    users_repo = _users_repo()
+    redis = _FakeRedis()
+    store = RedisSessionStore(users_repo, client=redis)
+    inicio = datetime(2026, 1, 2, 3, 4, 5)
+
+    with patch("app.bot.session_store.settings.QUESTIONNAIRE_TIMEOUT_MINUTES", 90):
+        await store.save("+5511", {"statusChat": "EM_CURSO", "indicePergunta": 3, "dataInicio": inicio})
+
+    assert redis.ttls["bot:session:+5511"] == 90 * 60
+    users_repo.update_chat_state.assert_not_awaited()
+    state = await store.load("+5511", {"metadata": {"chat_state": {"statusChat": "INATIVO"}}})
+    assert state == {"statusChat": "EM_CURSO", "indicePergunta": 3, "dataInicio": inicio}
+
+
+@pytest.mark.asyncio
+async def test_redis_store_sem_sessao_le_ultimo_marco_do_mongo():
+    store = RedisSessionStore(_users_repo(), client=_FakeRedis())
+
+    state = await store.load("+5511", {"metadata": {"chat_state": {"statusChat": "AGUARDANDO_CONFIRMACAO"}}})
+
+    assert state == {"statusChat": "AGUARDANDO_CONFIRMACAO"}
+
+
+@pytest.mark.asyncio
+async def test_redis_store_grava_no_mongo_em_marcos_e_quando_redis_falha():
+    users_repo = _users_repo()
+    store = RedisSessionStore(users_repo, client=_FakeRedis())
+    await store.save("+5511", {"statusChat": "FINALIZADO"}, durable=True)
+    users_repo.update_chat_state.assert_awaited_once_with("+5511", {"statusChat": "FINALIZADO"})
+
+    quebrado = MagicMock()
+    quebrado.pipeline.side_effect = ConnectionError("down")
+    store = RedisSessionStore(users_repo, client=quebrado)
+    await store.save("+5511", {"statusChat": "EM_CURSO"})
+    assert users_repo.update_chat_state.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_fluxo_com_redis_adia_escritas_de_progresso():
+    flow = BotFlow()
+    flow.users_repo.update_chat_state = AsyncMock(return_value=True)
+    flow.users_repo.update_fill_status = AsyncMock(return_value=True)
+    flow.session_store = RedisSessionStore(flow.users_repo, client=_FakeRedis())
+    state = {"statusChat": "EM_CURSO", "indicePergunta": 2}
+
+    with patch("app.bot.flow.get_settings") as get_settings:
+        get_settings.return_value.BOT_SESSION_FLUSH_EVERY = 10
+        await flow._save_chat_state("+5511", state, indicePergunta=3)
+        await flow._save_fill_status("+5511", fill_status="em_andamento", perguntas_respondidas=3)
+        flow.users_repo.update_chat_state.assert_not_awaited()
+        flow.users_repo.update_fill_status.assert_not_awaited()
+
+        await flow._save_chat_state("+5511", state, indicePergunta=10)
+        await flow._save_fill_status("+5511", fill_status="em_andamento", perguntas_respondidas=10)
+        await flow._save_chat_state("+5511", state, statusChat="FINALIZADO")
+
+    assert flow.users_repo.update_chat_state.await_count == 2
+    flow.users_repo.update_fill_status.assert_awaited_once()
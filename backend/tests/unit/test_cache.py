@@ -0,0 +1,353 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from app.core.cache import GEN_SUFFIX, TAG_KEY_PREFIX, CacheClient, LocalCache
+from app.core.serialization import unpack
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def get(self, key):
+        self.ops.append(("get", key))
+        return self
+
+    def pttl(self, key):
+        self.ops.append(("pttl", key))
+        return self
+
+    def set(self, key, value, ex=None):
+        self.ops.append(("set", key, value, ex))
+        return self
+
+    def sadd(self, key, member):
+        self.ops.append(("sadd", key, member))
+        return self
+
+    def expire(self, key, seconds, nx=False, gt=False):
+        self.ops.append(("expire", key, seconds, nx, gt))
+        return self
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        out = []
+        for op, key, *args in self.ops:
+            if op == "get":
+                out.append(self.redis.data.get(key))
+            elif op == "pttl":
+                out.append(self.redis.ttls.get(key, -1) * 1000 if key in self.redis.data else -2)
+            elif op == "set":
+                self.redis.data[key] = args[0]
+                self.redis.ttls[key] = args[1]
+            elif op == "sadd":
+                self.redis.sets.setdefault(key, set()).add(args[0])
+            elif op == "expire":
+                seconds, nx, gt = args
+                atual = self.redis.ttls.get(key)
+                if (nx and atual is None) or (gt and atual is not None and seconds > atual):
+                    self.redis.ttls[key] = seconds
+        return out
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.sets = {}
+        self.published = []
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    async def get(self, key):
+        self.round_trips += 1
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        self.ttls[key] = ex
+        return True
+
+    def _incr(self, key):
+        self.data[key] = str(int(self.data.get(key) or 0) + 1).encode()
+
+    async def eval(self, script, numkeys, *args):
+        keys, argv = args[:numkeys], args[numkeys:]
+        if "SMEMBERS" in script:
+            removidas, membros = 0, []
+            for tag in keys:
+                for key in sorted(self.sets.pop(tag, ())):
+                    membros.append(key)
+                    removidas += 1 if self.data.pop(key, None) is not None else 0
+                    self._incr(key + argv[0])
+            return [removidas, membros]
+        if "INCR" in script:
+            key, gen_key = keys
+            removida = 1 if self.data.pop(key, None) is not None else 0
+            self._incr(gen_key)
+            return removida
+        if "SADD" in script:
+            key, gen_key, *tag_keys = keys
+            geracao, payload, expire = argv
+            if (self.data.get(gen_key) or b"") != geracao:
+                return 0
+            self.data[key] = payload
+            self.ttls[key] = expire
+            for tag_key in tag_keys:
+                self.sets.setdefault(tag_key, set()).add(key)
+                if (self.ttls.get(tag_key) or -1) < expire:
+                    self.ttls[tag_key] = expire
+            return 1
+        (key,), (token,) = keys, argv
+        if self.data.get(key) == token:
+            del self.data[key]
+            return 1
+        return 0
+
+    async def publish(self, channel, message):
+        self.published.append((channel, json.loads(message)))
+
+
+def test_local_cache_descarta_menos_usado_e_expirado():
+    local = LocalCache(max_entries=2)
+    local.set("a", 1, ttl=10)
+    local.set("b", 2, ttl=10)
+    assert local.get("a") == (True, 1)
+    local.set("c", 3, ttl=10)
+
+    assert local.get("b") == (False, None)
+    assert local.get("a") == (True, 1)
+
+    with patch("app.core.cache.time.monotonic", return_value=10**9):
+        assert local.get("c") == (False, None)
+
+
+@pytest.mark.asyncio
+async def test_get_serve_do_l1_sem_ir_ao_redis():
+    redis = _FakeRedis()
+    redis.data["dashboard:overview"] = json.dumps({"total": 3})
+    redis.ttls["dashboard:overview"] = 3600
+    cache = CacheClient(client=redis, l1_max_entries=8, l1_ttl=5)
+
+    assert await cache.get("dashboard:overview") == {"total": 3}
+    assert await cache.get("dashboard:overview") == {"total": 3}
+
+    assert redis.round_trips == 1
+
+
+@pytest.mark.asyncio
+async def test_l1_respeita_ttl_restante_no_redis():
+    redis = _FakeRedis()
+    redis.data["k"] = json.dumps(1)
+    redis.ttls["k"] = 2
+    cache = CacheClient(client=redis, l1_max_entries=8, l1_ttl=30)
+
+    with patch("app.core.cache.time.monotonic", return_value=100.0):
+        await cache.get("k")
+    with patch("app.core.cache.time.monotonic", return_value=102.5):
+        await cache.get("k")
+
+    assert redis.round_trips == 2
+
+
+@pytest.mark.asyncio
+async def test_delete_publica_invalidacao_e_outra_replica_descarta_l1():
+    redis = _FakeRedis()
+    replica_a = CacheClient(client=redis, l1_max_entries=8, l1_ttl=5)
+    replica_b = CacheClient(client=redis, l1_max_entries=8, l1_ttl=5)
+    await replica_a.set("dashboard:overview", {"total": 1}, ttl=60)
+    assert await replica_b.get("dashboard:overview") == {"total": 1}
+
+    await replica_a.delete("dashboard:overview")
+    channel, message = redis.published[-1]
+    assert channel == replica_a.channel
+    replica_b.apply_invalidation(json.dumps(message))
+
+    assert len(replica_b.local) == 0
+    assert await replica_b.get("dashboard:overview") is None
+
+
+@pytest.mark.asyncio
+async def test_invalidate_tags_remove_so_as_chaves_da_tag():
+    redis = _FakeRedis()
+    cache = CacheClient(client=redis, l1_max_entries=8, l1_ttl=5)
+    org_a, org_b = "org:a", "org:b"
+    await cache.set("dashboard:org:a:resumo", {"v": 1}, ttl=60, tags=[org_a])
+    await cache.set("dashboard:org:a:setores", {"v": 2}, ttl=120, tags=[org_a, "dashboard"])
+    await cache.set("dashboard:org:b:resumo", {"v": 3}, ttl=60, tags=[org_b])
+
+    assert redis.ttls[f"{TAG_KEY_PREFIX}{org_a}"] == 120
+    assert await cache.invalidate_tags(org_a) == 2
+
+    assert sorted(k for k in redis.data if not k.endswith(GEN_SUFFIX)) == ["dashboard:org:b:resumo"]
+    assert redis.data[f"dashboard:org:a:resumo{GEN_SUFFIX}"] == b"1"
+    assert f"{TAG_KEY_PREFIX}{org_a}" not in redis.sets
+    assert await cache.get("dashboard:org:a:resumo") is None
+    assert redis.published[-1][1]["keys"] == ["dashboard:org:a:resumo", "dashboard:org:a:setores"]
+
+
+@pytest.mark.asyncio
+async def test_invalidacao_por_lista_de_chaves_e_mensagem_propria_ignorada():
+    redis = _FakeRedis()
+    cache = CacheClient(client=redis, l1_max_entries=8, l1_ttl=5)
+    cache.local.set("dashboard:twilio:saldo:AC1", {"saldo": 1}, ttl=5)
+    cache.local.set("dashboard:overview", {"total": 1}, ttl=5)
+
+    mensagem = {"keys": ["dashboard:twilio:saldo:AC1"]}
+    cache.apply_invalidation(json.dumps({**mensagem, "origem": cache.instance_id}))
+    assert len(cache.local) == 2
+
+    cache.apply_invalidation(json.dumps({**mensagem, "origem": "outra"}))
+    assert cache.local.get("dashboard:twilio:saldo:AC1") == (False, None)
+    assert cache.local.get("dashboard:overview") == (True, {"total": 1})
+
+
+@pytest.mark.asyncio
+async def test_sem_l1_nao_publica_nem_guarda_em_memoria():
+    redis = _FakeRedis()
+    cache = CacheClient(client=redis, l1_max_entries=0)
+
+    await cache.set("k", {"v": 1})
+    assert await cache.get("k") == {"v": 1}
+    await cache.delete("k")
+
+    assert redis.published == []
+    assert len(cache.local) == 0
+
+
+@pytest.mark.asyncio
+async def test_get_or_compute_calcula_uma_vez_para_misses_concorrentes():
+    redis = _FakeRedis()
+    cache = CacheClient(client=redis, l1_max_entries=0)
+    chamadas = 0
+
+    async def _calcular():
+        nonlocal chamadas
+        chamadas += 1
+        await asyncio.sleep(0.01)
+        return {"total": 7}
+
+    resultados = await asyncio.gather(*(cache.get_or_compute("k", _calcular, ttl=60, stale_ttl=30) for _ in range(10)))
+
+    assert chamadas == 1
+    assert all(r == {"total": 7} for r in resultados)
+    assert redis.ttls["k"] == 90
+    assert "k:lock" not in redis.data
+
+
+@pytest.mark.asyncio
+async def test_get_or_compute_serve_valor_vencido_e_recalcula_em_background():
+    redis = _FakeRedis()
+    redis.data["k"] = json.dumps({"v": "antigo"})
+    redis.ttls["k"] = 10  # dentro da janela de 30s de stale
+    cache = CacheClient(client=redis, l1_max_entries=0)
+    chamadas = 0
+
+    async def _calcular():
+        nonlocal chamadas
+        chamadas += 1
+        return {"v": "novo"}
+
+    primeiro = await cache.get_or_compute("k", _calcular, ttl=60, stale_ttl=30)
+    segundo = await cache.get_or_compute("k", _calcular, ttl=60, stale_ttl=30)
+    await asyncio.gather(*cache._inflight.values())
+    await asyncio.sleep(0)
+
+    assert primeiro == segundo == {"v": "antigo"}
+    assert chamadas == 1
+    assert unpack(redis.data["k"]) == {"v": "novo"}
+    assert await cache.get_or_compute("k", _calcular, ttl=60, stale_ttl=30) == {"v": "novo"}
+
+
+@pytest.mark.asyncio
+async def test_get_or_compute_aguarda_calculo_de_outra_replica():
+    redis = _FakeRedis()
+    redis.data["k:lock"] = "outra-replica"
+    cache = CacheClient(client=redis, l1_max_entries=0, lock_timeout=1)
+
+    async def _outra_replica_grava():
+        await asyncio.sleep(0.02)
+        redis.data["k"] = json.dumps({"v": "da outra"})
+        del redis.data["k:lock"]
+
+    async def _calcular():
+        raise AssertionError("não deveria recalcular")
+
+    escrita = asyncio.create_task(_outra_replica_grava())
+    assert await cache.get_or_compute("k", _calcular, ttl=60, stale_ttl=0) == {"v": "da outra"}
+    await escrita
+
+
+@pytest.mark.asyncio
+async def test_get_or_compute_calcula_sem_lock_quando_redis_falha():
+    class _RedisFora(_FakeRedis):
+        async def set(self, *args, **kwargs):
+            raise ConnectionError("redis fora")
+
+        def pipeline(self, transaction=True):
+            raise ConnectionError("redis fora")
+
+    cache = CacheClient(client=_RedisFora(), l1_max_entries=0)
+
+    async def _calcular():
+        return 42
+
+    assert await cache.get_or_compute("k", _calcular, ttl=60) == 42
+
+
+@pytest.mark.asyncio
+async def test_invalidacao_durante_o_calculo_descarta_o_resultado():
+    redis = _FakeRedis()
+    cache = CacheClient(client=redis, l1_max_entries=8, l1_ttl=5)
+    calculando = asyncio.Event()
+    liberar = asyncio.Event()
+    versoes = iter(["antigo", "novo"])
+
+    async def _calcular():
+        valor = next(versoes)
+        if valor == "antigo":
+            calculando.set()
+            await liberar.wait()
+        return {"v": valor}
+
+    primeiro = asyncio.create_task(cache.get_or_compute("dashboard:overview", _calcular, ttl=60, stale_ttl=30))
+    await calculando.wait()
+    # Escrita no banco invalida o overview enquanto o cálculo antigo ainda roda
+    await cache.delete("dashboard:overview")
+    liberar.set()
+
+    assert await primeiro == {"v": "antigo"}
+    assert "dashboard:overview" not in redis.data
+    assert cache.local.get("dashboard:overview") == (False, None)
+    assert await cache.get_or_compute("dashboard:overview", _calcular, ttl=60, stale_ttl=30) == {"v": "novo"}
+    assert unpack(redis.data["dashboard:overview"]) == {"v": "novo"}
+
+
+@pytest.mark.asyncio
+async def test_invalidacao_por_tag_durante_o_calculo_descarta_o_resultado():
+    redis = _FakeRedis()
+    cache = CacheClient(client=redis, l1_max_entries=0)
+    # Valor anterior registrado na tag (expirado ou não, a tag ainda o lista)
+    await cache.set("org:a:setores", {"v": 0}, ttl=60, tags=["org:a"])
+    del redis.data["org:a:setores"]
+
+    async def _calcular():
+        await cache.invalidate_tags("org:a")
+        return {"v": "antigo"}
+
+    assert await cache.get_or_compute("org:a:setores", _calcular, ttl=60, tags=["org:a"]) == {"v": "antigo"}
+    assert "org:a:setores" not in redis.data
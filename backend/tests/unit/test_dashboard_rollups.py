@@ -0,0 +1,141 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from bson import ObjectId
+
+from app.repositories.dashboard_rollups import DashboardRollupsRepo
+
+
+class _FakeRollupsCollection:
+    def __init__(self):
+        self.updates = []
+
+    async def update_one(self, query, update, upsert=False):
+        self.updates.append((query, update, upsert))
+
+
+class _FakeUsuariosCollection:
+    def __init__(self, user=None):
+        self.user = user
+
+    async def find_one(self, query, projection=None):
+        return self.user
+
+
+def _fake_db(user=None):
+    return {
+        "dashboard_rollups": _FakeRollupsCollection(),
+        "usuarios": _FakeUsuariosCollection(user),
+    }
+
+
+@pytest.mark.asyncio
+async def test_apply_user_change_move_contadores_entre_status():
+    org = ObjectId()
+    setor = ObjectId()
+    db = _fake_db()
+    before = {"idOrganizacao": org, "idSetor": setor, "status": "não iniciado", "respondido": False}
+    after = {**before, "status": "finalizado", "respondido": True}
+
+    with patch("app.repositories.dashboard_rollups.get_db", AsyncMock(return_value=db)):
+        await DashboardRollupsRepo().apply_user_change(before, after)
+
+    updates = db["dashboard_rollups"].updates
+    assert len(updates) == 1
+    query, update, upsert = updates[0]
+    assert query == {"idOrganizacao": org, "idSetor": setor, "idQuestionario": None}
+    assert update["$inc"] == {"status.naoIniciado": -1, "status.finalizado": 1, "respondidos": 1}
+    assert upsert is True
+
+
+@pytest.mark.asyncio
+async def test_apply_user_change_troca_de_setor_gera_dois_incrementos():
+    org = ObjectId()
+    antigo, novo = ObjectId(), ObjectId()
+    db = _fake_db()
+    before = {"idOrganizacao": org, "idSetor": antigo, "status": "em andamento"}
+    after = {**before, "idSetor": novo}
+
+    with patch("app.repositories.dashboard_rollups.get_db", AsyncMock(return_value=db)):
+        await DashboardRollupsRepo().apply_user_change(before, after)
+
+    incs = {q["idSetor"]: u["$inc"] for q, u, _ in db["dashboard_rollups"].updates}
+    assert incs[antigo] == {"usuarios": -1, "status.emAndamento": -1}
+    assert incs[novo] == {"usuarios": 1, "status.emAndamento": 1}
+
+
+@pytest.mark.asyncio
+async def test_apply_user_change_sem_mudanca_relevante_nao_escreve():
+    db = _fake_db()
+    doc = {"idOrganizacao": ObjectId(), "status": "ativo", "respondido": False}
+
+    with patch("app.repositories.dashboard_rollups.get_db", AsyncMock(return_value=db)):
+        await DashboardRollupsRepo().apply_user_change(doc, {**doc, "status": "em andamento"})
+
+    assert db["dashboard_rollups"].updates == []
+
+
+@pytest.mark.asyncio
+async def test_record_diagnostico_conta_classificacao_e_dimensoes_em_risco():
+    org, setor, qid = ObjectId(), ObjectId(), ObjectId()
+    db = _fake_db({"idOrganizacao": org, "idSetor": setor})
+    diagnostico = {
+        "anonId": "anon-1",
+        "idQuestionario": qid,
+        "resultadoGlobal": "risco",
+        "dimensoes": [{"classificacao": "risco"}, {"classificacao": "favoravel"}, {"classificacao": "risco"}],
+    }
+
+    with patch("app.repositories.dashboard_rollups.get_db", AsyncMock(return_value=db)):
+        await DashboardRollupsRepo().record_diagnostico(diagnostico)
+
+    query, update, _ = db["dashboard_rollups"].updates[0]
+    assert query == {"idOrganizacao": org, "idSetor": setor, "idQuestionario": qid}
+    assert update["$inc"] == {"diagnosticos": 1, "dimensoesRisco": 2, "classificacoes.risco": 1}
+
+
+@pytest.mark.asyncio
+async def test_increment_falha_nao_propaga_excecao():
+    with patch("app.repositories.dashboard_rollups.get_db", AsyncMock(side_effect=RuntimeError("down"))):
+        ok = await DashboardRollupsRepo().increment(None, None, None, {"usuarios": 1})
+
+    assert ok is False
+
+
+@pytest.mark.asyncio
+async def test_increment_invalida_overview_em_cache():
+    db = _fake_db()
+    cache_delete = AsyncMock()
+
+    with patch("app.repositories.dashboard_rollups.get_db", AsyncMock(return_value=db)), patch(
+        "app.repositories.dashboard_rollups.cache.delete", cache_delete
+    ):
+        ok = await DashboardRollupsRepo().increment(None, None, None, {"usuarios": 1})
+
+    assert ok is True
+    cache_delete.assert_awaited_once_with("dashboard:overview")
+
+
+@pytest.mark.asyncio
+async def test_increment_sem_deltas_nao_invalida_cache():
+    cache_delete = AsyncMock()
+
+    with patch("app.repositories.dashboard_rollups.cache.delete", cache_delete):
+        await DashboardRollupsRepo().increment(None, None, None, {"usuarios": 0})
+
+    cache_delete.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_increment_de_respostas_nao_invalida_overview():
+    db = _fake_db()
+    cache_delete = AsyncMock()
+
+    with patch("app.repositories.dashboard_rollups.get_db", AsyncMock(return_value=db)), patch(
+        "app.repositories.dashboard_rollups.cache.delete", cache_delete
+    ):
+        await DashboardRollupsRepo().record_answers("anon-1", ObjectId(), respostas=1, escopo={})
+        await DashboardRollupsRepo().increment(None, None, ObjectId(), {"diagnosticos": 1, "classificacoes.favoravel": 1})
+
+    assert len(db["dashboard_rollups"].updates) == 2
+    cache_delete.assert_not_awaited()
@@ -0,0 +1,135 @@
+from contextlib import ExitStack
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.services.scoring_plan import ScoringPlanCache
+from app.workers import diagnostico_tasks
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+        self.batch = None
+
+    def batch_size(self, size):
+        self.batch = size
+        return self
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+
+class _Collection:
+    def __init__(self, docs=None):
+        self.docs = docs or []
+        self.finds = []
+        self.inseridos = []
+        self.bulk = []
+        self.falhar_indices = set()
+
+    async def find_one(self, query, projection=None):
+        return self.docs[0] if self.docs else None
+
+    def find(self, query, projection=None):
+        self.finds.append(query)
+        return _Cursor(self.docs)
+
+    async def insert_many(self, docs, ordered=True):
+        self.inseridos.append(list(docs))
+        if self.falhar_indices:
+            erros = [{"index": i, "code": 11000} for i in sorted(self.falhar_indices)]
+            raise BulkWriteError({"writeErrors": erros})
+
+    async def bulk_write(self, operations, ordered=True):
+        self.bulk.append(operations)
+
+
+def _perguntas():
+    return [
+        {"idPergunta": "p1", "dominio": "D", "dimensao": "Burnout"},
+        {"idPergunta": "p2", "dominio": "D", "dimensao": "Burnout"},
+    ]
+
+
+def _db(qid, respostas_docs):
+    return {
+        "questionarios": _Collection([{"_id": qid, "codigo": "COPSOQ_MEDIA_PT", "perguntasVersao": 1}]),
+        "respostas": _Collection(respostas_docs),
+        "diagnosticos": _Collection(),
+        "usuarios": _Collection([]),
+        "dashboard_rollups": _Collection(),
+    }
+
+
+async def _executar(db, anon_ids, qid, chunk_size):
+    perguntas_repo = MagicMock()
+    perguntas_repo.get_questions = AsyncMock(return_value=_perguntas())
+    get_db = AsyncMock(return_value=db)
+    with ExitStack() as stack:
+        for modulo in ("questionarios", "respostas", "diagnosticos", "dashboard_rollups", "escopo"):
+            stack.enter_context(patch(f"app.repositories.{modulo}.get_db", get_db))
+        stack.enter_context(patch.object(diagnostico_tasks, "_ensure_db_connection", AsyncMock()))
+        stack.enter_context(patch.object(diagnostico_tasks, "scoring_plans", ScoringPlanCache(perguntas_repo=perguntas_repo)))
+        stack.enter_context(patch("app.repositories.dashboard_rollups.cache.delete", AsyncMock()))
+        resultado = await diagnostico_tasks._batch_calculate_diagnosticos_async(anon_ids, str(qid), chunk_size)
+    return resultado, perguntas_repo
+
+
+@pytest.mark.asyncio
+async def test_lote_usa_um_cursor_e_grava_em_blocos():
+    qid = ObjectId()
+    docs = [
+        {"anonId": f"a{i}", "respostas": [{"idPergunta": "p1", "valor": 1}, {"idPergunta": "p2", "valor": i % 5}]}
+        for i in range(5)
+    ]
+    db = _db(qid, docs)
+    org, setor = ObjectId(), ObjectId()
+    db["usuarios"].docs = [{"anonId": "a0", "idOrganizacao": org, "idSetor": setor, "numeroUnidade": "7"}]
+
+    resultado, perguntas_repo = await _executar(db, [f"a{i}" for i in range(5)] + ["sem_respostas"], qid, 2)
+
+    assert resultado == {"ok": 5, "erro": 1}
+    assert len(db["respostas"].finds) == 1
+    assert db["respostas"].finds[0]["anonId"] == {"$in": ["a0", "a1", "a2", "a3", "a4", "sem_respostas"]}
+    assert [len(lote) for lote in db["diagnosticos"].inseridos] == [2, 2, 1]
+    assert db["diagnosticos"].inseridos[0][0]["anonId"] == "a0"
+    assert db["diagnosticos"].inseridos[0][0]["idQuestionario"] == qid
+    # Escopo do usuário carimbado no diagnóstico (None quando o usuário não existe)
+    assert db["diagnosticos"].inseridos[0][0]["idOrganizacao"] == org
+    assert db["diagnosticos"].inseridos[0][0]["numeroUnidade"] == "7"
+    assert db["diagnosticos"].inseridos[0][1]["idSetor"] is None
+    assert len(db["usuarios"].finds) == 3
+    perguntas_repo.get_questions.assert_awaited_once()
+    assert len(db["dashboard_rollups"].bulk) == 3
+
+
+@pytest.mark.asyncio
+async def test_lote_conta_falhas_parciais_do_insert_many():
+    qid = ObjectId()
+    docs = [{"anonId": f"a{i}", "respostas": [{"idPergunta": "p1", "valor": 3}]} for i in range(3)]
+    db = _db(qid, docs)
+    db["diagnosticos"].falhar_indices = {1}
+
+    resultado, _ = await _executar(db, ["a0", "a1", "a2"], qid, 10)
+
+    assert resultado == {"ok": 2, "erro": 1}
+    (operacao,) = db["dashboard_rollups"].bulk[0]
+    assert operacao._doc["$inc"]["diagnosticos"] == 2
+
+
+@pytest.mark.asyncio
+async def test_lote_sem_questionario_marca_todos_como_erro():
+    db = _db(ObjectId(), [])
+    db["questionarios"].docs = []
+
+    resultado, _ = await _executar(db, ["a0", "a1"], ObjectId(), 10)
+
+    assert resultado == {"ok": 0, "erro": 2}
+    assert db["diagnosticos"].inseridos == []
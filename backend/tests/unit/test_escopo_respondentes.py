@@ -0,0 +1,108 @@
+from contextlib import ExitStack
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from bson import ObjectId
+
+from app.repositories.respostas import RespostasRepo
+from app.repositories.usuarios import UsuariosRepo
+
+
+class _Collection:
+    def __init__(self, doc=None, matched=0):
+        self.doc = doc
+        self.matched = matched
+        self.updates = []
+        self.update_many_calls = []
+
+    async def find_one(self, query, projection=None):
+        return self.doc
+
+    async def find_one_and_update(self, query, update, **kwargs):
+        self.updates.append((query, update))
+        return self.doc
+
+    async def update_one(self, query, update, upsert=False):
+        self.updates.append((query, update))
+        matched = self.matched if "respostas.idPergunta" in query else 0
+        return SimpleNamespace(matched_count=matched, upserted_id=ObjectId(), acknowledged=True)
+
+    async def update_many(self, query, update):
+        self.update_many_calls.append((query, update))
+        return SimpleNamespace(modified_count=0)
+
+
+def _patch_db(stack, db):
+    get_db = AsyncMock(return_value=db)
+    for modulo in ("usuarios", "respostas", "escopo", "dashboard_rollups", "relatorios"):
+        stack.enter_context(patch(f"app.repositories.{modulo}.get_db", get_db))
+    stack.enter_context(patch("app.repositories.dashboard_rollups.cache.delete", AsyncMock()))
+
+
+@pytest.mark.asyncio
+async def test_push_answer_carimba_escopo_e_reaproveita_no_rollup():
+    org, setor = ObjectId(), ObjectId()
+    db = {
+        "usuarios": _Collection({"anonId": "a1", "idOrganizacao": org, "idSetor": setor, "numeroUnidade": "3"}),
+        "respostas": _Collection(),
+        "dashboard_rollups": _Collection(),
+    }
+
+    with ExitStack() as stack:
+        _patch_db(stack, db)
+        assert await RespostasRepo().push_answer("a1", str(ObjectId()), "p1", valor=2)
+
+    _, upsert = db["respostas"].updates[-1]
+    assert upsert["$set"]["idOrganizacao"] == org
+    assert upsert["$set"]["idSetor"] == setor
+    assert upsert["$set"]["numeroUnidade"] == "3"
+    (rollup_query, _), = db["dashboard_rollups"].updates
+    assert rollup_query["idOrganizacao"] == org and rollup_query["idSetor"] == setor
+
+
+@pytest.mark.asyncio
+async def test_troca_de_setor_propaga_escopo_para_respostas_e_diagnosticos():
+    org, antigo, novo = ObjectId(), ObjectId(), ObjectId()
+    before = {"anonId": "a1", "idOrganizacao": org, "idSetor": antigo, "status": "ativo"}
+    db = {
+        "usuarios": _Collection(before),
+        "respostas": _Collection(),
+        "diagnosticos": _Collection(),
+        "dashboard_rollups": _Collection(),
+        "relatorios": _Collection(),
+    }
+
+    with ExitStack() as stack:
+        _patch_db(stack, db)
+        assert await UsuariosRepo().update_org_setor("+5511999999999", str(org), str(novo), "12")
+
+    for colecao in ("respostas", "diagnosticos"):
+        (query, update), = db[colecao].update_many_calls
+        assert query == {"anonId": "a1"}
+        assert update == {"$set": {"idOrganizacao": org, "idSetor": novo, "numeroUnidade": "12"}}
+
+    # Só os relatórios setoriais dos dois setores perdem o estado incremental
+    (query, update), = db["relatorios"].update_many_calls
+    assert query["$or"] == [{"idSetor": {"$in": [antigo, novo]}}]
+    assert update == {"$set": {"estadoAgregacao.obsoleto": True}}
+
+
+@pytest.mark.asyncio
+async def test_atualizacao_sem_mudanca_de_escopo_nao_reescreve_documentos():
+    before = {"anonId": "a1", "idOrganizacao": ObjectId(), "idSetor": ObjectId(), "status": "ativo"}
+    db = {
+        "usuarios": _Collection(before),
+        "respostas": _Collection(),
+        "diagnosticos": _Collection(),
+        "dashboard_rollups": _Collection(),
+        "relatorios": _Collection(),
+    }
+
+    with ExitStack() as stack:
+        _patch_db(stack, db)
+        await UsuariosRepo().update(str(ObjectId()), {"email": "x@y.com"})
+
+    assert db["respostas"].update_many_calls == []
+    assert db["diagnosticos"].update_many_calls == []
+    assert db["relatorios"].update_many_calls == []
@@ -0,0 +1,253 @@
+import asyncio
+import io
+import zipfile
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from bson import ObjectId
+
+from app.api.v1 import relatorios as api
+from app.repositories.exportacoes import STATUS_CONCLUIDO, STATUS_ERRO, STATUS_PROCESSANDO
+from app.workers import relatorio_tasks
+
+
+class _FakeExportacoes:
+    def __init__(self, job=None):
+        self.job = job
+        self.updates = []
+        self.progresso = []
+        self.arquivos = {}
+        self.removidos = []
+        self.jobs_limpos = []
+
+    async def get_by_id(self, job_id):
+        return self.job
+
+    async def update(self, job_id, data):
+        self.updates.append(dict(data))
+        return True
+
+    async def registrar_progresso(self, job_id, processados, falhas, erros, max_erros):
+        self.progresso.append((processados, falhas, erros))
+
+    async def save_arquivo(self, filename, source, job_id):
+        file_id = ObjectId()
+        self.arquivos[file_id] = source.read()
+        return file_id
+
+    async def read_arquivo(self, file_id):
+        return self.arquivos.get(file_id)
+
+    async def delete_arquivo(self, file_id):
+        self.removidos.append(file_id)
+        self.arquivos.pop(file_id, None)
+
+    async def delete_arquivos_job(self, job_id):
+        self.jobs_limpos.append(job_id)
+        self.arquivos.clear()
+
+
+class _FakeExportService:
+    def __init__(self, falhar=()):
+        self.falhar = set(falhar)
+
+    def export(self, relatorio, formato, cache=None):
+        if relatorio["id"] in self.falhar:
+            raise RuntimeError("falha ao renderizar")
+        return {"payload": f"{formato}:{relatorio['id']}".encode()}
+
+    def archive_name(self, relatorio, formato):
+        return f"{relatorio['tipoRelatorio']}_{relatorio['id']}.{formato}"
+
+
+def _relatorios(n):
+    return [
+        {"_id": ObjectId(), "tipoRelatorio": "organizacional", "dataGeracao": datetime(2024, 1, 1)}
+        for _ in range(n)
+    ]
+
+
+async def _render_parte(repo, docs, ids, service):
+    with patch.object(relatorio_tasks, "_ensure_db_connection", AsyncMock()), \
+         patch.object(relatorio_tasks, "ExportacoesRepo", return_value=repo), \
+         patch.object(relatorio_tasks, "RelatorioExportService", return_value=service), \
+         patch.object(relatorio_tasks.RelatoriosRepo, "find_by_ids", AsyncMock(return_value=docs)):
+        return await relatorio_tasks._render_relatorios_zip_parte_async("job", "csv", ids, 0)
+
+
+async def _finalizar(repo, partes):
+    with patch.object(relatorio_tasks, "_ensure_db_connection", AsyncMock()), \
+         patch.object(relatorio_tasks, "ExportacoesRepo", return_value=repo):
+        return await relatorio_tasks._finalizar_exportacao_zip_async(partes, "job")
+
+
+@pytest.mark.asyncio
+async def test_export_lote_distribui_partes_em_um_chord():
+    docs = _relatorios(5)
+    job_id = str(ObjectId())
+    repo = _FakeExportacoes({"_id": ObjectId(job_id), "filtros": {"idQuestionario": "q1"}, "formato": "pdf"})
+    chamadas = []
+
+    async def _iter_by_filters(self, **kwargs):
+        chamadas.append(kwargs)
+        for doc in docs:
+            yield {"_id": doc["_id"]}
+
+    fake_chord = MagicMock()
+    with patch.object(relatorio_tasks, "_ensure_db_connection", AsyncMock()), \
+         patch.object(relatorio_tasks, "ExportacoesRepo", return_value=repo), \
+         patch.object(relatorio_tasks, "chord", fake_chord), \
+         patch.object(relatorio_tasks.settings, "EXPORT_ZIP_PARTE_RELATORIOS", 2), \
+         patch.object(relatorio_tasks.RelatoriosRepo, "iter_by_filters", _iter_by_filters):
+        assert await relatorio_tasks._export_relatorios_zip_async(job_id) == job_id
+
+    assert chamadas[0]["projection"] == {"_id": 1}
+    assert repo.updates == [{"status": STATUS_PROCESSANDO, "total": 5}]
+    (cabecalho, corpo), _ = fake_chord.call_args
+    ids = [str(doc["_id"]) for doc in docs]
+    assert [tarefa.args for tarefa in cabecalho.tasks] == [
+        (job_id, "pdf", ids[0:2], 0),
+        (job_id, "pdf", ids[2:4], 1),
+        (job_id, "pdf", ids[4:5], 2),
+    ]
+    assert corpo.args == (job_id,)
+    (errback,), _ = fake_chord.return_value.on_error.call_args
+    assert errback.task == "falhar_exportacao_zip"
+    assert errback.args == (job_id,)
+    fake_chord.return_value.on_error.return_value.apply_async.assert_called_once_with()
+
+
+def test_parte_que_levanta_excecao_marca_o_job_como_erro_e_remove_as_partes():
+    repo = _FakeExportacoes()
+    repo.arquivos[ObjectId()] = b"parte-ja-gravada"
+    morreu = AsyncMock(side_effect=MemoryError("worker sem memória"))
+
+    # O errback é o mesmo anexado ao chord; o Celery o chama quando a task falha.
+    with patch.object(relatorio_tasks, "_run", asyncio.run), \
+         patch.object(relatorio_tasks, "_ensure_db_connection", AsyncMock()), \
+         patch.object(relatorio_tasks, "ExportacoesRepo", return_value=repo), \
+         patch.object(relatorio_tasks, "_render_relatorios_zip_parte_async", morreu):
+        resultado = relatorio_tasks.render_relatorios_zip_parte.apply(
+            args=("job", "csv", ["r1"], 0),
+            link_error=relatorio_tasks.falhar_exportacao_zip.s("job"),
+        )
+
+    assert resultado.failed()
+    assert repo.updates == [{"status": STATUS_ERRO, "erro": "worker sem memória"}]
+    assert repo.jobs_limpos == ["job"]
+    assert repo.arquivos == {}
+
+
+@pytest.mark.asyncio
+async def test_parte_grava_zip_parcial_e_continua_quando_um_relatorio_falha():
+    docs = _relatorios(3)
+    falho = str(docs[1]["_id"])
+    ids = [str(doc["_id"]) for doc in docs] + [str(ObjectId())]
+    repo = _FakeExportacoes()
+
+    resumo = await _render_parte(repo, docs, ids, _FakeExportService(falhar={falho}))
+
+    with zipfile.ZipFile(io.BytesIO(repo.arquivos[ObjectId(resumo["idArquivo"])])) as arquivo:
+        assert arquivo.namelist() == [f"organizacional_{docs[i]['_id']}.csv" for i in (0, 2)]
+        assert arquivo.read(f"organizacional_{docs[0]['_id']}.csv") == f"csv:{docs[0]['_id']}".encode()
+    assert resumo["processados"] == 4
+    assert resumo["falhas"] == 2
+    assert {"idRelatorio": falho, "erro": "falha ao renderizar"} in resumo["erros"]
+    assert repo.progresso == [(4, 2, resumo["erros"])]
+
+
+@pytest.mark.asyncio
+async def test_parte_que_falha_inteira_ainda_retorna_resumo_para_o_chord():
+    class _Quebrado(_FakeExportacoes):
+        async def save_arquivo(self, filename, source, job_id):
+            raise RuntimeError("gridfs indisponível")
+
+    docs = _relatorios(2)
+    resumo = await _render_parte(_Quebrado(), docs, [str(d["_id"]) for d in docs], _FakeExportService())
+
+    assert resumo == {
+        "idArquivo": None,
+        "processados": 2,
+        "falhas": 2,
+        "erros": [{"idRelatorio": None, "erro": "gridfs indisponível"}],
+    }
+
+
+@pytest.mark.asyncio
+async def test_finalizacao_junta_partes_e_remove_os_parciais():
+    docs = _relatorios(3)
+    repo = _FakeExportacoes()
+    partes = [
+        await _render_parte(repo, docs[:2], [str(d["_id"]) for d in docs[:2]], _FakeExportService()),
+        await _render_parte(repo, docs[2:], [str(docs[2]["_id"])], _FakeExportService()),
+    ]
+
+    file_id = await _finalizar(repo, partes)
+
+    with zipfile.ZipFile(io.BytesIO(repo.arquivos[ObjectId(file_id)])) as arquivo:
+        assert arquivo.namelist() == [f"organizacional_{doc['_id']}.csv" for doc in docs]
+    assert list(repo.arquivos) == [ObjectId(file_id)]
+    final = repo.updates[-1]
+    assert final["status"] == STATUS_CONCLUIDO
+    assert final["processados"] == final["total"] == 3
+    assert final["falhas"] == 0
+
+
+@pytest.mark.asyncio
+async def test_finalizacao_com_parte_invalida_marca_erro_e_remove_as_partes():
+    docs = _relatorios(1)
+    repo = _FakeExportacoes()
+    valida = await _render_parte(repo, docs, [str(docs[0]["_id"])], _FakeExportService())
+
+    assert await _finalizar(repo, [valida, {"idArquivo": "nao-e-objectid"}]) is None
+
+    assert repo.updates[-1]["status"] == STATUS_ERRO
+    assert repo.jobs_limpos == ["job"]
+    assert repo.arquivos == {}
+
+
+@pytest.mark.asyncio
+async def test_export_lote_marca_erro_quando_gravacao_falha():
+    class _Quebrado(_FakeExportacoes):
+        async def save_arquivo(self, filename, source, job_id):
+            raise RuntimeError("gridfs indisponível")
+
+    job_id = str(ObjectId())
+    repo = _Quebrado({"_id": ObjectId(job_id), "filtros": {}, "formato": "pdf"})
+
+    async def _vazio(self, **kwargs):
+        return
+        yield
+
+    with patch.object(relatorio_tasks, "_ensure_db_connection", AsyncMock()), \
+         patch.object(relatorio_tasks, "ExportacoesRepo", return_value=repo), \
+         patch.object(relatorio_tasks.RelatoriosRepo, "iter_by_filters", _vazio):
+        assert await relatorio_tasks._export_relatorios_zip_async(job_id) is None
+
+    assert repo.updates[-1] == {"status": STATUS_ERRO, "erro": "gridfs indisponível"}
+
+
+def test_status_da_exportacao_expoe_progresso_e_download():
+    job_id = ObjectId()
+    job = {
+        "_id": job_id,
+        "status": STATUS_CONCLUIDO,
+        "formato": "pdf",
+        "total": 4,
+        "processados": 4,
+        "falhas": 1,
+        "erros": [{"idRelatorio": "x", "erro": "boom"}],
+        "idArquivo": ObjectId(),
+    }
+
+    result = api._serialize_exportacao(job)
+
+    assert result["job_id"] == str(job_id)
+    assert result["progresso"] == 100.0
+    assert result["falhas"] == 1
+    assert result["download_url"].endswith(f"/relatorios/export-lote/{job_id}/download")
+
+    pendente = api._serialize_exportacao({**job, "status": "processando", "processados": 1, "idArquivo": None})
+    assert pendente["progresso"] == 25.0
+    assert pendente["download_url"] is None
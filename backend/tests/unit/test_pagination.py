@@ -0,0 +1,152 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from fastapi import Response
+
+from app.core.pagination import (
+    NEXT_CURSOR_HEADER,
+    InvalidCursorError,
+    apply_next_cursor,
+    build_page,
+    clamp_limit,
+    cursor_from_doc,
+    decode_cursor,
+    encode_cursor,
+    keyset_filter,
+    merge_filters,
+    with_sort_fields,
+)
+
+
+def test_cursor_roundtrip_preserva_tipos_bson():
+    oid = ObjectId()
+    when = datetime(2026, 1, 2, 3, 4, 5)
+    values = decode_cursor(encode_cursor({"_id": oid, "dataGeracao": when}))
+    assert values["_id"] == oid
+    assert values["dataGeracao"].replace(tzinfo=None) == when
+
+
+def test_keyset_filter_somente_id():
+    oid = ObjectId()
+    cursor = cursor_from_doc({"_id": oid}, [("_id", 1)])
+    assert keyset_filter(cursor, [("_id", 1)]) == {"_id": {"$gt": oid}}
+
+
+def test_keyset_filter_ordem_composta_descendente():
+    oid = ObjectId()
+    doc = {"_id": oid, "dataAnalise": datetime(2026, 1, 1)}
+    sort = [("dataAnalise", -1)]
+    result = keyset_filter(cursor_from_doc(doc, sort), sort)
+    valor = result["$or"][0]["dataAnalise"]["$lt"]
+    assert valor.replace(tzinfo=None) == datetime(2026, 1, 1)
+    assert result["$or"][1]["_id"] == {"$gt": oid}
+
+
+def test_cursor_invalido():
+    with pytest.raises(InvalidCursorError):
+        keyset_filter("não-é-base64!", [("_id", 1)])
+    with pytest.raises(InvalidCursorError):
+        keyset_filter(encode_cursor({"nome": "x"}), [("_id", 1)])
+
+
+@pytest.mark.parametrize("valor", [{"$ne": None}, [1, 2], {"$where": "sleep(1000)"}])
+def test_cursor_rejeita_operadores_e_listas(valor):
+    with pytest.raises(InvalidCursorError):
+        keyset_filter(encode_cursor({"_id": valor}), [("_id", 1)])
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(encode_cursor({"nome": "x", "_id": valor}))
+
+
+def test_cursor_aceita_escalares_grandes_e_nulos():
+    values = decode_cursor(encode_cursor({"total": 2**40, "nome": None, "_id": ObjectId()}))
+    assert values["total"] == 2**40
+
+
+def test_build_page_indica_proxima_pagina():
+    docs = [{"_id": ObjectId()} for _ in range(3)]
+    page = build_page(docs, 2, [("_id", 1)])
+    assert len(page.items) == 2
+    assert decode_cursor(page.next_cursor)["_id"] == docs[1]["_id"]
+    assert build_page(docs[:2], 2, [("_id", 1)]).next_cursor is None
+
+
+def test_clamp_limit():
+    assert clamp_limit(None) == 100
+    assert clamp_limit(10_000) == 500
+
+
+def test_merge_filters_usa_and_quando_ha_cursor():
+    after = {"_id": {"$gt": ObjectId()}}
+    assert merge_filters({}, after) == after
+    assert merge_filters({"ativo": True}, {}) == {"ativo": True}
+    assert merge_filters({"$or": [{"a": 1}]}, after) == {"$and": [{"$or": [{"a": 1}]}, after]}
+
+
+def test_with_sort_fields_inclui_chaves_da_ordenacao():
+    sort = [("dataGeracao", -1)]
+    assert with_sort_fields({"nome": 1, "_id": 0}, sort) == {"nome": 1, "_id": 1, "dataGeracao": 1}
+    assert with_sort_fields({"dominios": 0}, sort) == {"dominios": 0}
+    assert with_sort_fields(None, sort) is None
+
+
+def test_apply_next_cursor_so_publica_cursor_quando_ha_documento_extra():
+    docs = [{"_id": ObjectId()} for _ in range(3)]
+    response = Response()
+
+    # Última página com exatamente ``limit`` itens: sem cursor para página vazia
+    assert apply_next_cursor(response, docs[:2], 2, [("_id", 1)]) == docs[:2]
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+    assert apply_next_cursor(response, docs, 2, [("_id", 1)]) == docs[:2]
+    assert decode_cursor(response.headers[NEXT_CURSOR_HEADER])["_id"] == docs[1]["_id"]
+
+
+class _FakeFindCursor:
+    def __init__(self, docs):
+        self.docs = docs
+        self.sort_spec = None
+        self.limit_value = None
+
+    def sort(self, spec):
+        self.sort_spec = spec
+        return self
+
+    def limit(self, value):
+        self.limit_value = value
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs[: self.limit_value]
+
+
+class _FakeFindCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = []
+
+    def find(self, query, projection=None):
+        self.calls.append((query, projection))
+        return _FakeFindCursor(self.docs)
+
+
+@pytest.mark.asyncio
+async def test_repo_find_keyset_aplica_cursor_e_ordenacao():
+    from unittest.mock import AsyncMock, patch
+
+    from app.repositories.organizacoes import OrganizacoesRepo
+
+    docs = [{"_id": ObjectId(), "nome": f"Org {i}"} for i in range(3)]
+    collection = _FakeFindCollection(docs)
+    cursor = cursor_from_doc(docs[0], OrganizacoesRepo.LIST_SORT)
+
+    with patch(
+        "app.repositories.base_repository.get_db",
+        AsyncMock(return_value={"organizacoes": collection}),
+    ):
+        result = await OrganizacoesRepo().list_organizations(limit=2, cursor=cursor, projection={"nome": 1})
+
+    query, projection = collection.calls[0]
+    assert query == {"_id": {"$gt": docs[0]["_id"]}}
+    assert projection == {"nome": 1, "_id": 1}
+    assert len(result) == 2
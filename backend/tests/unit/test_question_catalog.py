@@ -0,0 +1,142 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from bson import ObjectId
+
+from app.bot.flow import BotFlow
+from app.bot.question_catalog import QuestionCatalog, compilar_pergunta
+from app.repositories.perguntas import PerguntasRepo
+
+
+def _pergunta(**extra):
+    base = {
+        "idPergunta": "P01",
+        "texto": "Você tem tempo suficiente?",
+        "tipoEscala": "frequencia",
+        "ordem": 1,
+        "opcoesResposta": [
+            {"valor": 0, "texto": " Nunca "},
+            {"valor": 4, "texto": "Sempre"},
+            "invalida",
+        ],
+    }
+    base.update(extra)
+    return base
+
+
+def _catalog(versao=1, perguntas=None):
+    perguntas_repo = MagicMock()
+    perguntas_repo.get_questions = AsyncMock(return_value=perguntas or [_pergunta()])
+    questionarios_repo = MagicMock()
+    questionarios_repo.get_questions_version = AsyncMock(return_value=versao)
+    return QuestionCatalog(perguntas_repo, questionarios_repo)
+
+
+def test_compilar_pergunta_normaliza_opcoes_intervalo_e_subpergunta():
+    pergunta = compilar_pergunta(
+        _pergunta(subPergunta={"texto": "Quem?", "opcoes": ["Colega", " "], "condicao": "valor >= 3"})
+    )
+
+    assert pergunta.opcoes == ({"valor": 0, "texto": "Nunca"}, {"valor": 4, "texto": "Sempre"})
+    assert (pergunta.min_valor, pergunta.max_valor) == (0, 4)
+    assert pergunta.sub_pergunta.opcoes == ("Colega",)
+    assert (pergunta.sub_pergunta.operador, pergunta.sub_pergunta.limiar) == (">=", 3)
+    assert BotFlow._deve_subpergunta(pergunta, 3) is True
+    assert BotFlow._deve_subpergunta(pergunta, [1, 2]) is False
+
+
+def test_compilar_pergunta_sem_opcoes_usa_min_max():
+    pergunta = compilar_pergunta({"idPergunta": "T1", "tipoEscala": "texto_livre", "min": 2, "max": 9})
+
+    assert (pergunta.min_valor, pergunta.max_valor) == (2, 9)
+    assert pergunta.sub_pergunta is None
+
+
+@pytest.mark.asyncio
+async def test_catalogo_reaproveita_perguntas_enquanto_versao_nao_muda():
+    catalog = _catalog()
+    qid = str(ObjectId())
+
+    with patch("app.bot.question_catalog.settings.BOT_QUESTION_CATALOG_CHECK_SECONDS", 0):
+        primeira = await catalog.get(qid)
+        segunda = await catalog.get(qid)
+
+    assert primeira is segunda
+    assert catalog.perguntas_repo.get_questions.await_count == 1
+    assert catalog.questionarios_repo.get_questions_version.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_catalogo_recarrega_quando_versao_muda():
+    catalog = _catalog()
+    qid = str(ObjectId())
+
+    with patch("app.bot.question_catalog.settings.BOT_QUESTION_CATALOG_CHECK_SECONDS", 0):
+        await catalog.get(qid)
+        catalog.questionarios_repo.get_questions_version.return_value = 2
+        await catalog.get(qid)
+
+    assert catalog.perguntas_repo.get_questions.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_catalogo_dentro_do_intervalo_nao_consulta_o_banco():
+    catalog = _catalog()
+    qid = str(ObjectId())
+
+    await catalog.get(qid)
+    await catalog.get(qid)
+
+    assert catalog.questionarios_repo.get_questions_version.await_count == 1
+    catalog.invalidate(qid)
+    await catalog.get(qid)
+    assert catalog.perguntas_repo.get_questions.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_mutacao_de_pergunta_incrementa_versao_e_invalida_catalogo():
+    qid = ObjectId()
+    questionarios = MagicMock()
+    questionarios.update_many = AsyncMock()
+    perguntas = MagicMock()
+    perguntas.insert_one = AsyncMock(return_value=MagicMock(inserted_id=ObjectId()))
+    db = {"perguntas": perguntas, "questionarios": questionarios}
+
+    with patch("app.repositories.perguntas.get_db", AsyncMock(return_value=db)), patch(
+        "app.bot.question_catalog.question_catalog.invalidate"
+    ) as invalidate:
+        await PerguntasRepo().create_question({"idQuestionario": str(qid), "idPergunta": "P99"})
+
+    questionarios.update_many.assert_awaited_once_with(
+        {"_id": {"$in": [qid]}}, {"$inc": {"perguntasVersao": 1}}
+    )
+    invalidate.assert_called_once_with(str(qid))
+
+
+@pytest.mark.asyncio
+async def test_fluxo_em_curso_usa_catalogo_compilado():
+    qid = str(ObjectId())
+    flow = BotFlow()
+    flow.question_catalog = _catalog(
+        perguntas=[
+            _pergunta(subPergunta={"texto": "Quem?", "opcoes": ["Colega", "Chefia"], "condicao": "valor > 0"}),
+            _pergunta(idPergunta="P02", ordem=2),
+        ]
+    )
+    flow.perguntas_repo.get_questions = AsyncMock(side_effect=AssertionError("não deve consultar"))
+    flow.users_repo.find_by_phone = AsyncMock(
+        return_value={
+            "anonId": "anon-1",
+            "metadata": {
+                "chat_state": {"statusChat": "EM_CURSO", "indicePergunta": 0, "idQuestionario": qid}
+            },
+        }
+    )
+    flow.users_repo.update_chat_state = AsyncMock()
+    flow.respostas_repo.push_answer = AsyncMock()
+
+    resposta = await flow.handle_incoming("+5511999990000", "4")
+
+    assert resposta.startswith("Quem?")
+    flow.respostas_repo.push_answer.assert_awaited_once()
+    assert flow.respostas_repo.push_answer.await_args.kwargs["id_pergunta"] == "P01"
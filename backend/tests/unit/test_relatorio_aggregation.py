@@ -0,0 +1,262 @@
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from bson import ObjectId
+
+from app.repositories.diagnosticos import DiagnosticosRepo
+from app.repositories.relatorios import RelatoriosRepo
+from app.services.copsoq_scoring_service import copsoq_scoring_service
+from app.services.relatorio_service import RelatorioService
+
+
+class _AggregateCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class _FakeDiagnosticos:
+    def __init__(self, docs):
+        self.docs = docs
+        self.pipelines = []
+
+    def aggregate(self, pipeline, **kwargs):
+        self.pipelines.append(pipeline)
+        return _AggregateCursor(self.docs)
+
+
+@pytest.mark.asyncio
+async def test_agrega_ultimo_diagnostico_por_anon_id_no_mongo():
+    qid, org, setor = ObjectId(), ObjectId(), ObjectId()
+    linha = {
+        "_id": {"codigo": "SBE", "dominio": "Saúde", "dimensao": "Burnout", "sinal": "risco"},
+        "soma": 14.0,
+        "total": 4,
+        "favoravel": 1,
+        "intermediario": 1,
+        "risco": 2,
+        "ordem": 0,
+    }
+    colecao = _FakeDiagnosticos([{"respondentes": [{"total": 5}], "dimensoes": [linha]}])
+
+    with patch("app.repositories.diagnosticos.get_db", AsyncMock(return_value={"diagnosticos": colecao})):
+        agregado = await DiagnosticosRepo().aggregate_latest_dimensoes(str(qid), org_id=str(org), setor_id=str(setor))
+
+    pipeline = colecao.pipelines[0]
+    # Escopo filtrado pelos campos carimbados, sem $in de anonIds
+    assert pipeline[0] == {"$match": {"idQuestionario": qid, "idOrganizacao": org, "idSetor": setor}}
+    # "Último" diagnóstico pela ordem de criação, a mesma das marcas do refresh
+    assert pipeline[1]["$sort"] == {"anonId": 1, "dataCriacao": -1, "_id": -1}
+    assert pipeline[2]["$group"]["dimensoes"] == {"$first": "$dimensoes"}
+    assert agregado["respondentes"] == 5
+    assert agregado["dimensoes"] == [
+        {
+            "codigo": "SBE",
+            "dominio": "Saúde",
+            "dimensao": "Burnout",
+            "sinal": "risco",
+            "soma": 14.0,
+            "total": 4,
+            "distribuicao": {"favoravel": 1, "intermediario": 1, "risco": 2},
+        }
+    ]
+
+    relatorio = RelatorioService().generate_relatorio_agregado(agregado, str(qid), "organizacional")
+    assert relatorio.metricas.totalRespondentes == 5
+    assert relatorio.dominios[0].dimensoes[0].distribuicao["risco"] == 2
+    assert relatorio.dominios[0].dimensoes[0].media == 3.5
+    assert relatorio.estadoAgregacao is None
+
+
+@pytest.mark.asyncio
+async def test_agregacao_sem_respondentes_nao_consulta_o_banco():
+    get_db = AsyncMock()
+    with patch("app.repositories.diagnosticos.get_db", get_db):
+        agregado = await DiagnosticosRepo().aggregate_latest_dimensoes(str(ObjectId()), anon_ids=[])
+        invalido = await DiagnosticosRepo().aggregate_latest_dimensoes(str(ObjectId()), org_id="invalido")
+
+    assert agregado == invalido == {"respondentes": 0, "dimensoes": []}
+    get_db.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_janela_de_data_filtra_por_data_de_criacao():
+    colecao = _FakeDiagnosticos([])
+    apos, ate = datetime(2026, 1, 1), datetime(2026, 1, 2)
+
+    with patch("app.repositories.diagnosticos.get_db", AsyncMock(return_value={"diagnosticos": colecao})):
+        await DiagnosticosRepo().aggregate_latest_dimensoes(str(ObjectId()), apos=apos, ate=ate)
+
+    assert colecao.pipelines[0][0]["$match"]["dataCriacao"] == {"$gt": apos, "$lte": ate}
+
+
+AGORA = datetime(2026, 1, 10)
+MARCA = AGORA - timedelta(seconds=300)
+VAZIO = {"respondentes": 0, "dimensoes": [], "anonIds": []}
+
+
+def _diag(anon_id, dia, classificacao, pontuacao):
+    return {
+        "anonId": anon_id,
+        "dataAnalise": datetime(2026, 1, dia),
+        "dataCriacao": datetime(2026, 1, dia),
+        "dimensoes": [
+            {
+                "codigoDominio": "SBE",
+                "dominio": "Saúde",
+                "dimensao": "Burnout",
+                "pontuacao": pontuacao,
+                "classificacao": classificacao,
+                "sinal": "risco",
+            }
+        ],
+    }
+
+
+def _agregado(service, diagnosticos, **extra):
+    return {"respondentes": len(diagnosticos), "dimensoes": service.agregar_dimensoes(diagnosticos), **extra}
+
+
+def _estado(service, diagnosticos, marca, **extra):
+    return {**service._estado_agregacao(_agregado(service, diagnosticos)), "marcaDataCriacao": marca, **extra}
+
+
+def _relogio():
+    relogio = MagicMock(wraps=datetime)
+    relogio.utcnow.return_value = AGORA
+    return relogio
+
+
+async def _agregar_escopo(service, d_repo, anterior, *args, **kwargs):
+    r_repo = AsyncMock()
+    r_repo.find_latest_snapshot.return_value = anterior
+    with patch("app.services.relatorio_service.DiagnosticosRepo", return_value=d_repo), patch(
+        "app.services.relatorio_service.RelatoriosRepo", return_value=r_repo
+    ), patch("app.services.relatorio_service.datetime", _relogio()), patch(
+        "app.services.relatorio_service.settings.RELATORIO_REFRESH_MARGEM", 300
+    ):
+        return await service.agregar_escopo(*args, **kwargs)
+
+
+def _sem_zeros(distribuicao):
+    return {k: v for k, v in distribuicao.items() if v}
+
+
+def _assert_equivalente(agregado, completo):
+    assert agregado["respondentes"] == completo["respondentes"]
+    (linha,) = agregado["dimensoes"]
+    (esperada,) = completo["dimensoes"]
+    assert linha["total"] == esperada["total"]
+    assert linha["soma"] == pytest.approx(esperada["soma"])
+    assert _sem_zeros(linha["distribuicao"]) == _sem_zeros(esperada["distribuicao"])
+
+
+@pytest.mark.asyncio
+async def test_refresh_incorpora_novos_e_retira_substituidos():
+    service = RelatorioService()
+    antigos = [_diag("a1", 1, "risco", 4.0), _diag("a2", 2, "favoravel", 1.0)]
+    # a2 refez o questionário e a3 respondeu pela primeira vez
+    novos = [_diag("a2", 5, "intermediario", 3.0), _diag("a3", 6, "risco", 3.8)]
+
+    d_repo = AsyncMock()
+    d_repo.aggregate_latest_dimensoes.side_effect = [
+        _agregado(service, novos, anonIds=["a2", "a3"]),
+        _agregado(service, [antigos[1]]),
+        VAZIO,
+    ]
+    anterior = {"_id": "r1", "estadoAgregacao": _estado(service, antigos, datetime(2026, 1, 2))}
+    agregado = await _agregar_escopo(service, d_repo, anterior, "qid", "organizacional", "org", refresh=True)
+
+    protecao = copsoq_scoring_service.DIMENSOES_PROTECAO
+    novos_call, retirados_call, recentes_call = d_repo.aggregate_latest_dimensoes.await_args_list
+    assert novos_call.kwargs == {
+        "org_id": "org",
+        "setor_id": None,
+        "apos": datetime(2026, 1, 2),
+        "ate": MARCA,
+        "incluir_anon_ids": True,
+        "dimensoes_protecao": protecao,
+    }
+    assert retirados_call.kwargs == {
+        "org_id": "org",
+        "setor_id": None,
+        "anon_ids": ["a2", "a3"],
+        "ate": datetime(2026, 1, 2),
+        "dimensoes_protecao": protecao,
+    }
+    # Diagnósticos criados depois da nova marca entram só como delta do relatório
+    assert recentes_call.kwargs == {
+        "org_id": "org",
+        "setor_id": None,
+        "apos": MARCA,
+        "ate": None,
+        "incluir_anon_ids": True,
+        "dimensoes_protecao": protecao,
+    }
+
+    _assert_equivalente(agregado, _agregado(service, [antigos[0], *novos]))
+    assert agregado["estadoAgregacao"]["marcaDataCriacao"] == MARCA
+    _assert_equivalente(agregado["estadoAgregacao"], agregado)
+
+
+@pytest.mark.asyncio
+async def test_diagnosticos_apos_a_marca_entram_no_relatorio_mas_nao_no_estado():
+    service = RelatorioService()
+    antigos = [_diag("a1", 1, "risco", 4.0), _diag("a2", 2, "favoravel", 1.0)]
+    # a2 refez o questionário dentro da margem: ainda pode haver gravação em curso
+    recente = _diag("a2", 10, "risco", 4.2)
+
+    d_repo = AsyncMock()
+    d_repo.aggregate_latest_dimensoes.side_effect = [
+        _agregado(service, antigos),
+        _agregado(service, [recente], anonIds=["a2"]),
+        _agregado(service, [antigos[1]]),
+    ]
+    agregado = await _agregar_escopo(service, d_repo, None, "qid", "setorial", "org", "setor", refresh=True)
+
+    completo_call = d_repo.aggregate_latest_dimensoes.await_args_list[0]
+    assert completo_call.kwargs == {
+        "org_id": "org",
+        "setor_id": "setor",
+        "ate": MARCA,
+        "dimensoes_protecao": copsoq_scoring_service.DIMENSOES_PROTECAO,
+    }
+    _assert_equivalente(agregado, _agregado(service, [antigos[0], recente]))
+    estado = agregado["estadoAgregacao"]
+    assert estado["marcaDataCriacao"] == MARCA
+    _assert_equivalente(estado, _agregado(service, antigos))
+
+    relatorio = service.generate_relatorio_agregado(agregado, str(ObjectId()), "setorial")
+    assert relatorio.estadoAgregacao == estado
+
+
+@pytest.mark.asyncio
+async def test_marca_anterior_a_frente_do_relogio_refaz_agregacao_completa():
+    service = RelatorioService()
+    d_repo = AsyncMock()
+    d_repo.aggregate_latest_dimensoes.side_effect = [VAZIO, VAZIO]
+    anterior = {"_id": "r1", "estadoAgregacao": _estado(service, [], AGORA)}
+
+    await _agregar_escopo(service, d_repo, anterior, "qid", "organizacional", "org", refresh=True)
+
+    completo_call, _ = d_repo.aggregate_latest_dimensoes.await_args_list
+    assert completo_call.kwargs["ate"] == MARCA
+    assert "apos" not in completo_call.kwargs
+
+
+@pytest.mark.asyncio
+async def test_snapshot_ignora_relatorios_obsoletos_e_sem_marca_de_criacao():
+    colecao = MagicMock()
+    colecao.find_one = AsyncMock(return_value=None)
+    qid, org = ObjectId(), ObjectId()
+
+    with patch("app.repositories.relatorios.get_db", AsyncMock(return_value={"relatorios": colecao})):
+        assert await RelatoriosRepo().find_latest_snapshot(str(qid), "organizacional", str(org)) is None
+
+    (query,), _ = colecao.find_one.await_args
+    assert query["estadoAgregacao.marcaDataCriacao"] == {"$ne": None}
+    assert query["estadoAgregacao.obsoleto"] == {"$ne": True}
+    assert query["idSetor"] is None
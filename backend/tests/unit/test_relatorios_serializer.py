@@ -33,3 +33,27 @@ def test_serialize_relatorio_handles_object_id_fields() -> None:
     assert payload["idSetor"] == str(setor_id)
     assert payload["totalDominios"] == 1
     assert payload["totalDimensoes"] == 1
+
+
+def test_exportar_relatorio_responde_304_quando_etag_confere() -> None:
+    import asyncio
+    from unittest.mock import AsyncMock, patch
+
+    from app.api.v1 import relatorios as api
+    from app.services.relatorio_export_service import RelatorioExportService
+
+    doc = {"_id": ObjectId(), "tipoRelatorio": "organizacional", "dominios": [], "recomendacoes": []}
+    etag = RelatorioExportService().artifact_key(api._serialize_relatorio(doc, include_full_payload=True), "csv")
+    repo = AsyncMock()
+    repo.get_by_id.return_value = doc
+
+    with patch.object(api, "RelatoriosRepo", return_value=repo), patch.object(
+        RelatorioExportService, "export", side_effect=AssertionError("não deveria renderizar")
+    ):
+        response = asyncio.run(
+            api.exportar_relatorio(str(doc["_id"]), api.ExportFormat.CSV, f'W/"outro", "{etag}"', current_user=None)
+        )
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == f'"{etag}"'
+    assert response.headers["cache-control"] == "private, no-cache"
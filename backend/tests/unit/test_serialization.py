@@ -0,0 +1,60 @@
+from datetime import date, datetime
+from enum import Enum
+
+import pytest
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from app.core.serialization import json_dumps, pack, to_jsonable, unpack
+
+
+class _Classificacao(str, Enum):
+    RISCO = "risco"
+
+
+def _relatorio():
+    return {
+        "_id": ObjectId(),
+        "idQuestionario": ObjectId(),
+        "dataGeracao": datetime(2024, 5, 1, 12, 30, 15, 123456),
+        "dominios": [
+            {
+                "codigo": "EL",
+                "dimensoes": [
+                    {"dimensao": "Ritmo", "media": 2.5, "classificacao": _Classificacao.RISCO},
+                ],
+            }
+        ],
+        "periodo": (date(2024, 1, 1), date(2024, 3, 31)),
+        "observacoes": None,
+    }
+
+
+def test_to_jsonable_equivale_ao_jsonable_encoder():
+    doc = _relatorio()
+
+    assert to_jsonable(doc) == jsonable_encoder(doc, custom_encoder={ObjectId: str})
+
+
+def test_json_dumps_serializa_tipos_do_mongo():
+    oid = ObjectId()
+    payload = json_dumps({"b": oid, "a": datetime(2024, 1, 2, 3, 4, 5)}, sort_keys=True)
+
+    assert payload == f'{{"a":"2024-01-02T03:04:05","b":"{oid}"}}'.encode()
+
+
+def test_pack_preserva_datas_e_object_ids():
+    pytest.importorskip("msgpack")
+    doc = _relatorio()
+
+    restored = unpack(pack(doc))
+
+    assert restored["_id"] == doc["_id"]
+    assert restored["dataGeracao"] == doc["dataGeracao"]
+    assert restored["periodo"] == [date(2024, 1, 1), date(2024, 3, 31)]
+    assert restored["dominios"][0]["dimensoes"][0]["classificacao"] == "risco"
+
+
+def test_unpack_le_entradas_json_legadas():
+    assert unpack('{"total": 3}') == {"total": 3}
+    assert unpack(b'{"total": 3}') == {"total": 3}
@@ -0,0 +1,70 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from app.core.database import db
+from app.workers import runtime
+from app.workers.runtime import WorkerRuntime
+
+
+async def _loop_atual():
+    return asyncio.get_running_loop()
+
+
+def test_tasks_compartilham_o_mesmo_loop_do_processo():
+    worker = WorkerRuntime()
+    try:
+        primeiro = worker.run(_loop_atual())
+        segundo = worker.run(_loop_atual())
+
+        assert primeiro is segundo
+        assert primeiro is worker.loop
+        assert not primeiro.is_closed()
+    finally:
+        worker.stop()
+
+    assert not worker.running
+
+
+def test_worker_process_init_nao_acessa_a_rede_e_shutdown_fecha(monkeypatch):
+    worker = WorkerRuntime()
+    monkeypatch.setattr(runtime, "worker_runtime", worker)
+    monkeypatch.setattr(db, "client", object())  # cliente herdado do processo pai
+    monkeypatch.setattr(db, "connected", True)
+
+    verify = AsyncMock()
+    close = AsyncMock()
+    with patch.object(runtime, "create_mongo_client", return_value="cliente-do-worker"), \
+            patch.object(runtime, "verify_mongo_connection", verify), \
+            patch.object(runtime, "close_mongo_connection", close):
+        runtime._init_worker_process()
+        worker.start()
+        assert db.client == "cliente-do-worker"
+        verify.assert_not_awaited()  # o ping não roda dentro do worker_process_init
+        runtime._shutdown_worker_process()
+
+    close.assert_awaited_once()
+    assert not worker.running
+
+
+def test_primeira_task_verifica_a_conexao_uma_vez(monkeypatch):
+    worker = WorkerRuntime()
+    monkeypatch.setattr(runtime, "worker_runtime", worker)
+    monkeypatch.setattr(db, "client", None)
+    monkeypatch.setattr(db, "connected", False)
+
+    async def _verify():
+        db.connected = True
+
+    verify = AsyncMock(side_effect=_verify)
+    with patch.object(runtime, "create_mongo_client", return_value="cliente-do-worker"), \
+            patch.object(runtime, "verify_mongo_connection", verify), \
+            patch.object(runtime, "close_mongo_connection", AsyncMock()):
+        runtime._init_worker_process()
+        try:
+            primeiro = runtime.run_in_worker(_loop_atual())
+            segundo = runtime.run_in_worker(_loop_atual())
+        finally:
+            runtime._shutdown_worker_process()
+
+    assert primeiro is segundo
+    verify.assert_awaited_once()
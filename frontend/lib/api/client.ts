@@ -11,6 +11,8 @@ const API_BASE_URL = useApiProxy
 type QueryParams = Record<string, string | number | undefined | null>;
 
 const DEFAULT_GET_CACHE_TTL_MS = 15_000;
+// Header com o cursor da próxima página nas listagens paginadas do backend.
+const NEXT_CURSOR_HEADER = "X-Next-Cursor";
 
 interface CacheEntry {
   expiresAt: number;
@@ -38,6 +40,8 @@ interface RequestOptions extends Omit<RequestInit, "body"> {
   query?: QueryParams;
   useCache?: boolean;
   cacheTtlMs?: number;
+  // Segue o header X-Next-Cursor e devolve todas as páginas concatenadas.
+  followCursor?: boolean;
 }
 
 function resolveBaseUrl(baseUrl: string): string {
@@ -111,6 +115,7 @@ export async function apiRequest<T>(path: string, options: RequestOptions = {}):
     headers,
     useCache = true,
     cacheTtlMs = DEFAULT_GET_CACHE_TTL_MS,
+    followCursor = false,
     method = "GET",
     signal,
     ...rest
@@ -140,8 +145,8 @@ export async function apiRequest<T>(path: string, options: RequestOptions = {}):
   const hasAbortSignal = Boolean(signal);
   const cacheKey = shouldUseCache ? buildCacheKey(normalizedMethod, requestUrl, token) : "";
 
-  const makeRequest = async (): Promise<T> => {
-    const response = await fetch(requestUrl, {
+  const fetchPage = async (url: string): Promise<{ body: unknown; nextCursor: string | null }> => {
+    const response = await fetch(url, {
       ...rest,
       method: normalizedMethod,
       headers: resolvedHeaders,
@@ -167,11 +172,28 @@ export async function apiRequest<T>(path: string, options: RequestOptions = {}):
       throw new ApiError(parseErrorMessage(detail, fallbackMessage), response.status, detail);
     }
 
+    return { body: responseBody, nextCursor: response.headers.get(NEXT_CURSOR_HEADER) };
+  };
+
+  const makeRequest = async (): Promise<T> => {
+    const first = await fetchPage(requestUrl);
+
     if (normalizedMethod !== "GET") {
       clearApiCache();
     }
 
-    return responseBody as T;
+    if (!followCursor || !Array.isArray(first.body)) {
+      return first.body as T;
+    }
+
+    const items: unknown[] = [...first.body];
+    let cursor = first.nextCursor;
+    while (cursor) {
+      const page = await fetchPage(resolveApiUrl(path, { ...query, cursor }));
+      items.push(...(page.body as unknown[]));
+      cursor = page.nextCursor;
+    }
+    return items as T;
   };
 
   if (!shouldUseCache) {
@@ -16,6 +16,10 @@ interface DashboardRequestOptions {
   signal?: AbortSignal;
 }
 
+// Listagens do dashboard são paginadas por cursor; busca páginas grandes e segue
+// o X-Next-Cursor para não truncar a lista.
+const DASHBOARD_PAGE_LIMIT = 500;
+
 const DASHBOARD_CACHE_TTL = {
   overview: 10_000,
   organizacoesList: 60_000,
@@ -41,6 +45,8 @@ export const dashboardApi = {
   listOrganizacoes(token: string, options: DashboardRequestOptions = {}): Promise<OrganizacaoDashboard[]> {
     return apiRequest<OrganizacaoDashboard[]>("/dashboard/organizacoes", {
       token,
+      query: { limit: DASHBOARD_PAGE_LIMIT },
+      followCursor: true,
       cacheTtlMs: DASHBOARD_CACHE_TTL.organizacoesList,
       ...options,
     });
@@ -61,7 +67,8 @@ export const dashboardApi = {
   listSetores(token: string, orgId?: string, options: DashboardRequestOptions = {}): Promise<SetorDashboard[]> {
     return apiRequest<SetorDashboard[]>("/dashboard/setores", {
       token,
-      query: { org_id: orgId || undefined },
+      query: { org_id: orgId || undefined, limit: DASHBOARD_PAGE_LIMIT },
+      followCursor: true,
       cacheTtlMs: DASHBOARD_CACHE_TTL.setoresList,
       ...options,
     });
@@ -89,7 +96,9 @@ export const dashboardApi = {
       query: {
         org_id: params?.orgId || undefined,
         setor_id: params?.setorId || undefined,
+        limit: DASHBOARD_PAGE_LIMIT,
       },
+      followCursor: true,
       cacheTtlMs: DASHBOARD_CACHE_TTL.usuariosAtivos,
       ...options,
     });
@@ -110,6 +119,8 @@ export const dashboardApi = {
   listQuestionariosStatus(token: string, options: DashboardRequestOptions = {}): Promise<QuestionarioStatus[]> {
     return apiRequest<QuestionarioStatus[]>("/dashboard/questionarios/status", {
       token,
+      query: { limit: DASHBOARD_PAGE_LIMIT },
+      followCursor: true,
       cacheTtlMs: DASHBOARD_CACHE_TTL.questionariosStatus,
       ...options,
     });